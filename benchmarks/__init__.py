@@ -0,0 +1,11 @@
+"""Offline microbenchmarks for Code Agent's hot paths.
+
+Usage:
+    uv run python -m benchmarks                       # run everything, write benchmarks/results/<commit>.json
+    uv run python -m benchmarks -k security -k memory # only benchmarks whose name contains a filter
+    uv run python -m benchmarks --compare benchmarks/results/main.json
+
+Each `bench_*.py` module registers benchmarks with `harness.benchmark`. Benchmarks run
+in a scratch workspace with a throwaway home directory, so they never read or write
+the user's configuration, sessions or memory.
+"""
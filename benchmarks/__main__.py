@@ -0,0 +1,136 @@
+"""Runs the microbenchmarks; see the package docstring for usage."""
+
+import argparse
+import contextlib
+import importlib
+import os
+import pkgutil
+import sys
+import tempfile
+from pathlib import Path
+from typing import List, Optional
+
+from benchmarks import harness
+
+RESULTS_DIR = Path(__file__).parent / "results"
+QUICK_MIN_TIME = 0.05
+QUICK_REPEAT = 3
+
+
+def _load_suites() -> None:
+    for module in pkgutil.iter_modules([str(Path(__file__).parent)]):
+        if module.name.startswith("bench_"):
+            importlib.import_module(f"benchmarks.{module.name}")
+
+
+def _write_config(home: Path) -> None:
+    """Writes the packaged config template, with a sessions directory, as the throwaway home's config."""
+    import yaml
+
+    from code_agent.config.config import DEFAULT_CONFIG_PATH, TEMPLATE_CONFIG_PATH
+
+    config = yaml.safe_load(TEMPLATE_CONFIG_PATH.read_text(encoding="utf-8"))
+    config["sessions_dir"] = str(home / "sessions")
+    DEFAULT_CONFIG_PATH.parent.mkdir(parents=True, exist_ok=True)
+    DEFAULT_CONFIG_PATH.write_text(yaml.safe_dump(config), encoding="utf-8")
+
+
+def _selected(filters: List[str]) -> List[str]:
+    return [name for name in harness.BENCHMARKS if not filters or any(text in name for text in filters)]
+
+
+def _print_comparisons(comparisons: List[harness.Comparison], baseline_path: Path) -> None:
+    print(f"\nCompared with {baseline_path} (best per-call time):")
+    width = max(len(c.name) for c in comparisons)
+    for c in comparisons:
+        flag = "  REGRESSION" if c.regressed else ""
+        print(f"  {c.name:<{width}}  {harness.format_seconds(c.baseline):>10} -> {harness.format_seconds(c.current):>10}  x{c.ratio:.2f}{flag}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Run Code Agent's offline microbenchmarks.")
+    parser.add_argument("-k", dest="filters", action="append", default=[], help="Only run benchmarks whose name contains this text (repeatable)")
+    parser.add_argument("-o", "--output", type=Path, help="Results file (default: benchmarks/results/<commit>.json)")
+    parser.add_argument("--compare", type=Path, help="Baseline results file; exit with status 1 if any benchmark regressed")
+    parser.add_argument("--threshold", type=float, default=harness.DEFAULT_THRESHOLD, help="Slowdown ratio counted as a regression (default: %(default)s)")
+    parser.add_argument("--min-time", type=float, default=harness.DEFAULT_MIN_TIME, help="Minimum seconds per repeat (default: %(default)s)")
+    parser.add_argument("--repeat", type=int, default=harness.DEFAULT_REPEAT, help="Timed repeats per benchmark (default: %(default)s)")
+    parser.add_argument("--quick", action="store_true", help=f"Shorter runs ({QUICK_MIN_TIME} s per repeat, {QUICK_REPEAT} repeats)")
+    parser.add_argument("--list", action="store_true", help="List benchmark names and exit")
+    args = parser.parse_args(argv)
+    min_time, repeat = (QUICK_MIN_TIME, QUICK_REPEAT) if args.quick else (args.min_time, args.repeat)
+
+    # The throwaway home directory only takes effect if code_agent has not read Path.home() yet
+    if any(module == "code_agent" or module.startswith("code_agent.") for module in sys.modules):
+        parser.error("benchmarks must run in a fresh interpreter (python -m benchmarks)")
+
+    baseline = None
+    if args.compare:
+        try:
+            baseline = harness.load_results(args.compare)
+        except (OSError, ValueError) as e:
+            parser.error(f"cannot read baseline: {e}")
+
+    failures = []
+    with tempfile.TemporaryDirectory(prefix="code-agent-bench-") as scratch:
+        home, workspace = Path(scratch) / "home", Path(scratch) / "workspace"
+        home.mkdir()
+        os.environ["HOME"] = str(home)
+        original_cwd = Path.cwd()
+        try:
+            _load_suites()
+            names = _selected(args.filters)
+            if args.list:
+                print("\n".join(names))
+                return 0
+            if not names:
+                parser.error(f"no benchmark matches {args.filters}")
+
+            from code_agent.config.config import initialize_config
+
+            _write_config(home)
+            # Edits must not wait for confirmation
+            initialize_config(cli_auto_approve_edits=True, validate=False)
+
+            results = harness.new_results(min_time, repeat)
+            width = max(len(name) for name in names)
+            for name in names:
+                bench_dir = workspace / name
+                bench_dir.mkdir(parents=True)
+                os.chdir(bench_dir)
+                try:
+                    # Tools print progress and diffs; keep that out of the report
+                    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                        stats = harness.measure(harness.BENCHMARKS[name](bench_dir), min_time=min_time, repeat=repeat)
+                except Exception as e:
+                    failures.append(name)
+                    print(f"{name:<{width}}  FAILED: {type(e).__name__}: {e}")
+                    continue
+                finally:
+                    os.chdir(original_cwd)
+                results["benchmarks"][name] = stats
+                print(
+                    f"{name:<{width}}  min {harness.format_seconds(stats['min']):>10}  median {harness.format_seconds(stats['median']):>10}"
+                    f"  stdev {harness.format_seconds(stats['stdev']):>10}  ({stats['loops']} loops x {stats['repeat']})"
+                )
+        finally:
+            os.chdir(original_cwd)
+
+    output = args.output or RESULTS_DIR / f"{results['commit'] or results['created'].replace(':', '')}.json"
+    harness.save_results(results, output)
+    print(f"\nResults written to {output}")
+
+    regressions = []
+    if baseline is not None:
+        comparisons = harness.compare(baseline, results, args.threshold)
+        if comparisons:
+            _print_comparisons(comparisons, args.compare)
+        regressions = [c.name for c in comparisons if c.regressed]
+        if regressions:
+            print(f"\n{len(regressions)} benchmark(s) slower than x{args.threshold}: {', '.join(regressions)}")
+
+    return 1 if failures or regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
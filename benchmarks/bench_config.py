@@ -0,0 +1,16 @@
+"""Configuration loading benchmarks, with and without the compiled config cache."""
+
+from pathlib import Path
+
+from benchmarks.harness import benchmark
+from code_agent.config.settings_based_config import DEFAULT_CONFIG_PATH, build_effective_config
+
+
+@benchmark("config.build_effective_config.uncached")
+def build_uncached(workspace: Path):
+    return lambda: build_effective_config(DEFAULT_CONFIG_PATH, cli_model="bench-model", use_cache=False)
+
+
+@benchmark("config.build_effective_config.cached")
+def build_cached(workspace: Path):
+    return lambda: build_effective_config(DEFAULT_CONFIG_PATH, cli_model="bench-model", use_cache=True)
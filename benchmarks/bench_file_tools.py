@@ -0,0 +1,70 @@
+"""File tool benchmarks: paged reads, tree search and edit diffs."""
+
+from pathlib import Path
+
+from benchmarks.harness import benchmark
+from code_agent.tools.file_tools import _count_file_lines, _read_file_lines, apply_edit, find_files
+
+READ_LINES = 20_000  # ~0.8 MB, below read_file's 1 MB limit
+PAGE_SIZE = 500
+
+
+def _make_source_file(path: Path, lines: int) -> None:
+    path.write_text("".join(f"    value_{i} = compute(value_{i - 1}, {i})  # line {i}\n" for i in range(lines)), encoding="utf-8")
+
+
+def _read_page(offset: int):
+    def factory(workspace: Path):
+        path = workspace / "big.py"
+        _make_source_file(path, READ_LINES)
+
+        # The work behind a paged read_file call: count the lines, then slice out the page
+        def run():
+            _count_file_lines(path)
+            return _read_file_lines(path, offset, PAGE_SIZE)
+
+        return run
+
+    return factory
+
+
+benchmark("file_tools.read_file.first_page")(_read_page(0))
+benchmark("file_tools.read_file.last_page")(_read_page(READ_LINES - PAGE_SIZE))
+
+
+def _make_tree(root: Path, dirs: int = 10, subdirs: int = 10, files: int = 30) -> None:
+    extensions = (".py", ".md", ".json", ".txt", ".yaml")
+    for d in range(dirs):
+        for s in range(subdirs):
+            directory = root / f"pkg_{d}" / f"mod_{s}"
+            directory.mkdir(parents=True)
+            for f in range(files):
+                (directory / f"file_{f}{extensions[f % len(extensions)]}").touch()
+
+
+@benchmark("file_tools.find_files.all_3000")
+def find_all(workspace: Path):
+    _make_tree(workspace / "tree")
+    return lambda: find_files("tree")
+
+
+@benchmark("file_tools.find_files.pattern_3000")
+def find_pattern(workspace: Path):
+    _make_tree(workspace / "tree")
+    return lambda: find_files("tree", "*.py")
+
+
+@benchmark("file_tools.apply_edit.diff_2000_lines")
+def apply_edit_diff(workspace: Path):
+    original = [f"line {i}: some source text that is long enough to wrap a little\n" for i in range(2000)]
+    edited = [line.upper() if i % 50 == 0 else line for i, line in enumerate(original)]
+    versions = ["".join(original), "".join(edited)]
+    Path("target.txt").write_text(versions[0], encoding="utf-8")
+    state = {"next": 1}
+
+    def run():
+        # Alternate between the two versions so every call has a diff to show and apply
+        apply_edit("target.txt", versions[state["next"]])
+        state["next"] ^= 1
+
+    return run
@@ -0,0 +1,47 @@
+"""Memory search and persistence benchmarks."""
+
+from pathlib import Path
+
+from benchmarks.harness import benchmark
+from code_agent.adk.json_memory_service import JsonFileMemoryService
+from code_agent.adk.memory import MemoryManager, MemoryType
+
+TOPICS = ["python", "testing", "deployment", "database", "frontend", "async", "caching", "security", "logging", "refactoring"]
+
+
+def _sentence(i: int) -> str:
+    first, second = TOPICS[i % len(TOPICS)], TOPICS[(i * 7) % len(TOPICS)]
+    return f"Note {i}: the user worked on {first} and {second} in project {i % 40} and prefers short answers"
+
+
+@benchmark("memory.manager.search_memories_5000")
+def search_memories(workspace: Path):
+    manager = MemoryManager("bench")
+    types = list(MemoryType)
+    manager.add_memories({"content": _sentence(i), "memory_type": types[i % len(types)]} for i in range(5000))
+    return lambda: manager.search_memories("python async testing", limit=10)
+
+
+def _service_with_facts(workspace: Path, facts: int) -> JsonFileMemoryService:
+    service = JsonFileMemoryService(str(workspace / "memory" / "memory.json"))
+    service._memory_store.facts["bench"] = [{"entity": f"user_{i % 25}", "content": _sentence(i)} for i in range(facts)]
+    return service
+
+
+@benchmark("memory.json_service.search_nodes_2000")
+def search_nodes(workspace: Path):
+    service = _service_with_facts(workspace, 2000)
+    return lambda: service.search_nodes("bench", "what project is the user working on")
+
+
+@benchmark("memory.json_service.save_100_sessions")
+def save_to_json(workspace: Path):
+    service = _service_with_facts(workspace, 500)
+    for s in range(100):
+        key = service._get_str_key("code_agent", "user", f"session-{s}")
+        events = [
+            {"id": f"e{s}-{e}", "author": "user" if e % 2 == 0 else "model", "content": {"role": "user", "parts": [{"text": _sentence(s * 40 + e)}]}}
+            for e in range(40)
+        ]
+        service._memory_store.sessions[key] = {"app_name": "code_agent", "user_id": "user", "id": f"session-{s}", "events": events}
+    return service._save_to_json
@@ -0,0 +1,34 @@
+"""Session storage benchmarks."""
+
+from pathlib import Path
+
+from google.adk.events import Event
+from google.adk.sessions import Session
+from google.genai import types as genai_types
+
+from benchmarks.harness import benchmark
+from code_agent.services.session_service import FileSystemSessionService
+
+
+def _saved_session(workspace: Path, events: int) -> FileSystemSessionService:
+    writer = FileSystemSessionService(str(workspace / "sessions"))
+    session = Session(app_name="code_agent", user_id="user", id="large")
+    for i in range(events):
+        role = "user" if i % 2 == 0 else "model"
+        text = f"Message {i}: " + "please look at src/module.py and explain the control flow " * 4
+        session.events.append(Event(author=role, content=genai_types.Content(role=role, parts=[genai_types.Part(text=text)])))
+    writer.save_session(session)
+    # A fresh service has nothing cached in memory, so every get_session loads from disk
+    return FileSystemSessionService(str(workspace / "sessions"))
+
+
+def _get_session(events: int):
+    def factory(workspace: Path):
+        service = _saved_session(workspace, events)
+        return lambda: service.get_session(app_name="code_agent", user_id="user", session_id="large")
+
+    return factory
+
+
+benchmark("sessions.get_session.disk_200_events")(_get_session(200))
+benchmark("sessions.get_session.disk_2000_events")(_get_session(2000))
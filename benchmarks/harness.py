@@ -0,0 +1,154 @@
+"""Registration, timing and comparison for the microbenchmark suite.
+
+A benchmark is a factory decorated with `@benchmark(name)`. It receives the scratch
+workspace directory (also the current directory while benchmarks run), does its setup,
+and returns the zero-argument callable to time. Setup is never timed.
+"""
+
+import gc
+import json
+import platform
+import statistics
+import subprocess
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+Factory = Callable[[Path], Callable[[], Any]]
+
+# Registered benchmark factories by name, in registration order
+BENCHMARKS: Dict[str, Factory] = {}
+
+RESULTS_VERSION = 1
+DEFAULT_MIN_TIME = 0.2
+DEFAULT_REPEAT = 5
+DEFAULT_THRESHOLD = 1.25
+
+
+def benchmark(name: str) -> Callable[[Factory], Factory]:
+    """Registers a benchmark factory under `name`."""
+
+    def decorator(factory: Factory) -> Factory:
+        if name in BENCHMARKS:
+            raise ValueError(f"Benchmark '{name}' is already registered")
+        BENCHMARKS[name] = factory
+        return factory
+
+    return decorator
+
+
+def measure(func: Callable[[], Any], min_time: float = DEFAULT_MIN_TIME, repeat: int = DEFAULT_REPEAT) -> Dict[str, Any]:
+    """Times `func` and returns per-call statistics in seconds.
+
+    Like `timeit`, the loop count is scaled (1, 2, 5, 10, 20, ...) until one repeat
+    takes at least `min_time`, then `repeat` repeats are timed.
+    """
+    func()  # warm-up: imports, caches, first-call allocation
+    # One full collection up front; collecting before every timing would dominate short benchmarks
+    gc.collect()
+
+    loops = 1
+    while True:
+        for multiplier in (1, 2, 5):
+            count = loops * multiplier
+            if _time_loops(func, count) >= min_time:
+                loops = count
+                break
+        else:
+            loops *= 10
+            continue
+        break
+
+    timings = [_time_loops(func, loops) / loops for _ in range(repeat)]
+    return {
+        "min": min(timings),
+        "median": statistics.median(timings),
+        "mean": statistics.fmean(timings),
+        "stdev": statistics.stdev(timings) if len(timings) > 1 else 0.0,
+        "loops": loops,
+        "repeat": repeat,
+    }
+
+
+def _time_loops(func: Callable[[], Any], loops: int) -> float:
+    start = time.perf_counter()
+    for _ in range(loops):
+        func()
+    return time.perf_counter() - start
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5, cwd=Path(__file__).parent)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    if result.returncode != 0:
+        return None
+    return result.stdout.strip() or None
+
+
+def new_results(min_time: float, repeat: int) -> Dict[str, Any]:
+    """Returns an empty results document describing this machine and checkout."""
+    return {
+        "version": RESULTS_VERSION,
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": {"min_time": min_time, "repeat": repeat},
+        "benchmarks": {},
+    }
+
+
+def save_results(results: Dict[str, Any], path: Path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(results, indent=2) + "\n", encoding="utf-8")
+
+
+def load_results(path: Path) -> Dict[str, Any]:
+    """Loads a results file written by `save_results`.
+
+    Raises:
+        ValueError: If the file is not a results document of a supported version
+    """
+    results = json.loads(Path(path).read_text(encoding="utf-8"))
+    if not isinstance(results, dict) or results.get("version") != RESULTS_VERSION or not isinstance(results.get("benchmarks"), dict):
+        raise ValueError(f"{path} is not a version {RESULTS_VERSION} benchmark results file")
+    return results
+
+
+@dataclass
+class Comparison:
+    """Best per-call time of one benchmark in a baseline run and the current run."""
+
+    name: str
+    baseline: float
+    current: float
+    threshold: float
+
+    @property
+    def ratio(self) -> float:
+        return self.current / self.baseline if self.baseline else float("inf")
+
+    @property
+    def regressed(self) -> bool:
+        return self.ratio > self.threshold
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float = DEFAULT_THRESHOLD) -> List[Comparison]:
+    """Compares benchmarks present in both runs by their best (minimum) per-call time.
+
+    The minimum is the least noisy estimate for code that does not depend on
+    outside state; a ratio above `threshold` counts as a regression.
+    """
+    old, new = baseline["benchmarks"], current["benchmarks"]
+    return [Comparison(name, old[name]["min"], new[name]["min"], threshold) for name in new if name in old]
+
+
+def format_seconds(seconds: float) -> str:
+    for unit, scale in (("s", 1.0), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.2f} {unit}"
+    return f"{seconds / 1e-9:.0f} ns"
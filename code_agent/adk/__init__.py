@@ -27,6 +27,7 @@ try:
     )
     from code_agent.adk.tools import (
         create_apply_edit_tool,  # noqa: F401
+        create_background_job_tools,  # noqa: F401
         create_delete_file_tool,  # noqa: F401
         create_list_dir_tool,  # noqa: F401
         create_read_file_tool,  # noqa: F401
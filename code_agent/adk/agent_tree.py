@@ -0,0 +1,66 @@
+"""
+Helpers for changing every LLM agent in a loaded agent tree.
+"""
+
+from typing import Callable, Iterator, Optional
+
+from google.adk.agents import BaseAgent, LlmAgent
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.adk.tools.agent_tool import AgentTool
+
+
+def iter_llm_agents(root: BaseAgent) -> Iterator[LlmAgent]:
+    """Yields every LLM agent reachable from `root`, including agents used as tools.
+
+    Lazily loaded sub-agent proxies (anything with a `load()` method returning the
+    real agent) are loaded so they can be changed too.
+    """
+    seen = set()
+    pending = [root]
+    while pending:
+        agent = pending.pop()
+        if not isinstance(agent, LlmAgent) and callable(getattr(agent, "load", None)):
+            agent = agent.load()
+        if id(agent) in seen:
+            continue
+        seen.add(id(agent))
+        if isinstance(agent, LlmAgent):
+            yield agent
+            pending.extend(tool.agent for tool in agent.tools if isinstance(tool, AgentTool))
+        pending.extend(list(agent.sub_agents))
+
+
+def add_before_model_callback(agent: LlmAgent, callback: Callable[..., Optional[LlmResponse]]) -> None:
+    """Runs `callback` after the agent's existing ``before_model_callback``.
+
+    A response returned by the existing callback skips the model call and `callback`.
+    """
+    existing = agent.before_model_callback
+    if existing is None:
+        agent.before_model_callback = callback
+        return
+
+    def before_model_callback(callback_context: CallbackContext, llm_request: LlmRequest) -> Optional[LlmResponse]:
+        response = existing(callback_context=callback_context, llm_request=llm_request)
+        if response is not None:
+            return response
+        return callback(callback_context=callback_context, llm_request=llm_request)
+
+    agent.before_model_callback = before_model_callback
+
+
+def add_after_model_callback(agent: LlmAgent, callback: Callable[..., Optional[LlmResponse]]) -> None:
+    """Runs `callback` on the response as altered by the agent's existing ``after_model_callback``."""
+    existing = agent.after_model_callback
+    if existing is None:
+        agent.after_model_callback = callback
+        return
+
+    def after_model_callback(callback_context: CallbackContext, llm_response: LlmResponse) -> Optional[LlmResponse]:
+        altered = existing(callback_context=callback_context, llm_response=llm_response)
+        response = altered or llm_response
+        return callback(callback_context=callback_context, llm_response=response) or altered
+
+    agent.after_model_callback = after_model_callback
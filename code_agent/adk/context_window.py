@@ -0,0 +1,241 @@
+"""
+Token-budgeted context window for model requests.
+
+ADK sends a session's whole history with every model call. `ContextWindowManager`
+is a ``before_model_callback`` that fits the request's contents to a token budget
+before the call; the events in session storage are never changed.
+
+When the history exceeds the budget:
+
+1. The most recent turns (a turn starts at each user message) are kept verbatim.
+2. Large tool outputs in older turns are shrunk to head and tail excerpts plus a digest.
+3. If that is not enough, the oldest turns are dropped and, optionally, replaced by a
+   short note listing the requests they contained.
+4. If the recent turns alone still exceed the budget (one long ``run`` instruction
+   with many tool calls is a single turn), large tool outputs in them are shrunk
+   too, except the latest ``keep_recent_tool_outputs``.
+
+Token counts use a cached approximation (about four characters per token, and at
+least one token per word or punctuation mark) rather than a model tokenizer.
+"""
+
+import functools
+import hashlib
+import json
+import logging
+import math
+import re
+from typing import Any, List, Optional
+
+from google.adk.agents import BaseAgent
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+
+from code_agent.adk.agent_tree import add_before_model_callback, iter_llm_agents
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_TOKENS = 100_000
+DEFAULT_KEEP_RECENT_TURNS = 4
+DEFAULT_TOOL_OUTPUT_MAX_TOKENS = 1_000
+DEFAULT_KEEP_RECENT_TOOL_OUTPUTS = 5
+
+_PIECE_PATTERN = re.compile(r"\w+|[^\w\s]")
+# Rough cost of an image or other inline data part
+_INLINE_DATA_TOKENS = 258
+# Per-content overhead for the role and message framing
+_CONTENT_OVERHEAD_TOKENS = 4
+# Characters of each dropped request listed in the omission note
+_SUMMARY_REQUEST_CHARS = 160
+_SUMMARY_MAX_REQUESTS = 20
+
+
+@functools.lru_cache(maxsize=4096)
+def estimate_tokens(text: str) -> int:
+    """Approximates the number of tokens in `text`."""
+    if not text:
+        return 0
+    return max(math.ceil(len(text) / 4), len(_PIECE_PATTERN.findall(text)))
+
+
+def _to_json(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, default=str)
+
+
+def part_tokens(part: types.Part) -> int:
+    """Approximates the tokens a content part costs in a request."""
+    if part.text:
+        return estimate_tokens(part.text)
+    if part.function_call:
+        return estimate_tokens(part.function_call.name or "") + estimate_tokens(_to_json(part.function_call.args or {}))
+    if part.function_response:
+        return estimate_tokens(part.function_response.name or "") + estimate_tokens(_to_json(part.function_response.response or {}))
+    if part.inline_data or part.file_data:
+        return _INLINE_DATA_TOKENS
+    return 0
+
+
+def content_tokens(content: types.Content) -> int:
+    """Approximates the tokens a content costs in a request."""
+    return _CONTENT_OVERHEAD_TOKENS + sum(part_tokens(part) for part in content.parts or [])
+
+
+def _is_user_message(content: types.Content) -> bool:
+    parts = content.parts or []
+    return content.role == "user" and any(part.text for part in parts) and not any(part.function_response for part in parts)
+
+
+def split_turns(contents: List[types.Content]) -> List[List[types.Content]]:
+    """Groups contents into turns, each starting at a user message.
+
+    Function responses are sent with the user role but belong to the turn of the
+    model call that requested them. Contents before the first user message form a turn
+    of their own.
+    """
+    turns: List[List[types.Content]] = []
+    for content in contents:
+        if not turns or _is_user_message(content):
+            turns.append([])
+        turns[-1].append(content)
+    return turns
+
+
+class ContextWindowManager:
+    """Fits the contents of each model request to a token budget."""
+
+    def __init__(
+        self,
+        max_tokens: int = DEFAULT_MAX_TOKENS,
+        keep_recent_turns: int = DEFAULT_KEEP_RECENT_TURNS,
+        tool_output_max_tokens: int = DEFAULT_TOOL_OUTPUT_MAX_TOKENS,
+        summarize_dropped: bool = True,
+        keep_recent_tool_outputs: int = DEFAULT_KEEP_RECENT_TOOL_OUTPUTS,
+    ):
+        self.max_tokens = max_tokens
+        # The latest turn holds the request being answered and is always kept
+        self.keep_recent_turns = max(keep_recent_turns, 1)
+        self.tool_output_max_tokens = tool_output_max_tokens
+        self.summarize_dropped = summarize_dropped
+        self.keep_recent_tool_outputs = max(keep_recent_tool_outputs, 0)
+
+        self.requests = 0
+        self.trimmed_requests = 0
+        self.tokens_removed = 0
+
+    @classmethod
+    def from_settings(cls, settings: Any) -> "ContextWindowManager":
+        """Creates a manager from the ``context_window`` config section."""
+        return cls(
+            max_tokens=settings.max_tokens,
+            keep_recent_turns=settings.keep_recent_turns,
+            tool_output_max_tokens=settings.tool_output_max_tokens,
+            summarize_dropped=settings.summarize_dropped,
+            keep_recent_tool_outputs=settings.keep_recent_tool_outputs,
+        )
+
+    def shrink_tool_output(self, content: types.Content) -> types.Content:
+        """Returns `content` with oversized function responses cut to head and tail excerpts."""
+        parts = content.parts or []
+        if not any(part.function_response and part_tokens(part) > self.tool_output_max_tokens for part in parts):
+            return content
+
+        new_parts = []
+        for part in parts:
+            tokens = part_tokens(part) if part.function_response else 0
+            if tokens <= self.tool_output_max_tokens:
+                new_parts.append(part)
+                continue
+            output = _to_json(part.function_response.response or {})
+            # Half the budget at each end (~4 characters per token), and never the whole output
+            keep_chars = min(self.tool_output_max_tokens * 2, len(output) // 4)
+            excerpt = f"{output[:keep_chars]}\n... [{len(output) - 2 * keep_chars} characters omitted] ...\n{output[-keep_chars:]}"
+            response = {
+                "excerpt": excerpt,
+                "original_tokens": tokens,
+                "sha256": hashlib.sha256(output.encode("utf-8")).hexdigest()[:16],
+            }
+            shrunk = part.function_response.model_copy(update={"response": response})
+            new_parts.append(types.Part(function_response=shrunk))
+        return types.Content(role=content.role, parts=new_parts)
+
+    def _shrink_recent(self, recent: List[List[types.Content]]) -> List[List[types.Content]]:
+        """Shrinks the tool outputs of recent turns, except the latest `keep_recent_tool_outputs` contents holding them."""
+        with_outputs = [(t, c) for t, turn in enumerate(recent) for c, content in enumerate(turn) if any(p.function_response for p in content.parts or [])]
+        shrink = set(with_outputs[: max(len(with_outputs) - self.keep_recent_tool_outputs, 0)])
+        return [[self.shrink_tool_output(content) if (t, c) in shrink else content for c, content in enumerate(turn)] for t, turn in enumerate(recent)]
+
+    def _omission_note(self, dropped: List[List[types.Content]], max_tokens: int) -> str:
+        """Notes the dropped turns, listing as many of their requests (newest kept first) as fit `max_tokens`."""
+        note = f"[{len(dropped)} earlier turn(s) of this conversation were omitted to fit the context window."
+        if not self.summarize_dropped:
+            return note + "]"
+        requests: List[str] = []
+        for turn in reversed(dropped[-_SUMMARY_MAX_REQUESTS:]):
+            text = " ".join(" ".join(part.text for part in turn[0].parts or [] if part.text).split())
+            if not _is_user_message(turn[0]) or not text:
+                continue
+            line = f"- {text[:_SUMMARY_REQUEST_CHARS]}{'...' if len(text) > _SUMMARY_REQUEST_CHARS else ''}"
+            candidate = [line, *requests]
+            if estimate_tokens(f"{note} Earlier requests, oldest first:\n" + "\n".join(candidate) + "]") > max_tokens:
+                break
+            requests = candidate
+        if requests:
+            note += " Earlier requests, oldest first:\n" + "\n".join(requests)
+        return note + "]"
+
+    def fit(self, contents: List[types.Content]) -> List[types.Content]:
+        """Returns contents that fit the budget, or `contents` itself when they already do."""
+        total = sum(content_tokens(content) for content in contents)
+        if total <= self.max_tokens:
+            return contents
+
+        turns = split_turns(contents)
+        split = max(len(turns) - self.keep_recent_turns, 0)
+        recent = turns[split:]
+        if sum(content_tokens(content) for turn in recent for content in turn) > self.max_tokens:
+            recent = self._shrink_recent(recent)
+        older = [[self.shrink_tool_output(content) for content in turn] for turn in turns[:split]]
+
+        turn_tokens = [sum(content_tokens(content) for content in turn) for turn in older]
+        budget = self.max_tokens - sum(content_tokens(content) for turn in recent for content in turn)
+        dropped: List[List[types.Content]] = []
+        # Drop the oldest turns until the rest fits alongside a bare omission note
+        while older and sum(turn_tokens) + (estimate_tokens(self._omission_note(dropped, 0)) if dropped else 0) > budget:
+            dropped.append(older.pop(0))
+            turn_tokens.pop(0)
+
+        fitted = [content for turn in older + recent for content in turn]
+        if dropped:
+            note_part = types.Part(text=self._omission_note(dropped, budget - sum(turn_tokens)))
+            if fitted and fitted[0].role == "user":
+                fitted[0] = types.Content(role="user", parts=[note_part, *(fitted[0].parts or [])])
+            else:
+                fitted.insert(0, types.Content(role="user", parts=[note_part]))
+
+        remaining = sum(content_tokens(content) for content in fitted)
+        if remaining > self.max_tokens:
+            logger.warning(f"The {len(recent)} most recent turn(s) alone use ~{remaining} tokens, over the context budget of {self.max_tokens}")
+        self.trimmed_requests += 1
+        self.tokens_removed += total - remaining
+        logger.debug(f"Fitted model request from ~{total} to ~{remaining} tokens ({len(dropped)} turn(s) dropped)")
+        return fitted
+
+    def before_model_callback(self, callback_context: CallbackContext, llm_request: LlmRequest) -> Optional[LlmResponse]:
+        """Replaces the request's contents with contents that fit the budget. Never skips the call."""
+        self.requests += 1
+        llm_request.contents = self.fit(llm_request.contents)
+        return None
+
+    def attach(self, root: BaseAgent) -> int:
+        """Fits the model requests of every LLM agent in the tree and returns how many were changed.
+
+        The agents' own ``before_model_callback`` runs first, so it sees the full history.
+        """
+        count = 0
+        for agent in iter_llm_agents(root):
+            add_before_model_callback(agent, self.before_model_callback)
+            count += 1
+        logger.info(f"Fitting model requests of {count} agent(s) to {self.max_tokens} tokens")
+        return count
@@ -12,6 +12,8 @@ from typing import Any, Dict, List, Optional, Tuple
 from google.adk.memory import BaseMemoryService
 from google.adk.sessions import Session
 
+from code_agent.telemetry import traced
+
 # Remove config import - filepath is passed in
 # from code_agent.config import get_config
 
@@ -81,6 +83,7 @@ class JsonFileMemoryService(BaseMemoryService):
             logger.warning(f"Failed to parse key {key_str}: {e}.")
         return None
 
+    @traced("code_agent.memory.load")
     def _load_from_json(self):
         """Loads the memory store from the JSON file."""
         if not os.path.exists(self.filepath):
@@ -144,6 +147,7 @@ class JsonFileMemoryService(BaseMemoryService):
             logger.error(f"Unexpected error loading memory from {self.filepath}: {e}. Starting with empty store.", exc_info=True)
             self._memory_store = JsonMemoryStore()
 
+    @traced("code_agent.memory.save")
     def _save_to_json(self):
         """Saves the current internal memory store to the JSON file."""
         session_count = len(self._memory_store.sessions)
@@ -185,6 +189,7 @@ class JsonFileMemoryService(BaseMemoryService):
         # Persist the entire store after adding/updating
         self._save_to_json()
 
+    @traced("code_agent.memory.search", record=("query",))
     def search_memory(self, query: str, **kwargs) -> MemoryServiceResponse:  # Keep returning MemoryServiceResponse
         """
         Searches the message history of stored sessions for the query.
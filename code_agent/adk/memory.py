@@ -5,7 +5,7 @@ import json
 import logging
 from datetime import datetime
 from enum import Enum
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterable, List, Optional
 
 # Import the ADK base class
 
@@ -90,6 +90,17 @@ class MemoryManager:
         memory = Memory(content, memory_type, importance, metadata)
         self.memories[memory_type].append(memory)
 
+    def add_memories(self, entries: Iterable[Dict[str, Any]]) -> None:
+        """Add several memories in one batch.
+
+        Args:
+            entries: Dictionaries with the keyword arguments accepted by add_memory
+                (content, memory_type and optionally importance and metadata)
+        """
+        for entry in entries:
+            memory = Memory(entry["content"], entry["memory_type"], entry.get("importance", 1.0), entry.get("metadata"))
+            self.memories[memory.memory_type].append(memory)
+
     def get_memories(self, memory_type: Optional[MemoryType] = None, min_importance: float = 0.0) -> List[Memory]:
         """Get memories of a specific type with minimum importance."""
         result: List[Memory] = []
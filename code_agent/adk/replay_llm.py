@@ -0,0 +1,221 @@
+"""
+Record and replay model responses for offline end-to-end runs.
+
+Two pseudo-providers replace the models of every LLM agent in a loaded agent tree:
+
+- ``record`` (``--provider record --model calls.jsonl``) keeps each agent's real model
+  and appends every call's final responses to the JSONL file.
+- ``replay`` (``--provider replay --model calls.jsonl``) serves those responses,
+  function calls included, without network access. Synthetic latency and token
+  streaming come from the ``replay`` config section.
+
+A call is matched by agent name, its position in the conversation (the number of
+contents sent to the model) and a digest of the conversation's first user message.
+When no call with the same first message was recorded, any call at the same agent
+and position is used, cycling through them, so one recording can drive many
+sessions with different instructions.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import re
+import threading
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, AsyncGenerator, Dict, List, Optional, Tuple
+
+from google.adk.agents import BaseAgent
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+from pydantic import PrivateAttr
+
+from code_agent.adk.agent_tree import iter_llm_agents
+
+logger = logging.getLogger(__name__)
+
+REPLAY_PROVIDER = "replay"
+RECORD_PROVIDER = "record"
+
+# Streamed text is split into words with their trailing whitespace
+_TOKEN_PATTERN = re.compile(r"\s*\S+\s*|\s+")
+
+CallKey = Tuple[str, int, str]
+
+
+class ReplayMissError(LookupError):
+    """Raised when a recording has no response for a model call."""
+
+
+def request_key(agent_name: str, llm_request: LlmRequest) -> CallKey:
+    """Returns the (agent, position, first-message digest) key identifying a model call."""
+    first_message = ""
+    for content in llm_request.contents:
+        if content.role == "user" and content.parts:
+            text = "".join(part.text for part in content.parts if part.text)
+            if text:
+                first_message = text
+                break
+    digest = hashlib.sha256(first_message.encode("utf-8")).hexdigest()[:16]
+    return agent_name, len(llm_request.contents), digest
+
+
+def _response_text(response: LlmResponse) -> str:
+    if not response.content or not response.content.parts:
+        return ""
+    return "".join(part.text for part in response.content.parts if part.text and not part.thought)
+
+
+class Recording:
+    """Recorded model calls loaded from a JSONL file, indexed for replay."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._exact: Dict[CallKey, List[List[LlmResponse]]] = defaultdict(list)
+        self._by_position: Dict[Tuple[str, int], List[List[LlmResponse]]] = defaultdict(list)
+        self._served: Dict[Any, int] = defaultdict(int)
+
+        with self.path.open(encoding="utf-8") as f:
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                    key = (record["agent"], int(record["position"]), record["prompt"])
+                    responses = [LlmResponse.model_validate(response) for response in record["responses"]]
+                except (ValueError, KeyError, TypeError) as e:
+                    raise ValueError(f"Invalid recorded call on line {line_number} of {self.path}: {e}") from e
+                self._exact[key].append(responses)
+                self._by_position[key[:2]].append(responses)
+
+    def __len__(self) -> int:
+        return sum(len(calls) for calls in self._exact.values())
+
+    def responses_for(self, key: CallKey) -> List[LlmResponse]:
+        """Returns copies of the recorded responses for a call, cycling through repeated calls.
+
+        Raises:
+            ReplayMissError: If nothing was recorded for this agent at this position
+        """
+        lookup_key: Any = key
+        calls = self._exact.get(key)
+        if not calls:
+            lookup_key = key[:2]
+            calls = self._by_position.get(lookup_key)
+        if not calls:
+            agent_name, position, _ = key
+            raise ReplayMissError(f"No recorded response for agent '{agent_name}' with {position} content(s) in {self.path}")
+        index = self._served[lookup_key]
+        self._served[lookup_key] = index + 1
+        return [response.model_copy(deep=True) for response in calls[index % len(calls)]]
+
+
+class ReplayLlm(BaseLlm):
+    """Serves recorded responses for one agent, optionally with synthetic latency and streaming."""
+
+    agent_name: str
+    latency: float = 0.0
+    """Seconds to wait before each call's first response."""
+    tokens_per_second: float = 0.0
+    """Pace of replayed text; 0 returns it at once."""
+
+    _recording: Recording = PrivateAttr()
+
+    def __init__(self, recording: Recording, **data: Any):
+        super().__init__(model=str(recording.path), **data)
+        self._recording = recording
+
+    async def generate_content_async(self, llm_request: LlmRequest, stream: bool = False) -> AsyncGenerator[LlmResponse, None]:
+        responses = self._recording.responses_for(request_key(self.agent_name, llm_request))
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        for response in responses:
+            tokens = _TOKEN_PATTERN.findall(_response_text(response))
+            if stream and tokens:
+                for token in tokens:
+                    if self.tokens_per_second:
+                        await asyncio.sleep(1 / self.tokens_per_second)
+                    yield LlmResponse(content=types.Content(role="model", parts=[types.Part(text=token)]), partial=True)
+            elif tokens and self.tokens_per_second:
+                await asyncio.sleep(len(tokens) / self.tokens_per_second)
+            yield response
+
+
+class RecordWriter:
+    """Appends recorded calls to a JSONL file, one line per call."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+    def write(self, key: CallKey, responses: List[LlmResponse]) -> None:
+        agent_name, position, prompt = key
+        record = {
+            "agent": agent_name,
+            "position": position,
+            "prompt": prompt,
+            "responses": [response.model_dump(mode="json", exclude_none=True) for response in responses],
+        }
+        with self._lock, self.path.open("a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+
+
+class RecordingLlm(BaseLlm):
+    """Passes calls through to an agent's real model and records the final responses."""
+
+    agent_name: str
+    inner: BaseLlm
+
+    _writer: RecordWriter = PrivateAttr()
+
+    def __init__(self, writer: RecordWriter, **data: Any):
+        super().__init__(**data)
+        self._writer = writer
+
+    async def generate_content_async(self, llm_request: LlmRequest, stream: bool = False) -> AsyncGenerator[LlmResponse, None]:
+        key = request_key(self.agent_name, llm_request)
+        final: List[LlmResponse] = []
+        async for response in self.inner.generate_content_async(llm_request, stream=stream):
+            # Partial chunks are re-created from the final text when replaying
+            if not response.partial:
+                final.append(response)
+            yield response
+        self._writer.write(key, final)
+
+
+def apply_model_provider(root: BaseAgent, cfg: Any) -> Optional[str]:
+    """Replaces every LLM agent's model when the configured provider is ``replay`` or ``record``.
+
+    The configured model is the recording file. Returns the provider applied, or None
+    when a regular provider is configured and nothing was changed.
+
+    Raises:
+        OSError: If the recording cannot be read
+        ValueError: If no recording file is configured, or it is not a valid recording
+    """
+    provider = cfg.default_provider
+    if provider not in (REPLAY_PROVIDER, RECORD_PROVIDER):
+        return None
+    if not cfg.default_model:
+        raise ValueError(f"The '{provider}' provider needs the recording file as the model (--model path/to/recording.jsonl).")
+    path = Path(cfg.default_model).expanduser()
+    agents = list(iter_llm_agents(root))
+
+    if provider == REPLAY_PROVIDER:
+        recording = Recording(path)
+        logger.info(f"Replaying {len(recording)} recorded model call(s) from {path} for {len(agents)} agent(s)")
+        for agent in agents:
+            agent.model = ReplayLlm(recording, agent_name=agent.name, latency=cfg.replay.latency, tokens_per_second=cfg.replay.tokens_per_second)
+    else:
+        writer = RecordWriter(path)
+        # Resolve every model first: agents without their own model inherit the parent's
+        models = [agent.canonical_model for agent in agents]
+        for agent, model in zip(agents, models, strict=True):
+            agent.model = RecordingLlm(writer, model=model.model, agent_name=agent.name, inner=model)
+        logger.info(f"Recording model calls of {len(agents)} agent(s) to {path}")
+    return provider
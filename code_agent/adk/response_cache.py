@@ -0,0 +1,247 @@
+"""
+On-disk cache of model responses for repeated, deterministic runs.
+
+`ResponseCache` provides a ``before_model_callback``/``after_model_callback`` pair.
+Before a model call, the request is fingerprinted from the model name, contents
+and generate-content config (which carries the system instruction, tool schemas
+and generation parameters). A cached response for that fingerprint is returned in
+place of the call; otherwise the call's final response is stored once it arrives.
+
+Entries live in ``<cache_dir>/<2-hex shard>/<fingerprint>.json``. Entries older than
+the TTL are ignored and removed, and the least recently used entries are evicted
+when the cache grows past its size cap. By default only requests sent with
+``temperature=0`` are cached, since other responses are not meant to repeat.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from google.adk.agents import BaseAgent
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+
+from code_agent.adk.agent_tree import add_after_model_callback, add_before_model_callback, iter_llm_agents
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = Path.home() / ".cache" / "code-agent" / "responses"
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+DEFAULT_MAX_SIZE_MB = 256.0
+
+# Eviction frees space down to this fraction of the cap so it does not run on every store
+_EVICT_TO_FRACTION = 0.9
+
+
+def request_fingerprint(llm_request: LlmRequest) -> Optional[str]:
+    """Returns a stable SHA-256 fingerprint of a model request.
+
+    Returns None when the request cannot be serialized (for example a response
+    schema given as a Python class), in which case it is not cacheable.
+    """
+    try:
+        payload = {
+            "model": llm_request.model,
+            "contents": [content.model_dump(mode="json", exclude_none=True) for content in llm_request.contents],
+            "config": llm_request.config.model_dump(mode="json", exclude_none=True) if llm_request.config else None,
+        }
+        encoded = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    except (TypeError, ValueError) as e:
+        logger.debug(f"Model request is not cacheable: {e}")
+        return None
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """Sharded on-disk cache of final model responses, keyed by request fingerprint."""
+
+    def __init__(
+        self,
+        cache_dir: Path = DEFAULT_CACHE_DIR,
+        ttl_seconds: Optional[float] = DEFAULT_TTL_SECONDS,
+        max_size_mb: float = DEFAULT_MAX_SIZE_MB,
+        deterministic_only: bool = True,
+    ):
+        self.cache_dir = Path(cache_dir).expanduser()
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = int(max_size_mb * 1024 * 1024)
+        self.deterministic_only = deterministic_only
+
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.bypassed = 0
+        self.evictions = 0
+
+        self._lock = threading.Lock()
+        self._size: Optional[int] = None  # Computed on the first store
+        # Fingerprints of calls in flight, by (invocation id, agent name)
+        self._pending: Dict[Tuple[str, str], str] = {}
+
+    @classmethod
+    def from_settings(cls, settings: Any) -> "ResponseCache":
+        """Creates a cache from the ``response_cache`` config section (None means the defaults)."""
+        if settings is None:
+            return cls()
+        return cls(
+            cache_dir=settings.cache_dir or DEFAULT_CACHE_DIR,
+            ttl_seconds=settings.ttl_seconds,
+            max_size_mb=settings.max_size_mb,
+            deterministic_only=settings.deterministic_only,
+        )
+
+    # --- Storage ---
+
+    def _entry_path(self, fingerprint: str) -> Path:
+        return self.cache_dir / fingerprint[:2] / f"{fingerprint}.json"
+
+    def get(self, fingerprint: str) -> Optional[LlmResponse]:
+        """Returns the cached response for a fingerprint, or None if absent or expired."""
+        path = self._entry_path(fingerprint)
+        try:
+            entry = json.loads(path.read_text(encoding="utf-8"))
+            response = LlmResponse.model_validate(entry["response"])
+            created = float(entry["created"])
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Discarding unreadable response cache entry {path}: {e}")
+            self._remove(path)
+            return None
+
+        if self.ttl_seconds is not None and time.time() - created > self.ttl_seconds:
+            self._remove(path)
+            return None
+        try:
+            # The modification time tracks recent use for eviction
+            os.utime(path)
+        except OSError:
+            pass
+        return response
+
+    def put(self, fingerprint: str, response: LlmResponse) -> None:
+        """Stores a response, evicting the least recently used entries if over the size cap."""
+        path = self._entry_path(fingerprint)
+        entry = {"created": time.time(), "response": response.model_dump(mode="json", exclude_none=True)}
+        data = json.dumps(entry).encode("utf-8")
+        tmp_name = None
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            previous = path.stat().st_size if path.exists() else 0
+            # Write to a temporary file first so concurrent readers never see a partial entry
+            fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_name, path)
+        except OSError as e:
+            logger.warning(f"Could not write response cache entry {path}: {e}")
+            if tmp_name:
+                self._remove(Path(tmp_name))
+            return
+
+        with self._lock:
+            self.stores += 1
+            if self._size is None:
+                self._size = self._disk_usage()
+            else:
+                self._size += len(data) - previous
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def clear(self) -> None:
+        """Removes every cache entry."""
+        for path in self.cache_dir.glob("*/*.json"):
+            self._remove(path)
+        with self._lock:
+            self._size = 0
+
+    def _remove(self, path: Path) -> None:
+        try:
+            path.unlink()
+        except OSError:
+            pass
+
+    def _disk_usage(self) -> int:
+        return sum(path.stat().st_size for path in self.cache_dir.glob("*/*.json"))
+
+    def _evict(self) -> None:
+        """Removes least recently used entries until the cache is well under its cap. Caller holds the lock."""
+        entries = []
+        for path in self.cache_dir.glob("*/*.json"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+
+        size = sum(entry_size for _, entry_size, _ in entries)
+        target = self.max_bytes * _EVICT_TO_FRACTION
+        for _, entry_size, path in entries:
+            if size <= target:
+                break
+            self._remove(path)
+            size -= entry_size
+            self.evictions += 1
+        self._size = size
+
+    def stats(self) -> Dict[str, int]:
+        """Returns the hit, miss, store, bypass and eviction counters."""
+        return {"hits": self.hits, "misses": self.misses, "stores": self.stores, "bypassed": self.bypassed, "evictions": self.evictions}
+
+    # --- ADK callbacks ---
+
+    def _is_cacheable(self, llm_request: LlmRequest) -> bool:
+        if not self.deterministic_only:
+            return True
+        return llm_request.config is not None and llm_request.config.temperature == 0
+
+    def before_model_callback(self, callback_context: CallbackContext, llm_request: LlmRequest) -> Optional[LlmResponse]:
+        """Returns the cached response for this request, skipping the model call, or None on a miss."""
+        fingerprint = request_fingerprint(llm_request) if self._is_cacheable(llm_request) else None
+        if fingerprint is None:
+            with self._lock:
+                self.bypassed += 1
+            return None
+
+        response = self.get(fingerprint)
+        with self._lock:
+            if response is not None:
+                self.hits += 1
+                return response
+            self.misses += 1
+            self._pending[(callback_context.invocation_id, callback_context.agent_name)] = fingerprint
+        return None
+
+    def after_model_callback(self, callback_context: CallbackContext, llm_response: LlmResponse) -> Optional[LlmResponse]:
+        """Stores the final response of a call that missed the cache. Never alters the response."""
+        if llm_response.partial:
+            return None
+        with self._lock:
+            fingerprint = self._pending.pop((callback_context.invocation_id, callback_context.agent_name), None)
+        if fingerprint and llm_response.content and not llm_response.error_code:
+            self.put(fingerprint, llm_response)
+        return None
+
+    def attach(self, root: BaseAgent) -> int:
+        """Adds the cache callbacks to every LLM agent in the tree and returns how many were changed.
+
+        Existing model callbacks keep working: a response returned by an agent's own
+        ``before_model_callback`` wins over the cache, and responses are stored after
+        the agent's own ``after_model_callback`` has altered them. Lazily loaded
+        sub-agents are loaded so their calls are cached too.
+        """
+        count = 0
+        for agent in iter_llm_agents(root):
+            add_before_model_callback(agent, self.before_model_callback)
+            add_after_model_callback(agent, self.after_model_callback)
+            count += 1
+        logger.info(f"Caching model responses of {count} agent(s) in {self.cache_dir}")
+        return count
@@ -1,11 +1,14 @@
 # Session security utilities for ADK integration
+import asyncio
 import hashlib
+import heapq
+import itertools
 import logging
 import secrets
 from datetime import datetime, timedelta
-from typing import Dict, Optional
+from typing import Any, Callable, Dict, Generic, Hashable, List, Optional, Set, Tuple, TypeVar
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr
 
 logger = logging.getLogger(__name__)
 
@@ -15,6 +18,73 @@ DEFAULT_TOKEN_VALIDITY_SECONDS = 60 * 60
 # Default session expiration: 8 hours of inactivity
 DEFAULT_SESSION_EXPIRY_SECONDS = 8 * 60 * 60
 
+# Upper bound on how long the background cleanup task sleeps between passes
+DEFAULT_CLEANUP_MAX_INTERVAL_SECONDS = 60.0
+
+# Stale heap entries are only compacted once the heap is at least this large
+_MIN_COMPACT_SIZE = 1024
+
+K = TypeVar("K", bound=Hashable)
+
+
+class ExpiryHeap(Generic[K]):
+    """Min-heap of expiry deadlines keyed by an identifier.
+
+    Rescheduling or cancelling a key does not search the heap; the old entry is left
+    behind and skipped when it surfaces ("lazy deletion"). Popping due keys therefore
+    costs O(k log n) for k expired keys instead of a scan over every key. The heap is
+    rebuilt when stale entries outnumber live ones, which bounds memory at ~2x.
+    """
+
+    def __init__(self) -> None:
+        self._heap: List[Tuple[datetime, int, K]] = []
+        self._deadlines: Dict[K, datetime] = {}
+        self._counter = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._deadlines)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._deadlines
+
+    def schedule(self, key: K, deadline: datetime) -> None:
+        """Sets (or moves) the deadline for ``key``."""
+        self._deadlines[key] = deadline
+        heapq.heappush(self._heap, (deadline, next(self._counter), key))
+        self._maybe_compact()
+
+    def cancel(self, key: K) -> None:
+        """Forgets ``key``; its heap entry is discarded lazily."""
+        if self._deadlines.pop(key, None) is not None:
+            self._maybe_compact()
+
+    def clear(self) -> None:
+        self._heap.clear()
+        self._deadlines.clear()
+
+    def pop_due(self, now: datetime) -> List[K]:
+        """Removes and returns every key whose deadline is at or before ``now``."""
+        due: List[K] = []
+        heap = self._heap
+        while heap and heap[0][0] <= now:
+            deadline, _, key = heapq.heappop(heap)
+            if self._deadlines.get(key) == deadline:
+                del self._deadlines[key]
+                due.append(key)
+        return due
+
+    def next_deadline(self) -> Optional[datetime]:
+        """Returns the earliest live deadline, or None if nothing is scheduled."""
+        heap = self._heap
+        while heap and self._deadlines.get(heap[0][2]) != heap[0][0]:
+            heapq.heappop(heap)
+        return heap[0][0] if heap else None
+
+    def _maybe_compact(self) -> None:
+        if len(self._heap) > _MIN_COMPACT_SIZE and len(self._heap) > 2 * len(self._deadlines):
+            self._heap = [(deadline, next(self._counter), key) for key, deadline in self._deadlines.items()]
+            heapq.heapify(self._heap)
+
 
 class SessionToken(BaseModel):
     """Token used for session authentication."""
@@ -26,6 +96,14 @@ class SessionToken(BaseModel):
     revoked: bool = False
     metadata: Dict[str, str] = Field(default_factory=dict)
 
+    # Set by the owning SessionTokenManager so changing expires_at reschedules expiry
+    _on_expiry_change: Optional[Callable[["SessionToken"], None]] = PrivateAttr(default=None)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        super().__setattr__(name, value)
+        if name == "expires_at" and self._on_expiry_change is not None:
+            self._on_expiry_change(self)
+
 
 class SessionTokenManager:
     """Manages session tokens for authentication."""
@@ -39,6 +117,10 @@ class SessionTokenManager:
         self.tokens: Dict[str, SessionToken] = {}
         self.token_validity_seconds = token_validity_seconds
 
+        # Secondary indexes so revocation and expiry only touch the affected tokens
+        self._user_tokens: Dict[str, Set[str]] = {}
+        self._expiry: ExpiryHeap[str] = ExpiryHeap()
+
     def generate_token(self, user_id: str, metadata: Optional[Dict[str, str]] = None) -> str:
         """Generate a new session token.
 
@@ -59,8 +141,8 @@ class SessionTokenManager:
             token=token, user_id=user_id, created_at=now, expires_at=now + timedelta(seconds=self.token_validity_seconds), metadata=metadata or {}
         )
 
-        # Store token
-        self.tokens[token] = token_entry
+        # Store and index token
+        self._add_token(token_entry)
         logger.debug(f"Generated token for user {user_id}")
 
         return token
@@ -134,8 +216,9 @@ class SessionTokenManager:
             Number of tokens revoked
         """
         count = 0
-        for token_entry in self.tokens.values():
-            if token_entry.user_id == user_id and not token_entry.revoked:
+        for token in self._user_tokens.get(user_id, ()):
+            token_entry = self.tokens[token]
+            if not token_entry.revoked:
                 token_entry.revoked = True
                 count += 1
 
@@ -149,14 +232,75 @@ class SessionTokenManager:
             Number of tokens removed
         """
         current_time = datetime.utcnow()
-        expired_tokens = [token for token, entry in self.tokens.items() if entry.expires_at <= current_time]
+        expired_tokens = self._expiry.pop_due(current_time)
 
         for token in expired_tokens:
-            del self.tokens[token]
+            self._remove_token(token)
 
         logger.debug(f"Cleaned up {len(expired_tokens)} expired tokens")
         return len(expired_tokens)
 
+    def next_expiry(self) -> Optional[datetime]:
+        """Returns when the next token expires, or None if there are no tokens."""
+        return self._expiry.next_deadline()
+
+    def _add_token(self, token_entry: SessionToken) -> None:
+        self.tokens[token_entry.token] = token_entry
+        self._user_tokens.setdefault(token_entry.user_id, set()).add(token_entry.token)
+        self._expiry.schedule(token_entry.token, token_entry.expires_at)
+        token_entry._on_expiry_change = self._reschedule_token
+
+    def _remove_token(self, token: str) -> None:
+        token_entry = self.tokens.pop(token, None)
+        if token_entry is None:
+            return
+        token_entry._on_expiry_change = None
+        self._expiry.cancel(token)
+        user_tokens = self._user_tokens.get(token_entry.user_id)
+        if user_tokens is not None:
+            user_tokens.discard(token)
+            if not user_tokens:
+                del self._user_tokens[token_entry.user_id]
+
+    def _reschedule_token(self, token_entry: SessionToken) -> None:
+        if self.tokens.get(token_entry.token) is token_entry:
+            self._expiry.schedule(token_entry.token, token_entry.expires_at)
+
+
+class _SessionActivity(Dict[str, datetime]):
+    """Session ID -> last activity time, mirrored into the owner's expiry heap on every write."""
+
+    def __init__(self, owner: "SessionSecurityManager", initial: Optional[Dict[str, datetime]] = None):
+        super().__init__()
+        self._owner = owner
+        if initial:
+            self.update(initial)
+
+    def __setitem__(self, session_id: str, last_activity: datetime) -> None:
+        super().__setitem__(session_id, last_activity)
+        self._owner._schedule_session_expiry(session_id, last_activity)
+
+    def __delitem__(self, session_id: str) -> None:
+        super().__delitem__(session_id)
+        self._owner._session_expiry.cancel(session_id)
+
+    def pop(self, session_id: str, *default: Any) -> Any:
+        self._owner._session_expiry.cancel(session_id)
+        return super().pop(session_id, *default)
+
+    def setdefault(self, session_id: str, last_activity: datetime) -> datetime:  # type: ignore[override]
+        if session_id not in self:
+            self[session_id] = last_activity
+        return self[session_id]
+
+    def update(self, *args: Any, **kwargs: Any) -> None:
+        for session_id, last_activity in dict(*args, **kwargs).items():
+            self[session_id] = last_activity
+
+    def clear(self) -> None:
+        super().clear()
+        self._owner._session_expiry.clear()
+
 
 class SessionSecurityManager:
     """Manages security for ADK sessions."""
@@ -169,13 +313,39 @@ class SessionSecurityManager:
             session_expiry_seconds: How long sessions can be inactive before expiring
         """
         self.token_manager = token_manager or SessionTokenManager()
-        self.session_expiry_seconds = session_expiry_seconds
+        self._session_expiry_seconds = session_expiry_seconds
+        self._session_expiry: ExpiryHeap[str] = ExpiryHeap()
+        self._cleanup_task: Optional[asyncio.Task] = None
 
         # Maps session IDs to authorized user IDs
         self.authorized_sessions: Dict[str, str] = {}
 
         # Maps session IDs to last activity time
-        self.session_activity: Dict[str, datetime] = {}
+        self.session_activity = {}
+
+    @property
+    def session_expiry_seconds(self) -> int:
+        return self._session_expiry_seconds
+
+    @session_expiry_seconds.setter
+    def session_expiry_seconds(self, value: int) -> None:
+        self._session_expiry_seconds = value
+        # Deadlines depend on the expiry window, so move every scheduled session
+        for session_id, last_activity in self._session_activity.items():
+            self._schedule_session_expiry(session_id, last_activity)
+
+    @property
+    def session_activity(self) -> Dict[str, datetime]:
+        """Maps session IDs to last activity time. Writes keep the expiry schedule in sync."""
+        return self._session_activity
+
+    @session_activity.setter
+    def session_activity(self, value: Dict[str, datetime]) -> None:
+        self._session_expiry.clear()
+        self._session_activity = _SessionActivity(self, dict(value))
+
+    def _schedule_session_expiry(self, session_id: str, last_activity: datetime) -> None:
+        self._session_expiry.schedule(session_id, last_activity + timedelta(seconds=self._session_expiry_seconds))
 
     def register_session(self, session_id: str, user_id: str) -> str:
         """Register a new session and generate an auth token.
@@ -287,22 +457,63 @@ class SessionSecurityManager:
             Number of sessions removed
         """
         current_time = datetime.utcnow()
-        expired_sessions = []
-
-        for session_id, last_activity in self.session_activity.items():
-            expiry_time = last_activity + timedelta(seconds=self.session_expiry_seconds)
-            if expiry_time <= current_time:
-                expired_sessions.append(session_id)
+        expired_sessions = self._session_expiry.pop_due(current_time)
 
         for session_id in expired_sessions:
-            if session_id in self.authorized_sessions:
-                del self.authorized_sessions[session_id]
-
-            if session_id in self.session_activity:
-                del self.session_activity[session_id]
+            self.authorized_sessions.pop(session_id, None)
+            self.session_activity.pop(session_id, None)
 
         # Also cleanup expired tokens
         self.token_manager.cleanup_expired_tokens()
 
         logger.debug(f"Cleaned up {len(expired_sessions)} expired sessions")
         return len(expired_sessions)
+
+    # --- Background expiry --- #
+
+    def seconds_until_next_expiry(self, max_interval_seconds: float = DEFAULT_CLEANUP_MAX_INTERVAL_SECONDS) -> float:
+        """Returns how long the cleanup task can sleep before a session or token expires."""
+        deadlines = [d for d in (self._session_expiry.next_deadline(), self.token_manager.next_expiry()) if d is not None]
+        if not deadlines:
+            return max_interval_seconds
+        delay = (min(deadlines) - datetime.utcnow()).total_seconds()
+        # Never spin: a deadline that is already due is handled on the next pass
+        return min(max(delay, 0.01), max_interval_seconds)
+
+    async def run_cleanup_loop(self, max_interval_seconds: float = DEFAULT_CLEANUP_MAX_INTERVAL_SECONDS) -> None:
+        """Expires sessions and tokens as their deadlines pass, until cancelled.
+
+        Args:
+            max_interval_seconds: Longest time to sleep between passes
+        """
+        while True:
+            try:
+                self.cleanup_expired_sessions()
+            except Exception:
+                logger.exception("Error while cleaning up expired sessions")
+            await asyncio.sleep(self.seconds_until_next_expiry(max_interval_seconds))
+
+    def start_cleanup_task(self, max_interval_seconds: float = DEFAULT_CLEANUP_MAX_INTERVAL_SECONDS) -> Optional[asyncio.Task]:
+        """Starts the background expiry task on the running event loop.
+
+        Args:
+            max_interval_seconds: Longest time to sleep between passes
+
+        Returns:
+            The cleanup task, or None if there is no running event loop
+        """
+        if self._cleanup_task is not None and not self._cleanup_task.done():
+            return self._cleanup_task
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            logger.debug("No running event loop; expired sessions are cleaned up on demand only.")
+            return None
+        self._cleanup_task = loop.create_task(self.run_cleanup_loop(max_interval_seconds), name="session-expiry-cleanup")
+        return self._cleanup_task
+
+    def stop_cleanup_task(self) -> None:
+        """Cancels the background expiry task if it is running."""
+        if self._cleanup_task is not None:
+            self._cleanup_task.cancel()
+            self._cleanup_task = None
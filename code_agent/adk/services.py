@@ -4,11 +4,15 @@ Session management services using ADK.
 This module contains implementations of session services that connect the Code Agent with ADK.
 """
 
+import asyncio
+import contextvars
+import inspect
 import logging
 import os
 import time
 import uuid
-from typing import Any, Dict, List, Optional, Tuple
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple
 
 import google.generativeai as genai  # Import for API key configuration
 from google.adk.events import Event
@@ -18,6 +22,7 @@ from google.adk.sessions import BaseSessionService, Session
 from google.adk.sessions import InMemorySessionService as ADKInMemorySessionService
 from google.genai import types as genai_types  # For FunctionCall/Response types
 
+from code_agent.adk import security
 from code_agent.adk.memory import BaseMemoryService, InMemoryMemoryService, MemoryManager, MemoryType, get_memory_manager
 from code_agent.adk.session_config import IN_MEMORY_SESSION_CONFIG, CodeAgentSessionConfig
 from code_agent.verbosity import get_controller
@@ -29,6 +34,12 @@ verbosity_controller = get_controller()
 _adk_session_service: Optional[BaseSessionService] = None
 _memory_service: Optional[BaseMemoryService] = None
 
+# Validated session handles for the current call chain, keyed by (session_id, auth_token).
+# Only set inside CodeAgentADKSessionManager.session_scope(); None means "no caching".
+_session_handles: contextvars.ContextVar[Optional[Dict[Tuple[str, Optional[str]], Session]]] = contextvars.ContextVar(
+    "code_agent_session_handles", default=None
+)
+
 
 # Define EventState and EventType for compatibility with tests
 class SessionState:
@@ -329,34 +340,22 @@ class TypingService:
         pass
 
 
-# Temporary placeholders for missing classes - just to make code compile
-class SessionSecurityManager:
-    """Placeholder for session security management."""
+class SessionSecurityManager(security.SessionSecurityManager):
+    """Session security manager configured from a CodeAgentSessionConfig."""
 
-    def __init__(self, config):
+    def __init__(self, config: CodeAgentSessionConfig):
+        super().__init__(
+            token_manager=security.SessionTokenManager(token_validity_seconds=config.security.authentication_token_expiry_seconds),
+            session_expiry_seconds=config.security.session_timeout_seconds,
+        )
         self.config = config
 
-    def start_cleanup_task(self):
-        """Placeholder for starting cleanup task."""
-        pass
-
-    def register_session(self, session_id, user_id):
-        """Placeholder for registering session."""
-        return "dummy_token"
-
-    def verify_session_access(self, session_id, token):
-        """Placeholder for verifying session access."""
-        return True
-
-    def is_session_expired(self, session_id):
-        """Placeholder for checking if session is expired."""
-        return False
-
-    def revoke_session_access(self, session_id):
-        """Placeholder for revoking session access."""
-        pass
+    def start_cleanup_task(self, max_interval_seconds: Optional[float] = None) -> Optional[asyncio.Task]:
+        """Starts background expiry, waking at least every ``cleanup_interval_seconds``."""
+        return super().start_cleanup_task(max_interval_seconds or self.config.cleanup_interval_seconds)
 
 
+# Temporary placeholder for missing classes - just to make code compile
 class SessionAccessError(Exception):
     """Placeholder for session access error."""
 
@@ -434,11 +433,12 @@ class CodeAgentADKSessionManager:
     def __init__(self, session_service: BaseSessionService, config: CodeAgentSessionConfig = IN_MEMORY_SESSION_CONFIG):
         self._session_service = session_service
         self._memory_managers: Dict[str, MemoryManager] = {}
-        self.config = config
-        self.security_manager = SessionSecurityManager(config)
+        # Copy the shared default so security settings changed on one manager do not leak into others
+        self.config = config.model_copy(deep=True) if config is IN_MEMORY_SESSION_CONFIG else config
+        self.security_manager = SessionSecurityManager(self.config)
 
         # Start the cleanup task if auto-cleanup is enabled
-        if config.security.auto_cleanup_expired_sessions:
+        if self.config.security.auto_cleanup_expired_sessions:
             self.security_manager.start_cleanup_task()
 
     def create_session(self, user_id: str = "default_user") -> Tuple[str, str]:
@@ -517,6 +517,95 @@ class CodeAgentADKSessionManager:
 
         return session
 
+    @asynccontextmanager
+    async def session_scope(self) -> AsyncIterator[None]:
+        """Caches validated session handles for every call made inside the block.
+
+        The first lookup of a session inside the scope runs the usual access and expiry
+        checks; later add_* calls in the same call chain reuse the validated handle.
+        Nested scopes share the outermost cache.
+        """
+        reset_token = _session_handles.set({}) if _session_handles.get() is None else None
+        try:
+            yield
+        finally:
+            if reset_token is not None:
+                _session_handles.reset(reset_token)
+
+    async def _resolve_session(self, session_id: str, auth_token: Optional[str] = None) -> Session:
+        """Returns a validated session handle, reusing one cached by session_scope() if present."""
+        handles = _session_handles.get()
+        key = (session_id, auth_token)
+        if handles is not None and key in handles:
+            return handles[key]
+
+        session = await self.get_session(session_id, auth_token)
+        if handles is not None:
+            handles[key] = session
+        return session
+
+    async def _append_event(self, session: Session, event: Event) -> None:
+        """Appends an event, awaiting the result when the underlying service is async."""
+        result = self._session_service.append_event(session=session, event=event)
+        if inspect.isawaitable(result):
+            await result
+
+    async def _append_events(self, session_id: str, events: List[Event], auth_token: Optional[str] = None) -> None:
+        """Appends events to a session after a single lookup and event-limit check."""
+        session = await self._resolve_session(session_id, auth_token)
+
+        # Check event count limit for the whole batch up front
+        if hasattr(session, "events") and len(session.events) + len(events) > self.config.max_events_per_session:
+            raise ValueError(f"Session has reached the maximum number of events: {self.config.max_events_per_session}")
+
+        for event in events:
+            await self._append_event(session, event)
+
+    @staticmethod
+    def _memory_entries_for_event(event: Event) -> List[Dict[str, Any]]:
+        """Derives the memory-manager entries recorded for a conversation event."""
+        if event.partial or not event.content or not event.content.parts:
+            return []
+        if event.author == "system" or (event.custom_metadata or {}).get("event_type") == "error":
+            return []
+
+        entries: List[Dict[str, Any]] = []
+        for part in event.content.parts:
+            if part.function_response is not None:
+                response = part.function_response.response or {}
+                entries.append(
+                    {
+                        "content": f"Function {part.function_response.name} returned: {response.get('result', response)}",
+                        "memory_type": MemoryType.WORKING,
+                        "importance": 0.7,
+                        "metadata": {"author": event.author, "type": "function_response", "function_name": part.function_response.name},
+                    }
+                )
+            elif part.function_call is not None:
+                entries.append(
+                    {
+                        "content": f"Called function {part.function_call.name} with args: {part.function_call.args}",
+                        "memory_type": MemoryType.WORKING,
+                        "importance": 0.7,
+                        "metadata": {"author": event.author, "type": "function_call", "function_name": part.function_call.name},
+                    }
+                )
+            elif part.text is not None:
+                if event.author == "user":
+                    entries.append(
+                        {"content": part.text, "memory_type": MemoryType.SHORT_TERM, "importance": 1.0, "metadata": {"author": "user", "type": "query"}}
+                    )
+                else:
+                    entries.append(
+                        {
+                            "content": part.text,
+                            "memory_type": MemoryType.SHORT_TERM,
+                            "importance": 0.8,
+                            "metadata": {"author": event.author, "type": "response"},
+                        }
+                    )
+        return entries
+
     async def add_event(self, session_id: str, event: Event, auth_token: Optional[str] = None) -> None:
         """Adds an event to the specified session.
 
@@ -529,39 +618,50 @@ class CodeAgentADKSessionManager:
             SessionAccessError: If access to the session is denied
             ValueError: If the session has reached the maximum number of events
         """
-        # Retrieve session (with access check)
-        session = await self.get_session(session_id, auth_token)
+        await self._append_events(session_id, [event], auth_token)
 
-        # Check event count limit
-        if hasattr(session, "events") and len(session.events) >= self.config.max_events_per_session:
-            raise ValueError(f"Session has reached the maximum number of events: {self.config.max_events_per_session}")
+    async def add_events(self, session_id: str, events: Iterable[Event], auth_token: Optional[str] = None) -> None:
+        """Adds several conversation events to a session in one batch.
 
-        # Add the event
-        await self._session_service.append_event(session=session, event=event)
+        The session is looked up and access-checked once, and the memory-manager
+        entries for all events are written in a single batch.
 
-    async def add_user_message(self, session_id: str, content: str, invocation_id: Optional[str] = None) -> None:  # SessionId -> str
-        """Adds a user message event."""
-        # Event structure based on events/event.py
-        event = Event(
+        Args:
+            session_id: The ID of the session
+            events: The events to add, in order
+            auth_token: The authentication token for the session
+
+        Raises:
+            SessionAccessError: If access to the session is denied
+            ValueError: If adding the events would exceed the maximum number of events
+        """
+        events = list(events)
+        if not events:
+            return
+
+        await self._append_events(session_id, events, auth_token)
+
+        entries = [entry for event in events for entry in self._memory_entries_for_event(event)]
+        if entries:
+            self._get_memory_manager(session_id).add_memories(entries)
+
+    @staticmethod
+    def build_user_message_event(content: str, invocation_id: Optional[str] = None) -> Event:
+        """Builds a user message event."""
+        return Event(
             author="user",
             content=genai_types.Content(parts=[genai_types.Part(text=content)]),
             invocation_id=invocation_id or "",  # Ensure it's a string, even if empty
         )
-        await self.add_event(session_id, event)
-
-        # Add to memory manager
-        memory_manager = self._get_memory_manager(session_id)
-        memory_manager.add_memory(content=content, memory_type=MemoryType.SHORT_TERM, importance=1.0, metadata={"author": "user", "type": "query"})
 
-    async def add_assistant_message(
-        self,
-        session_id: str,
+    @staticmethod
+    def build_assistant_message_event(
         content: Optional[str] = None,
         tool_calls: Optional[List[genai_types.FunctionCall]] = None,
         invocation_id: Optional[str] = None,
-        partial: bool = False,  # Add partial flag
-    ) -> None:  # SessionId -> str, Tool call type updated
-        """Adds an assistant message event, potentially including tool calls or partial content."""
+        partial: bool = False,
+    ) -> Event:
+        """Builds an assistant message event, potentially including tool calls or partial content."""
         parts = []
         if content is not None:
             parts.append(genai_types.Part(text=content))
@@ -569,83 +669,50 @@ class CodeAgentADKSessionManager:
             for tc in tool_calls:
                 parts.append(genai_types.Part(function_call=tc))
 
-        event = Event(
+        return Event(
             author="assistant",  # Assuming a fixed author name for now
             content=genai_types.Content(parts=parts),
             invocation_id=invocation_id or "",
-            partial=partial,  # Set partial flag
+            partial=partial,
         )
-        await self.add_event(session_id, event)
-
-        # Add to memory manager (skip if partial)
-        if not partial:
-            memory_manager = self._get_memory_manager(session_id)
-            memory_manager.add_memory(content=content, memory_type=MemoryType.SHORT_TERM, importance=0.8, metadata={"author": "assistant", "type": "response"})
-
-            # Add tool calls to working memory
-            if tool_calls:
-                for tc in tool_calls:
-                    memory_manager.add_memory(
-                        content=f"Called function {tc.name} with args: {tc.args}",
-                        memory_type=MemoryType.WORKING,
-                        importance=0.7,
-                        metadata={"author": "assistant", "type": "function_call", "function_name": tc.name},
-                    )
-
-    async def add_tool_result(
-        self, session_id: str, tool_call_id: str, tool_name: str, content: Any, author: str = "assistant", invocation_id: Optional[str] = None
-    ):
-        """Adds a tool result event to the session, following ADK history conventions."""
-        session = await self.get_session(session_id)
 
+    @staticmethod
+    def build_tool_result_event(tool_name: str, content: Any, author: str = "assistant", invocation_id: Optional[str] = None) -> Event:
+        """Builds a tool result event, following ADK history conventions."""
         # Ensure content is a simple string
         content_str = str(content)
-
         try:
-            # Create a simple dictionary with the result string
-            response_dict = {"result": content_str}
-
-            # Create function response with a dictionary
-            function_response = genai_types.FunctionResponse(name=tool_name, response=response_dict)
-
-            # Create the Content object with role='function' for history formatting
-            event_content = genai_types.Content(
-                parts=[genai_types.Part(function_response=function_response)],
-                role="function",  # Set role='function' for tool results in history
-            )
+            function_response = genai_types.FunctionResponse(name=tool_name, response={"result": content_str})
+            # Use role='function' for tool results in history
+            event_content = genai_types.Content(parts=[genai_types.Part(function_response=function_response)], role="function")
+        except Exception as e:
+            # Fall back to a plain text response if the function response can't be built
+            logger.warning(f"Could not build function response for tool {tool_name}, falling back to text: {e}")
+            event_content = genai_types.Content(parts=[genai_types.Part(text=f"Tool {tool_name} result: {content_str}")], role="user")
 
-            event = Event(author=author, content=event_content, invocation_id=invocation_id or "")
+        return Event(author=author, content=event_content, invocation_id=invocation_id or "")
 
-            # Append event using the underlying service
-            self._session_service.append_event(session=session, event=event)
-        except Exception as e:
-            # If we can't create the response properly, log the error
-            import traceback
+    async def add_user_message(self, session_id: str, content: str, invocation_id: Optional[str] = None) -> None:  # SessionId -> str
+        """Adds a user message event."""
+        await self.add_events(session_id, [self.build_user_message_event(content, invocation_id)])
 
-            print(f"Error creating tool result: {e}")
-            print(traceback.format_exc())
+    async def add_assistant_message(
+        self,
+        session_id: str,
+        content: Optional[str] = None,
+        tool_calls: Optional[List[genai_types.FunctionCall]] = None,
+        invocation_id: Optional[str] = None,
+        partial: bool = False,  # Add partial flag
+    ) -> None:  # SessionId -> str, Tool call type updated
+        """Adds an assistant message event, potentially including tool calls or partial content."""
+        # Memory entries are skipped for partial events
+        await self.add_events(session_id, [self.build_assistant_message_event(content, tool_calls, invocation_id, partial)])
 
-            # Try a simpler approach - text response instead of function response
-            try:
-                simple_content = genai_types.Content(parts=[genai_types.Part(text=f"Tool {tool_name} result: {content_str}")], role="user")
-                simple_event = Event(author=author, content=simple_content, invocation_id=invocation_id or "")
-                self._session_service.append_event(session=session, event=simple_event)
-            except Exception as e2:
-                print(f"Error creating simplified tool result: {e2}")
-                print(traceback.format_exc())
-
-        # Add to memory manager
-        try:
-            memory_manager = self._get_memory_manager(session_id)
-            memory_manager.add_memory(
-                content=f"Function {tool_name} returned: {content_str}",
-                memory_type=MemoryType.WORKING,
-                importance=0.7,
-                metadata={"author": author, "type": "function_response", "function_name": tool_name},
-            )
-        except Exception as mem_error:
-            print(f"Error adding tool result to memory: {mem_error}")
-            # Continue without adding to memory
+    async def add_tool_result(
+        self, session_id: str, tool_call_id: str, tool_name: str, content: Any, author: str = "assistant", invocation_id: Optional[str] = None
+    ):
+        """Adds a tool result event to the session, following ADK history conventions."""
+        await self.add_events(session_id, [self.build_tool_result_event(tool_name, content, author, invocation_id)])
 
     async def add_error_event(
         self, session_id: str, error_message: str, error_code: Optional[str] = None, author: str = "assistant", invocation_id: Optional[str] = None
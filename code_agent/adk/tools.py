@@ -14,10 +14,13 @@ from google.adk.tools import FunctionTool, ToolContext
 from google.adk.tools.google_search_tool import google_search
 
 from code_agent.config import get_config
+from code_agent.telemetry import traced
+from code_agent.tools.background_jobs import get_job_manager
 from code_agent.tools.file_tools import ReadFileArgs  # Import the ReadFileArgs class
 from code_agent.tools.file_tools import delete_file as original_delete_file
 from code_agent.tools.file_tools import read_file as original_read_file
 from code_agent.tools.native_tools import run_native_command as original_run_command
+from code_agent.tools.native_tools import start_native_command_in_background
 from code_agent.tools.simple_tools import apply_edit as original_apply_edit
 from code_agent.verbosity import get_controller
 
@@ -28,8 +31,12 @@ logger = logging.getLogger(__name__)
 config = get_config()
 verbosity_controller = get_controller()
 
+# Output reported when a background job is killed: only its last lines
+_KILLED_JOB_OUTPUT_BYTES = 2048
+
 
 # --- Read File Tool ---
+@traced("code_agent.tool.read_file", record=("path",))
 async def read_file(tool_context: ToolContext, path: str, offset: Optional[int] = None, limit: Optional[int] = None, enable_pagination: bool = False) -> str:
     """
     Reads a file and returns its contents.
@@ -63,6 +70,7 @@ async def read_file(tool_context: ToolContext, path: str, offset: Optional[int]
 
 
 # --- Delete File Tool ---
+@traced("code_agent.tool.delete_file", record=("path",))
 async def delete_file(tool_context: ToolContext, path: str) -> str:
     """
     Deletes a file at the specified path.
@@ -89,6 +97,7 @@ async def delete_file(tool_context: ToolContext, path: str) -> str:
 
 
 # --- Apply Edit Tool ---
+@traced("code_agent.tool.apply_edit", record=("target_file",))
 async def apply_edit(tool_context: ToolContext, target_file: str, code_edit: str) -> str:
     """
     Applies proposed content changes to a file after showing a diff and requesting user confirmation.
@@ -116,6 +125,7 @@ async def apply_edit(tool_context: ToolContext, target_file: str, code_edit: str
 
 
 # --- List Directory Tool ---
+@traced("code_agent.tool.list_dir", record=("relative_workspace_path",))
 async def list_dir(tool_context: ToolContext, relative_workspace_path: str = ".") -> str:
     """
     Lists the contents of a directory.
@@ -197,27 +207,32 @@ async def list_dir(tool_context: ToolContext, relative_workspace_path: str = "."
 
 
 # --- Run Terminal Command Tool ---
+@traced("code_agent.tool.run_terminal_cmd", record=("command",))
 async def run_terminal_cmd(tool_context: ToolContext, command: str, is_background: bool = False) -> str:
     """
     Executes a terminal command after security checks and user confirmation.
 
     Args:
         command: The terminal command to execute
-        is_background: Whether to run the command in the background
+        is_background: Whether to start the command as a background job and return its job ID
+            instead of waiting for it; use for test suites, builds and servers
 
     Returns:
-        Command output or error message
+        Command output, the background job ID, or an error message
     """
     # Log the tool execution in the context
     tool_context.logger.info(f"Running terminal command: {command}")
 
-    # Background processing not implemented in the original function
-    # We'll add a warning if it's requested
     if is_background:
-        tool_context.logger.warning("Background execution requested but not supported. Running in foreground.")
+        result_str = await start_native_command_in_background(command, _session_id(tool_context))
+        if result_str.startswith("Started background job"):
+            tool_context.logger.info(f"Started terminal command in the background: {command}")
+        else:
+            tool_context.logger.error(f"Failed to start background command: {command} -> {result_str}")
+        return result_str
 
     # Call the original implementation - it handles confirmation internally based on config
-    result_str = await original_run_command(command)
+    result_str = await original_run_command(command, session_id=_session_id(tool_context))
 
     # Log the result
     # Check for known error prefixes/substrings returned by original_run_command
@@ -235,7 +250,82 @@ async def run_terminal_cmd(tool_context: ToolContext, command: str, is_backgroun
     return result_str
 
 
+# --- Background Job Tools ---
+def _session_id(tool_context: ToolContext) -> str:
+    """Returns the ID of the session the tool runs in; background jobs are scoped to it."""
+    session = getattr(getattr(tool_context, "_invocation_context", None), "session", None)
+    session_id = getattr(session, "id", None)
+    return session_id if isinstance(session_id, str) else "default"
+
+
+def _job_not_found(tool_context: ToolContext, job_id: str) -> str:
+    error_msg = f"Error: No background job '{job_id}' in this session."
+    tool_context.logger.error(error_msg)
+    return error_msg
+
+
+@traced("code_agent.tool.check_background_job", record=("job_id",))
+async def check_background_job(tool_context: ToolContext, job_id: str, offset: int = 0) -> str:
+    """
+    Reports the status of a background job and its output from an offset on.
+
+    Args:
+        job_id: The job ID returned when the command was started
+        offset: Byte offset to read output from; pass the "next output offset" of the previous check to get only new output
+
+    Returns:
+        The job's status and output, or an error message
+    """
+    job = get_job_manager().get(_session_id(tool_context), job_id)
+    if job is None:
+        return _job_not_found(tool_context, job_id)
+    tool_context.logger.info(f"Checked background job {job_id}: {job.status}")
+    return job.describe(offset)
+
+
+@traced("code_agent.tool.wait_for_background_job", record=("job_id", "timeout"))
+async def wait_for_background_job(tool_context: ToolContext, job_id: str, timeout: int = 60, offset: int = 0) -> str:
+    """
+    Waits for a background job to finish, up to a timeout, then reports it like check_background_job.
+
+    Args:
+        job_id: The job ID returned when the command was started
+        timeout: Seconds to wait at most; the job keeps running if it does not finish in time
+        offset: Byte offset to read output from
+
+    Returns:
+        The job's status and output, or an error message
+    """
+    job = get_job_manager().get(_session_id(tool_context), job_id)
+    if job is None:
+        return _job_not_found(tool_context, job_id)
+    finished = await job.wait(max(timeout, 0))
+    tool_context.logger.info(f"Waited for background job {job_id}: {job.status}")
+    result = job.describe(offset)
+    return result if finished else f"{result}\n[Still running after waiting {timeout}s]"
+
+
+@traced("code_agent.tool.kill_background_job", record=("job_id",))
+async def kill_background_job(tool_context: ToolContext, job_id: str) -> str:
+    """
+    Stops a background job and every process it started.
+
+    Args:
+        job_id: The job ID returned when the command was started
+
+    Returns:
+        The job's final status and its latest output, or an error message
+    """
+    job = get_job_manager().get(_session_id(tool_context), job_id)
+    if job is None:
+        return _job_not_found(tool_context, job_id)
+    await get_job_manager().kill(job)
+    tool_context.logger.info(f"Killed background job {job_id}")
+    return job.describe(max(job.output.total - _KILLED_JOB_OUTPUT_BYTES, 0))
+
+
 # --- Load Memory Tool (Moved from tools/memory_tools.py) ---
+@traced("code_agent.tool.load_memory", record=("query",))
 async def load_memory(tool_context: ToolContext, query: str, app_name: str = "code_agent", user_id: str = "default_user") -> str:
     """
     Load relevant information from long-term memory based on a search query.
@@ -324,6 +414,15 @@ def create_run_terminal_cmd_tool() -> FunctionTool:
     )
 
 
+def create_background_job_tools() -> List[FunctionTool]:
+    """Create the tools that check, wait for and kill background jobs."""
+    return [
+        FunctionTool(func=check_background_job),
+        FunctionTool(func=wait_for_background_job),
+        FunctionTool(func=kill_background_job),
+    ]
+
+
 def create_google_search_tool() -> FunctionTool:
     """Create a Google Search tool.
 
@@ -352,6 +451,7 @@ def get_all_tools() -> List[FunctionTool]:
     """Get all tools."""
     tools = get_file_tools()
     tools.append(create_run_terminal_cmd_tool())
+    tools.extend(create_background_job_tools())
     # Add google_search tool to the list of all tools
     tools.append(create_google_search_tool())
     return tools
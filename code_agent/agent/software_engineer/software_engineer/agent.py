@@ -6,15 +6,7 @@ from google.adk.agents import Agent
 from google.adk.tools import load_memory
 
 from . import prompt
-
-# Use relative imports from the 'software_engineer' sibling directory
-from .sub_agents.code_quality.agent import code_quality_agent
-from .sub_agents.code_review.agent import code_review_agent
-from .sub_agents.debugging.agent import debugging_agent
-from .sub_agents.design_pattern.agent import design_pattern_agent
-from .sub_agents.devops.agent import devops_agent
-from .sub_agents.documentation.agent import documentation_agent
-from .sub_agents.testing.agent import testing_agent
+from .shared_libraries.lazy_agent import LazyAgent
 from .tools import (
     check_command_exists_tool,
     check_shell_command_safety_tool,
@@ -74,6 +66,29 @@ def initialize_session_memory(tool_context):
     # else: memory already exists, do nothing
 
 
+# --- Sub-Agents ---
+# Sub-agents are imported on first transfer; the root agent only needs their names
+# and descriptions. Keep these in sync with the agent definitions in sub_agents/.
+
+
+def _lazy_sub_agent(package: str, name: str, description: str) -> LazyAgent:
+    return LazyAgent(
+        name=name,
+        description=description,
+        module=f"{__package__}.sub_agents.{package}.agent",
+        attribute=name,
+    )
+
+
+design_pattern_agent = _lazy_sub_agent("design_pattern", "design_pattern_agent", "Agent specialized in applying design patterns and architectural principles")
+documentation_agent = _lazy_sub_agent("documentation", "documentation_agent", "Agent specialized in writing and updating documentation")
+code_review_agent = _lazy_sub_agent("code_review", "code_review_agent", "Analyzes code for issues and suggests improvements")
+code_quality_agent = _lazy_sub_agent("code_quality", "code_quality_agent", "Analyzes code for quality issues and suggests improvements")
+testing_agent = _lazy_sub_agent("testing", "testing_agent", "Agent specialized in writing and running tests")
+debugging_agent = _lazy_sub_agent("debugging", "debugging_agent", "Agent specialized in debugging code and fixing issues")
+devops_agent = _lazy_sub_agent("devops", "devops_agent", "Agent specialized in DevOps, CI/CD, deployment, and infrastructure")
+
+
 # --- Agent Definition ---
 
 # Note: Using custom ripgrep-based codebase search in tools/code_search.py
@@ -0,0 +1,67 @@
+"""Lazy sub-agent proxies for the software engineer agent."""
+
+import importlib
+import logging
+from typing import AsyncGenerator, Optional
+
+from google.adk.agents import BaseAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event
+from pydantic import PrivateAttr
+
+logger = logging.getLogger(__name__)
+
+
+class LazyAgent(BaseAgent):
+    """Stands in for a sub-agent until it is first needed.
+
+    Only the name and description are known up front, which is all the parent needs
+    to list transfer targets. The real agent is imported from `module` on first use
+    (a transfer, or a follow-up message addressed to it) and then replaces this
+    proxy in the parent's `sub_agents`, so ADK sees a regular agent from then on.
+    """
+
+    module: str
+    """Absolute name of the module defining the agent."""
+    attribute: str
+    """Name of the agent variable in `module`."""
+
+    _agent: Optional[BaseAgent] = PrivateAttr(default=None)
+
+    @property
+    def is_loaded(self) -> bool:
+        """Whether the real agent has been imported."""
+        return self._agent is not None
+
+    def load(self) -> BaseAgent:
+        """Imports the real agent and swaps it into the agent tree in place of this proxy."""
+        if self._agent is not None:
+            return self._agent
+
+        agent = getattr(importlib.import_module(self.module), self.attribute)
+        if agent.name != self.name:
+            raise ValueError(f"Lazy agent '{self.name}' resolved to an agent named '{agent.name}' ({self.module}.{self.attribute})")
+
+        agent.parent_agent = self.parent_agent
+        if self.parent_agent is not None:
+            siblings = self.parent_agent.sub_agents
+            for index, sibling in enumerate(siblings):
+                if sibling is self:
+                    siblings[index] = agent
+        self._agent = agent
+        logger.debug(f"Loaded sub-agent '{self.name}' from {self.module}")
+        return agent
+
+    def find_agent(self, name: str) -> Optional[BaseAgent]:
+        if name == self.name:
+            return self.load()
+        # Descendants of the real agent can only be found once it is loaded
+        return self._agent.find_sub_agent(name) if self._agent is not None else None
+
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        async for event in self.load().run_async(ctx):
+            yield event
+
+    async def _run_live_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        async for event in self.load().run_live(ctx):
+            yield event
@@ -1,9 +1,10 @@
 # ruff: noqa: I001, F401
 """Tools for the Software Engineer Multi-Agent."""
 
+import importlib
+
 from . import (
     analysis_state,
-    code_analysis,
     code_search,
     filesystem,
     search,
@@ -11,13 +12,6 @@ from . import (
     system_info,
 )
 
-# Export code analysis tools
-from .code_analysis import (
-    analyze_code_tool,
-    get_analysis_issues_by_severity_tool,
-    suggest_code_fixes_tool,
-)
-
 # Export the code search tool for easier imports
 from .code_search import codebase_search_tool
 
@@ -51,6 +45,18 @@ from .persistent_memory_tool import (
     load_memory_from_file_tool,
 )
 
+# Code analysis tools import pylint, flake8 and radon, and only the code_quality and
+# code_review sub-agents use them, so they are loaded on first access (see __getattr__)
+_CODE_ANALYSIS_EXPORTS = ("analyze_code_tool", "get_analysis_issues_by_severity_tool", "suggest_code_fixes_tool")
+
+
+def __getattr__(name):
+    if name == "code_analysis" or name in _CODE_ANALYSIS_EXPORTS:
+        module = importlib.import_module(".code_analysis", __name__)
+        return module if name == "code_analysis" else getattr(module, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 __all__ = [
     # Filesystem Tools
     "read_file_tool",
@@ -1,7 +1,10 @@
+import asyncio
 import logging
+import os
 import shlex
 import shutil  # <-- Added import
-import subprocess
+import signal
+import weakref
 from typing import Literal, Optional
 
 # Import ToolContext for state management
@@ -11,6 +14,10 @@ from google.adk.tools import (
 )
 from pydantic import BaseModel, Field
 
+from code_agent.tools.shell_session import get_shell_pool
+
+from .shell_whitelist import ANY_ARGUMENTS, DEFAULT_RULES, DEFAULT_SAFE_COMMANDS, STATE_KEY, ShellWhitelist, command_tokens
+
 logger = logging.getLogger(__name__)
 
 # --- Configuration Tool --- #
@@ -70,6 +77,10 @@ class ConfigureShellWhitelistOutput(BaseModel):
 def configure_shell_whitelist(args: dict, tool_context: ToolContext) -> ConfigureShellWhitelistOutput:
     """Manages the whitelist of shell commands that bypass approval.
 
+    An entry also covers the command with further arguments, so the entry
+    ``git status`` covers ``git status --short``. Default entries restrict which
+    arguments may follow them (``git branch`` does not cover ``git branch -D x``).
+
     Args:
         args (dict): A dictionary containing:
             action (Literal["add", "remove", "list", "clear"]): The action.
@@ -79,89 +90,39 @@ def configure_shell_whitelist(args: dict, tool_context: ToolContext) -> Configur
     action = args.get("action")
     command = args.get("command")
 
-    # Default safe commands (adjust as needed)
-    DEFAULT_SAFE_COMMANDS = [
-        "ls",
-        "grep",
-        "find",
-        "cat",
-        "pwd",
-        "echo",
-        "git status",
-        "head",
-        "tail",
-        "wc",
-        "git diff",
-        "git log",
-        "which",
-        "ping",
-        "host",
-        "dig",
-        "nslookup",
-        "ss",
-        "uname",
-        "uptime",
-        "date",
-        "df",
-        "du",
-        "free",
-        "stat",
-        "ps",
-        "pgrep",
-        "ip addr",
-        "ip route",
-        "traceroute",
-        "git grep",
-        "git branch",
-        "git branch --show-current",  # Specific safe variant
-        "git tag",
-        "git remote -v",
-        "git config --list",
-        "docker ps",
-        "docker images",
-        "kubectl get",
-        "kubectl describe",
-        "kubectl logs",
-        "kubectl cluster-info",
-        "kubectl config view",
-        "kubectl version",
-        "kubectl api-resources",
-        "kubectl api-versions",
-        "kubectl top",
-    ]
-
     # Initialize whitelist in state if it doesn't exist
-    if "shell_command_whitelist" not in tool_context.state:
-        # Initialize with default safe commands
-        tool_context.state["shell_command_whitelist"] = DEFAULT_SAFE_COMMANDS[:]
+    if STATE_KEY not in tool_context.state:
+        tool_context.state[STATE_KEY] = {"defaults": True, "added": [], "removed": []}
         logger.info(f"Initialized shell command whitelist with defaults: {DEFAULT_SAFE_COMMANDS}")
 
-    whitelist: list[str] = tool_context.state["shell_command_whitelist"]
+    whitelist = ShellWhitelist.from_state(tool_context.state[STATE_KEY])
+    entries = dict(whitelist.entries)
 
     if action == "add":
         if not command:
             return ConfigureShellWhitelistOutput(status="Error: 'command' is required for 'add' action.")
-        if command not in whitelist:
-            whitelist.append(command)
-            tool_context.state["shell_command_whitelist"] = whitelist  # Update state
-            logger.info(f"Added command '{command}' to shell whitelist.")
-            return ConfigureShellWhitelistOutput(status=f"Command '{command}' added to whitelist.")
-        else:
+        if command in entries:
             return ConfigureShellWhitelistOutput(status=f"Command '{command}' is already in the whitelist.")
+        if not command_tokens(command):
+            return ConfigureShellWhitelistOutput(status=f"Error: '{command}' is not a plain command; pipes, redirects and substitutions cannot be whitelisted.")
+        entries[command] = DEFAULT_RULES.get(command, ANY_ARGUMENTS)
+        tool_context.state[STATE_KEY] = ShellWhitelist(entries).to_state()  # Update state
+        logger.info(f"Added command '{command}' to shell whitelist.")
+        return ConfigureShellWhitelistOutput(status=f"Command '{command}' added to whitelist.")
     elif action == "remove":
         if not command:
             return ConfigureShellWhitelistOutput(status="Error: 'command' is required for 'remove' action.")
-        if command in whitelist:
-            whitelist.remove(command)
-            tool_context.state["shell_command_whitelist"] = whitelist  # Update state
+        if command in entries:
+            del entries[command]
+            tool_context.state[STATE_KEY] = ShellWhitelist(entries).to_state()  # Update state
             logger.info(f"Removed command '{command}' from shell whitelist.")
             return ConfigureShellWhitelistOutput(status=f"Command '{command}' removed from whitelist.")
         else:
             return ConfigureShellWhitelistOutput(status=f"Command '{command}' not found in whitelist.")
     elif action == "list":
-        return ConfigureShellWhitelistOutput(status="Current whitelist retrieved.", whitelist=list(whitelist))  # Return a copy
+        return ConfigureShellWhitelistOutput(status="Current whitelist retrieved.", whitelist=list(entries))
     elif action == "clear":
-        tool_context.state["shell_command_whitelist"] = []
+        tool_context.state[STATE_KEY] = {"defaults": False, "added": [], "removed": []}
         logger.info("Cleared shell command whitelist.")
         return ConfigureShellWhitelistOutput(status="Shell command whitelist cleared.")
     else:
@@ -268,18 +229,19 @@ def check_shell_command_safety(args: dict, tool_context: ToolContext) -> CheckSh
 
     require_approval = tool_context.state.get("require_shell_approval", True)
     # Ensure whitelist is initialized if needed (accessing it via configure_shell_whitelist initializes)
-    if "shell_command_whitelist" not in tool_context.state:
+    if STATE_KEY not in tool_context.state:
         # Temporarily call configure_shell_whitelist with 'list' action to initialize state
         # This is a slight workaround to ensure initialization happens if only check/execute are called.
         # A cleaner approach might involve a dedicated initialization step or context manager.
         _ = configure_shell_whitelist({"action": "list"}, tool_context)
 
-    shell_whitelist = tool_context.state.get("shell_command_whitelist", [])
-    is_whitelisted = command in shell_whitelist
+    matched_entry = ShellWhitelist.from_state(tool_context.state.get(STATE_KEY)).match(command)
 
-    if is_whitelisted:
-        logger.info(f"Command '{command}' is whitelisted.")
-        return CheckShellCommandSafetyOutput(status="whitelisted", command=command, message="Command is in the configured whitelist and can be run directly.")
+    if matched_entry is not None:
+        logger.info(f"Command '{command}' is whitelisted by '{matched_entry}'.")
+        return CheckShellCommandSafetyOutput(
+            status="whitelisted", command=command, message=f"Command is covered by the whitelist entry '{matched_entry}' and can be run directly."
+        )
     elif not require_approval:
         logger.info(f"Command '{command}' is not whitelisted, but shell approval is disabled.")
         return CheckShellCommandSafetyOutput(
@@ -314,7 +276,81 @@ class ExecuteVettedShellCommandOutput(BaseModel):
     message: str = Field(description="Additional information about the status.")
 
 
-def execute_vetted_shell_command(args: dict, tool_context: ToolContext) -> ExecuteVettedShellCommandOutput:
+# Maximum number of vetted commands running at the same time, across all sessions
+MAX_CONCURRENT_SHELL_COMMANDS = max(int(os.getenv("SOFTWARE_ENGINEER_MAX_SHELL_COMMANDS", "4")), 1)
+
+# Run commands in one long-lived bash per session (keeping cd and exported variables) instead of spawning each one
+USE_PERSISTENT_SHELL = os.getenv("SOFTWARE_ENGINEER_PERSISTENT_SHELL", "").lower() in ("1", "true", "yes")
+
+# asyncio semaphores belong to one event loop, so there is one per running loop
+_command_slots: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+
+
+def _shell_command_slots() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    slots = _command_slots.get(loop)
+    if slots is None:
+        slots = _command_slots[loop] = asyncio.Semaphore(MAX_CONCURRENT_SHELL_COMMANDS)
+    return slots
+
+
+async def _kill_process_group(process: asyncio.subprocess.Process) -> None:
+    """Kills the command and everything it started, then reaps it."""
+    try:
+        if hasattr(os, "killpg"):
+            # The command leads its own process group (start_new_session=True)
+            os.killpg(process.pid, signal.SIGKILL)
+        else:
+            process.kill()
+    except ProcessLookupError:
+        pass  # Already exited
+    await process.wait()
+
+
+async def _execute_in_persistent_shell(
+    command: str, working_directory: Optional[str], timeout_sec: int, tool_context: ToolContext
+) -> ExecuteVettedShellCommandOutput:
+    """Runs the command in the session's persistent shell, with the same result codes as a spawned command."""
+    session = getattr(getattr(tool_context, "_invocation_context", None), "session", None)
+    session_id = getattr(session, "id", None)
+    shell = get_shell_pool().get(session_id if isinstance(session_id, str) else "default")
+    try:
+        result = await shell.run(command, working_directory=working_directory, timeout=timeout_sec)
+    except Exception as e:
+        return _unexpected_error(command, e)
+
+    if result.timed_out:
+        logger.error(f"Vetted command '{command}' timed out after {timeout_sec} seconds; restarting the persistent shell.")
+        return ExecuteVettedShellCommandOutput(
+            stdout=result.stdout.strip(),
+            stderr=f"Error: Command timed out after {timeout_sec} seconds.",
+            return_code=-2,
+            command_executed=command,
+            status="error",
+            message=f"Command timed out after {timeout_sec} seconds. The persistent shell was restarted, so earlier cd and export changes are gone.",
+        )
+    # Unlike a spawned command, a missing program is reported by the shell as exit code 127
+    message = "Command executed successfully." if result.return_code == 0 else "Command executed with non-zero exit code."
+    if result.shell_exited:
+        message += " The command ended the persistent shell; the next command starts a new one."
+    logger.info(f"Vetted command '{command}' finished in the persistent shell with return code {result.return_code}")
+    return ExecuteVettedShellCommandOutput(
+        stdout=result.stdout.strip(),
+        stderr=result.stderr.strip(),
+        return_code=result.return_code,
+        command_executed=command,
+        status="executed",
+        message=message,
+    )
+
+
+def _unexpected_error(command: str, e: Exception) -> ExecuteVettedShellCommandOutput:
+    logger.exception(f"An unexpected error occurred while running vetted command '{command}': {e}")
+    message = f"An unexpected error occurred: {e}"
+    return ExecuteVettedShellCommandOutput(stderr=message, return_code=-3, command_executed=command, status="error", message=message)
+
+
+async def execute_vetted_shell_command(args: dict, tool_context: ToolContext) -> ExecuteVettedShellCommandOutput:
     """Executes a shell command that has ALREADY BEEN VETTED or explicitly approved.
 
     ***WARNING:*** DO NOT CALL THIS TOOL directly unless you have either:
@@ -347,50 +383,65 @@ def execute_vetted_shell_command(args: dict, tool_context: ToolContext) -> Execu
             status="error", command_executed=command, message=f"Error: Invalid timeout value '{timeout}'. Must be an integer."
         )
 
+    if USE_PERSISTENT_SHELL:
+        async with _shell_command_slots():
+            return await _execute_in_persistent_shell(command, working_directory, timeout_sec, tool_context)
+
     command_parts = shlex.split(command)
-    logger.info(f"Executing vetted shell command: '{command}' in directory '{working_directory or '.'}'")
 
-    try:
-        process = subprocess.run(
-            command_parts,
-            capture_output=True,
-            text=True,
-            cwd=working_directory,
-            timeout=timeout_sec,
-            check=False,  # Don't raise exception on non-zero exit
-        )
-        logger.info(f"Vetted command '{command}' finished with return code {process.returncode}")
-        return ExecuteVettedShellCommandOutput(
-            stdout=process.stdout.strip(),
-            stderr=process.stderr.strip(),
-            return_code=process.returncode,
-            command_executed=command,
-            status="executed",
-            message="Command executed successfully." if process.returncode == 0 else "Command executed with non-zero exit code.",
-        )
-    except FileNotFoundError:
-        logger.error(f"Command not found during execution: {command_parts[0]}")
-        return ExecuteVettedShellCommandOutput(
-            stderr=f"Error: Command not found: {command_parts[0]}",
-            return_code=-1,  # Using distinct negative codes for different errors
-            command_executed=command,
-            status="error",
-            message=f"Command not found: {command_parts[0]}",
-        )
-    except subprocess.TimeoutExpired:
-        logger.error(f"Vetted command '{command}' timed out after {timeout_sec} seconds.")
-        return ExecuteVettedShellCommandOutput(
-            stderr=f"Error: Command timed out after {timeout_sec} seconds.",
-            return_code=-2,
-            command_executed=command,
-            status="error",
-            message=f"Command timed out after {timeout_sec} seconds.",
-        )
-    except Exception as e:
-        logger.exception(f"An unexpected error occurred while running vetted command '{command}': {e}")
-        return ExecuteVettedShellCommandOutput(
-            stderr=f"An unexpected error occurred: {e}", return_code=-3, command_executed=command, status="error", message=f"An unexpected error occurred: {e}"
-        )
+    # Waiting for a free slot does not count towards the command's timeout
+    async with _shell_command_slots():
+        logger.info(f"Executing vetted shell command: '{command}' in directory '{working_directory or '.'}'")
+        try:
+            # A new session makes the command a process group leader, so a timeout can stop its children too
+            process = await asyncio.create_subprocess_exec(
+                *command_parts,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                cwd=working_directory,
+                start_new_session=True,
+            )
+        except FileNotFoundError:
+            logger.error(f"Command not found during execution: {command_parts[0]}")
+            return ExecuteVettedShellCommandOutput(
+                stderr=f"Error: Command not found: {command_parts[0]}",
+                return_code=-1,  # Using distinct negative codes for different errors
+                command_executed=command,
+                status="error",
+                message=f"Command not found: {command_parts[0]}",
+            )
+        except Exception as e:
+            return _unexpected_error(command, e)
+
+        try:
+            stdout_bytes, stderr_bytes = await asyncio.wait_for(process.communicate(), timeout=timeout_sec)
+        except asyncio.TimeoutError:
+            await _kill_process_group(process)
+            logger.error(f"Vetted command '{command}' timed out after {timeout_sec} seconds.")
+            return ExecuteVettedShellCommandOutput(
+                stderr=f"Error: Command timed out after {timeout_sec} seconds.",
+                return_code=-2,
+                command_executed=command,
+                status="error",
+                message=f"Command timed out after {timeout_sec} seconds.",
+            )
+        except asyncio.CancelledError:
+            # The agent run was cancelled: do not leave the command running
+            await _kill_process_group(process)
+            raise
+        except Exception as e:
+            await _kill_process_group(process)
+            return _unexpected_error(command, e)
+
+    logger.info(f"Vetted command '{command}' finished with return code {process.returncode}")
+    return ExecuteVettedShellCommandOutput(
+        stdout=stdout_bytes.decode("utf-8", errors="replace").strip(),
+        stderr=stderr_bytes.decode("utf-8", errors="replace").strip(),
+        return_code=process.returncode,
+        command_executed=command,
+        status="executed",
+        message="Command executed successfully." if process.returncode == 0 else "Command executed with non-zero exit code.",
+    )
 
 
 # --- Tool Registrations --- # <-- Added section (optional but good practice)
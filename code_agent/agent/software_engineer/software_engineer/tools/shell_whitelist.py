@@ -0,0 +1,284 @@
+# software_engineer/tools/shell_whitelist.py
+"""Argument-aware whitelist of shell commands that run without approval.
+
+Entries are token prefixes such as ``git status`` or ``kubectl get``, kept in a
+trie so a lookup walks the command's tokens once. A command is whitelisted when
+an entry is a prefix of it and the arguments after that prefix satisfy the
+entry's `ArgumentRule`, so ``git status --short`` and ``kubectl get pods -n x``
+need no approval while ``git branch -D main`` or ``find . -delete`` still do.
+Commands that read files (``cat``, ``grep``, ``head``, ``tail``, ``git diff``) are
+only whitelisted for relative paths inside the working directory, and ``kubectl get``
+not for secrets or full ``yaml``/``json`` output. Commands using shell syntax
+(redirects, pipes, chains, substitutions) are never whitelisted.
+
+Session state stores only how the whitelist differs from the defaults, as
+``{"defaults": bool, "added": [...], "removed": [...]}``.
+"""
+
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import PurePosixPath
+from typing import Any, Dict, FrozenSet, Iterable, List, Mapping, Optional, Tuple
+
+from code_agent.tools.shell_session import command_tokens
+
+STATE_KEY = "shell_command_whitelist"
+
+# Characters that let the shell turn an argument into another path: variables and brace expansion
+_PATH_EXPANSIONS = frozenset("${")
+_OUTPUT_FLAGS = ("-o", "--output")
+
+
+def _workspace_path(arg: str) -> bool:
+    """Whether `arg` names a path inside the working directory, judging by its text alone."""
+    if arg.startswith(("/", "~")) or not _PATH_EXPANSIONS.isdisjoint(arg):
+        return False
+    return ".." not in PurePosixPath(arg).parts
+
+
+def _resource_names(arg: str) -> List[str]:
+    """Returns the resource kinds in a kubectl argument such as ``pods,secrets`` or ``secret/db``."""
+    return [part.split("/", 1)[0].split(".", 1)[0].lower() for part in arg.split(",")]
+
+
+@dataclass(frozen=True)
+class ArgumentRule:
+    """Constraints on the arguments that follow a whitelisted prefix."""
+
+    allowed_flags: Optional[FrozenSet[str]] = None
+    """Flags that may be used; None allows any flag that is not forbidden."""
+    forbidden_flags: FrozenSet[str] = frozenset()
+    positional: bool = True
+    """Whether arguments other than flags are allowed."""
+    workspace_paths: bool = False
+    """Whether arguments other than flags must be relative paths inside the working directory."""
+    pattern_first: bool = False
+    """Whether the first argument other than a flag is a pattern rather than a path, as for grep."""
+    pattern_flags: FrozenSet[str] = frozenset()
+    """Flags that supply the pattern instead, making every argument other than a flag a path."""
+    forbidden_resources: FrozenSet[str] = frozenset()
+    """Resource kinds that may not be named, in any of kubectl's ``kind``, ``kind/name`` or list forms."""
+    output_formats: Optional[FrozenSet[str]] = None
+    """Values ``-o``/``--output`` may take; None allows any."""
+
+    @staticmethod
+    def _flag_names(arg: str) -> Tuple[str, List[str], FrozenSet[str]]:
+        """Returns a flag's name, its bundled single-letter flags and every name it may stand for."""
+        name = arg.split("=", 1)[0]
+        if arg.startswith("--"):
+            return name, [], frozenset({name})
+        # Single-dash flags can be long (-delete), bundled (-av) or carry their value (-sVALUE)
+        bundled = [f"-{letter}" for letter in arg[1:]] if arg[1:].isalpha() else []
+        return name, bundled, frozenset({name, arg[:2], *bundled})
+
+    def _flag_allowed(self, arg: str) -> bool:
+        name, bundled, names = self._flag_names(arg)
+        if not self.forbidden_flags.isdisjoint(names):
+            return False
+        if self.allowed_flags is None:
+            return True
+        return name in self.allowed_flags or (len(bundled) > 1 and self.allowed_flags.issuperset(bundled))
+
+    @staticmethod
+    def _output_format(arg: str, following: Optional[str]) -> Optional[str]:
+        """Returns the output format `arg` selects, or None if it is not an output flag."""
+        name, sep, value = arg.partition("=")
+        if name in _OUTPUT_FLAGS:
+            return value if sep else following or ""
+        if arg.startswith("-o") and not arg.startswith("--"):
+            return arg[2:]
+        return None
+
+    def accepts(self, args: Iterable[str]) -> bool:
+        args = list(args)
+        options_ended = False
+        pattern_pending = self.pattern_first
+        operands: List[str] = []
+        skip_next = False
+        for index, arg in enumerate(args):
+            if skip_next:
+                skip_next = False
+            elif not options_ended and arg == "--":
+                options_ended = True
+            elif not options_ended and arg.startswith("-") and arg != "-":
+                if not self._flag_allowed(arg):
+                    return False
+                if not self.pattern_flags.isdisjoint(self._flag_names(arg)[2]):
+                    pattern_pending = False
+                if self.output_formats is not None:
+                    following = args[index + 1] if index + 1 < len(args) else None
+                    output_format = self._output_format(arg, following)
+                    if output_format is not None and output_format not in self.output_formats:
+                        return False
+                    # The format after a bare -o is its value, not a resource
+                    skip_next = output_format is not None and arg in _OUTPUT_FLAGS
+            elif not self.positional:
+                return False
+            else:
+                operands.append(arg)
+        if any(name in self.forbidden_resources for arg in operands for name in _resource_names(arg)):
+            return False
+        if self.workspace_paths:
+            # Decided after all flags are seen, since grep -e may follow the pattern position
+            paths = operands[1:] if pattern_pending else operands
+            return all(_workspace_path(arg) for arg in paths)
+        return True
+
+
+ANY_ARGUMENTS = ArgumentRule()
+NO_ARGUMENTS = ArgumentRule(allowed_flags=frozenset(), positional=False)
+
+# Reading files outside the working directory (keys, credentials) needs approval
+_WORKSPACE_FILES = ArgumentRule(workspace_paths=True)
+
+_GIT_REF_LISTING_FLAGS = frozenset(
+    {"-a", "--all", "-r", "--remotes", "-v", "-vv", "--verbose", "-l", "--list", "--sort", "--format", "--column", "--no-column", "--color", "--no-color"}
+)
+
+# Default safe commands with what may follow them; the order is the order `list` reports
+DEFAULT_RULES: Dict[str, ArgumentRule] = {
+    "ls": ANY_ARGUMENTS,
+    # -f and --exclude-from read patterns from a file, which may lie outside the working directory
+    "grep": ArgumentRule(
+        forbidden_flags=frozenset({"-f", "--file", "--exclude-from"}),
+        workspace_paths=True,
+        pattern_first=True,
+        pattern_flags=frozenset({"-e", "--regexp"}),
+    ),
+    "find": ArgumentRule(forbidden_flags=frozenset({"-delete", "-exec", "-execdir", "-ok", "-okdir", "-fprint", "-fprint0", "-fprintf", "-fls"})),
+    "cat": _WORKSPACE_FILES,
+    "pwd": ANY_ARGUMENTS,
+    "echo": ANY_ARGUMENTS,
+    "git status": ANY_ARGUMENTS,
+    "head": _WORKSPACE_FILES,
+    "tail": _WORKSPACE_FILES,
+    "wc": ANY_ARGUMENTS,
+    # With --no-index, or a path outside the work tree, git diff compares any two files
+    "git diff": ArgumentRule(forbidden_flags=frozenset({"--output", "--ext-diff", "--no-index"}), workspace_paths=True),
+    "git log": ArgumentRule(forbidden_flags=frozenset({"--output", "--ext-diff"})),
+    "which": ANY_ARGUMENTS,
+    "ping": ArgumentRule(forbidden_flags=frozenset({"-f"})),
+    "host": ANY_ARGUMENTS,
+    "dig": ANY_ARGUMENTS,
+    "nslookup": ANY_ARGUMENTS,
+    "ss": ArgumentRule(forbidden_flags=frozenset({"-K", "--kill"})),
+    "uname": ANY_ARGUMENTS,
+    "uptime": ANY_ARGUMENTS,
+    "date": ArgumentRule(forbidden_flags=frozenset({"-s", "--set"})),
+    "df": ANY_ARGUMENTS,
+    "du": ANY_ARGUMENTS,
+    "free": ANY_ARGUMENTS,
+    "stat": ANY_ARGUMENTS,
+    "ps": ANY_ARGUMENTS,
+    "pgrep": ANY_ARGUMENTS,
+    # Arguments would add or delete addresses and routes; "show" lists them
+    "ip addr": NO_ARGUMENTS,
+    "ip addr show": ANY_ARGUMENTS,
+    "ip route": NO_ARGUMENTS,
+    "ip route show": ANY_ARGUMENTS,
+    "traceroute": ANY_ARGUMENTS,
+    "git grep": ArgumentRule(forbidden_flags=frozenset({"-O", "--open-files-in-pager", "--no-index"})),
+    # A name would create a branch or tag, so only listing flags are allowed
+    "git branch": ArgumentRule(allowed_flags=_GIT_REF_LISTING_FLAGS | {"--show-current"}, positional=False),
+    "git branch --show-current": NO_ARGUMENTS,
+    "git tag": ArgumentRule(allowed_flags=_GIT_REF_LISTING_FLAGS | {"-n"}, positional=False),
+    "git remote -v": NO_ARGUMENTS,
+    "git config --list": ArgumentRule(
+        allowed_flags=frozenset({"--show-origin", "--show-scope", "--global", "--system", "--local", "--name-only", "-z", "--null", "--includes"}),
+        positional=False,
+    ),
+    "docker ps": ANY_ARGUMENTS,
+    "docker images": ANY_ARGUMENTS,
+    # Secrets hold credentials and yaml/json output includes them; --raw fetches any API path
+    "kubectl get": ArgumentRule(
+        forbidden_flags=frozenset({"--raw", "--template"}),
+        forbidden_resources=frozenset({"secret", "secrets"}),
+        output_formats=frozenset({"wide", "name"}),
+    ),
+    "kubectl describe": ANY_ARGUMENTS,
+    "kubectl logs": ANY_ARGUMENTS,
+    "kubectl cluster-info": ArgumentRule(forbidden_flags=frozenset({"--output-directory"})),
+    # --raw and --flatten print credentials
+    "kubectl config view": ArgumentRule(forbidden_flags=frozenset({"--raw", "--flatten"})),
+    "kubectl version": ANY_ARGUMENTS,
+    "kubectl api-resources": ANY_ARGUMENTS,
+    "kubectl api-versions": ANY_ARGUMENTS,
+    "kubectl top": ANY_ARGUMENTS,
+}
+
+DEFAULT_SAFE_COMMANDS: List[str] = list(DEFAULT_RULES)
+
+
+class _Node:
+    __slots__ = ("children", "entry", "rule")
+
+    def __init__(self):
+        self.children: Dict[str, "_Node"] = {}
+        self.entry: Optional[str] = None
+        self.rule: Optional[ArgumentRule] = None
+
+
+class ShellWhitelist:
+    """Whitelisted command prefixes in a token trie.
+
+    Args:
+        entries: Command prefixes, each with the rule for the arguments that may follow it
+    """
+
+    def __init__(self, entries: Mapping[str, ArgumentRule]):
+        self.entries: Dict[str, ArgumentRule] = dict(entries)
+        self._root = _Node()
+        for entry, rule in self.entries.items():
+            tokens = command_tokens(entry)
+            if not tokens:
+                continue
+            node = self._root
+            for token in tokens:
+                node = node.children.setdefault(token, _Node())
+            node.entry, node.rule = entry, rule
+
+    @classmethod
+    def from_state(cls, value: Any) -> "ShellWhitelist":
+        """Loads the whitelist stored in session state; a missing value means the defaults."""
+        if isinstance(value, list):
+            # Sessions saved before the compact form stored every entry
+            return cls({entry: DEFAULT_RULES.get(entry, ANY_ARGUMENTS) for entry in value if isinstance(entry, str)})
+        if not isinstance(value, dict):
+            return _cached_whitelist(True, (), ())
+        added, removed = (tuple(entry for entry in value.get(key) or () if isinstance(entry, str)) for key in ("added", "removed"))
+        return _cached_whitelist(bool(value.get("defaults", True)), added, removed)
+
+    def to_state(self) -> Dict[str, Any]:
+        """Returns the compact session state form: the differences from the defaults."""
+        kept = [entry for entry in DEFAULT_SAFE_COMMANDS if entry in self.entries]
+        if len(kept) * 2 < len(DEFAULT_SAFE_COMMANDS):
+            return {"defaults": False, "added": list(self.entries), "removed": []}
+        removed = [entry for entry in DEFAULT_SAFE_COMMANDS if entry not in self.entries]
+        added = [entry for entry in self.entries if entry not in DEFAULT_RULES]
+        return {"defaults": True, "added": added, "removed": removed}
+
+    def match(self, command: str) -> Optional[str]:
+        """Returns the entry that whitelists `command`, or None if there is none.
+
+        Every entry that is a prefix of the command is tried, so a broad entry such as
+        ``git`` covers what a narrower one (``git branch``) would refuse.
+        """
+        tokens = command_tokens(command)
+        if not tokens:
+            return None
+        node = self._root
+        matched: Optional[str] = None
+        for index, token in enumerate(tokens):
+            node = node.children.get(token)
+            if node is None:
+                break
+            if node.rule is not None and node.rule.accepts(tokens[index + 1 :]):
+                matched = node.entry
+        return matched
+
+
+@lru_cache(maxsize=64)
+def _cached_whitelist(defaults: bool, added: Tuple[str, ...], removed: Tuple[str, ...]) -> ShellWhitelist:
+    entries = {entry: rule for entry, rule in DEFAULT_RULES.items() if entry not in removed} if defaults else {}
+    entries.update((entry, DEFAULT_RULES.get(entry, ANY_ARGUMENTS)) for entry in added)
+    return ShellWhitelist(entries)
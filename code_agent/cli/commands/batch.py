@@ -0,0 +1,134 @@
+"""
+This module contains the 'batch' command, which runs scripted instructions concurrently.
+"""
+
+import asyncio
+import json
+import logging
+import sys
+import warnings
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import typer
+from rich.console import Console
+from typing_extensions import Annotated
+
+from code_agent.cli.commands.run import ADK_INSTALLED, AGENT_PATH_HELP, LEVEL_HELP, create_services, load_agent
+from code_agent.cli.utils import _resolve_agent_path_str, operation_complete, operation_error, operation_warning, setup_logging, step_progress
+from code_agent.config import get_config, initialize_config
+
+logger = logging.getLogger(__name__)
+
+INPUT_HELP = "JSONL file with one instruction per line (a JSON string or an object with 'instruction'), or '-' for stdin."
+OUTPUT_HELP = "File to write JSONL results to, one line per instruction as it finishes. Defaults to stdout."
+CONCURRENCY_HELP = "Maximum number of instructions to run at the same time."
+
+
+def batch_command(
+    input_file: Annotated[str, typer.Argument(help=INPUT_HELP)],
+    agent_path: Annotated[
+        Optional[Path],
+        typer.Option("--agent", "-a", help=AGENT_PATH_HELP),
+    ] = None,
+    output: Annotated[
+        Optional[Path],
+        typer.Option("--output", "-o", help=OUTPUT_HELP),
+    ] = None,
+    concurrency: Annotated[
+        int,
+        typer.Option("--concurrency", "-c", min=1, help=CONCURRENCY_HELP),
+    ] = 4,
+    provider: Annotated[
+        Optional[str],
+        typer.Option("--provider", "-p", help="LLM provider to use. Overrides config file."),
+    ] = None,
+    model: Annotated[
+        Optional[str],
+        typer.Option("--model", "-m", help="LLM model to use. Overrides config file."),
+    ] = None,
+    log_level: Annotated[
+        Optional[str],
+        typer.Option("--log-level", "-l", help=LEVEL_HELP + " Overrides config/verbose flag."),
+    ] = None,
+    verbose: Annotated[
+        bool,
+        typer.Option("--verbose", "-v", help="Enable verbose output.", is_flag=True),
+    ] = False,
+):
+    """
+    Run instructions from a JSONL file concurrently and write JSONL results.
+
+    Every instruction gets its own session (unless the line sets 'session_id') and
+    all of them share one loaded agent, runner and set of services in this process.
+    Each result line has the final text, session ID, tool-call count, token usage
+    (estimated when the model does not report it) and latency. Progress goes to stderr.
+    """
+    # stdout may carry the results, so everything else goes to stderr
+    console = Console(stderr=True)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        initialize_config(cli_provider=provider, cli_model=model, cli_log_level=log_level, cli_verbose=verbose, force_reinit=True, validate=True)
+        cfg = get_config()
+    setup_logging(verbosity_level=cfg.verbosity)
+
+    if not ADK_INSTALLED:
+        operation_error(console, "Google ADK is required for the 'batch' command but is not installed.")
+        raise typer.Exit(code=1)
+
+    try:
+        lines = sys.stdin.read().splitlines() if input_file == "-" else Path(input_file).expanduser().read_text(encoding="utf-8").splitlines()
+    except OSError as e:
+        operation_error(console, f"Could not read instructions from {input_file}: {e}")
+        raise typer.Exit(code=1) from e
+
+    resolved_agent_path_str = _resolve_agent_path_str(agent_path, cfg)
+    if not resolved_agent_path_str:
+        raise typer.Exit(code=1)
+
+    try:
+        agent = load_agent(Path(resolved_agent_path_str), console, cfg)
+    except (ImportError, AttributeError, OSError, ValueError) as e:
+        operation_error(console, f"Failed to load agent: {e}")
+        raise typer.Exit(code=1) from e
+
+    from google.adk.runners import Runner
+
+    from code_agent.services.batch_runner import BatchRunner
+
+    session_service, memory_service, artifact_service = create_services(cfg, console)
+    runner = Runner(
+        app_name=cfg.app_name,
+        agent=agent,
+        artifact_service=artifact_service,
+        session_service=session_service,
+        memory_service=memory_service,
+    )
+    batch = BatchRunner(runner=runner, session_service=session_service, app_name=cfg.app_name, user_id=cfg.user_id, max_concurrency=concurrency)
+    step_progress(console, f"[dim]Running instructions from {input_file} with concurrency {concurrency}[/dim]")
+
+    out = open(output, "w", encoding="utf-8") if output else sys.stdout
+
+    def write_result(result: Dict[str, Any]) -> None:
+        out.write(json.dumps(result) + "\n")
+        out.flush()
+        if result["status"] != "ok":
+            operation_warning(console, f"Instruction on line {result['index'] + 1} failed: {result['error']}")
+
+    try:
+        summary = asyncio.run(batch.run(lines, write_result))
+    except KeyboardInterrupt:
+        console.print("\n[bold yellow]Batch interrupted.[/bold yellow]")
+        raise typer.Exit(code=130)  # noqa: B904
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    rate = summary["total"] / summary["elapsed_s"] if summary["elapsed_s"] else 0.0
+    operation_complete(
+        console,
+        f"{summary['succeeded']}/{summary['total']} instructions succeeded in {summary['elapsed_s']:.1f}s ({rate:.2f}/s)",
+    )
+    if summary["failed"]:
+        raise typer.Exit(code=1)
@@ -70,8 +70,8 @@ def providers_list():
     found_configured_cloud = False
 
     # Current default indicator
-    console.print(f"[bold]Current Default Provider:[/bold] {config.llm.provider}")
-    console.print(f"[bold]Current Default Model:[/bold]    {config.llm.model}")
+    console.print(f"[bold]Current Default Provider:[/bold] {config.default_provider}")
+    console.print(f"[bold]Current Default Model:[/bold]    {config.default_model}")
     console.print()
 
     # List all providers with their status
@@ -86,7 +86,9 @@ def providers_list():
             # We could add a check here to see if the ollama service is reachable
             status = "[cyan]✓ Available (Local)[/cyan]"
             # Check if Ollama URL is default or custom
-            ollama_url = config.ollama.url if config.ollama else "http://localhost:11434"
+            # There is no ollama config section yet; honour one if a config provides it
+            ollama = getattr(config, "ollama", None)
+            ollama_url = ollama.url if ollama else "http://localhost:11434"
             if ollama_url != "http://localhost:11434":
                 status += f" (URL: {ollama_url})"
 
@@ -106,7 +108,7 @@ def providers_list():
 
         # Is this the default?
         default_marker = ""
-        if provider_id == config.llm.provider:
+        if provider_id == config.default_provider:
             default_marker = " [bold green](DEFAULT)[/bold green]"
 
         console.print(f"[bold {style}]{name}[/bold {style}]: {status}{default_marker}")
@@ -128,7 +130,7 @@ def providers_list():
 
         console.print()
 
-    if not found_configured_cloud and config.llm.provider != "ollama":
+    if not found_configured_cloud and config.default_provider != "ollama":
         console.print("\n[bold yellow]Warning:[/bold yellow] No cloud providers seem to have configured API keys.")
         console.print("You may need to configure one unless you intend to use Ollama exclusively.")
         console.print("Run the relevant command to see setup instructions, e.g.:")
@@ -2,46 +2,24 @@
 This module contains the commands for the run sub-app.
 """
 
+import importlib
 import importlib.util
 import json
 import logging
 import sys
 import traceback
 import warnings
+from importlib import import_module
 from pathlib import Path
-from typing import Optional
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple
 
 import typer
 from rich.console import Console
+from rich.markdown import Markdown
+from rich.prompt import Prompt
 from typing_extensions import Annotated
 
 # Local application imports
-from code_agent.config import get_config, initialize_config
-
-# Import ADK components if available
-try:
-    from google.adk.artifacts.in_memory_artifact_service import InMemoryArtifactService
-
-    # Try importing the memory service
-    from google.adk.memory.in_memory_memory_service import InMemoryMemoryService
-    from google.adk.sessions.in_memory_session_service import InMemorySessionService
-
-    ADK_INSTALLED = True
-    # Placeholder is no longer needed here if import succeeds
-    # InMemoryMemoryService = None # type: ignore
-except ImportError:
-    # Set all to None if ANY import fails
-    InMemoryArtifactService = None  # type: ignore
-    InMemorySessionService = None  # type: ignore
-    InMemoryMemoryService = None  # type: ignore # Keep this for the check below
-    ADK_INSTALLED = False
-
-# Import our custom session service
-# from code_agent.services.memory_service import FileSystemMemoryService # Old import
-# from code_agent.services.memory_service import MemoryServiceWrapper # Not the wrapper
-from code_agent.adk.json_memory_service import JsonFileMemoryService  # Import the correct one
-
-# Import helpers from utils
 from code_agent.cli.utils import (
     _resolve_agent_path_str,
     operation_complete,
@@ -52,10 +30,64 @@ from code_agent.cli.utils import (
     step_progress,
     thinking_indicator,
 )
-from code_agent.services.session_service import FileSystemSessionService
+from code_agent.config import get_config, initialize_config
+from code_agent.services.agent_client import AgentClient, AgentServerError, AgentServerUnavailableError, resolve_address
+from code_agent.telemetry import configure_tracing, shutdown_tracing
+from code_agent.telemetry.profiling import create_profiler, print_profile_summary
+
+if TYPE_CHECKING:
+    from google.adk.artifacts.in_memory_artifact_service import InMemoryArtifactService
+    from google.adk.sessions import Session
+    from google.adk.sessions.in_memory_session_service import InMemorySessionService
+
+    from code_agent.adk.json_memory_service import JsonFileMemoryService
+    from code_agent.services.artifact_service import FileSystemArtifactService
+    from code_agent.services.session_service import FileSystemSessionService
 
 logger = logging.getLogger(__name__)  # Define logger at module level
 
+# ADK and the services built on it take seconds to import and 'run --server' needs
+# none of them, so they are imported on first use. They are still module attributes
+# for easier patching; without ADK they are None and ADK_INSTALLED is False.
+_LAZY_IMPORTS = {
+    "InMemoryArtifactService": ("google.adk.artifacts.in_memory_artifact_service", "InMemoryArtifactService"),
+    "InMemoryMemoryService": ("google.adk.memory.in_memory_memory_service", "InMemoryMemoryService"),
+    "InMemorySessionService": ("google.adk.sessions.in_memory_session_service", "InMemorySessionService"),
+    "JsonFileMemoryService": ("code_agent.adk.json_memory_service", "JsonFileMemoryService"),
+    "FileSystemArtifactService": ("code_agent.services.artifact_service", "FileSystemArtifactService"),
+    "FileSystemSessionService": ("code_agent.services.session_service", "FileSystemSessionService"),
+    "Session": ("google.adk.sessions", "Session"),
+}
+_ADK_SERVICES = ("InMemoryArtifactService", "InMemoryMemoryService", "InMemorySessionService")
+
+
+def _lazy_import(name: str) -> Any:
+    module_name, attribute = _LAZY_IMPORTS[name]
+    try:
+        value = getattr(import_module(module_name), attribute)
+    except ImportError:
+        value = None
+    globals()[name] = value
+    return value
+
+
+def _import_adk() -> None:
+    """Loads ADK and the services built on it unless already loaded (or patched)."""
+    for name in _LAZY_IMPORTS:
+        if name not in globals():
+            _lazy_import(name)
+    globals().setdefault("ADK_INSTALLED", all(globals()[name] is not None for name in _ADK_SERVICES))
+
+
+def __getattr__(name: str):
+    if name in _LAZY_IMPORTS:
+        return _lazy_import(name)
+    if name == "ADK_INSTALLED":
+        _import_adk()
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 # --- Constants for Typer Arguments/Options ---
 AGENT_PATH_DEFAULT = None  # Can't use Path() here directly
 AGENT_PATH_HELP = (
@@ -80,6 +112,261 @@ AGENT_PATH_ARG = typer.Argument(
 )
 
 
+# --- Agent Loading ---
+def load_agent(resolved_agent_path: Path, console: Console, cfg: Any = None) -> Any:
+    """Imports an agent module or package and returns its root agent.
+
+    Args:
+        resolved_agent_path: Absolute path to an agent ``.py`` file or package directory
+        console: Console used for notices about how the agent was found
+        cfg: Effective config; when its provider is ``replay`` or ``record``, every
+            LLM agent's model is replaced accordingly, and when ``context_window`` is
+            enabled every LLM agent's requests are fitted to its token budget
+
+    Returns:
+        The agent instance exposed as ``root_agent`` (or ``agent``) by the module
+
+    Raises:
+        ImportError: If the module cannot be imported or exposes no agent
+        AttributeError: If the module exposes ``agent`` but no usable root agent
+        OSError: If the ``replay`` recording cannot be read
+        ValueError: If the ``replay`` recording is invalid or none is configured
+    """
+    spec = None
+    agent_module = None
+    agent_to_run = None
+
+    if resolved_agent_path.is_file() and resolved_agent_path.suffix == ".py":
+        module_name = resolved_agent_path.stem
+        # Use importlib.util.spec_from_file_location for robust loading
+        spec = importlib.util.spec_from_file_location(module_name, resolved_agent_path)
+        if spec and spec.loader:
+            agent_module = importlib.util.module_from_spec(spec)
+            # Add module to sys.modules BEFORE executing
+            sys.modules[module_name] = agent_module
+            spec.loader.exec_module(agent_module)
+        else:
+            raise ImportError(f"Could not create module spec for {resolved_agent_path}")
+
+    elif resolved_agent_path.is_dir():
+        # Assume it's a package directory
+        # Add parent directory to path to allow direct import
+        parent_dir = str(resolved_agent_path.parent)
+        if parent_dir not in sys.path:
+            sys.path.insert(0, parent_dir)  # Insert at beginning
+
+        module_name = resolved_agent_path.name
+        try:
+            # Attempt to import the directory as a package
+            agent_module = importlib.import_module(module_name)
+        except ImportError as e:
+            # Re-raise the original ImportError but chain the context
+            raise ImportError(f"Could not import agent package '{module_name}' from {resolved_agent_path}: {e}") from e
+        finally:
+            # Clean up sys.path if needed, though generally safe to leave
+            # if parent_dir in sys.path and sys.path[0] == parent_dir:
+            #     sys.path.pop(0)
+            pass
+    else:
+        raise ImportError(f"Agent path is neither a Python file nor a directory: {resolved_agent_path}")
+
+    # --- Get Agent Instance (Revert to previous working logic) ---
+    if hasattr(agent_module, "root_agent"):
+        agent_to_run = agent_module.root_agent
+        operation_warning(console, f"[dim]Found 'agent.root_agent' structure in {resolved_agent_path.name}.[/dim]")
+    elif hasattr(agent_module, "agent"):
+        potential_agent = agent_module.agent
+        # Previous check: Look for expected attributes like name/tools
+        if hasattr(potential_agent, "name") and hasattr(potential_agent, "tools"):
+            agent_to_run = potential_agent
+            operation_warning(console, f"[dim]Found top-level 'agent' variable in {resolved_agent_path.name} and using it.[/dim]")
+            operation_warning(console, "Consider renaming to 'root_agent' for clarity.")
+        # Check if agent_module.agent contains root_agent (less common)
+        elif hasattr(potential_agent, "root_agent"):
+            agent_to_run = potential_agent.root_agent
+            # operation_warning(console, f"[dim]Found 'agent.root_agent' structure in {resolved_agent_path.name}.[/dim]")
+        else:
+            # If root_agent doesn't exist, try 'agent'
+            raise AttributeError(f"Module {resolved_agent_path} has 'agent' but not 'root_agent'. Please expose 'root_agent'.")
+    else:
+        # Look for common factory functions or patterns if needed
+        operation_error(console, f"Could not find 'root_agent' or a suitable 'agent' variable in the module: {resolved_agent_path.name}")
+        raise ImportError(f"Could not find 'root_agent' or 'agent' in the module: {resolved_agent_path.name}")
+
+    if not agent_to_run:
+        # Should have been caught above, but double check
+        raise ImportError("Failed to load a valid agent instance.")
+
+    if cfg is not None:
+        from code_agent.adk.replay_llm import apply_model_provider
+
+        provider = apply_model_provider(agent_to_run, cfg)
+        if provider:
+            step_progress(console, f"[dim]Model calls use the '{provider}' provider with {cfg.default_model}[/dim]")
+
+        # Context window (selected via the 'context_window.enabled' config setting)
+        context_settings = getattr(cfg, "context_window", None)
+        if getattr(context_settings, "enabled", False) is True:
+            from code_agent.adk.context_window import ContextWindowManager
+
+            ContextWindowManager.from_settings(context_settings).attach(agent_to_run)
+            step_progress(console, f"[dim]Model requests are fitted to ~{context_settings.max_tokens} tokens[/dim]")
+
+    return agent_to_run
+
+
+def create_services(cfg: Any, console: Console) -> Tuple[Any, Any, Any]:
+    """Instantiates the session, memory and artifact services described by the config.
+
+    Shared by 'run' and 'serve' so both commands persist sessions in the same place.
+
+    Returns:
+        A (session_service, memory_service, artifact_service) tuple
+
+    Raises:
+        typer.Exit: If a storage directory cannot be created
+    """
+    # Session Service (using FileSystemSessionService)
+    sessions_dir_path = Path(cfg.sessions_dir).expanduser()
+    sessions_dir_str = str(sessions_dir_path)
+    # Ensure directory exists (FileSystemSessionService might do this, but good practice)
+    try:
+        sessions_dir_path.mkdir(parents=True, exist_ok=True)
+    except OSError as e:
+        operation_error(console, f"Failed to create sessions directory {sessions_dir_str}: {e}")
+        raise typer.Exit(code=1)  # noqa: B904
+
+    logging.debug(f"Initializing FileSystemSessionService. Sessions dir: {sessions_dir_str}")
+    file_system_session_service = FileSystemSessionService(sessions_dir=sessions_dir_str)
+
+    # Memory Service (using JsonFileMemoryService)
+    # Place memory store inside the sessions directory for organization
+    memory_file_path = sessions_dir_path / "memory_store.json"
+    memory_file_path_str = str(memory_file_path)
+    logging.info(f"Using JSON memory store file: {memory_file_path_str}")
+    json_memory_service = JsonFileMemoryService(filepath=memory_file_path_str)
+
+    # Artifact Service (selected via the 'artifacts.storage' config setting)
+    artifact_settings = getattr(cfg, "artifacts", None)
+    if getattr(artifact_settings, "storage", "memory") == "filesystem":
+        artifacts_dir_path = Path(artifact_settings.artifacts_dir or sessions_dir_path / "artifacts").expanduser()
+        logging.debug(f"Initializing FileSystemArtifactService. Artifacts dir: {artifacts_dir_path}")
+        try:
+            artifact_service = FileSystemArtifactService(artifacts_dir=str(artifacts_dir_path))
+        except RuntimeError as e:
+            operation_error(console, f"Failed to initialize artifact storage: {e}")
+            raise typer.Exit(code=1) from e
+    else:
+        artifact_service = InMemoryArtifactService()
+        logging.debug("Using default InMemoryArtifactService.")
+
+    return file_system_session_service, json_memory_service, artifact_service
+
+
+def _render_server_message(console: Console, message: Dict[str, Any]) -> None:
+    """Prints one event streamed back by the agent daemon."""
+    if message.get("type") == "session_created":
+        step_progress(console, f"[dim]Created new session: {message['session_id']}[/dim]")
+        return
+    for call in message.get("tool_calls") or []:
+        console.print(f"[dim][bold cyan]🔧 Tool Call:[/bold cyan] [bold]{call.get('name')}[/bold][/dim]")
+        if call.get("args"):
+            console.print(f"[dim]  Arguments: {json.dumps(call['args'], indent=2)}[/dim]")
+    if message.get("error"):
+        console.print(f"[bold red]❌ Error: {message['error']}[/bold red]")
+    if message.get("text") and message.get("author") != "user" and not message.get("partial"):
+        console.print("[bold yellow]🤖Agent:[/bold yellow]")
+        console.print(Markdown(message["text"]))
+
+
+def _save_server_session(cfg: Any, console: Console, session_dict: Dict[str, Any]) -> None:
+    """Saves a session fetched from the agent daemon the way local runs save theirs."""
+    # Only --save-session pays for importing ADK in --server mode; this sets both names
+    _import_adk()
+    if FileSystemSessionService is None or Session is None:
+        operation_warning(console, "Saving sessions requires google-adk to be installed.")
+        return
+    sessions_dir_path = Path(cfg.sessions_dir).expanduser()
+    try:
+        sessions_dir_path.mkdir(parents=True, exist_ok=True)
+        session = Session.model_validate(session_dict)
+        save_path = FileSystemSessionService(sessions_dir=str(sessions_dir_path)).save_session(session)
+    except (OSError, ValueError) as e:
+        operation_error(console, f"Failed to save session {session_dict.get('id')} to {sessions_dir_path}: {e}")
+        return
+    operation_complete(console, f"Session saved to: {save_path}")
+
+
+def _run_via_server(
+    cfg: Any,
+    console: Console,
+    *,
+    resolved_agent_path: Path,
+    instruction: str,
+    session_id: Optional[str],
+    interactive: bool,
+    save_session: bool,
+) -> Optional[str]:
+    """Runs the instruction (and optional interactive follow-ups) on the agent daemon.
+
+    Returns:
+        The session ID used by the daemon
+
+    Raises:
+        typer.Exit: If the daemon is unreachable or reports an error
+    """
+    address = resolve_address(cfg.server.address)
+    client = AgentClient(address)
+    current_session_id = session_id
+
+    def run_turn(text: str) -> None:
+        nonlocal current_session_id
+        with thinking_indicator(console, "Processing..."):
+            for message in client.run(text, str(resolved_agent_path), session_id=current_session_id, user_id=cfg.user_id):
+                if message.get("type") == "done":
+                    current_session_id = message["session_id"]
+                else:
+                    _render_server_message(console, message)
+
+    try:
+        console.print(f"[bold cyan]Running agent[/bold cyan] via daemon at {address} with instruction: '[italic]{instruction}[/italic]'")
+        run_turn(instruction)
+
+        if interactive:
+            console.print("\n[bold green]Continuing conversation...[/bold green]")
+            console.print("Type 'exit', 'quit', or press Ctrl+C to end the session.\n")
+            while True:
+                try:
+                    user_input = Prompt.ask("[bold cyan]You[/bold cyan]")
+                except (KeyboardInterrupt, EOFError):
+                    console.print("\n[bold yellow]Exiting conversation mode.[/bold yellow]")
+                    break
+                if user_input.lower() in ["exit", "quit"]:
+                    console.print("[bold green]Exiting conversation mode.[/bold green]")
+                    break
+                if user_input.strip():
+                    run_turn(user_input)
+
+        if current_session_id:
+            console.print(f"[dim]Session ID: {current_session_id}[/dim]")
+            if save_session:
+                session_dict = client.get_session(current_session_id, user_id=cfg.user_id)
+                if session_dict:
+                    _save_server_session(cfg, console, session_dict)
+                else:
+                    operation_warning(console, f"Could not retrieve session data for ID {current_session_id} to save.")
+            # Background jobs and the persistent shell end with the run, as they do without --server
+            client.close_session(current_session_id)
+    except AgentServerUnavailableError as e:
+        operation_error(console, f"{e}. Start one with: code-agent serve")
+        raise typer.Exit(code=1) from e
+    except (AgentServerError, OSError, ValueError) as e:
+        operation_error(console, f"The agent daemon failed to run the instruction: {e}")
+        raise typer.Exit(code=1) from e
+
+    return current_session_id
+
+
 # --- Run Command ---
 
 
@@ -121,7 +408,10 @@ def run_command(
         typer.Option(
             "--provider",
             "-p",
-            help="LLM provider to use (e.g., openai, ai_studio, groq, anthropic, ollama). Overrides config file.",
+            help=(
+                "LLM provider to use (e.g., openai, ai_studio, groq, anthropic, ollama). Overrides config file."
+                " 'replay' serves recorded model responses offline and 'record' records them; both take the recording file as --model."
+            ),
         ),
     ] = None,
     model: Annotated[
@@ -159,12 +449,83 @@ def run_command(
             is_flag=True,  # Make it a flag
         ),
     ] = False,
+    server: Annotated[
+        bool,
+        typer.Option("--server", help="Forward to a running 'code-agent serve' daemon instead of loading the agent in this process."),
+    ] = False,
+    stream: Annotated[
+        Optional[bool],
+        typer.Option("--stream/--no-stream", help="Stream responses and render them as they arrive (raw text when output is not a terminal). On by default."),
+    ] = None,
+    trace_file: Annotated[
+        Optional[Path],
+        typer.Option("--trace", help="Record an OpenTelemetry trace of the run (turns, model calls, tools, storage) to this file."),
+    ] = None,
+    trace_format: Annotated[
+        str,
+        typer.Option("--trace-format", help="Format of the --trace file: 'otlp' (OTLP/JSON) or 'chrome' (chrome://tracing, Perfetto)."),
+    ] = "otlp",
+    profile_dir: Annotated[
+        Optional[Path],
+        typer.Option("--profile", help="Profile each turn, write one profile per turn to this directory and print hotspots at exit."),
+    ] = None,
+    profile_format: Annotated[
+        str,
+        typer.Option("--profile-format", help="'folded' (sampling profiler, collapsed stacks) or 'pstats' (cProfile)."),
+    ] = "folded",
+    profile_top: Annotated[
+        int,
+        typer.Option("--profile-top", min=1, help="Number of hotspots to print with --profile."),
+    ] = 15,
+    cache_responses: Annotated[
+        Optional[bool],
+        typer.Option(
+            "--cache-responses/--no-cache-responses",
+            help="Answer repeated model requests from the on-disk response cache. Overrides the 'response_cache.enabled' config setting.",
+        ),
+    ] = None,
 ):
     """
     Run a Code Agent powered by ADK.
     """
     console = Console()
 
+    if server:
+        # The daemon runs the agents it loaded with its own configuration
+        model_options = {
+            "--provider": provider,
+            "--model": model,
+            "--temperature": temperature,
+            "--max-tokens": max_tokens,
+            "--cache-responses": cache_responses,
+        }
+        ignored = [name for name, value in model_options.items() if value is not None]
+        if ignored:
+            operation_error(console, f"{', '.join(ignored)} cannot be used with --server; the daemon uses the model settings it was started with.")
+            raise typer.Exit(code=1)
+        # Tracing and profiling would only cover this client, and the daemon sends whole events
+        local_options = {"--trace": trace_file, "--profile": profile_dir, "--stream": stream or None}
+        unsupported = [name for name, value in local_options.items() if value is not None]
+        if unsupported:
+            operation_error(console, f"{', '.join(unsupported)} cannot be used with --server; run without --server to trace, profile or stream a run.")
+            raise typer.Exit(code=1)
+
+    response_cache = None
+    profiler = None
+    if profile_dir:
+        try:
+            profiler = create_profiler(profile_dir, profile_format)
+        except ValueError as e:
+            operation_error(console, str(e))
+            raise typer.Exit(code=1) from e
+
+    if trace_file:
+        try:
+            configure_tracing(trace_file, trace_format)
+        except ValueError as e:
+            operation_error(console, str(e))
+            raise typer.Exit(code=1) from e
+
     try:
         # --- Configuration and Logging Setup ---
         # Suppress warnings during initialization
@@ -186,14 +547,16 @@ def run_command(
         setup_logging(verbosity_level=cfg.verbosity)
         logging.debug(f"Logging setup complete in 'run' command. Level: {logging.getLevelName(logging.getLogger().getEffectiveLevel())}")
 
-        # --- ADK Check ---
-        if not ADK_INSTALLED:
-            console.print("[bold red]Error:[/bold red] Google ADK is required for the 'run' command but is not installed.")
-            console.print("Please install it using: [yellow]uv add google-adk[/yellow]")
-            raise typer.Exit(code=1)
-        if InMemorySessionService is None:  # Check again just in case
-            console.print("[bold red]Error:[/bold red] Failed to import ADK's InMemorySessionService.")
-            raise typer.Exit(code=1)
+        # --- ADK Check (in --server mode the daemon holds ADK; this process never imports it) ---
+        if not server:
+            _import_adk()
+            if not ADK_INSTALLED:  # noqa: F821 - set by _import_adk()
+                console.print("[bold red]Error:[/bold red] Google ADK is required for the 'run' command but is not installed.")
+                console.print("Please install it using: [yellow]uv add google-adk[/yellow]")
+                raise typer.Exit(code=1)
+            if InMemorySessionService is None:  # Check again just in case
+                console.print("[bold red]Error:[/bold red] Failed to import ADK's InMemorySessionService.")
+                raise typer.Exit(code=1)
 
         # --- Agent Path Resolution ---
         resolved_agent_path_str = _resolve_agent_path_str(agent_path, cfg)
@@ -202,6 +565,19 @@ def run_command(
             raise typer.Exit(code=1)
         resolved_agent_path = Path(resolved_agent_path_str)  # Path object for loading
 
+        # --- Thin Client Mode ---
+        if server:
+            _run_via_server(
+                cfg,
+                console,
+                resolved_agent_path=resolved_agent_path,
+                instruction=instruction,
+                session_id=session_id,
+                interactive=interactive,
+                save_session=save_session_cli,
+            )
+            return
+
         # --- Agent Loading ---
         console.print(f"[bold cyan]Running agent[/bold cyan] with instruction: '[italic]{instruction}[/italic]'")
         # Print provider info using the correct config attribute
@@ -211,79 +587,24 @@ def run_command(
         step_progress(console, f"[dim]Provider: {provider_display}[/dim]")
         step_progress(console, f"[dim]Model: {model_display}[/dim]")
 
-        agent_to_run = None
         try:
             with thinking_indicator(console, "Loading agent..."):
-                # Dynamically load the agent module
-                spec = None
-                agent_module = None
-
-                if resolved_agent_path.is_file() and resolved_agent_path.suffix == ".py":
-                    module_name = resolved_agent_path.stem
-                    # Use importlib.util.spec_from_file_location for robust loading
-                    spec = importlib.util.spec_from_file_location(module_name, resolved_agent_path)
-                    if spec and spec.loader:
-                        agent_module = importlib.util.module_from_spec(spec)
-                        # Add module to sys.modules BEFORE executing
-                        sys.modules[module_name] = agent_module
-                        spec.loader.exec_module(agent_module)
-                    else:
-                        raise ImportError(f"Could not create module spec for {resolved_agent_path}")
-
-                elif resolved_agent_path.is_dir():
-                    # Assume it's a package directory
-                    # Add parent directory to path to allow direct import
-                    parent_dir = str(resolved_agent_path.parent)
-                    if parent_dir not in sys.path:
-                        sys.path.insert(0, parent_dir)  # Insert at beginning
-
-                    module_name = resolved_agent_path.name
-                    try:
-                        # Attempt to import the directory as a package
-                        agent_module = importlib.import_module(module_name)
-                    except ImportError as e:
-                        # Re-raise the original ImportError but chain the context
-                        raise ImportError(f"Could not import agent package '{module_name}' from {resolved_agent_path}: {e}") from e
-                    finally:
-                        # Clean up sys.path if needed, though generally safe to leave
-                        # if parent_dir in sys.path and sys.path[0] == parent_dir:
-                        #     sys.path.pop(0)
-                        pass
-                else:
-                    raise ImportError(f"Agent path is neither a Python file nor a directory: {resolved_agent_path}")
-
-                # --- Get Agent Instance (Revert to previous working logic) ---
-                if hasattr(agent_module, "root_agent"):
-                    agent_to_run = agent_module.root_agent
-                    operation_warning(console, f"[dim]Found 'agent.root_agent' structure in {resolved_agent_path.name}.[/dim]")
-                elif hasattr(agent_module, "agent"):
-                    potential_agent = agent_module.agent
-                    # Previous check: Look for expected attributes like name/tools
-                    if hasattr(potential_agent, "name") and hasattr(potential_agent, "tools"):
-                        agent_to_run = potential_agent
-                        operation_warning(console, f"[dim]Found top-level 'agent' variable in {resolved_agent_path.name} and using it.[/dim]")
-                        operation_warning(console, "Consider renaming to 'root_agent' for clarity.")
-                    # Check if agent_module.agent contains root_agent (less common)
-                    elif hasattr(potential_agent, "root_agent"):
-                        agent_to_run = potential_agent.root_agent
-                        # operation_warning(console, f"[dim]Found 'agent.root_agent' structure in {resolved_agent_path.name}.[/dim]")
-                    else:
-                        # If root_agent doesn't exist, try 'agent'
-                        raise AttributeError(f"Module {resolved_agent_path} has 'agent' but not 'root_agent'. Please expose 'root_agent'.")
-                else:
-                    # Look for common factory functions or patterns if needed
-                    operation_error(console, f"Could not find 'root_agent' or a suitable 'agent' variable in the module: {resolved_agent_path.name}")
-                    raise ImportError(f"Could not find 'root_agent' or 'agent' in the module: {resolved_agent_path.name}")
+                agent_to_run = load_agent(resolved_agent_path, console, cfg)
+
+                # Response cache (selected via --cache-responses or the 'response_cache.enabled' config setting)
+                cache_settings = getattr(cfg, "response_cache", None)
+                if getattr(cache_settings, "enabled", False) if cache_responses is None else cache_responses:
+                    from code_agent.adk.response_cache import ResponseCache
 
-                if not agent_to_run:
-                    # Should have been caught above, but double check
-                    raise ImportError("Failed to load a valid agent instance.")
+                    response_cache = ResponseCache.from_settings(cache_settings)
+                    response_cache.attach(agent_to_run)
+                    step_progress(console, f"[dim]Caching model responses in {response_cache.cache_dir}[/dim]")
 
                 operation_complete(
                     console, f"[dim]Agent '{getattr(agent_to_run, 'name', 'Unnamed Agent')}' loaded successfully from {resolved_agent_path.name}.[/dim]"
                 )
 
-        except (ImportError, AttributeError) as e:
+        except (ImportError, AttributeError, OSError, ValueError) as e:
             operation_error(console, f"Failed to load agent: {e}")
             # Chain the original exception
             raise typer.Exit(code=1) from e
@@ -295,30 +616,7 @@ def run_command(
             raise typer.Exit(code=1) from e
 
         # --- Instantiate Services ---
-        # Session Service (using FileSystemSessionService)
-        sessions_dir_path = Path(cfg.sessions_dir).expanduser()
-        sessions_dir_str = str(sessions_dir_path)
-        # Ensure directory exists (FileSystemSessionService might do this, but good practice)
-        try:
-            sessions_dir_path.mkdir(parents=True, exist_ok=True)
-        except OSError as e:
-            operation_error(console, f"Failed to create sessions directory {sessions_dir_str}: {e}")
-            raise typer.Exit(code=1)  # noqa: B904
-
-        logging.debug(f"Initializing FileSystemSessionService. Sessions dir: {sessions_dir_str}")
-        file_system_session_service = FileSystemSessionService(sessions_dir=sessions_dir_str)
-
-        # Memory Service (using JsonFileMemoryService)
-        # Place memory store inside the sessions directory for organization
-        memory_file_path = sessions_dir_path / "memory_store.json"
-        memory_file_path_str = str(memory_file_path)
-        logging.info(f"Using JSON memory store file: {memory_file_path_str}")
-        json_memory_service = JsonFileMemoryService(filepath=memory_file_path_str)
-
-        # Artifact Service (using default InMemory for now)
-        # If needed, instantiate a specific one here
-        artifact_service = InMemoryArtifactService()
-        logging.debug("Using default InMemoryArtifactService.")
+        file_system_session_service, json_memory_service, artifact_service = create_services(cfg, console)
 
         # --- Execute Agent via run_cli --- #
         run_output = None  # Initialize run_output
@@ -333,6 +631,8 @@ def run_command(
                 "session_id": session_id,
                 "interactive": interactive,
                 "show_timestamps": show_timestamps,
+                "stream": stream is not False,
+                "profiler": profiler,
                 # Pass the instantiated services
                 "session_service": file_system_session_service,
                 "memory_service": json_memory_service,
@@ -388,10 +688,7 @@ def run_command(
                             session_data = file_system_session_service.get_session(app_name=cfg.app_name, user_id=cfg.user_id, session_id=final_session_id)
 
                             if session_data:
-                                # Convert Session object to dict before saving
-                                session_dict = session_data.model_dump(mode="json")
-                                with open(save_path, "w", encoding="utf-8") as f:
-                                    json.dump(session_dict, f, indent=4)
+                                save_path = file_system_session_service.save_session(session_data)
                                 operation_complete(console, f"Session saved to: {save_path}")
                             else:
                                 operation_warning(console, f"Could not retrieve session data for ID {final_session_id} to save.")
@@ -415,6 +712,18 @@ def run_command(
         operation_error(console, f"An unexpected error occurred: {e}")
         logger.error(traceback.format_exc())  # Log the full traceback # - Logger should be defined
         raise typer.Exit(code=1) from e
+    finally:
+        if response_cache is not None:
+            stats = response_cache.stats()
+            step_progress(console, f"[dim]Response cache: {stats['hits']} hit(s), {stats['misses']} miss(es), {stats['bypassed']} not cacheable[/dim]")
+            if stats["bypassed"] and not stats["hits"] + stats["misses"] and response_cache.deterministic_only:
+                operation_warning(console, "No model request was cacheable: only temperature-0 requests are cached unless deterministic_only is false.")
+        if profiler is not None:
+            print_profile_summary(console, profiler, top=profile_top)
+        if trace_file:
+            written_trace = shutdown_tracing()
+            if written_trace:
+                step_progress(console, f"[dim]Trace written to {written_trace}[/dim]")
 
 
 # Note: Command registration happens in main.py
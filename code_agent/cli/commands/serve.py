@@ -0,0 +1,87 @@
+"""
+This module contains the 'serve' command, which runs the long-lived agent daemon.
+"""
+
+import asyncio
+import logging
+import warnings
+from functools import partial
+from typing import Optional
+
+import typer
+from rich.console import Console
+from typing_extensions import Annotated
+
+from code_agent.cli.commands.run import create_services, load_agent
+from code_agent.cli.utils import operation_complete, operation_error, setup_logging, step_progress
+from code_agent.config import get_config, initialize_config
+from code_agent.services.agent_client import resolve_address
+from code_agent.services.agent_server import AgentServer
+
+logger = logging.getLogger(__name__)
+
+ADDRESS_HELP = "Unix socket path or loopback 'host:port' to listen on. Overrides config (default: ~/.config/code-agent/agent.sock)."
+MAX_CONCURRENCY_HELP = "Maximum number of agent turns to run at the same time. Overrides config."
+
+
+def serve_command(
+    address: Annotated[
+        Optional[str],
+        typer.Option("--address", "-a", help=ADDRESS_HELP),
+    ] = None,
+    max_concurrency: Annotated[
+        Optional[int],
+        typer.Option("--max-concurrency", "-c", min=1, help=MAX_CONCURRENCY_HELP),
+    ] = None,
+    log_level: Annotated[
+        Optional[str],
+        typer.Option("--log-level", "-l", help="Verbosity level to set (0-3, QUIET, NORMAL, VERBOSE, DEBUG). Overrides config/verbose flag."),
+    ] = None,
+    verbose: Annotated[
+        bool,
+        typer.Option("--verbose", "-v", help="Enable verbose output.", is_flag=True),
+    ] = False,
+):
+    """
+    Run a long-lived agent daemon that 'code-agent run --server' forwards to.
+
+    Agents stay loaded between requests and share session, memory and artifact
+    services, so forwarded runs skip start-up, config loading and agent import.
+    Tools run in the directory the daemon was started from.
+    """
+    console = Console()
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        initialize_config(cli_log_level=log_level, cli_verbose=verbose, force_reinit=True, validate=True)
+        cfg = get_config()
+    setup_logging(verbosity_level=cfg.verbosity)
+
+    server_settings = cfg.server
+    listen_address = resolve_address(address or server_settings.address)
+    session_service, memory_service, artifact_service = create_services(cfg, console)
+
+    server = AgentServer(
+        agent_loader=partial(load_agent, console=console, cfg=cfg),
+        session_service=session_service,
+        memory_service=memory_service,
+        artifact_service=artifact_service,
+        app_name=cfg.app_name,
+        user_id=cfg.user_id,
+        max_concurrency=max_concurrency or server_settings.max_concurrency,
+        session_idle_timeout=server_settings.session_idle_timeout,
+    )
+
+    def on_ready(bound_address: str) -> None:
+        operation_complete(console, f"Agent daemon listening on [bold]{bound_address}[/bold]")
+        step_progress(console, f"[dim]Workspace: {server.workspace}[/dim]")
+        step_progress(console, f"[dim]Max concurrency: {server.max_concurrency}[/dim]")
+        step_progress(console, '[dim]Forward runs with: code-agent run --server "your instruction"[/dim]')
+
+    try:
+        asyncio.run(server.serve(listen_address, on_ready=on_ready))
+    except KeyboardInterrupt:
+        console.print("\n[bold yellow]Agent daemon stopped.[/bold yellow]")
+    except (RuntimeError, ValueError, OSError) as e:
+        operation_error(console, f"Could not start agent daemon: {e}")
+        raise typer.Exit(code=1) from e
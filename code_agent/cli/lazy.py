@@ -0,0 +1,79 @@
+"""
+Lazy subcommand registration for the Typer app.
+
+Subcommands are registered by import path and only imported when they are
+invoked, so lightweight commands like '--version', 'config show' and
+'providers list' do not pay for importing ADK, genai and litellm.
+"""
+
+import importlib
+from dataclasses import dataclass
+from typing import ClassVar, Dict, List, Optional
+
+import click
+import typer
+from typer.core import TyperGroup
+from typer.models import CommandInfo
+
+
+@dataclass(frozen=True)
+class LazyCommand:
+    """A subcommand whose implementation lives in `module` as `attribute`.
+
+    `attribute` is either a command function or a `typer.Typer` sub-app.
+    `help` is shown in the top-level command list without importing the module.
+    """
+
+    module: str
+    attribute: str
+    help: str
+
+
+class LazyTyperGroup(TyperGroup):
+    """A TyperGroup that imports the subcommands in `lazy_commands` on first use.
+
+    Subclass it and set `lazy_commands`, then pass the subclass as `cls` to `typer.Typer`.
+    """
+
+    lazy_commands: ClassVar[Dict[str, LazyCommand]] = {}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._listing_commands = False
+
+    def list_commands(self, ctx: click.Context) -> List[str]:
+        return sorted(set(super().list_commands(ctx)) | set(self.lazy_commands))
+
+    def get_command(self, ctx: click.Context, cmd_name: str) -> Optional[click.Command]:
+        command = super().get_command(ctx, cmd_name)
+        if command is not None or cmd_name not in self.lazy_commands:
+            return command
+
+        lazy = self.lazy_commands[cmd_name]
+        if self._listing_commands:
+            # Top-level help only needs the name and summary
+            return click.Command(cmd_name, help=lazy.help)
+
+        command = self._load_command(cmd_name, lazy)
+        self.add_command(command, cmd_name)
+        return command
+
+    def format_help(self, ctx: click.Context, formatter: click.HelpFormatter) -> None:
+        self._listing_commands = True
+        try:
+            return super().format_help(ctx, formatter)
+        finally:
+            self._listing_commands = False
+
+    def _load_command(self, cmd_name: str, lazy: LazyCommand) -> click.Command:
+        target = getattr(importlib.import_module(lazy.module), lazy.attribute)
+        if isinstance(target, typer.Typer):
+            command: click.Command = typer.main.get_group(target)
+        else:
+            command = typer.main.get_command_from_info(
+                CommandInfo(name=cmd_name, callback=target),
+                pretty_exceptions_short=True,
+                rich_markup_mode=self.rich_markup_mode,
+            )
+        command.name = cmd_name
+        return command
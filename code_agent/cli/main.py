@@ -1,5 +1,7 @@
+import importlib.metadata
+import importlib.util
 import logging
-from typing import Optional
+from typing import ClassVar, Dict, Optional
 
 import typer
 from dotenv import load_dotenv
@@ -8,50 +10,58 @@ from typing_extensions import Annotated
 
 # Local application imports
 from code_agent import __version__ as agent_version
-from code_agent.cli.commands.config import config_app
-from code_agent.cli.commands.provider import provider_app
-
-# Import command functions and apps from submodules
-from code_agent.cli.commands.run import run_command
-from code_agent.cli.commands.session import history as history_command
-from code_agent.cli.commands.session import sessions as sessions_command
+from code_agent.cli.lazy import LazyCommand, LazyTyperGroup
 from code_agent.config import get_config, initialize_config
 
 # Load environment variables first (e.g., from .env)
 load_dotenv()
 
 # --- ADK Version Check (Keep simplified version) ---
-ADK_INSTALLED = False
-try:
-    import google.adk  # Just check if base exists
+# Look the package up instead of importing it; importing google.adk costs seconds.
+ADK_INSTALLED = importlib.util.find_spec("google.adk") is not None
+
+
+def _adk_version() -> str:
+    """Returns the installed Google ADK version without importing it."""
+    if not ADK_INSTALLED:
+        return "Google ADK not installed"
+    try:
+        return importlib.metadata.version("google-adk")
+    except importlib.metadata.PackageNotFoundError:
+        return "unknown"
+
+
+# --- Lazy Command Registry ---
+# Commands are imported only when invoked, so '--version', 'config' and
+# 'providers' start without loading ADK, genai or litellm.
+class CodeAgentGroup(LazyTyperGroup):
+    lazy_commands: ClassVar[Dict[str, LazyCommand]] = {
+        "run": LazyCommand("code_agent.cli.commands.run", "run_command", "Run a Code Agent powered by ADK."),
+        "batch": LazyCommand(
+            "code_agent.cli.commands.batch",
+            "batch_command",
+            "Run instructions from a JSONL file concurrently and write JSONL results.",
+        ),
+        "serve": LazyCommand(
+            "code_agent.cli.commands.serve",
+            "serve_command",
+            "Run a long-lived agent daemon that 'code-agent run --server' forwards to.",
+        ),
+        "history": LazyCommand("code_agent.cli.commands.session", "history", "View the history of a previous conversation session."),
+        "sessions": LazyCommand("code_agent.cli.commands.session", "sessions", "List available saved conversation sessions."),
+        "config": LazyCommand("code_agent.cli.commands.config", "config_app", "Manage configuration."),
+        "providers": LazyCommand("code_agent.cli.commands.provider", "provider_app", "List and manage LLM providers."),
+    }
 
-    adk_version = getattr(google.adk, "__version__", "unknown")
-    ADK_INSTALLED = True
-except ImportError:
-    adk_version = "Google ADK not installed"
 
 # --- Typer App Definition ---
 app = typer.Typer(
     name="code-agent",
     help="Code Agent CLI - Enhanced with ADK capabilities.",
     add_completion=True,
+    cls=CodeAgentGroup,
 )
 
-# --- Register Commands ---
-
-# Register the run command
-# Need to explicitly add it using app.command() decorator on the imported function
-# This is slightly different from add_typer
-app.command("run")(run_command)
-
-# Register session commands
-app.command("history")(history_command)
-app.command("sessions")(sessions_command)
-
-# Register sub-apps
-app.add_typer(config_app, name="config")
-app.add_typer(provider_app, name="providers")
-
 
 # --- Version Callback ---
 def _version_callback(value: bool):
@@ -59,7 +69,7 @@ def _version_callback(value: bool):
     if value:
         console = Console()
         console.print(f"Code Agent version: {agent_version}")
-        console.print(f"Google ADK version: {adk_version}")
+        console.print(f"Google ADK version: {_adk_version()}")
         raise typer.Exit()
 
 
@@ -0,0 +1,210 @@
+"""
+Incremental rendering of streamed agent output.
+
+Partial text events are appended to a `rich.Live` region that is refreshed at a
+capped rate. Markdown is split into blocks as it arrives: finished blocks are
+printed once above the live region and only the trailing, still-growing block is
+re-parsed on each refresh. A chunk that arrives inside the refresh interval is
+drawn by a refresh scheduled for the end of it, so a stalled stream does not leave
+it undrawn. When the console is not a terminal the text is written through as-is.
+"""
+
+import asyncio
+import time
+from typing import Callable, List, Optional
+
+from rich.console import Console, Group, RenderableType
+from rich.live import Live
+from rich.markdown import Markdown
+from rich.text import Text
+
+DEFAULT_MAX_REFRESH_PER_SECOND = 10.0
+
+_FENCE_MARKERS = ("```", "~~~")
+
+
+class MarkdownBlocks:
+    """Splits a growing Markdown document into finished blocks and a trailing block.
+
+    A block is finished once a blank line follows it outside a fenced code block.
+    Each character is scanned once, however many times `take_finished` is called.
+    """
+
+    def __init__(self):
+        self._text = ""
+        self._parts: List[str] = []  # Chunks fed since `text` was last read
+        self._finished_upto = 0  # End of the text handed out by take_finished
+        self._scanned_upto = 0  # End of the last complete line scanned
+        self._boundary = 0  # End of the last blank line outside a fence
+        self._fence: Optional[str] = None  # Marker of the open code fence, if any
+
+    def feed(self, delta: str) -> None:
+        self._parts.append(delta)
+
+    @property
+    def text(self) -> str:
+        """Everything fed so far."""
+        # Joined on read, so feeding many small chunks does not copy the text each time
+        if self._parts:
+            self._text += "".join(self._parts)
+            self._parts.clear()
+        return self._text
+
+    @property
+    def trailing(self) -> str:
+        """Text after the last finished block."""
+        return self.text[self._finished_upto :]
+
+    def take_finished(self) -> str:
+        """Returns the blocks finished since the last call, or an empty string."""
+        text = self.text
+        while True:
+            end = text.find("\n", self._scanned_upto)
+            if end == -1:
+                break
+            line = text[self._scanned_upto : end].strip()
+            self._scanned_upto = end + 1
+            if self._fence is not None:
+                if line.startswith(self._fence):
+                    self._fence = None
+            elif line.startswith(_FENCE_MARKERS):
+                self._fence = line[:3]
+            elif not line:
+                self._boundary = self._scanned_upto
+
+        finished = text[self._finished_upto : self._boundary]
+        self._finished_upto = self._boundary
+        return finished.strip("\n")
+
+
+class StreamRenderer:
+    """Renders one streamed agent message.
+
+    Call `append` with each partial text chunk and `finish` once the message is
+    complete. On a terminal the message is shown in a `rich.Live` region refreshed
+    at most `max_refresh_per_second` times; otherwise chunks are written as raw text.
+    """
+
+    def __init__(
+        self,
+        console: Console,
+        header: Optional[str] = None,
+        max_refresh_per_second: float = DEFAULT_MAX_REFRESH_PER_SECOND,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.console = console
+        self.header = header
+        self.min_refresh_interval = 1.0 / max_refresh_per_second
+        self.clock = clock
+        self.live_output = console.is_terminal and not console.is_dumb_terminal
+        self._blocks = MarkdownBlocks()
+        self._printed_blocks = 0
+        self._live: Optional[Live] = None
+        self._last_refresh: Optional[float] = None
+        self._pending_refresh: Optional[asyncio.TimerHandle] = None
+        self._started = False
+
+    @property
+    def text(self) -> str:
+        """Everything streamed so far."""
+        return self._blocks.text
+
+    @property
+    def active(self) -> bool:
+        """Whether a message is being streamed and has not been finished."""
+        return self._started
+
+    def append(self, delta: str) -> None:
+        """Adds a chunk of the message and refreshes the display if due."""
+        if not delta:
+            return
+        if not self._started:
+            self._start()
+        self._blocks.feed(delta)
+
+        if not self.live_output:
+            self.console.out(delta, end="", highlight=False)
+            self.console.file.flush()
+            return
+
+        now = self.clock()
+        if self._last_refresh is None or now - self._last_refresh >= self.min_refresh_interval:
+            self._cancel_pending_refresh()
+            self._refresh()
+            self._last_refresh = now
+        elif self._pending_refresh is None:
+            self._schedule_refresh(self._last_refresh + self.min_refresh_interval - now)
+
+    def finish(self, full_text: Optional[str] = None) -> str:
+        """Completes the message and returns its text.
+
+        `full_text` is the aggregated message, when the caller has it. Any part of it
+        that did not arrive as a chunk is shown before the live region is closed.
+        """
+        streamed = self._blocks.text
+        if full_text is not None and full_text.startswith(streamed):
+            self.append(full_text[len(streamed) :])
+
+        if not self._started:
+            return self._blocks.text
+
+        if self.live_output:
+            self._cancel_pending_refresh()
+            self._print_finished(self._blocks.take_finished())
+            trailing = self._blocks.trailing.strip("\n")
+            self._live.update(Text(""), refresh=True)
+            self._live.stop()
+            self._live = None
+            self._print_finished(trailing)
+        else:
+            self.console.out("")
+        self._started = False
+        return self._blocks.text
+
+    def _start(self) -> None:
+        self._started = True
+        if self.header:
+            self.console.print(self.header)
+        if self.live_output:
+            self._live = Live(Text(""), console=self.console, auto_refresh=False, transient=True)
+            self._live.start()
+
+    def _schedule_refresh(self, delay: float) -> None:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # Without an event loop the next chunk or `finish` draws the text
+            return
+        self._pending_refresh = loop.call_later(delay, self._run_pending_refresh)
+
+    def _run_pending_refresh(self) -> None:
+        self._pending_refresh = None
+        if self._live is not None:
+            self._refresh()
+            self._last_refresh = self.clock()
+
+    def _cancel_pending_refresh(self) -> None:
+        if self._pending_refresh is not None:
+            self._pending_refresh.cancel()
+            self._pending_refresh = None
+
+    def _refresh(self) -> None:
+        self._print_finished(self._blocks.take_finished())
+        self._live.update(self._trailing_renderable(), refresh=True)
+
+    def _print_finished(self, blocks: str) -> None:
+        if not blocks:
+            return
+        if self._printed_blocks:
+            self.console.print()
+        self.console.print(Markdown(blocks))
+        self._printed_blocks += 1
+
+    def _trailing_renderable(self) -> RenderableType:
+        trailing = self._blocks.trailing.strip("\n")
+        if not trailing:
+            return Text("")
+        if self._printed_blocks:
+            # Keep the gap that will separate the block once it is printed
+            return Group(Text(""), Markdown(trailing))
+        return Markdown(trailing)
@@ -1,26 +1,59 @@
 import asyncio
 import datetime
+import importlib
 import json
 import logging
 import signal
-from contextlib import contextmanager
+import threading
+from contextlib import contextmanager, nullcontext
 from pathlib import Path
-from typing import Optional
+from typing import TYPE_CHECKING, Optional
 
 import typer  # For typer.Exit
 import yaml
-
-# Import Runner at top level for easier patching
-from google.adk.runners import Runner
-from google.adk.sessions.in_memory_session_service import InMemorySessionService
-from google.genai import types as genai_types
 from rich.console import Console
 from rich.markdown import Markdown
 from rich.prompt import Prompt
 
+from code_agent.cli.streaming import StreamRenderer
+
 # Assuming CodeAgentSettings is defined in code_agent.config.settings_based_config
 # Adjust the import path if necessary
 from code_agent.config import CodeAgentSettings
+from code_agent.telemetry import span
+from code_agent.tools.background_jobs import get_job_manager
+from code_agent.tools.shell_session import get_shell_pool
+
+if TYPE_CHECKING:
+    from google.adk.agents.run_config import RunConfig, StreamingMode
+    from google.adk.runners import Runner
+    from google.adk.sessions.in_memory_session_service import InMemorySessionService
+    from google.genai import types as genai_types
+
+# ADK and genai take seconds to import and only run_cli needs them, so they are
+# imported on first use. They are still module attributes for easier patching.
+_LAZY_IMPORTS = {
+    "Runner": ("google.adk.runners", "Runner"),
+    "InMemorySessionService": ("google.adk.sessions.in_memory_session_service", "InMemorySessionService"),
+    "genai_types": ("google.genai.types", None),
+    "RunConfig": ("google.adk.agents.run_config", "RunConfig"),
+    "StreamingMode": ("google.adk.agents.run_config", "StreamingMode"),
+}
+
+
+def _lazy_import(name: str):
+    module_name, attribute = _LAZY_IMPORTS[name]
+    value = importlib.import_module(module_name)
+    if attribute:
+        value = getattr(value, attribute)
+    globals()[name] = value
+    return value
+
+
+def __getattr__(name: str):
+    if name in _LAZY_IMPORTS:
+        return _lazy_import(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 # --- Path Resolution ---
@@ -188,6 +221,8 @@ def run_cli(
     session_service=None,
     memory_service=None,
     initial_instruction=None,
+    stream=False,
+    profiler=None,
 ):
     """
     Run an agent in CLI mode with interactive capabilities.
@@ -203,13 +238,17 @@ def run_cli(
         session_service: Service for session management (creates InMemorySessionService if None)
         memory_service: Service for memory management (creates InMemorySessionService if None)
         initial_instruction: Initial instruction to give the agent (if None, will prompt for it)
+        stream: Whether to ask the model to stream its responses and render them as they arrive
+        profiler: Optional turn profiler (see code_agent.telemetry.profiling) wrapped around each turn
     """
     # Suppress specific loggers that generate noise
     logging.getLogger("google.adk.tools.function_parameter_parse_util").setLevel(logging.ERROR)
     logging.getLogger("google_genai.types").setLevel(logging.ERROR)
 
-    # Import Runner here to avoid circular dependency if utils is imported by runner's module
-    # from google.adk.runners import Runner # Removed local import
+    # Load ADK/genai unless already loaded (or patched)
+    for name in _LAZY_IMPORTS:
+        if name not in globals():
+            _lazy_import(name)
 
     # Set up rich console for better output
     console = Console()
@@ -220,7 +259,13 @@ def run_cli(
         session_service = InMemorySessionService()
 
     # Create a Runner instance
-    runner = Runner(session_service=session_service, app_name=app_name, agent=agent, memory_service=memory_service)
+    runner = Runner(session_service=session_service, app_name=app_name, agent=agent, artifact_service=artifact_service, memory_service=memory_service)
+
+    # The whole run (initial instruction and interactive turns) shares one event loop,
+    # so model clients keep their connections and background tasks keep running
+    session_loop: Optional[asyncio.AbstractEventLoop] = None
+    # Future for the prompt currently waiting on stdin, if any
+    pending_input: Optional[asyncio.Future] = None
 
     # Set up interrupt handling
     interrupted = False
@@ -230,6 +275,9 @@ def run_cli(
         nonlocal interrupted
         interrupted = True
         console.print("\n[bold yellow]Interrupt signal received. Exiting gracefully...")
+        # Stop waiting for input; the reader thread is a daemon and is left behind
+        if pending_input is not None and session_loop is not None:
+            session_loop.call_soon_threadsafe(pending_input.cancel)
         # Don't re-raise in interactive mode immediately, let the loop handle it
         if not interactive:
             # Restore handler and re-raise for non-interactive cleanup
@@ -239,6 +287,39 @@ def run_cli(
 
     signal.signal(signal.SIGINT, sigint_handler)
 
+    async def prompt_async(prompt: str) -> str:
+        """Reads a line with Prompt.ask on a daemon thread, keeping the event loop free."""
+        nonlocal pending_input
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def deliver(result=None, error=None):
+            if future.done():
+                return
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+        def read():
+            try:
+                result = Prompt.ask(prompt)
+            except BaseException as e:  # KeyboardInterrupt/EOFError belong to the awaiting coroutine
+                outcome = (None, e)
+            else:
+                outcome = (result, None)
+            try:
+                loop.call_soon_threadsafe(deliver, *outcome)
+            except RuntimeError:
+                pass  # A prompt abandoned on interrupt can outlive the session loop
+
+        pending_input = future
+        threading.Thread(target=read, name="run-cli-input", daemon=True).start()
+        try:
+            return await future
+        finally:
+            pending_input = None
+
     # Process a single message through the agent asynchronously
     async def process_message_async(current_session_id, user_input, show_events=True):
         """Process a single message through the agent asynchronously and display results."""
@@ -248,7 +329,11 @@ def run_cli(
             return None, False
 
         try:
-            with thinking_indicator(console, "Processing..."):  # Pass console
+            with (
+                thinking_indicator(console, "Processing..."),
+                span("code_agent.turn", app_name=app_name, user_id=user_id) as turn_span,
+                profiler.turn() if profiler is not None else nullcontext(),
+            ):
                 # Prepare the input message content
                 message_content = genai_types.Content(role="user", parts=[genai_types.Part(text=user_input)])
 
@@ -257,16 +342,24 @@ def run_cli(
                     session = session_service.create_session(app_name=app_name, user_id=user_id)
                     current_session_id = session.id
                     step_progress(console, f"[dim]Created new session: {current_session_id}[/dim]")  # Pass console
+                if turn_span is not None:
+                    turn_span.set_attribute("session_id", current_session_id)
 
                 # Run the agent asynchronously
+                run_kwargs = {}
+                if stream:
+                    run_kwargs["run_config"] = RunConfig(streaming_mode=StreamingMode.SSE)
                 event_async_generator = runner.run_async(
                     user_id=user_id,
                     session_id=current_session_id,
                     new_message=message_content,
+                    **run_kwargs,
                 )
 
                 final_response_event = None
                 last_content = ""
+                # Renders partial text chunks of the agent message being streamed
+                stream_renderer: Optional[StreamRenderer] = None
 
                 # Process events
                 try:
@@ -362,6 +455,12 @@ def run_cli(
                         #         meta_str = ", ".join(meta_info)
                         #         console.print(f"{timestamp_str}[dim]{event_icon} Event metadata: {meta_str}[/dim]")
 
+                        is_agent_text = (author == "assistant" or author == agent.name) and content_text and event_type in ["complete_text", "streaming_text"]
+
+                        # Close the streamed message before anything else is shown
+                        if stream_renderer is not None and stream_renderer.active and not is_agent_text:
+                            last_content = stream_renderer.finish()
+
                         # Display event based on type
                         if show_events:
                             # User messages
@@ -369,15 +468,18 @@ def run_cli(
                                 console.print(f"{timestamp_str}[bold blue]👦🏻User:[/bold blue] {content_text}")
 
                             # Agent text responses
-                            elif (author == "assistant" or author == agent.name) and content_text and event_type in ["complete_text", "streaming_text"]:
-                                prefix = f"{timestamp_str}[bold yellow]🤖Agent"
+                            elif is_agent_text:
                                 if is_partial:
-                                    prefix += " [dim](streaming)[/dim]"
-                                prefix += ":[/bold yellow]"
-
-                                # Only print prefix once for streaming chunks with same content
-                                if content_text != last_content:
-                                    console.print(prefix)
+                                    # Partial events carry the next chunk of the message
+                                    if stream_renderer is None or not stream_renderer.active:
+                                        stream_renderer = StreamRenderer(console, header=f"{timestamp_str}[bold yellow]🤖Agent:[/bold yellow]")
+                                    stream_renderer.append(content_text)
+                                elif stream_renderer is not None and stream_renderer.active:
+                                    # The complete event repeats the whole streamed message
+                                    last_content = stream_renderer.finish(content_text)
+                                # Only print once for complete events with the same content
+                                elif content_text != last_content:
+                                    console.print(f"{timestamp_str}[bold yellow]🤖Agent:[/bold yellow]")
                                     console.print(Markdown(content_text))
                                     last_content = content_text
 
@@ -457,6 +559,9 @@ def run_cli(
                     operation_error(console, f"Error processing event: {e}")  # Pass console, clarify scope
                     # Log the full traceback for debugging
                     logging.exception("Error during event processing loop")
+                finally:
+                    if stream_renderer is not None and stream_renderer.active:
+                        last_content = stream_renderer.finish()
 
                 # Display final response separately if needed and wasn't already shown
                 if not interrupted and final_response_event:
@@ -496,8 +601,8 @@ def run_cli(
         current_session_id = initial_session_id
         while not interrupted:
             try:
-                # Use rich.prompt for better handling of Ctrl+C within the prompt
-                user_input = Prompt.ask("[bold cyan]You[/bold cyan]")
+                # Read stdin off the loop so background tasks keep running while the user types
+                user_input = await prompt_async("[bold cyan]You[/bold cyan]")
 
                 if user_input.lower() in ["exit", "quit"]:
                     console.print("[bold green]Exiting conversation mode.[/bold green]")
@@ -525,13 +630,59 @@ def run_cli(
                     # This case shouldn't happen if process_message_async always returns an ID
                     operation_warning(console, "Process message returned success but no session ID.")
 
-            except (KeyboardInterrupt, EOFError):  # Catch EOFError for cases like pipe closure
+            except (KeyboardInterrupt, EOFError, asyncio.CancelledError):  # EOFError for pipe closure, CancelledError for Ctrl+C
                 console.print("\n[bold yellow]Exiting conversation mode.[/bold yellow]")
                 interrupted = True  # Set interrupt flag
                 break  # Exit the loop cleanly
 
         return current_session_id
 
+    async def run_session_async(current_session_id, instruction):
+        """Processes the initial instruction and any interactive turns on a single event loop."""
+        nonlocal session_loop
+        session_loop = asyncio.get_running_loop()
+        try:
+            # Process the initial instruction only if it's not empty
+            if instruction:
+                session_id_result, success = await process_message_async(current_session_id, instruction)
+
+                # Check for interruption or failure
+                if interrupted:
+                    console.print("[bold yellow]Initial processing interrupted.[/bold yellow]")
+                elif not success:
+                    operation_error(console, "Initial instruction failed to process.")
+                    # Decide if we should exit or allow interactive mode attempt
+                    if not interactive:
+                        raise typer.Exit(code=1)
+                    else:
+                        operation_warning(console, "Attempting to enter interactive mode despite initial failure.")
+                        # We might want to reset session_id_result here
+                        session_id_result = current_session_id  # Keep original or reset?
+
+                # Update session ID from the result if successful
+                if success and session_id_result:
+                    current_session_id = session_id_result
+
+                # Continue with interactive mode if requested AND initial step didn't fail/wasn't interrupted
+                if interactive and (interrupted or not success):
+                    console.print("[yellow]Skipping interactive mode due to interruption or initial failure.[/yellow]")
+                    return current_session_id
+
+            if interactive and not interrupted:
+                # Run interactive mode starting with the session ID from the initial step
+                final_session_id = await run_interactively_async(current_session_id)
+                # Update the main session ID if the interactive part returned one
+                if final_session_id:
+                    current_session_id = final_session_id
+            return current_session_id
+        finally:
+            # Background commands and persistent shells end with the session; they cannot outlive its event loop
+            stopped_jobs = await get_job_manager().close_all()
+            if stopped_jobs:
+                console.print(f"[dim]Stopped {stopped_jobs} background job(s).[/dim]")
+            await get_shell_pool().close_all()
+            session_loop = None
+
     # Main execution logic for run_cli
     current_session_id = session_id
     try:
@@ -544,11 +695,7 @@ def run_cli(
             if interactive:
                 console.print("[yellow]Starting in interactive mode without an initial instruction.[/yellow]")
                 # Directly jump to interactive loop without initial processing
-                final_session_id = asyncio.run(run_interactively_async(current_session_id))
-                if final_session_id:
-                    current_session_id = final_session_id
-                # Skip the rest of the initial processing block
-                instruction = ""  # Set instruction to empty to avoid processing it later
+                instruction = ""
             else:
                 # Not interactive, needs an instruction
                 instruction = Prompt.ask("[bold cyan]You (Initial Instruction)[/bold cyan]")
@@ -559,37 +706,10 @@ def run_cli(
         else:
             console.print(f"[bold cyan]User (Initial Instruction):[/bold cyan] {instruction}")
 
-        # Process the initial instruction only if it's not empty
-        if instruction:
-            # Run the initial processing using asyncio.run
-            session_id_result, success = asyncio.run(process_message_async(current_session_id, instruction))
-
-            # Check for interruption or failure
-            if interrupted:
-                console.print("[bold yellow]Initial processing interrupted.[/bold yellow]")
-            elif not success:
-                operation_error(console, "Initial instruction failed to process.")
-                # Decide if we should exit or allow interactive mode attempt
-                if not interactive:
-                    raise typer.Exit(code=1)
-                else:
-                    operation_warning(console, "Attempting to enter interactive mode despite initial failure.")
-                    # We might want to reset session_id_result here
-                    session_id_result = current_session_id  # Keep original or reset?
-
-            # Update session ID from the result if successful
-            if success and session_id_result:
-                current_session_id = session_id_result
-
-            # Continue with interactive mode if requested AND initial step didn't fail/wasn't interrupted
-            if interactive and not interrupted and success:
-                # Run interactive mode starting with the session ID from the initial step
-                final_session_id = asyncio.run(run_interactively_async(current_session_id))
-                # Update the main session ID if the interactive part returned one
-                if final_session_id:
-                    current_session_id = final_session_id
-            elif interactive and (interrupted or not success):
-                console.print("[yellow]Skipping interactive mode due to interruption or initial failure.[/yellow]")
+        if instruction or interactive:
+            final_session_id = asyncio.run(run_session_async(current_session_id, instruction))
+            if final_session_id:
+                current_session_id = final_session_id
 
     except (Exception, typer.Exit) as e:  # Catch typer.Exit as well
         if not interrupted:  # Avoid double logging if interrupted
@@ -60,6 +60,7 @@ def initialize_config(
             cli_auto_approve_native_commands=cli_auto_approve_native_commands,
             cli_log_level=cli_log_level,
             cli_verbose=cli_verbose,
+            use_cache=True,
         )
         if validate:
             # Call the validation method on the final CodeAgentSettings object
@@ -4,10 +4,14 @@ This module provides a settings-based configuration system for the code-agent.
 It uses pydantic-settings to handle environment variables and configuration files.
 """
 
+import hashlib
 import logging
+import os
+import pickle
 import shutil
+import tempfile
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Literal, Optional, Tuple
 
 import yaml
 from pydantic import BaseModel, Field, ValidationError, field_validator
@@ -15,6 +19,9 @@ from pydantic_settings import BaseSettings, SettingsConfigDict
 from rich import print as rich_print
 from typing_extensions import Annotated
 
+from code_agent.telemetry import traced
+from code_agent.version import __version__
+
 logger = logging.getLogger(__name__)  # Ensure logger is defined at module level
 
 # Define the default config path
@@ -104,6 +111,169 @@ class NativeCommandSettings(BaseModel):
         default=None,
         description="Default working directory for native commands (None means current directory)",
     )
+    output_head_bytes: int = Field(
+        default=16 * 1024,
+        ge=0,
+        description="Bytes kept from the start of each output stream of a command",
+    )
+    output_tail_bytes: int = Field(
+        default=16 * 1024,
+        ge=0,
+        description="Bytes kept from the end of each output stream of a command",
+    )
+    max_output_bytes: Optional[int] = Field(
+        default=100 * 1024 * 1024,
+        gt=0,
+        description="Output size after which a command is stopped (None means no limit)",
+    )
+    spill_output: bool = Field(
+        default=True,
+        description="Write the full output of commands that exceed the kept bytes to a temporary file",
+    )
+    echo_output: bool = Field(
+        default=True,
+        description="Show command output in the terminal while the command runs",
+    )
+    persistent_shell: bool = Field(
+        default=False,
+        description="Run commands in one long-lived bash per session, so cd and exported variables carry over between commands",
+    )
+    shell_idle_timeout: Optional[float] = Field(
+        default=1800.0,
+        gt=0,
+        description="Seconds a persistent shell may go unused before it is stopped (None keeps it until its session ends)",
+    )
+    cache_read_only_commands: bool = Field(
+        default=True,
+        description="Reuse the output of read-only commands (git status, ls, ...) until the workspace changes",
+    )
+    command_cache_entries: int = Field(
+        default=128,
+        ge=1,
+        description="Read-only command results kept in the cache",
+    )
+    command_cache_verify_seconds: float = Field(
+        default=1.0,
+        ge=0,
+        description="Seconds after which a cached result is checked against the working directory's file times again",
+    )
+    max_background_jobs: int = Field(
+        default=4,
+        ge=1,
+        description="Background commands that may run at the same time in one session",
+    )
+    background_output_bytes: int = Field(
+        default=1024 * 1024,
+        gt=0,
+        description="Bytes of recent output kept in memory for each background command",
+    )
+
+
+class ArtifactSettings(BaseModel):
+    """Settings for artifact storage used by the 'run' command."""
+
+    storage: Literal["memory", "filesystem"] = Field(
+        default="memory",
+        description="Artifact storage backend: 'memory' (discarded on exit) or 'filesystem' (persisted, deduplicated)",
+    )
+    artifacts_dir: Optional[Path] = Field(
+        default=None,
+        description="Directory for filesystem artifact storage (None means '<sessions_dir>/artifacts')",
+    )
+
+
+class ServerSettings(BaseModel):
+    """Settings for the long-running 'serve' daemon and the 'run --server' client."""
+
+    address: Optional[str] = Field(
+        default=None,
+        description="Unix socket path or loopback 'host:port' to listen on (None means '<config dir>/agent.sock')",
+    )
+    max_concurrency: int = Field(
+        default=4,
+        ge=1,
+        description="Maximum number of agent turns the daemon runs at the same time",
+    )
+    session_idle_timeout: Optional[float] = Field(
+        default=3600.0,
+        gt=0,
+        description="Seconds a daemon session may go without a turn before its background jobs and shell are stopped (None keeps them until it is closed)",
+    )
+
+
+class ReplaySettings(BaseModel):
+    """Settings for the offline 'replay' provider."""
+
+    latency: float = Field(
+        default=0.0,
+        ge=0.0,
+        description="Seconds to wait before each replayed model response",
+    )
+    tokens_per_second: float = Field(
+        default=0.0,
+        ge=0.0,
+        description="Pace of replayed text, streamed word by word when streaming (0 means no delay)",
+    )
+
+
+class ResponseCacheSettings(BaseModel):
+    """Settings for the on-disk model response cache."""
+
+    enabled: bool = Field(
+        default=False,
+        description="Serve repeated model requests from the cache instead of calling the model",
+    )
+    cache_dir: Optional[Path] = Field(
+        default=None,
+        description="Directory for cached responses (None means '~/.cache/code-agent/responses')",
+    )
+    ttl_seconds: Optional[int] = Field(
+        default=7 * 24 * 3600,
+        gt=0,
+        description="Seconds a cached response stays valid (None means it never expires)",
+    )
+    max_size_mb: float = Field(
+        default=256.0,
+        gt=0.0,
+        description="Size cap of the cache; least recently used responses are evicted beyond it",
+    )
+    deterministic_only: bool = Field(
+        default=True,
+        description="Only cache requests sent with temperature 0",
+    )
+
+
+class ContextWindowSettings(BaseModel):
+    """Settings for fitting model requests to a token budget."""
+
+    enabled: bool = Field(
+        default=False,
+        description="Trim the history sent with each model call once it exceeds 'max_tokens' (session storage keeps it all)",
+    )
+    max_tokens: int = Field(
+        default=100_000,
+        gt=0,
+        description="Approximate token budget for the history sent with each model call",
+    )
+    keep_recent_turns: int = Field(
+        default=4,
+        ge=1,
+        description="Number of most recent turns always sent verbatim",
+    )
+    tool_output_max_tokens: int = Field(
+        default=1_000,
+        gt=0,
+        description="Tool outputs of older turns above this size are cut to head and tail excerpts",
+    )
+    summarize_dropped: bool = Field(
+        default=True,
+        description="List the requests of dropped turns in a short note instead of only noting the omission",
+    )
+    keep_recent_tool_outputs: int = Field(
+        default=5,
+        ge=0,
+        description="When the recent turns alone exceed the budget, tool outputs in them are shrunk too, except this many of the latest",
+    )
 
 
 class LLMSettings(BaseModel):
@@ -142,6 +312,11 @@ class CodeAgentSettings(BaseSettings):
     security: SecuritySettings = Field(default_factory=SecuritySettings, description="Security-related settings.")
     file_operations: FileOperationsSettings = Field(default_factory=FileOperationsSettings, description="Settings for file operations.")
     native_commands: NativeCommandSettings = Field(default_factory=NativeCommandSettings, description="Settings for native command execution.")
+    artifacts: ArtifactSettings = Field(default_factory=ArtifactSettings, description="Settings for artifact storage.")
+    server: ServerSettings = Field(default_factory=ServerSettings, description="Settings for the 'serve' daemon.")
+    replay: ReplaySettings = Field(default_factory=ReplaySettings, description="Settings for the 'replay' provider.")
+    response_cache: ResponseCacheSettings = Field(default_factory=ResponseCacheSettings, description="Settings for the model response cache.")
+    context_window: ContextWindowSettings = Field(default_factory=ContextWindowSettings, description="Settings for the model context window.")
     auto_approve_edits: bool = Field(False, description="Automatically approve file edit operations.")
     auto_approve_native_commands: bool = Field(False, description="Automatically approve native command execution.")
     native_command_allowlist: List[str] = Field(default_factory=list, description="List of native commands allowed without confirmation.")
@@ -184,9 +359,126 @@ class CodeAgentSettings(BaseSettings):
 
 # --- Configuration Loading Logic ---
 
-_config: Optional[CodeAgentSettings] = None
+# Compiled (defaults + env + YAML) settings are pickled here and reused while the
+# config file, CODE_AGENT_* environment variables and package version are unchanged.
+CONFIG_CACHE_PATH = DEFAULT_CONFIG_DIR / "cache" / "settings.pickle"
+# Set to a non-empty value to always rebuild the config from its sources
+NO_CONFIG_CACHE_ENV_VAR = "CODE_AGENT_NO_CONFIG_CACHE"
+
+# In-process copy of the last compiled base settings: (fingerprint, settings)
+_base_settings_cache: Optional[Tuple[str, CodeAgentSettings]] = None
+
+
+def config_fingerprint(config_file_path: Path) -> str:
+    """Returns a key that changes whenever the inputs to the base settings change.
+
+    Covers the config file (path, mtime and size), every CODE_AGENT_* environment
+    variable, the package version and this module (which defines the schema).
+    """
+    hasher = hashlib.sha256()
+    hasher.update(f"{__version__}\0{Path(__file__).stat().st_mtime_ns}\0{config_file_path}\0".encode())
+    try:
+        file_stat = config_file_path.stat()
+        hasher.update(f"{file_stat.st_mtime_ns}:{file_stat.st_size}\0".encode())
+    except OSError:
+        hasher.update(b"missing\0")
+    env_prefix = CodeAgentSettings.model_config["env_prefix"].upper()
+    for name, value in sorted(os.environ.items()):
+        upper_name = name.upper()
+        if upper_name.startswith(env_prefix) and upper_name != NO_CONFIG_CACHE_ENV_VAR:
+            hasher.update(f"{upper_name}={value}\0".encode())
+    return hasher.hexdigest()
+
+
+@traced("code_agent.config.compile")
+def _compile_base_settings(config_file_path: Path) -> Tuple[CodeAgentSettings, bool]:
+    """Validates defaults, environment variables and the YAML file in a single pass.
+
+    File values are passed as init arguments, which pydantic-settings deep-merges
+    over the environment, so YAML takes precedence over env vars.
+
+    Returns:
+        The settings, and whether they are valid as configured rather than a fallback
+        to the defaults after a validation error
+    """
+    file_values = load_config_from_file(config_file_path)
+    try:
+        return CodeAgentSettings(**file_values), True
+    except ValidationError as e:
+        logger.error(f"Error validating merged settings from file ({config_file_path}): {e}")
+
+    try:
+        return CodeAgentSettings(), False
+    except ValidationError as e:
+        logger.error(f"Error loading base settings or environment variables: {e}")
+        return CodeAgentSettings.model_construct(), False
 
 
+def _read_cached_settings(fingerprint: str) -> Optional[CodeAgentSettings]:
+    try:
+        # Unpickling runs code from the file, so this relies on the cache being written only by
+        # _write_cached_settings, in the user's own config directory that other users cannot write to
+        with open(CONFIG_CACHE_PATH, "rb") as f:
+            cached_fingerprint, settings = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.debug(f"Ignoring unreadable config cache {CONFIG_CACHE_PATH}: {e}")
+        return None
+    if cached_fingerprint != fingerprint or not isinstance(settings, CodeAgentSettings):
+        return None
+    return settings
+
+
+def _write_cached_settings(fingerprint: str, settings: CodeAgentSettings) -> None:
+    try:
+        CONFIG_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=CONFIG_CACHE_PATH.parent, prefix=".settings-", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump((fingerprint, settings), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, CONFIG_CACHE_PATH)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+    except Exception as e:
+        logger.debug(f"Could not write config cache {CONFIG_CACHE_PATH}: {e}")
+
+
+def _load_base_settings(config_file_path: Path, use_cache: bool) -> CodeAgentSettings:
+    """Returns a private copy of the compiled base settings, using the caches if allowed."""
+    global _base_settings_cache
+    if not use_cache or os.environ.get(NO_CONFIG_CACHE_ENV_VAR):
+        return _compile_base_settings(config_file_path)[0]
+
+    fingerprint = config_fingerprint(config_file_path)
+    if _base_settings_cache is not None and _base_settings_cache[0] == fingerprint:
+        return _base_settings_cache[1].model_copy(deep=True)
+
+    settings = _read_cached_settings(fingerprint)
+    if settings is None:
+        settings, valid = _compile_base_settings(config_file_path)
+        if not valid:
+            # Caching the fallback would hide the validation error from every later run
+            return settings
+        # Loading may have created the file from the template, so fingerprint again
+        fingerprint = config_fingerprint(config_file_path)
+        _write_cached_settings(fingerprint, settings)
+        logger.debug("Compiled configuration and refreshed the config cache.")
+    else:
+        logger.debug("Loaded compiled configuration from the config cache.")
+    _base_settings_cache = (fingerprint, settings)
+    return settings.model_copy(deep=True)
+
+
+def clear_config_cache() -> None:
+    """Drops the in-process and on-disk compiled config caches."""
+    global _base_settings_cache
+    _base_settings_cache = None
+    CONFIG_CACHE_PATH.unlink(missing_ok=True)
+
+
+@traced("code_agent.config.build")
 def build_effective_config(
     config_file_path: Path = DEFAULT_CONFIG_PATH,
     cli_provider: Optional[str] = None,
@@ -196,6 +488,7 @@ def build_effective_config(
     cli_auto_approve_native_commands: Optional[bool] = None,
     cli_log_level: Optional[str] = None,
     cli_verbose: Optional[bool] = None,
+    use_cache: bool = False,
 ) -> CodeAgentSettings:
     """
     Builds the effective configuration by layering sources:
@@ -203,51 +496,14 @@ def build_effective_config(
     2. Values from environment variables (handled by BaseSettings).
     3. Values from the YAML configuration file.
     4. Values from CLI arguments.
-    """
-
-    # 1 & 2: Load settings from defaults and environment variables
-    try:
-        # Pydantic-settings automatically loads from env vars based on model_config
-        settings = CodeAgentSettings(
-            # Pass config_file_path explicitly if needed by BaseSettings, though it usually handles it via env/defaults
-            # config_file_path=config_file_path
-        )
-    except ValidationError as e:
-        logger.error(f"Error loading base settings or environment variables: {e}")
-        # Depending on desired behavior, either exit or continue with defaults
-        settings = CodeAgentSettings()  # Fallback to pure defaults
 
-    # 3: Load settings from the specified YAML file
-    file_values = load_config_from_file(config_file_path)
-
-    # 4: Merge file values into the settings object (carefully)
-    # Pydantic models are immutable by default, so we create a new dict and then a new model instance
-    merged_data = settings.model_dump()  # Start with env/default values
-
-    # Custom deep update logic needed because model_dump doesn't perfectly handle nested BaseSettings
-    def deep_update(target: Dict, source: Dict) -> Dict:
-        for key, value in source.items():
-            if isinstance(value, dict) and isinstance(target.get(key), dict):
-                # Key exists in both and both values are dicts, recurse
-                deep_update(target[key], value)
-            # elif key in target: # REMOVE THIS CHECK - Allow adding/overwriting keys
-            else:
-                # Overwrite target key with source value (or add if not present)
-                target[key] = value
-            # else: ignore keys from file not present in the model (or handle as extra if configured)
-        return target
-
-    merged_data = deep_update(merged_data, file_values)
-
-    # Create settings instance incorporating file values over env/defaults
-    try:
-        settings = CodeAgentSettings(**merged_data)
-    except ValidationError as e:
-        logger.error(f"Error validating merged settings from file ({config_file_path}): {e}")
-        # Fallback or re-raise depending on desired strictness
-        # settings = CodeAgentSettings() # Or use the previous settings instance
+    Layers 1-3 are validated together in one pass. With use_cache=True that result
+    is reused from memory or from CONFIG_CACHE_PATH while its inputs are unchanged.
+    CLI values are then applied as validated assignments on a private copy.
+    """
+    settings = _load_base_settings(config_file_path, use_cache)
 
-    # 5: Apply CLI overrides (highest priority)
+    # Apply CLI overrides (highest priority)
     cli_overrides: Dict[str, Any] = {}
     if cli_provider is not None:
         cli_overrides["default_provider"] = cli_provider
@@ -268,12 +524,12 @@ def build_effective_config(
         # Only apply --verbose if --log-level wasn't given
         cli_overrides["verbosity"] = max(settings.verbosity, 2)  # Set to at least VERBOSE (2)
 
-    # Create the final settings object by applying CLI overrides
     if cli_overrides:
-        final_data = settings.model_dump()
-        final_data.update(cli_overrides)
+        # validate_assignment checks each field; apply to a copy so a bad value leaves settings intact
+        final_settings = settings.model_copy()
         try:
-            final_settings = CodeAgentSettings(**final_data)
+            for field_name, value in cli_overrides.items():
+                setattr(final_settings, field_name, value)
         except ValidationError as e:
             logger.error(f"Error validating settings after applying CLI overrides: {e}")
             # Fallback to settings before CLI overrides
@@ -281,7 +537,8 @@ def build_effective_config(
     else:
         final_settings = settings
 
-    logger.debug(f"Effective configuration loaded: {final_settings.model_dump()}")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"Effective configuration loaded: {final_settings.model_dump()}")
     return final_settings
 
 
@@ -346,36 +603,36 @@ def create_default_config_file(config_path: Path = DEFAULT_CONFIG_PATH) -> None:
         logger.error(f"Error creating default config file {config_path}: {e}")
 
 
+# The configuration singleton lives in code_agent.config.config; these helpers share it.
+
+
 def get_config() -> CodeAgentSettings:
     """Returns the current configuration settings, loading if necessary."""
-    global _config
-    if _config is None:
-        # logger.debug("Configuration not loaded, initializing...")
-        _config = build_effective_config()  # Load using default path
-        # logger.debug(f"Configuration loaded: {_config.model_dump()}")
-    # else:
-    # logger.debug("Returning cached configuration.")
-    return _config
+    from code_agent.config import config as config_module
+
+    if config_module._config is None:
+        config_module.initialize_config(validate=False)
+    return config_module.get_config()
 
 
 def initialize_config(**cli_args) -> CodeAgentSettings:
     """Loads or reloads the configuration using build_effective_config, applying CLI args."""
-    global _config
-    # logger.debug(f"Initializing/Reloading configuration with CLI args: {cli_args}")
+    from code_agent.config import config as config_module
+
     # Map relevant CLI args to build_effective_config parameters
-    build_args = {
-        "config_file_path": cli_args.get("config_file", DEFAULT_CONFIG_PATH),
-        "cli_provider": cli_args.get("provider"),
-        "cli_model": cli_args.get("model"),
-        "cli_agent_path": cli_args.get("agent_path"),
-        "cli_auto_approve_edits": cli_args.get("auto_approve_edits"),
-        "cli_auto_approve_native_commands": cli_args.get("auto_approve_native_commands"),
-        "cli_log_level": cli_args.get("log_level"),
-        "cli_verbose": cli_args.get("verbose"),
-    }
-    _config = build_effective_config(**build_args)
-    # logger.debug(f"Configuration initialized/reloaded: {_config.model_dump()}")
-    return _config
+    config_module.initialize_config(
+        config_file_path=cli_args.get("config_file", DEFAULT_CONFIG_PATH),
+        cli_provider=cli_args.get("provider"),
+        cli_model=cli_args.get("model"),
+        cli_agent_path=cli_args.get("agent_path"),
+        cli_auto_approve_edits=cli_args.get("auto_approve_edits"),
+        cli_auto_approve_native_commands=cli_args.get("auto_approve_native_commands"),
+        cli_log_level=cli_args.get("log_level"),
+        cli_verbose=cli_args.get("verbose"),
+        force_reinit=True,
+        validate=False,
+    )
+    return config_module.get_config()
 
 
 def get_api_key(provider_name: str) -> Optional[str]:
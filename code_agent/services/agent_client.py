@@ -0,0 +1,162 @@
+"""
+Client for the ``code-agent serve`` daemon.
+
+This module deliberately avoids importing ADK, genai or LiteLLM, so forwarding a
+request with ``code-agent run --server`` does not pay for imports the daemon already holds.
+"""
+
+import json
+import os
+import socket
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Tuple, Union
+
+from code_agent.config.settings_based_config import DEFAULT_CONFIG_DIR
+
+DEFAULT_SOCKET_PATH = DEFAULT_CONFIG_DIR / "agent.sock"
+# Directory holding the access token of each TCP daemon; unix sockets are protected by their permissions instead
+TOKEN_DIR = DEFAULT_CONFIG_DIR
+
+# The daemon executes tools with the privileges of the user that started it, so it
+# only ever listens on a private unix socket or on the loopback interface
+LOOPBACK_HOSTS = ("127.0.0.1", "localhost", "::1")
+
+# Message types that end the response to a request
+TERMINAL_MESSAGE_TYPES = ("done", "error", "pong", "session", "ok")
+
+
+def resolve_address(address: Optional[str]) -> str:
+    """Returns the configured daemon address, falling back to the default socket path."""
+    return address or str(DEFAULT_SOCKET_PATH)
+
+
+def parse_address(address: str) -> Tuple[str, Union[str, Tuple[str, int]]]:
+    """Parses a daemon address.
+
+    Args:
+        address: A unix socket path, or ``host:port`` on a loopback interface
+
+    Returns:
+        ``("unix", path)`` or ``("tcp", (host, port))``
+
+    Raises:
+        ValueError: If a TCP address does not point at a loopback interface
+    """
+    host, sep, port = address.rpartition(":")
+    if sep and port.isdigit() and "/" not in address:
+        host = host.strip("[]")
+        if host not in LOOPBACK_HOSTS:
+            raise ValueError(f"Refusing to use non-loopback address '{address}'. Use a unix socket or one of: {', '.join(LOOPBACK_HOSTS)}")
+        return "tcp", (host, int(port))
+    return "unix", str(Path(address).expanduser())
+
+
+def token_path(port: int) -> Path:
+    """Returns the file holding the access token of the TCP daemon listening on ``port``."""
+    return TOKEN_DIR / f"agent-{port}.token"
+
+
+def read_token(port: int) -> str:
+    """Reads the access token of the TCP daemon listening on ``port``.
+
+    Raises:
+        AgentServerUnavailableError: If the daemon has not written a token
+    """
+    try:
+        return token_path(port).read_text(encoding="utf-8").strip()
+    except OSError as e:
+        raise AgentServerUnavailableError(f"No access token for a code-agent daemon on port {port}: {e}") from e
+
+
+class AgentServerUnavailableError(ConnectionError):
+    """Raised when no daemon is listening on the configured address."""
+
+
+class AgentServerError(RuntimeError):
+    """Raised when the daemon reports an error for a request."""
+
+
+class AgentClient:
+    """Sends requests to a running agent daemon and yields its responses."""
+
+    def __init__(self, address: str, connect_timeout: float = 2.0):
+        """Initializes the client.
+
+        Args:
+            address: Unix socket path or loopback ``host:port`` of the daemon
+            connect_timeout: Seconds to wait when connecting; agent turns themselves are not time-limited
+        """
+        self.address = address
+        self.connect_timeout = connect_timeout
+
+    def _connect(self) -> socket.socket:
+        kind, target = parse_address(self.address)
+        try:
+            if kind == "unix":
+                sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                sock.settimeout(self.connect_timeout)
+                sock.connect(target)
+            else:
+                sock = socket.create_connection(target, timeout=self.connect_timeout)
+        except OSError as e:
+            raise AgentServerUnavailableError(f"No code-agent daemon is listening on {self.address}: {e}") from e
+        sock.settimeout(None)
+        return sock
+
+    def request(self, payload: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        """Sends one request and yields response messages until the terminal one.
+
+        Raises:
+            AgentServerUnavailableError: If the daemon cannot be reached
+            AgentServerError: If the daemon answers with an error message
+        """
+        kind, target = parse_address(self.address)
+        if kind == "tcp":
+            # Any local user can reach a loopback port, so TCP requests carry the token only the owner can read
+            payload = {**payload, "token": read_token(target[1])}
+        with self._connect() as sock, sock.makefile("rb") as stream:
+            sock.sendall(json.dumps(payload).encode("utf-8") + b"\n")
+            for line in stream:
+                message = json.loads(line)
+                if message.get("type") == "error":
+                    raise AgentServerError(message.get("message", "Unknown daemon error"))
+                yield message
+                if message.get("type") in TERMINAL_MESSAGE_TYPES:
+                    return
+        raise AgentServerError("The daemon closed the connection before finishing the request.")
+
+    def ping(self) -> Optional[Dict[str, Any]]:
+        """Returns the daemon status, or None if no daemon is reachable."""
+        try:
+            return next(self.request({"op": "ping"}))
+        except AgentServerUnavailableError:
+            return None
+
+    def run(self, instruction: str, agent_path: str, session_id: Optional[str] = None, user_id: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """Runs one agent turn on the daemon, yielding streamed events.
+
+        The last message yielded is ``{"type": "done", "session_id": ...}``.
+        """
+        payload = {
+            "op": "run",
+            "agent_path": agent_path,
+            "instruction": instruction,
+            "session_id": session_id,
+            "user_id": user_id,
+            "cwd": os.getcwd(),
+        }
+        return self.request(payload)
+
+    def get_session(self, session_id: str, user_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Returns the JSON form of a session held by the daemon, or None if unknown."""
+        return next(self.request({"op": "get_session", "session_id": session_id, "user_id": user_id})).get("session")
+
+    def close_session(self, session_id: str) -> None:
+        """Asks the daemon to stop the background jobs and persistent shell of a session."""
+        for _ in self.request({"op": "close_session", "session_id": session_id}):
+            pass
+
+    def shutdown(self) -> None:
+        """Asks the daemon to stop."""
+        for _ in self.request({"op": "shutdown"}):
+            pass
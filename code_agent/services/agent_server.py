@@ -0,0 +1,401 @@
+"""
+Long-running agent daemon used by ``code-agent serve``.
+
+The daemon keeps one warm ``Runner`` per agent path together with shared session,
+memory and artifact services, so repeated ``code-agent run --server`` invocations
+skip interpreter start-up, ADK/LiteLLM imports, config loading and agent import.
+
+Clients talk to it over a unix socket (or a loopback-only TCP port) using JSON
+lines: each request is one JSON object per line, and each response is a stream of
+JSON objects terminated by a message whose ``type`` is in
+``agent_client.TERMINAL_MESSAGE_TYPES``. The client side lives in ``agent_client``.
+
+Background jobs and the persistent shell of a session outlive the connection of
+the turn that started them, since the client opens one connection per request. They
+are stopped when the client closes the session (``run --server`` does so when it
+exits, as a local ``code-agent run`` does), when the session has had no turn for
+``session_idle_timeout`` seconds, or when the daemon stops.
+
+The unix socket is created owner-only. A TCP port is reachable by every local
+user, so TCP requests must also carry a ``"token"``: the one the daemon writes to
+an owner-only file at ``agent_client.token_path(port)``.
+
+Requests::
+
+    {"op": "ping"}
+    {"op": "run", "agent_path": "...", "instruction": "...", "session_id": null, "cwd": "..."}
+    {"op": "get_session", "session_id": "..."}
+    {"op": "close_session", "session_id": "..."}
+    {"op": "shutdown"}
+"""
+
+import asyncio
+import contextlib
+import hmac
+import json
+import logging
+import os
+import secrets
+import socket
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from google.adk.runners import Runner
+from google.genai import types as genai_types
+
+from code_agent.services.agent_client import parse_address, token_path
+from code_agent.tools.background_jobs import get_job_manager
+from code_agent.tools.shell_session import get_shell_pool
+
+logger = logging.getLogger(__name__)
+
+# Upper bound for a single JSON line (instructions can include pasted files)
+MAX_LINE_BYTES = 8 * 1024 * 1024
+
+SendFn = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+def event_to_message(event: Any) -> Dict[str, Any]:
+    """Converts an ADK event into the JSON message streamed to clients."""
+    parts = event.content.parts if event.content and event.content.parts else []
+    return {
+        "type": "event",
+        "author": event.author,
+        "text": " ".join(p.text for p in parts if p.text),
+        "partial": bool(event.partial),
+        "final": event.is_final_response(),
+        "tool_calls": [{"name": call.name, "args": call.args} for call in event.get_function_calls()],
+        "error": event.error_message or event.error_code,
+    }
+
+
+def _write_token(path: Path) -> str:
+    """Writes a new random access token to an owner-only file at ``path`` and returns it."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with contextlib.suppress(FileNotFoundError):
+        path.unlink()
+    token = secrets.token_urlsafe(32)
+    # O_EXCL: never reuse a file someone else created with looser permissions
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(token)
+    return token
+
+
+def _unix_socket_in_use(path: str) -> bool:
+    """Returns True if another process is accepting connections on the socket at ``path``."""
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.settimeout(0.5)
+        probe.connect(path)
+        return True
+    except OSError:
+        return False
+    finally:
+        probe.close()
+
+
+class AgentServer:
+    """Serves agent turns for many clients from a single warm process.
+
+    Runners are created lazily, once per resolved agent path, and share the session,
+    memory and artifact services passed in. At most ``max_concurrency`` turns run at
+    the same time; turns for the same session are serialized so its history stays
+    consistent.
+    """
+
+    def __init__(
+        self,
+        *,
+        agent_loader: Callable[[Path], Any],
+        session_service: Any,
+        memory_service: Any,
+        artifact_service: Any,
+        app_name: str,
+        user_id: str,
+        max_concurrency: int = 4,
+        workspace: Optional[Path] = None,
+        session_idle_timeout: Optional[float] = None,
+    ):
+        """Initializes the server.
+
+        Args:
+            agent_loader: Callable returning the root agent for an agent path
+            session_service: Session service shared by every runner
+            memory_service: Memory service shared by every runner
+            artifact_service: Artifact service shared by every runner
+            app_name: Application name used for sessions
+            user_id: Default user ID for requests that do not send one
+            max_concurrency: Maximum number of agent turns executing at once
+            workspace: Directory tools operate in; defaults to the current directory
+            session_idle_timeout: Seconds a session may go without a turn before its background jobs
+                and persistent shell are stopped; None keeps them until the session is closed
+        """
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1.")
+
+        self.agent_loader = agent_loader
+        self.session_service = session_service
+        self.memory_service = memory_service
+        self.artifact_service = artifact_service
+        self.app_name = app_name
+        self.user_id = user_id
+        self.max_concurrency = max_concurrency
+        self.workspace = Path(workspace or os.getcwd()).resolve()
+        self.session_idle_timeout = session_idle_timeout
+
+        self._runners: Dict[str, Runner] = {}
+        self._runner_lock = asyncio.Lock()
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        # Per-session locks plus the number of requests holding or waiting on each
+        self._session_locks: Dict[str, asyncio.Lock] = {}
+        self._session_lock_users: Dict[str, int] = {}
+        # When each session last finished a turn, for closing idle ones
+        self._session_last_used: Dict[str, float] = {}
+        self._shutdown = asyncio.Event()
+        # Set while listening on TCP; requests must then present it
+        self._token: Optional[str] = None
+        self.active_turns = 0
+
+    # --- Runners --- #
+
+    async def get_runner(self, agent_path: str) -> Runner:
+        """Returns the warm runner for ``agent_path``, loading the agent on first use."""
+        key = str(Path(agent_path).expanduser().resolve())
+        runner = self._runners.get(key)
+        if runner is not None:
+            return runner
+
+        async with self._runner_lock:
+            runner = self._runners.get(key)
+            if runner is None:
+                logger.info(f"Loading agent from {key}")
+                # Importing an agent can take seconds; keep serving other connections meanwhile
+                agent = await asyncio.to_thread(self.agent_loader, Path(key))
+                runner = Runner(
+                    app_name=self.app_name,
+                    agent=agent,
+                    artifact_service=self.artifact_service,
+                    session_service=self.session_service,
+                    memory_service=self.memory_service,
+                )
+                self._runners[key] = runner
+        return runner
+
+    @contextlib.asynccontextmanager
+    async def _session_lock(self, session_id: str):
+        lock = self._session_locks.setdefault(session_id, asyncio.Lock())
+        self._session_lock_users[session_id] = self._session_lock_users.get(session_id, 0) + 1
+        try:
+            async with lock:
+                yield
+        finally:
+            self._session_lock_users[session_id] -= 1
+            if not self._session_lock_users[session_id]:
+                del self._session_lock_users[session_id]
+                del self._session_locks[session_id]
+
+    async def close_session(self, session_id: str) -> None:
+        """Stops the background jobs and the persistent shell the session's turns started."""
+        self._session_last_used.pop(session_id, None)
+        await get_shell_pool().close_session(session_id)
+        stopped_jobs = await get_job_manager().close_session(session_id)
+        if stopped_jobs:
+            logger.info(f"Stopped {stopped_jobs} background job(s) of session {session_id}")
+
+    async def close_idle_sessions(self) -> int:
+        """Closes the sessions that have had no turn for ``session_idle_timeout`` seconds and returns how many."""
+        if self.session_idle_timeout is None:
+            return 0
+        cutoff = time.monotonic() - self.session_idle_timeout
+        idle = [session_id for session_id, last_used in self._session_last_used.items() if last_used <= cutoff and session_id not in self._session_lock_users]
+        for session_id in idle:
+            await self.close_session(session_id)
+        return len(idle)
+
+    async def _close_idle_sessions_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.session_idle_timeout / 2)
+            await self.close_idle_sessions()
+
+    # --- Request handlers --- #
+
+    async def run_turn(self, request: Dict[str, Any], send: SendFn) -> None:
+        """Runs one agent turn and streams its events through ``send``.
+
+        Args:
+            request: The decoded ``run`` request
+            send: Sends one response message to the client
+        """
+        instruction = request.get("instruction")
+        agent_path = request.get("agent_path")
+        if not isinstance(instruction, str) or not instruction:
+            raise ValueError("'instruction' must be a non-empty string.")
+        if not isinstance(agent_path, str) or not agent_path:
+            raise ValueError("'agent_path' must be a non-empty string.")
+
+        cwd = request.get("cwd")
+        if cwd and Path(cwd).resolve() != self.workspace:
+            raise ValueError(f"This daemon serves the workspace {self.workspace}; start a separate daemon for {cwd}.")
+
+        user_id = request.get("user_id") or self.user_id
+        session_id = request.get("session_id")
+        runner = await self.get_runner(agent_path)
+        if not session_id:
+            session_id = self.session_service.create_session(app_name=self.app_name, user_id=user_id).id
+            await send({"type": "session_created", "session_id": session_id})
+
+        message = genai_types.Content(role="user", parts=[genai_types.Part(text=instruction)])
+        # Wait for the session before taking a concurrency slot so queued turns for a busy session do not block others
+        async with self._session_lock(session_id), self._semaphore:
+            self.active_turns += 1
+            try:
+                async for event in runner.run_async(user_id=user_id, session_id=session_id, new_message=message):
+                    await send(event_to_message(event))
+            finally:
+                self.active_turns -= 1
+                self._session_last_used[session_id] = time.monotonic()
+
+        await send({"type": "done", "session_id": session_id})
+
+    async def dispatch(self, request: Dict[str, Any], send: SendFn) -> None:
+        """Handles a single decoded request."""
+        op = request.get("op")
+        try:
+            if op == "ping":
+                await send(
+                    {
+                        "type": "pong",
+                        "pid": os.getpid(),
+                        "workspace": str(self.workspace),
+                        "agents": sorted(self._runners),
+                        "active_turns": self.active_turns,
+                        "max_concurrency": self.max_concurrency,
+                    }
+                )
+            elif op == "run":
+                await self.run_turn(request, send)
+            elif op == "get_session":
+                session = self.session_service.get_session(
+                    app_name=self.app_name, user_id=request.get("user_id") or self.user_id, session_id=request.get("session_id")
+                )
+                await send({"type": "session", "session": session.model_dump(mode="json") if session else None})
+            elif op == "close_session":
+                session_id = request.get("session_id")
+                if not isinstance(session_id, str) or not session_id:
+                    raise ValueError("'session_id' must be a non-empty string.")
+                # Waits for the session's running turn, so its tools are not stopped mid-call
+                async with self._session_lock(session_id):
+                    await self.close_session(session_id)
+                await send({"type": "ok"})
+            elif op == "shutdown":
+                await send({"type": "ok"})
+                self.request_shutdown()
+            else:
+                await send({"type": "error", "message": f"Unknown op: {op!r}"})
+        except (ConnectionError, asyncio.CancelledError):
+            raise
+        except Exception as e:
+            logger.exception(f"Error handling '{op}' request")
+            await send({"type": "error", "message": str(e)})
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Serves requests from one client connection until it closes."""
+
+        async def send(message: Dict[str, Any]) -> None:
+            writer.write(json.dumps(message).encode("utf-8") + b"\n")
+            await writer.drain()
+
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                except json.JSONDecodeError as e:
+                    await send({"type": "error", "message": f"Invalid JSON request: {e}"})
+                    continue
+                if not isinstance(request, dict):
+                    await send({"type": "error", "message": "Request must be a JSON object."})
+                    continue
+                if self._token is not None and not self._authorized(request.get("token")):
+                    await send({"type": "error", "message": "Invalid or missing access token."})
+                    break
+                await self.dispatch(request, send)
+        except (ConnectionError, ValueError) as e:
+            # ValueError is raised by readline() for lines longer than MAX_LINE_BYTES
+            logger.debug(f"Client connection closed: {e}")
+        finally:
+            writer.close()
+            with contextlib.suppress(ConnectionError):
+                await writer.wait_closed()
+
+    def _authorized(self, token: Any) -> bool:
+        return isinstance(token, str) and hmac.compare_digest(token.encode("utf-8"), self._token.encode("utf-8"))
+
+    # --- Lifecycle --- #
+
+    def request_shutdown(self) -> None:
+        """Asks serve() to stop accepting connections and return."""
+        self._shutdown.set()
+
+    async def serve(self, address: str, on_ready: Optional[Callable[[str], None]] = None) -> None:
+        """Listens on ``address`` until shutdown is requested.
+
+        Args:
+            address: Unix socket path or loopback ``host:port`` (port 0 picks a free port)
+            on_ready: Called with the bound address once the server accepts connections
+
+        Raises:
+            RuntimeError: If another daemon is already listening on the unix socket
+        """
+        kind, target = parse_address(address)
+        socket_path: Optional[Path] = None
+        token_file: Optional[Path] = None
+
+        if kind == "unix":
+            socket_path = Path(target)
+            socket_path.parent.mkdir(parents=True, exist_ok=True)
+            if socket_path.exists():
+                if _unix_socket_in_use(str(socket_path)):
+                    raise RuntimeError(f"Another code-agent daemon is already listening on {socket_path}.")
+                socket_path.unlink()
+            # Only the owner may talk to the daemon; it runs tools with the owner's privileges.
+            # The umask makes the socket owner-only from the moment it exists.
+            old_umask = os.umask(0o177)
+            try:
+                server = await asyncio.start_unix_server(self.handle_connection, path=str(socket_path), limit=MAX_LINE_BYTES)
+            finally:
+                os.umask(old_umask)
+            bound = str(socket_path)
+        else:
+            host, port = target
+            server = await asyncio.start_server(self.handle_connection, host=host, port=port, limit=MAX_LINE_BYTES)
+            sockname = server.sockets[0].getsockname()
+            bound = f"{sockname[0]}:{sockname[1]}"
+            token_file = token_path(sockname[1])
+            try:
+                self._token = _write_token(token_file)
+            except OSError:
+                server.close()
+                raise
+
+        logger.info(f"code-agent daemon listening on {bound} (workspace {self.workspace}, max concurrency {self.max_concurrency})")
+        reaper = asyncio.create_task(self._close_idle_sessions_periodically()) if self.session_idle_timeout is not None else None
+        try:
+            async with server:
+                if on_ready:
+                    on_ready(bound)
+                await self._shutdown.wait()
+        finally:
+            if reaper is not None:
+                reaper.cancel()
+            await get_job_manager().close_all()
+            await get_shell_pool().close_all()
+            for path in (socket_path, token_file):
+                if path is not None:
+                    with contextlib.suppress(OSError):
+                        path.unlink()
+            logger.info("code-agent daemon stopped")
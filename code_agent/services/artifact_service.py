@@ -0,0 +1,343 @@
+import hashlib
+import json
+import logging
+import mmap
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Set, Tuple
+from urllib.parse import quote
+
+from google.adk.artifacts.base_artifact_service import BaseArtifactService
+from google.genai import types as genai_types
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None  # type: ignore[assignment]
+
+logger = logging.getLogger(__name__)
+
+# Manifest entry "kind" values describing how a blob maps back onto a types.Part
+KIND_INLINE_DATA = "inline_data"
+KIND_TEXT = "text"
+KIND_PART_JSON = "part_json"
+
+# Manifest file written per session (and one per user for "user:" artifacts)
+MANIFEST_VERSION = 1
+
+
+class FileSystemArtifactService(BaseArtifactService):
+    """
+    An implementation of ArtifactService that persists artifact versions to the filesystem.
+
+    Artifact payloads are stored once as content-addressed blobs (named by their SHA-256),
+    so identical artifacts saved in different sessions or versions share a single file.
+    Each session keeps a small JSON manifest mapping filenames to their list of versions;
+    artifacts in the "user:" namespace use a per-user manifest instead.
+
+    Layout under ``artifacts_dir``::
+
+        blobs/<sha[:2]>/<sha>
+        manifests/<app_name>/<user_id>/sessions/<session_id>.json
+        manifests/<app_name>/<user_id>/user.json
+
+    Several processes (``serve`` and ``run``, say) may share one store. A cached
+    manifest is reused only while the file on disk is unchanged, and every update
+    re-reads the manifest under an exclusive lock on a ``.lock`` file next to it,
+    so concurrent writers do not drop each other's versions.
+    """
+
+    def __init__(self, artifacts_dir: str):
+        """Initializes the service, ensuring the blob and manifest directories exist.
+
+        Args:
+            artifacts_dir: The path to the directory where artifacts should be stored.
+        """
+        if not artifacts_dir:
+            logger.error("artifacts_dir argument cannot be empty.")
+            raise ValueError("artifacts_dir argument cannot be empty.")
+
+        self.artifacts_dir = Path(artifacts_dir)
+        self.blobs_dir = self.artifacts_dir / "blobs"
+        self.manifests_dir = self.artifacts_dir / "manifests"
+        # Manifest cache keyed by manifest path, with the file signature each was read at
+        self._manifests: Dict[Path, Tuple[Optional[Tuple[int, int, int]], Dict[str, List[Dict[str, Any]]]]] = {}
+        self._lock = threading.RLock()
+
+        try:
+            self.blobs_dir.mkdir(parents=True, exist_ok=True)
+            self.manifests_dir.mkdir(parents=True, exist_ok=True)
+            logger.debug(f"FileSystemArtifactService initialized. Artifacts dir: {self.artifacts_dir}")
+        except OSError as e:
+            logger.exception(f"Error creating artifacts directory {self.artifacts_dir}: {e}")
+            raise RuntimeError(f"Failed to initialize FileSystemArtifactService: Could not create directory {self.artifacts_dir}.") from e
+
+    # --- Path helpers --- #
+
+    @staticmethod
+    def _file_has_user_namespace(filename: str) -> bool:
+        return filename.startswith("user:")
+
+    @staticmethod
+    def _safe_component(value: str) -> str:
+        """Encodes an identifier so it is always a single, safe path component."""
+        encoded = quote(value, safe="")
+        # quote() leaves "." untouched, so "." and ".." need explicit handling
+        return encoded.replace(".", "%2E") if encoded in (".", "..") else encoded
+
+    def _manifest_path(self, app_name: str, user_id: str, session_id: str, filename: str) -> Path:
+        user_dir = self.manifests_dir / self._safe_component(app_name) / self._safe_component(user_id)
+        if self._file_has_user_namespace(filename):
+            return user_dir / "user.json"
+        return user_dir / "sessions" / f"{self._safe_component(session_id)}.json"
+
+    def _blob_path(self, digest: str) -> Path:
+        return self.blobs_dir / digest[:2] / digest
+
+    # --- Manifest handling --- #
+
+    @staticmethod
+    def _signature(manifest_path: Path) -> Optional[Tuple[int, int, int]]:
+        try:
+            stat = manifest_path.stat()
+        except OSError:
+            return None
+        # The inode changes on every atomic replace, even within one mtime tick
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def _load_manifest(self, manifest_path: Path) -> Dict[str, List[Dict[str, Any]]]:
+        """Returns the manifest at ``manifest_path``, re-reading it if the file changed since it was cached."""
+        signature = self._signature(manifest_path)
+        cached = self._manifests.get(manifest_path)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+
+        artifacts: Dict[str, List[Dict[str, Any]]] = {}
+        if signature is not None:
+            try:
+                data = json.loads(manifest_path.read_text(encoding="utf-8"))
+                loaded = data.get("artifacts", {}) if isinstance(data, dict) else {}
+                artifacts = {k: v for k, v in loaded.items() if isinstance(k, str) and isinstance(v, list)}
+            except (OSError, json.JSONDecodeError) as e:
+                logger.error(f"Error reading artifact manifest {manifest_path}: {e}. Treating it as empty.")
+
+        self._manifests[manifest_path] = (signature, artifacts)
+        return artifacts
+
+    def _save_manifest(self, manifest_path: Path, artifacts: Dict[str, List[Dict[str, Any]]]) -> None:
+        """Atomically writes a manifest to disk."""
+        manifest_path.parent.mkdir(parents=True, exist_ok=True)
+        payload = json.dumps({"version": MANIFEST_VERSION, "artifacts": artifacts}, separators=(",", ":"))
+        self._atomic_write(manifest_path, payload.encode("utf-8"))
+        self._manifests[manifest_path] = (self._signature(manifest_path), artifacts)
+
+    @contextmanager
+    def _manifest_lock(self, manifest_path: Path) -> Iterator[None]:
+        """Holds an exclusive lock on a manifest across processes while it is read, changed and written."""
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            manifest_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(manifest_path.with_name(manifest_path.name + ".lock"), "a") as lock_file:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    @staticmethod
+    def _atomic_write(path: Path, data: bytes) -> None:
+        fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_name, path)
+        except BaseException:
+            try:
+                os.unlink(tmp_name)
+            except OSError:
+                pass
+            raise
+
+    # --- Blob handling --- #
+
+    @staticmethod
+    def _encode_part(artifact: genai_types.Part) -> tuple[bytes, str, Optional[str]]:
+        """Serializes a Part into (payload bytes, kind, mime_type)."""
+        if artifact.inline_data is not None and artifact.inline_data.data is not None:
+            return artifact.inline_data.data, KIND_INLINE_DATA, artifact.inline_data.mime_type
+        if artifact.text is not None:
+            return artifact.text.encode("utf-8"), KIND_TEXT, "text/plain"
+        return artifact.model_dump_json(exclude_none=True).encode("utf-8"), KIND_PART_JSON, "application/json"
+
+    @staticmethod
+    def _decode_part(data: bytes, entry: Dict[str, Any]) -> genai_types.Part:
+        kind = entry.get("kind")
+        if kind == KIND_INLINE_DATA:
+            return genai_types.Part(inline_data=genai_types.Blob(data=data, mime_type=entry.get("mime_type")))
+        if kind == KIND_TEXT:
+            return genai_types.Part(text=data.decode("utf-8"))
+        return genai_types.Part.model_validate_json(data)
+
+    def _write_blob(self, data: bytes) -> str:
+        """Stores ``data`` as a content-addressed blob and returns its digest.
+
+        Blobs that already exist are not rewritten, which is what lets identical
+        artifacts share storage across sessions and versions.
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        blob_path = self._blob_path(digest)
+        if blob_path.is_file():
+            logger.debug(f"Artifact blob {digest} already stored; reusing it.")
+            return digest
+        blob_path.parent.mkdir(parents=True, exist_ok=True)
+        self._atomic_write(blob_path, data)
+        return digest
+
+    def _read_blob(self, digest: str) -> bytes:
+        """Reads a blob through a read-only memory map so the OS page cache backs the read."""
+        blob_path = self._blob_path(digest)
+        with open(blob_path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size == 0:
+                return b""
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                return mapped[:]
+
+    def _get_entry(self, app_name: str, user_id: str, session_id: str, filename: str, version: Optional[int]) -> Optional[Dict[str, Any]]:
+        manifest = self._load_manifest(self._manifest_path(app_name, user_id, session_id, filename))
+        versions = manifest.get(filename)
+        if not versions:
+            return None
+        if version is None:
+            return versions[-1]
+        if 0 <= version < len(versions):
+            return versions[version]
+        return None
+
+    # --- BaseArtifactService implementation --- #
+
+    def save_artifact(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        filename: str,
+        artifact: genai_types.Part,
+    ) -> int:
+        data, kind, mime_type = self._encode_part(artifact)
+        digest = self._write_blob(data)
+
+        manifest_path = self._manifest_path(app_name, user_id, session_id, filename)
+        with self._manifest_lock(manifest_path):
+            manifest = self._load_manifest(manifest_path)
+            versions = manifest.setdefault(filename, [])
+            versions.append({"sha256": digest, "size": len(data), "kind": kind, "mime_type": mime_type})
+            self._save_manifest(manifest_path, manifest)
+            version = len(versions) - 1
+
+        logger.debug(f"Saved artifact '{filename}' version {version} for session {session_id} (blob {digest}).")
+        return version
+
+    def load_artifact(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        filename: str,
+        version: Optional[int] = None,
+    ) -> Optional[genai_types.Part]:
+        with self._lock:
+            entry = self._get_entry(app_name, user_id, session_id, filename, version)
+        if entry is None:
+            return None
+
+        try:
+            data = self._read_blob(entry["sha256"])
+        except OSError as e:
+            logger.error(f"Error reading blob for artifact '{filename}' in session {session_id}: {e}")
+            return None
+        return self._decode_part(data, entry)
+
+    def list_artifact_keys(self, *, app_name: str, user_id: str, session_id: str) -> list[str]:
+        with self._lock:
+            session_manifest = self._load_manifest(self._manifest_path(app_name, user_id, session_id, ""))
+            user_manifest = self._load_manifest(self._manifest_path(app_name, user_id, session_id, "user:"))
+            filenames = [name for name, versions in session_manifest.items() if versions]
+            filenames.extend(name for name, versions in user_manifest.items() if versions)
+        return sorted(filenames)
+
+    def delete_artifact(self, *, app_name: str, user_id: str, session_id: str, filename: str) -> None:
+        # Blobs may be shared with other sessions, so only the manifest entry is removed here.
+        # Unreferenced blobs are reclaimed by prune_blobs().
+        manifest_path = self._manifest_path(app_name, user_id, session_id, filename)
+        with self._manifest_lock(manifest_path):
+            manifest = self._load_manifest(manifest_path)
+            if manifest.pop(filename, None) is not None:
+                self._save_manifest(manifest_path, manifest)
+
+    def list_versions(self, *, app_name: str, user_id: str, session_id: str, filename: str) -> list[int]:
+        with self._lock:
+            manifest = self._load_manifest(self._manifest_path(app_name, user_id, session_id, filename))
+            return list(range(len(manifest.get(filename, []))))
+
+    # --- Extensions beyond BaseArtifactService --- #
+
+    def open_artifact(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        filename: str,
+        version: Optional[int] = None,
+    ) -> Optional[BinaryIO]:
+        """Opens the raw payload of an artifact version for streaming reads.
+
+        Unlike load_artifact, this never materializes the payload in memory, which
+        makes it the preferred way to consume large artifacts. The caller owns the
+        returned file object and must close it.
+
+        Returns:
+            A binary file object positioned at the start of the payload, or None if not found.
+        """
+        with self._lock:
+            entry = self._get_entry(app_name, user_id, session_id, filename, version)
+        if entry is None:
+            return None
+        try:
+            return open(self._blob_path(entry["sha256"]), "rb")
+        except OSError as e:
+            logger.error(f"Error opening blob for artifact '{filename}' in session {session_id}: {e}")
+            return None
+
+    def prune_blobs(self) -> int:
+        """Removes blobs that are no longer referenced by any manifest.
+
+        Returns:
+            The number of blob files removed.
+        """
+        with self._lock:
+            referenced: Set[str] = set()
+            for manifest_path in self.manifests_dir.rglob("*.json"):
+                for versions in self._load_manifest(manifest_path).values():
+                    referenced.update(entry.get("sha256") for entry in versions)
+
+            removed = 0
+            for blob_path in self.blobs_dir.glob("*/*"):
+                if blob_path.name.startswith(".tmp-") or blob_path.name in referenced:
+                    continue
+                try:
+                    blob_path.unlink()
+                    removed += 1
+                except OSError as e:
+                    logger.warning(f"Could not remove unreferenced blob {blob_path}: {e}")
+
+        logger.info(f"Pruned {removed} unreferenced artifact blob(s) from {self.blobs_dir}.")
+        return removed
@@ -0,0 +1,269 @@
+"""
+Concurrent headless execution of scripted instructions for ``code-agent batch``.
+
+All instructions share one ``Runner`` and one set of session, memory and artifact
+services, and at most ``max_concurrency`` of them run at the same time. Results are
+reported one per instruction, in the order they finish.
+
+Input lines (JSON lines; blank lines are skipped)::
+
+    {"instruction": "...", "id": "optional label", "session_id": "optional", "user_id": "optional"}
+    "a bare JSON string is shorthand for {\"instruction\": ...}"
+
+Result lines::
+
+    {"index": 0, "id": null, "status": "ok", "session_id": "...", "final_text": "...",
+     "tool_calls": 2, "usage": {"prompt_tokens": 10, ...}, "latency_s": 1.52, "error": null}
+
+``index`` is the zero-based line number of the instruction in the input. Instructions
+that reuse a ``session_id`` run one after another, in input order. Lines that cannot be
+parsed get the same keys, with null values for what was never run.
+
+When an instruction finishes and no later one uses its session, the background jobs
+and persistent shell its tools started are stopped.
+
+``usage`` is the token usage the model reported when ADK passes it on with events. ADK
+0.4.0 drops it, so usage is then estimated from the contents of the session and of each
+model response with `context_window.estimate_tokens`, and the dict has ``"estimated": true``.
+"""
+
+import asyncio
+import contextlib
+import json
+import logging
+import time
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from google.genai import types as genai_types
+
+from code_agent.adk.context_window import content_tokens
+from code_agent.tools.background_jobs import get_job_manager
+from code_agent.tools.shell_session import get_shell_pool
+
+logger = logging.getLogger(__name__)
+
+ResultFn = Callable[[Dict[str, Any]], None]
+
+
+def parse_instruction(line: str) -> Dict[str, Any]:
+    """Decodes one input line into a request dict with a non-empty ``instruction``.
+
+    Raises:
+        ValueError: If the line is not valid JSON or has no usable instruction
+    """
+    request = json.loads(line)
+    if isinstance(request, str):
+        request = {"instruction": request}
+    if not isinstance(request, dict):
+        raise ValueError("Each line must be a JSON object or string.")
+    instruction = request.get("instruction")
+    if not isinstance(instruction, str) or not instruction.strip():
+        raise ValueError("'instruction' must be a non-empty string.")
+    return request
+
+
+def usage_from_event(event: Any) -> Optional[Dict[str, int]]:
+    """Returns the token usage reported with an event, if the model and ADK expose it."""
+    usage = getattr(event, "usage_metadata", None)
+    if usage is None:
+        return None
+    return {
+        "prompt_tokens": getattr(usage, "prompt_token_count", None) or 0,
+        "completion_tokens": getattr(usage, "candidates_token_count", None) or 0,
+        "total_tokens": getattr(usage, "total_token_count", None) or 0,
+    }
+
+
+class UsageTally:
+    """Adds up the token usage of one instruction from the events it produced.
+
+    Usage the model reported is used when any event carries it. Otherwise every model
+    response is counted as a call whose prompt was the conversation so far, which
+    misses the system instruction and tool declarations.
+    """
+
+    def __init__(self, context_tokens: int = 0):
+        """Initializes the tally.
+
+        Args:
+            context_tokens: Estimated tokens of the history the first model call is sent
+        """
+        self.context_tokens = context_tokens
+        self.reported: Optional[Dict[str, int]] = None
+        self.estimated = {"prompt_tokens": 0, "completion_tokens": 0}
+
+    def add(self, event: Any) -> None:
+        usage = usage_from_event(event)
+        if usage is not None:
+            totals = self.reported or dict.fromkeys(usage, 0)
+            self.reported = {key: totals[key] + value for key, value in usage.items()}
+        if event.partial or not event.content:
+            return
+        tokens = content_tokens(event.content)
+        # Tool results are authored by the agent too, but go back to the model as input
+        if event.author != "user" and not event.get_function_responses():
+            self.estimated["prompt_tokens"] += self.context_tokens
+            self.estimated["completion_tokens"] += tokens
+        self.context_tokens += tokens
+
+    def usage(self) -> Optional[Dict[str, Any]]:
+        """Returns the reported usage, else the estimate, or None if no model call was seen."""
+        if self.reported is not None:
+            return self.reported
+        if not self.estimated["completion_tokens"]:
+            return None
+        return {**self.estimated, "total_tokens": sum(self.estimated.values()), "estimated": True}
+
+
+def _history_tokens(session: Any) -> int:
+    return sum(content_tokens(event.content) for event in getattr(session, "events", None) or [] if event.content)
+
+
+def _new_result(request_id: Any, session_id: Optional[str] = None) -> Dict[str, Any]:
+    return {
+        "id": request_id,
+        "status": "ok",
+        "session_id": session_id,
+        "final_text": None,
+        "tool_calls": 0,
+        "usage": None,
+        "latency_s": None,
+        "error": None,
+    }
+
+
+class BatchRunner:
+    """Runs many independent instructions through a shared runner."""
+
+    def __init__(
+        self,
+        *,
+        runner: Any,
+        session_service: Any,
+        app_name: str,
+        user_id: str,
+        max_concurrency: int = 4,
+        clock: Callable[[], float] = time.perf_counter,
+    ):
+        """Initializes the batch runner.
+
+        Args:
+            runner: ADK ``Runner`` shared by every instruction
+            session_service: Session service the runner stores sessions in
+            app_name: Application name used for sessions
+            user_id: Default user ID for instructions that do not set one
+            max_concurrency: Maximum number of instructions executing at once
+            clock: Monotonic clock used for latencies
+        """
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1.")
+
+        self.runner = runner
+        self.session_service = session_service
+        self.app_name = app_name
+        self.user_id = user_id
+        self.max_concurrency = max_concurrency
+        self.clock = clock
+        self._semaphore = asyncio.BoundedSemaphore(max_concurrency)
+        self._session_locks: Dict[str, asyncio.Lock] = {}
+        self._session_lock_users: Dict[str, int] = {}
+
+    @contextlib.asynccontextmanager
+    async def _session_lock(self, session_id: Optional[str]):
+        if not session_id:
+            yield
+            return
+        lock = self._session_locks.setdefault(session_id, asyncio.Lock())
+        self._session_lock_users[session_id] = self._session_lock_users.get(session_id, 0) + 1
+        try:
+            async with lock:
+                yield
+        finally:
+            self._session_lock_users[session_id] -= 1
+            if not self._session_lock_users[session_id]:
+                del self._session_lock_users[session_id]
+                del self._session_locks[session_id]
+
+    async def run_instruction(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Runs one instruction to completion and returns its result (without ``index``)."""
+        user_id = request.get("user_id") or self.user_id
+        session_id = request.get("session_id")
+        result = _new_result(request.get("id"), session_id)
+
+        # Wait for the session before taking a concurrency slot so queued turns for a busy session do not block others
+        async with self._session_lock(session_id), self._semaphore:
+            started = self.clock()
+            tally = UsageTally()
+            try:
+                if not session_id:
+                    session_id = self.session_service.create_session(app_name=self.app_name, user_id=user_id).id
+                    result["session_id"] = session_id
+                else:
+                    session = self.session_service.get_session(app_name=self.app_name, user_id=user_id, session_id=session_id)
+                    tally.context_tokens = _history_tokens(session)
+
+                message = genai_types.Content(role="user", parts=[genai_types.Part(text=request["instruction"])])
+                tally.context_tokens += content_tokens(message)
+                async for event in self.runner.run_async(user_id=user_id, session_id=session_id, new_message=message):
+                    result["tool_calls"] += len(event.get_function_calls())
+                    tally.add(event)
+                    if event.error_code or event.error_message:
+                        result["status"] = "error"
+                        result["error"] = event.error_message or event.error_code
+                    if event.author != "user" and not event.partial and event.is_final_response():
+                        parts = event.content.parts if event.content and event.content.parts else []
+                        text = "".join(p.text for p in parts if p.text)
+                        if text:
+                            result["final_text"] = text
+            except Exception as e:
+                logger.debug(f"Batch instruction {request.get('id')!r} failed", exc_info=True)
+                result["status"] = "error"
+                result["error"] = f"{type(e).__name__}: {e}"
+            finally:
+                result["usage"] = tally.usage()
+                result["latency_s"] = round(self.clock() - started, 3)
+
+        # Instructions that reuse the session keep its jobs and shell; the last one stops them
+        if session_id and session_id not in self._session_locks:
+            await self.close_session(session_id)
+        return result
+
+    async def close_session(self, session_id: str) -> None:
+        """Stops the background jobs and the persistent shell the session's instructions started."""
+        await get_shell_pool().close_session(session_id)
+        stopped_jobs = await get_job_manager().close_session(session_id)
+        if stopped_jobs:
+            logger.info(f"Stopped {stopped_jobs} background job(s) of session {session_id}")
+
+    async def run(self, lines: Iterable[str], on_result: ResultFn) -> Dict[str, Any]:
+        """Runs every instruction in ``lines`` and calls ``on_result`` as each one finishes.
+
+        Lines that cannot be parsed are reported as failed results without running.
+
+        Returns:
+            A summary dict with ``total``, ``succeeded``, ``failed`` and ``elapsed_s``
+        """
+        started = self.clock()
+        counts = {"succeeded": 0, "failed": 0}
+
+        def report(result: Dict[str, Any]) -> None:
+            counts["succeeded" if result["status"] == "ok" else "failed"] += 1
+            on_result(result)
+
+        async def run_one(index: int, request: Dict[str, Any]) -> None:
+            result = await self.run_instruction(request)
+            report({"index": index, **result})
+
+        tasks = []
+        for index, line in enumerate(lines):
+            if not line.strip():
+                continue
+            try:
+                request = parse_instruction(line)
+            except ValueError as e:
+                report({"index": index, **_new_result(None), "status": "error", "error": f"Invalid input line: {e}"})
+                continue
+            tasks.append(asyncio.create_task(run_one(index, request)))
+
+        await asyncio.gather(*tasks)
+        return {**counts, "total": counts["succeeded"] + counts["failed"], "elapsed_s": round(self.clock() - started, 3)}
@@ -1,19 +1,254 @@
+import bisect
+import copy
 import json
 import logging
+import uuid
+from collections.abc import MutableSequence
+from itertools import islice
 from pathlib import Path
-from typing import Optional
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
 
+from google.adk.events import Event
 from google.adk.sessions import Session  # Keep Session import
 
 # No longer need SessionService import
 from google.adk.sessions.in_memory_session_service import InMemorySessionService
-from pydantic import ValidationError
+from google.adk.sessions.state import State
+from pydantic import ValidationError, field_serializer
+
+from code_agent.telemetry import span
 
 logger = logging.getLogger(__name__)
 
 
+class ForkedEventList(MutableSequence):
+    """
+    Copy-on-write event list for forked sessions.
+
+    A fork shares the first ``fork_point`` events of its parent by reference, as a chain
+    of ``(source, count)`` segments, and keeps its own events in a private tail list.
+    This relies on event lists being append-only (which is how ADK session services
+    use them): a segment's first ``count`` items never change once shared.
+
+    ``append``/``extend`` only touch the private tail. Any other mutation copies the
+    visible events into a fresh list first, so shared segments are never modified.
+    ``copy.deepcopy`` yields a plain list, so sessions returned by ``get_session`` look
+    exactly like unforked ones. Sessions holding one are `ForkedSession` objects, which
+    serialize it as a plain list.
+    """
+
+    def __init__(self, segments: Tuple[Tuple[Sequence[Event], int], ...] = (), tail: Optional[List[Event]] = None):
+        self._segments = segments
+        # Cumulative end offsets of each segment, for bisecting an index to its segment
+        self._ends: List[int] = []
+        total = 0
+        for _, count in segments:
+            total += count
+            self._ends.append(total)
+        self._prefix_len = total
+        self._tail: List[Event] = tail if tail is not None else []
+
+    @classmethod
+    def fork(cls, events: Sequence[Event], fork_point: int) -> "ForkedEventList":
+        """Returns a new list sharing ``events[:fork_point]`` without copying it."""
+        if isinstance(events, ForkedEventList):
+            return cls(events._prefix_segments(fork_point))
+        return cls(((events, fork_point),) if fork_point else ())
+
+    def _prefix_segments(self, fork_point: int) -> Tuple[Tuple[Sequence[Event], int], ...]:
+        segments: List[Tuple[Sequence[Event], int]] = []
+        remaining = fork_point
+        for source, count in (*self._segments, (self._tail, len(self._tail))):
+            if remaining <= 0:
+                break
+            segments.append((source, min(count, remaining)))
+            remaining -= count
+        return tuple(segments)
+
+    # --- Sequence protocol --- #
+
+    def __len__(self) -> int:
+        return self._prefix_len + len(self._tail)
+
+    def __iter__(self) -> Iterator[Event]:
+        for source, count in self._segments:
+            yield from islice(source, count)
+        yield from self._tail
+
+    def __getitem__(self, index: Any) -> Any:
+        if isinstance(index, slice):
+            return list(self)[index]
+        length = len(self)
+        if index < 0:
+            index += length
+        if not 0 <= index < length:
+            raise IndexError("event index out of range")
+        if index >= self._prefix_len:
+            return self._tail[index - self._prefix_len]
+        segment = bisect.bisect_right(self._ends, index)
+        start = self._ends[segment - 1] if segment else 0
+        return self._segments[segment][0][index - start]
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, (list, ForkedEventList)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other, strict=True))
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"ForkedEventList(shared={self._prefix_len}, own={len(self._tail)})"
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> List[Event]:
+        return [copy.deepcopy(event, memo) for event in self]
+
+    # --- Mutation --- #
+
+    def append(self, event: Event) -> None:
+        self._tail.append(event)
+
+    def extend(self, events: Any) -> None:
+        self._tail.extend(events)
+
+    def _detach(self) -> List[Event]:
+        # The tail may be shared with forks of this list, so never mutate it in place here
+        events = list(self)
+        self._segments, self._ends, self._prefix_len = (), [], 0
+        return events
+
+    def __setitem__(self, index: Any, value: Any) -> None:
+        events = self._detach()
+        events[index] = value
+        self._tail = events
+
+    def __delitem__(self, index: Any) -> None:
+        events = self._detach()
+        del events[index]
+        self._tail = events
+
+    def insert(self, index: int, value: Event) -> None:
+        events = self._detach()
+        events.insert(index, value)
+        self._tail = events
+
+
+class ForkedSession(Session):
+    """A session whose events are a `ForkedEventList`.
+
+    Pydantic only knows how to serialize plain lists of events, so the list is
+    materialized when the session is dumped (``model_dump``, ``model_dump_json``,
+    ``save_session``); the saved form is that of an ordinary `Session`.
+    """
+
+    @field_serializer("events", mode="wrap")
+    def _serialize_events(self, events: Sequence[Event], handler: Any) -> Any:
+        return handler(events if isinstance(events, list) else list(events))
+
+
+def _state_at(session: Session, fork_point: int) -> Dict[str, Any]:
+    """Reconstructs the session-scoped state after the first ``fork_point`` events.
+
+    Keys never written by an event keep their current value (they come from the state
+    the session was created with); other keys are replayed from the events' state deltas.
+    The current state is returned as is when forking at the latest event; any earlier
+    fork point replays the deltas, which takes time proportional to the session length.
+    """
+    if fork_point == len(session.events):
+        return dict(session.state)
+
+    deltas = [event.actions.state_delta for event in session.events if event.actions and event.actions.state_delta]
+    written = {key for delta in deltas for key in delta}
+    state = {key: value for key, value in session.state.items() if key not in written}
+    for event in islice(session.events, fork_point):
+        if event.actions and event.actions.state_delta:
+            state.update({key: value for key, value in event.actions.state_delta.items() if not key.startswith(State.TEMP_PREFIX)})
+    return state
+
+
+class SessionForkMixin:
+    """
+    Adds copy-on-write session forking to services derived from ADK's InMemorySessionService.
+
+    Forking shares the parent's event prefix instead of copying it, so branching a long
+    session at its latest event is O(1) in time and memory regardless of its length.
+    Branching at an earlier event still shares the events, but reconstructing the state
+    at that point replays the state deltas (see `_state_at`).
+    """
+
+    def _get_stored_session(self, app_name: str, user_id: str, session_id: str) -> Optional[Session]:
+        """Returns the service's own (uncopied) session object, or None."""
+        return self.sessions.get(app_name, {}).get(user_id, {}).get(session_id)
+
+    def fork_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        at_event: Optional[int] = None,
+        new_session_id: Optional[str] = None,
+    ) -> Session:
+        """Creates a new session that branches from an existing one.
+
+        The fork sees the parent's first ``at_event`` events and the matching state;
+        events appended afterwards go only to the fork (or only to the parent).
+
+        Args:
+            app_name: The app name of the parent session
+            user_id: The user ID of the parent session
+            session_id: The ID of the session to fork
+            at_event: Number of parent events to keep (default: all of them)
+            new_session_id: ID for the fork (default: a new UUID)
+
+        Returns:
+            The forked session
+
+        Raises:
+            ValueError: If the parent does not exist, ``at_event`` is out of range,
+                or ``new_session_id`` is already taken
+        """
+        parent = self._get_stored_session(app_name, user_id, session_id)
+        if parent is None:
+            raise ValueError(f"Session not found: {session_id}")
+
+        fork_point = len(parent.events) if at_event is None else at_event
+        if not 0 <= fork_point <= len(parent.events):
+            raise ValueError(f"at_event must be between 0 and {len(parent.events)}, got {at_event}")
+
+        fork_id = new_session_id.strip() if new_session_id and new_session_id.strip() else str(uuid.uuid4())
+        user_sessions = self.sessions.setdefault(app_name, {}).setdefault(user_id, {})
+        if fork_id in user_sessions:
+            raise ValueError(f"Session already exists: {fork_id}")
+
+        state = _state_at(parent, fork_point)
+        last_update_time = parent.events[fork_point - 1].timestamp if fork_point else parent.last_update_time
+        # model_construct skips validation, which would otherwise copy the event list
+        user_sessions[fork_id] = ForkedSession.model_construct(
+            id=fork_id,
+            app_name=app_name,
+            user_id=user_id,
+            state=state,
+            events=ForkedEventList.fork(parent.events, fork_point),
+            last_update_time=last_update_time,
+        )
+        logger.debug(f"Forked session {session_id} at event {fork_point} into {fork_id}")
+
+        # The caller gets its own view, like the copies create_session/get_session return
+        forked = ForkedSession.model_construct(
+            id=fork_id,
+            app_name=app_name,
+            user_id=user_id,
+            state=dict(state),
+            events=ForkedEventList.fork(parent.events, fork_point),
+            last_update_time=last_update_time,
+        )
+        return self._merge_state(app_name, user_id, forked)
+
+
+class ForkableInMemorySessionService(SessionForkMixin, InMemorySessionService):
+    """ADK's InMemorySessionService with copy-on-write session forking."""
+
+
 # Restore inheritance from InMemorySessionService
-class FileSystemSessionService(InMemorySessionService):
+class FileSystemSessionService(SessionForkMixin, InMemorySessionService):
     """
     An implementation of SessionService that persists sessions to the filesystem
     by extending InMemorySessionService and loading from disk on cache miss.
@@ -88,8 +323,9 @@ class FileSystemSessionService(InMemorySessionService):
 
         # 3. Load from file if it exists
         try:
-            json_content = session_file_path.read_text()
-            loaded_session = Session.model_validate_json(json_content)
+            with span("code_agent.session.load", session_id=session_id):
+                json_content = session_file_path.read_text()
+                loaded_session = Session.model_validate_json(json_content)
             logger.info(f"Successfully loaded session {session_id} from {session_file_path}")
 
             # 4. Return the loaded session directly. Do not attempt to add it back to the
@@ -107,7 +343,36 @@ class FileSystemSessionService(InMemorySessionService):
             return None
 
     # Note: We are not overriding update_session or create_session here.
-    # Session *saving* will still rely on the logic in `run_command` which calls
-    # get_session again after execution and writes the file.
+    # Session *saving* is explicit: `run_command` calls save_session after execution.
     # Session *creation* still happens in memory via the parent class.
     # If a session is created and then saved, the next run will load it via get_session.
+
+    def save_session(self, session: Session) -> Path:
+        """Writes a session to `<sessions_dir>/<session_id>.session.json` and returns the path.
+
+        Raises:
+            OSError: If the file cannot be written
+        """
+        session_file_path = self.sessions_dir / f"{session.id}.session.json"
+        with span("code_agent.session.save", session_id=session.id, events=len(session.events)):
+            session_dict = session.model_dump(mode="json")
+            with open(session_file_path, "w", encoding="utf-8") as f:
+                json.dump(session_dict, f, indent=4)
+        logger.debug(f"Saved session {session.id} to {session_file_path}")
+        return session_file_path
+
+    def _get_stored_session(self, app_name: str, user_id: str, session_id: str) -> Optional[Session]:
+        """Returns the stored session, loading it from disk into the memory cache if needed.
+
+        Forks share the parent's events by reference, so a parent that only exists on
+        disk is cached in memory first.
+        """
+        session = super()._get_stored_session(app_name, user_id, session_id)
+        if session is not None:
+            return session
+
+        loaded = self.get_session(app_name=app_name, user_id=user_id, session_id=session_id)
+        if loaded is None or loaded.app_name != app_name or loaded.user_id != user_id:
+            return None
+        self.sessions.setdefault(app_name, {}).setdefault(user_id, {})[session_id] = loaded
+        return loaded
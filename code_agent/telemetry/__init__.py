@@ -0,0 +1,140 @@
+"""
+OpenTelemetry tracing for Code Agent.
+
+Code is instrumented with `span()` and the `traced()` decorator. Until tracing is
+configured, and as long as nothing else (such as ADK) has imported OpenTelemetry,
+both are no-ops that do not import it, so lightweight commands stay fast. Once
+OpenTelemetry is loaded, spans go to whichever tracer provider is installed; ADK's
+own spans (invocation, agent_run, call_llm, tool_call) land in the same traces.
+
+`configure_tracing()` installs an SDK tracer provider that records spans to a local
+file, written by `shutdown_tracing()` as OTLP-JSON or Chrome trace events. No
+collector is needed.
+"""
+
+import functools
+import inspect
+import logging
+import sys
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+TRACER_NAME = "code_agent"
+TRACE_FORMATS = ("otlp", "chrome")
+
+# Exporter installed by configure_tracing(), if any
+_file_exporter = None
+
+
+def _tracing_active() -> bool:
+    return _file_exporter is not None or "opentelemetry.trace" in sys.modules
+
+
+def _attribute_value(value: Any) -> Any:
+    if isinstance(value, (str, bool, int, float)):
+        return value
+    if isinstance(value, (list, tuple)) and all(isinstance(item, (str, bool, int, float)) for item in value):
+        return list(value)
+    return str(value)
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Any]:
+    """Runs the block in a span named `name`, yielding the span (or None when tracing is off).
+
+    Attributes set to None are left out. Exceptions are recorded on the span and re-raised.
+    """
+    if not _tracing_active():
+        yield None
+        return
+
+    from opentelemetry import trace
+
+    clean = {key: _attribute_value(value) for key, value in attributes.items() if value is not None}
+    with trace.get_tracer(TRACER_NAME).start_as_current_span(name, attributes=clean) as current:
+        yield current
+
+
+def traced(name: str, *, record: Sequence[str] = ()) -> Callable[[Callable], Callable]:
+    """Decorator running each call of a sync or async function in a span named `name`.
+
+    `record` lists argument names whose values are added as span attributes.
+    """
+
+    def decorator(func: Callable) -> Callable:
+        signature = inspect.signature(func) if record else None
+
+        def attributes(args: tuple, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+            if signature is None:
+                return {}
+            try:
+                arguments = signature.bind_partial(*args, **kwargs).arguments
+            except TypeError:
+                return {}
+            return {arg: arguments.get(arg) for arg in record}
+
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(name, **attributes(args, kwargs)):
+                    return await func(*args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name, **attributes(args, kwargs)):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def configure_tracing(path: Path, trace_format: str = "otlp") -> None:
+    """Records spans from now on, to be written to `path` by `shutdown_tracing()`.
+
+    Installs an SDK tracer provider unless one is already installed, in which case
+    the file exporter is added to it.
+
+    Raises:
+        ValueError: If `trace_format` is not one of `TRACE_FORMATS`
+    """
+    global _file_exporter
+    if trace_format not in TRACE_FORMATS:
+        raise ValueError(f"Unknown trace format '{trace_format}'. Use one of: {', '.join(TRACE_FORMATS)}.")
+
+    from opentelemetry import trace
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+
+    from code_agent.telemetry.file_exporter import FileSpanExporter
+    from code_agent.version import __version__
+
+    if _file_exporter is not None:
+        shutdown_tracing()
+
+    provider = trace.get_tracer_provider()
+    if not isinstance(provider, TracerProvider):
+        provider = TracerProvider(resource=Resource.create({"service.name": "code-agent", "service.version": __version__}))
+        trace.set_tracer_provider(provider)
+        if trace.get_tracer_provider() is not provider:
+            logger.warning("Another tracer provider is installed; spans will not be written to the trace file.")
+
+    _file_exporter = FileSpanExporter(Path(path), trace_format)
+    provider.add_span_processor(SimpleSpanProcessor(_file_exporter))
+
+
+def shutdown_tracing() -> Optional[Path]:
+    """Writes the spans recorded since `configure_tracing()` and returns the trace file path."""
+    global _file_exporter
+    exporter, _file_exporter = _file_exporter, None
+    if exporter is None:
+        return None
+    exporter.shutdown()
+    return exporter.path
@@ -0,0 +1,143 @@
+"""
+Span exporter that writes a local trace file instead of sending spans to a collector.
+
+Two formats are supported:
+
+- ``otlp``: the OTLP/JSON encoding of an ``ExportTraceServiceRequest``, as written by
+  the OpenTelemetry collector's file exporter. It can be replayed into any OTLP backend.
+- ``chrome``: Chrome trace event JSON, which opens directly in ``chrome://tracing``
+  or https://ui.perfetto.dev. Each trace gets its own row.
+"""
+
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Sequence
+
+from opentelemetry.sdk.trace import ReadableSpan
+from opentelemetry.sdk.trace.export import SpanExporter, SpanExportResult
+
+logger = logging.getLogger(__name__)
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    if isinstance(value, (list, tuple)):
+        return {"arrayValue": {"values": [_otlp_value(item) for item in value]}}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes: Any) -> List[Dict[str, Any]]:
+    return [{"key": key, "value": _otlp_value(value)} for key, value in (attributes or {}).items()]
+
+
+def _otlp_span(span: ReadableSpan) -> Dict[str, Any]:
+    context = span.get_span_context()
+    encoded = {
+        "traceId": format(context.trace_id, "032x"),
+        "spanId": format(context.span_id, "016x"),
+        "name": span.name,
+        # OTLP's SpanKind enum reserves 0 for "unspecified"
+        "kind": span.kind.value + 1,
+        "startTimeUnixNano": str(span.start_time),
+        "endTimeUnixNano": str(span.end_time),
+        "attributes": _otlp_attributes(span.attributes),
+        "status": {"code": span.status.status_code.value},
+    }
+    if span.parent is not None:
+        encoded["parentSpanId"] = format(span.parent.span_id, "016x")
+    if span.status.description:
+        encoded["status"]["message"] = span.status.description
+    if span.events:
+        encoded["events"] = [
+            {"timeUnixNano": str(event.timestamp), "name": event.name, "attributes": _otlp_attributes(event.attributes)} for event in span.events
+        ]
+    return encoded
+
+
+def to_otlp_json(spans: Sequence[ReadableSpan]) -> Dict[str, Any]:
+    """Encodes spans as an OTLP/JSON ExportTraceServiceRequest."""
+    resources: Dict[int, Dict[str, Any]] = {}
+    for span in spans:
+        resource_spans = resources.setdefault(
+            id(span.resource),
+            {"resource": {"attributes": _otlp_attributes(span.resource.attributes)}, "scopes": {}},
+        )
+        scope = span.instrumentation_scope
+        scope_spans = resource_spans["scopes"].setdefault(
+            (scope.name, scope.version),
+            {"scope": {"name": scope.name, **({"version": scope.version} if scope.version else {})}, "spans": []},
+        )
+        scope_spans["spans"].append(_otlp_span(span))
+
+    return {
+        "resourceSpans": [
+            {"resource": resource_spans["resource"], "scopeSpans": list(resource_spans["scopes"].values())} for resource_spans in resources.values()
+        ]
+    }
+
+
+def to_chrome_trace(spans: Sequence[ReadableSpan]) -> Dict[str, Any]:
+    """Encodes spans as Chrome trace events, one row (tid) per trace."""
+    pid = os.getpid()
+    rows: Dict[int, int] = {}
+    events = []
+    for span in sorted(spans, key=lambda s: s.start_time):
+        tid = rows.setdefault(span.get_span_context().trace_id, len(rows) + 1)
+        args = dict(span.attributes or {})
+        if not span.status.is_ok:
+            args["status"] = span.status.description or span.status.status_code.name
+        events.append(
+            {
+                "name": span.name,
+                "cat": span.instrumentation_scope.name,
+                "ph": "X",
+                "ts": span.start_time / 1000,
+                "dur": (span.end_time - span.start_time) / 1000,
+                "pid": pid,
+                "tid": tid,
+                "args": args,
+            }
+        )
+        for event in span.events:
+            events.append({"name": event.name, "ph": "i", "s": "t", "ts": event.timestamp / 1000, "pid": pid, "tid": tid, "args": dict(event.attributes or {})})
+    events.extend({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": f"trace {tid}"}} for tid in rows.values())
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+class FileSpanExporter(SpanExporter):
+    """Collects finished spans in memory and writes them to `path` on shutdown."""
+
+    def __init__(self, path: Path, trace_format: str = "otlp"):
+        self.path = path
+        self.trace_format = trace_format
+        self.spans: List[ReadableSpan] = []
+        self._shutdown = False
+
+    def export(self, spans: Sequence[ReadableSpan]) -> SpanExportResult:
+        if self._shutdown:
+            return SpanExportResult.FAILURE
+        self.spans.extend(spans)
+        return SpanExportResult.SUCCESS
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        return True
+
+    def shutdown(self) -> None:
+        if self._shutdown:
+            return
+        self._shutdown = True
+        encode = to_chrome_trace if self.trace_format == "chrome" else to_otlp_json
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.path.write_text(json.dumps(encode(self.spans)), encoding="utf-8")
+        except OSError as e:
+            logger.error(f"Could not write trace file {self.path}: {e}")
+            return
+        logger.info(f"Wrote {len(self.spans)} spans to {self.path}")
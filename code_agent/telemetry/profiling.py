@@ -0,0 +1,240 @@
+"""
+Per-turn profiling for ``code-agent run --profile``.
+
+Two profilers share one interface (`turn()` around each agent turn, `hotspots()` and
+`turns` for the summary):
+
+- `SamplingProfiler` samples the turn's thread from a background thread every few
+  milliseconds and writes collapsed stacks (``turn-001.folded``), the input format of
+  flamegraph.pl, speedscope and similar tools. Overhead is low and independent of
+  how many Python calls the turn makes.
+- `CProfileProfiler` runs cProfile around each turn and writes ``turn-001.pstats``.
+
+Both split a turn's wall time into CPU time of the turn's thread and time spent
+waiting, and estimate how much of the wait was the event loop idling in its selector,
+i.e. awaiting network I/O such as the model response.
+"""
+
+import abc
+import cProfile
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from types import FrameType
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from rich.console import Console
+from rich.table import Table
+
+PROFILE_FORMATS = ("folded", "pstats")
+DEFAULT_SAMPLE_INTERVAL = 0.005
+
+# The event loop blocks here while every task is awaiting I/O
+_SELECTOR_FILE = "selectors.py"
+_SELECTOR_FUNCTION = "select"
+
+
+@dataclass
+class TurnProfile:
+    """Timings for one profiled turn."""
+
+    label: str
+    wall_s: float
+    cpu_s: float
+    io_wait_s: float
+    path: Optional[Path] = None
+
+    @property
+    def other_wait_s(self) -> float:
+        """Wall time that was neither CPU time nor selector wait (locks, sleeps, other threads)."""
+        return max(self.wall_s - self.cpu_s - self.io_wait_s, 0.0)
+
+
+def _short_filename(filename: str) -> str:
+    marker = f"site-packages{os.sep}"
+    if marker in filename:
+        return filename.split(marker, 1)[1]
+    try:
+        return os.path.relpath(filename)
+    except ValueError:
+        return filename
+
+
+def _frame_name(frame: FrameType) -> str:
+    code = frame.f_code
+    return f"{code.co_qualname} ({_short_filename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _is_selector_wait(frame: FrameType) -> bool:
+    code = frame.f_code
+    return code.co_name == _SELECTOR_FUNCTION and code.co_filename.endswith(_SELECTOR_FILE)
+
+
+class _TurnProfiler(abc.ABC):
+    """Shared turn bookkeeping; subclasses collect the actual profile."""
+
+    extension = ""
+
+    def __init__(self, output_dir: Path):
+        self.output_dir = Path(output_dir)
+        self.turns: List[TurnProfile] = []
+
+    def _next_path(self) -> Path:
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        return self.output_dir / f"turn-{len(self.turns) + 1:03d}.{self.extension}"
+
+    @contextmanager
+    def turn(self, label: Optional[str] = None) -> Iterator[None]:
+        """Profiles the enclosed block as one turn and writes its profile file."""
+        label = label or f"turn {len(self.turns) + 1}"
+        self._start()
+        wall_start, cpu_start = time.perf_counter(), time.thread_time()
+        try:
+            yield
+        finally:
+            wall_s, cpu_s = time.perf_counter() - wall_start, time.thread_time() - cpu_start
+            path = self._next_path()
+            io_wait_s = self._stop(path, wall_s)
+            self.turns.append(TurnProfile(label=label, wall_s=wall_s, cpu_s=cpu_s, io_wait_s=min(io_wait_s, wall_s), path=path))
+
+    @abc.abstractmethod
+    def _start(self) -> None:
+        """Starts profiling the calling thread."""
+
+    @abc.abstractmethod
+    def _stop(self, path: Path, wall_s: float) -> float:
+        """Stops profiling, writes `path` and returns the estimated selector wait in seconds."""
+
+    @abc.abstractmethod
+    def hotspots(self, limit: int) -> List[Tuple[str, float]]:
+        """Returns up to `limit` (function, self seconds) pairs across all turns, excluding selector waits."""
+
+
+class SamplingProfiler(_TurnProfiler):
+    """Samples the profiled thread's stack at a fixed interval and writes collapsed stacks."""
+
+    extension = "folded"
+
+    def __init__(self, output_dir: Path, interval: float = DEFAULT_SAMPLE_INTERVAL):
+        super().__init__(output_dir)
+        self.interval = interval
+        self._self_time: Counter = Counter()
+        self._turn_stacks: Counter = Counter()
+        self._io_wait_s = 0.0
+        self._stop_event = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+
+    def _start(self) -> None:
+        self._turn_stacks = Counter()
+        self._io_wait_s = 0.0
+        self._stop_event.clear()
+        self._sampler = threading.Thread(target=self._sample, args=(threading.get_ident(),), name="profile-sampler", daemon=True)
+        self._sampler.start()
+
+    def _sample(self, thread_id: int) -> None:
+        last = time.perf_counter()
+        while not self._stop_event.wait(self.interval):
+            # While the profiled thread holds the GIL the sampler wakes late, so each sample
+            # stands for the time since the previous one rather than a fixed interval
+            now = time.perf_counter()
+            elapsed, last = now - last, now
+            frame = sys._current_frames().get(thread_id)
+            if frame is None:
+                continue
+            leaf = frame
+            names = []
+            while frame is not None:
+                names.append(_frame_name(frame))
+                frame = frame.f_back
+            self._turn_stacks[";".join(reversed(names))] += 1
+            if _is_selector_wait(leaf):
+                self._io_wait_s += elapsed
+            else:
+                self._self_time[names[0]] += elapsed
+
+    def _stop(self, path: Path, wall_s: float) -> float:
+        self._stop_event.set()
+        self._sampler.join()
+        path.write_text("".join(f"{stack} {count}\n" for stack, count in self._turn_stacks.most_common()), encoding="utf-8")
+        return self._io_wait_s
+
+    def hotspots(self, limit: int) -> List[Tuple[str, float]]:
+        return self._self_time.most_common(limit)
+
+
+class CProfileProfiler(_TurnProfiler):
+    """Runs cProfile around each turn and writes pstats files."""
+
+    extension = "pstats"
+
+    def __init__(self, output_dir: Path):
+        super().__init__(output_dir)
+        self._profile: Optional[cProfile.Profile] = None
+        self._combined: Optional[pstats.Stats] = None
+
+    def _start(self) -> None:
+        self._profile = cProfile.Profile()
+        self._profile.enable()
+
+    def _stop(self, path: Path, wall_s: float) -> float:
+        self._profile.disable()
+        self._profile.dump_stats(str(path))
+        stats = pstats.Stats(self._profile)
+        if self._combined is None:
+            self._combined = pstats.Stats(self._profile)
+        else:
+            self._combined.add(self._profile)
+        return sum(entry[3] for (filename, _, name), entry in stats.stats.items() if name == _SELECTOR_FUNCTION and filename.endswith(_SELECTOR_FILE))
+
+    def hotspots(self, limit: int) -> List[Tuple[str, float]]:
+        if self._combined is None:
+            return []
+        totals: Dict[str, float] = {}
+        for (filename, line, name), (_, _, tottime, _, _) in self._combined.stats.items():
+            # Built-ins such as the selector's poll() are listed as "~"
+            if filename == "~" and "poll" in name:
+                continue
+            label = name if filename == "~" else f"{name} ({_short_filename(filename)}:{line})"
+            totals[label] = totals.get(label, 0.0) + tottime
+        return sorted(totals.items(), key=lambda item: item[1], reverse=True)[:limit]
+
+
+def create_profiler(output_dir: Path, profile_format: str = "folded") -> _TurnProfiler:
+    """Returns the profiler writing `profile_format` files to `output_dir`.
+
+    Raises:
+        ValueError: If `profile_format` is not one of `PROFILE_FORMATS`
+    """
+    if profile_format == "folded":
+        return SamplingProfiler(output_dir)
+    if profile_format == "pstats":
+        return CProfileProfiler(output_dir)
+    raise ValueError(f"Unknown profile format '{profile_format}'. Use one of: {', '.join(PROFILE_FORMATS)}.")
+
+
+def print_profile_summary(console: Console, profiler: _TurnProfiler, top: int = 15) -> None:
+    """Prints per-turn timings and the top `top` hotspots across all turns."""
+    if not profiler.turns:
+        console.print("[dim]No turns were profiled.[/dim]")
+        return
+
+    turns = Table(title="Turn timings (s)", title_justify="left")
+    for column in ("Turn", "Wall", "CPU", "Awaiting I/O", "Other wait"):
+        turns.add_column(column, justify="left" if column == "Turn" else "right")
+    for turn in profiler.turns:
+        turns.add_row(turn.label, f"{turn.wall_s:.3f}", f"{turn.cpu_s:.3f}", f"{turn.io_wait_s:.3f}", f"{turn.other_wait_s:.3f}")
+    console.print(turns)
+
+    hotspots = Table(title=f"Top {top} hotspots by self time (s, excluding I/O wait)", title_justify="left")
+    hotspots.add_column("Self", justify="right")
+    hotspots.add_column("Function")
+    for name, seconds in profiler.hotspots(top):
+        hotspots.add_row(f"{seconds:.3f}", name)
+    console.print(hotspots)
+    console.print(f"[dim]Per-turn profiles written to {profiler.output_dir}[/dim]")
@@ -0,0 +1,251 @@
+"""
+Background jobs for long-running terminal commands.
+
+`JobManager` starts commands without waiting for them, so an agent can start a test
+suite or a dev server and keep working. Each job runs in its own process group with
+stdout and stderr merged into one stream. Only the most recent output is kept in
+memory; it is read back by absolute byte offset, so repeated polls return only what
+is new. Jobs belong to the session that started them, the number running at once
+per session is capped, and all of a session's jobs are stopped when it closes.
+"""
+
+import asyncio
+import atexit
+import itertools
+import logging
+import os
+import signal
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from code_agent.config.config import get_config
+from code_agent.config.settings_based_config import NativeCommandSettings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_JOBS_PER_SESSION = 4
+DEFAULT_OUTPUT_BYTES = 1024 * 1024
+DEFAULT_READ_BYTES = 16 * 1024
+
+_READ_CHUNK_BYTES = 64 * 1024
+# Finished jobs kept per session for their exit status and output
+_MAX_FINISHED_JOBS_PER_SESSION = 20
+# Time a job gets to exit after SIGTERM before it is killed
+_KILL_GRACE_SECONDS = 3.0
+
+
+class JobLimitError(RuntimeError):
+    """Raised when a session already runs the maximum number of background jobs."""
+
+
+class OutputLog:
+    """Keeps the last `max_bytes` of a byte stream, addressed by absolute offsets."""
+
+    def __init__(self, max_bytes: int = DEFAULT_OUTPUT_BYTES):
+        self.max_bytes = max_bytes
+        self.total = 0
+        self._data = bytearray()
+
+    @property
+    def start(self) -> int:
+        """Offset of the oldest byte still kept."""
+        return self.total - len(self._data)
+
+    def append(self, data: bytes) -> None:
+        self.total += len(data)
+        self._data += data
+        if len(self._data) > self.max_bytes:
+            del self._data[: len(self._data) - self.max_bytes]
+
+    def read(self, offset: int, max_bytes: int = DEFAULT_READ_BYTES) -> Tuple[bytes, int, int]:
+        """Returns up to `max_bytes` from `offset` on, with the offsets they span.
+
+        Reading starts at the oldest kept byte when `offset` was already discarded.
+        """
+        start = min(max(offset, self.start), self.total)
+        end = min(start + max_bytes, self.total)
+        return bytes(self._data[start - self.start : end - self.start]), start, end
+
+
+def _signal_group(process: asyncio.subprocess.Process, sig: int) -> None:
+    """Sends `sig` to the process group led by `process`."""
+    try:
+        if hasattr(os, "killpg"):
+            os.killpg(process.pid, sig)
+        else:
+            process.kill()
+    except ProcessLookupError:
+        pass
+
+
+class BackgroundJob:
+    """A command started by `JobManager`."""
+
+    def __init__(self, job_id: str, session_id: str, command: str, process: asyncio.subprocess.Process, output_bytes: int):
+        self.job_id = job_id
+        self.session_id = session_id
+        self.command = command
+        self.process = process
+        self.output = OutputLog(output_bytes)
+        self.started = time.monotonic()
+        self.finished: Optional[float] = None
+        self.killed = False
+        self._reader = asyncio.create_task(self._pump(), name=f"background-job-{job_id}")
+
+    async def _pump(self) -> None:
+        try:
+            while chunk := await self.process.stdout.read(_READ_CHUNK_BYTES):
+                self.output.append(chunk)
+            await self.process.wait()
+        finally:
+            self.finished = time.monotonic()
+
+    @property
+    def running(self) -> bool:
+        # The process, not the reader: an event loop shutting down cancels the reader of a live job
+        return self.process.returncode is None
+
+    @property
+    def elapsed(self) -> float:
+        return (self.finished or time.monotonic()) - self.started
+
+    @property
+    def status(self) -> str:
+        if self.running:
+            return "running"
+        if self.killed:
+            return "killed"
+        return f"exited with code {self.process.returncode}"
+
+    async def wait(self, timeout: Optional[float] = None) -> bool:
+        """Waits up to `timeout` seconds for the job to finish and its output to be read, and returns whether it has finished."""
+        if not self._reader.done():
+            await asyncio.wait({self._reader}, timeout=timeout)
+        return not self.running
+
+    def describe(self, offset: int = 0, max_bytes: int = DEFAULT_READ_BYTES) -> str:
+        """Summarizes the job's state and its output from `offset` on."""
+        data, start, end = self.output.read(offset, max_bytes)
+        lines = [f"Job {self.job_id} ({self.command}): {self.status} after {self.elapsed:.1f}s."]
+        if start > offset:
+            lines.append(f"[{start - offset} bytes of output before offset {start} are no longer kept]")
+        if data:
+            lines.append(f"Output bytes {start}-{end}:")
+            lines.append(data.decode("utf-8", errors="replace"))
+        else:
+            lines.append("No new output.")
+        if end < self.output.total:
+            lines.append(f"[More output is available; read again from offset {end}]")
+        else:
+            lines.append(f"[Next output offset: {end}]")
+        return "\n".join(lines)
+
+
+class JobManager:
+    """Starts, tracks and stops background jobs, grouped by session.
+
+    Args:
+        max_jobs_per_session: Jobs that may run at the same time in one session
+        output_bytes: Bytes of recent output kept for each job
+    """
+
+    def __init__(self, max_jobs_per_session: int = DEFAULT_MAX_JOBS_PER_SESSION, output_bytes: int = DEFAULT_OUTPUT_BYTES):
+        self.max_jobs_per_session = max_jobs_per_session
+        self.output_bytes = output_bytes
+        self._jobs: Dict[str, BackgroundJob] = {}
+        self._ids = itertools.count(1)
+
+    @classmethod
+    def from_settings(cls, settings: Any) -> "JobManager":
+        """Creates a manager from the ``native_commands`` config section."""
+        return cls(max_jobs_per_session=settings.max_background_jobs, output_bytes=settings.background_output_bytes)
+
+    def jobs(self, session_id: str) -> List[BackgroundJob]:
+        """Returns the session's jobs, oldest first."""
+        return [job for job in self._jobs.values() if job.session_id == session_id]
+
+    def get(self, session_id: str, job_id: str) -> Optional[BackgroundJob]:
+        """Returns the job if it exists and belongs to the session."""
+        job = self._jobs.get(job_id)
+        return job if job is not None and job.session_id == session_id else None
+
+    async def start(self, session_id: str, args: List[str], working_directory: Optional[str] = None, command: Optional[str] = None) -> BackgroundJob:
+        """Starts `args` as a background job of the session.
+
+        Raises:
+            JobLimitError: If the session already runs `max_jobs_per_session` jobs
+            FileNotFoundError: If the program does not exist
+        """
+        jobs = self.jobs(session_id)
+        if sum(job.running for job in jobs) >= self.max_jobs_per_session:
+            raise JobLimitError(f"This session already runs {self.max_jobs_per_session} background job(s); wait for one to finish or kill one first.")
+
+        finished = [job for job in jobs if not job.running]
+        for job in finished[: max(len(finished) - _MAX_FINISHED_JOBS_PER_SESSION + 1, 0)]:
+            del self._jobs[job.job_id]
+
+        process = await asyncio.create_subprocess_exec(
+            *args,
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT,
+            cwd=working_directory,
+            # A process group of its own, so killing the job also stops the processes it started
+            start_new_session=True,
+        )
+        job = BackgroundJob(f"job-{next(self._ids)}", session_id, command or " ".join(args), process, self.output_bytes)
+        self._jobs[job.job_id] = job
+        logger.info(f"Started background job {job.job_id} (pid {process.pid}): {job.command}")
+        return job
+
+    async def kill(self, job: BackgroundJob) -> None:
+        """Stops the job's process group: SIGTERM first, then SIGKILL if it does not exit."""
+        if not job.running:
+            return
+        job.killed = True
+        _signal_group(job.process, signal.SIGTERM)
+        if await job.wait(_KILL_GRACE_SECONDS):
+            return
+        _signal_group(job.process, signal.SIGKILL)
+        await job.wait(_KILL_GRACE_SECONDS)
+        if not job._reader.done():
+            # A process that left the group still holds the output pipe open
+            job._reader.cancel()
+            await job.process.wait()
+        logger.info(f"Killed background job {job.job_id}")
+
+    async def close_session(self, session_id: str) -> int:
+        """Stops and forgets the session's jobs and returns how many were still running."""
+        jobs = self.jobs(session_id)
+        running = [job for job in jobs if job.running]
+        await asyncio.gather(*(self.kill(job) for job in running))
+        for job in jobs:
+            del self._jobs[job.job_id]
+        return len(running)
+
+    async def close_all(self) -> int:
+        """Closes every session and returns how many jobs were still running."""
+        counts = await asyncio.gather(*(self.close_session(session_id) for session_id in {job.session_id for job in self._jobs.values()}))
+        return sum(counts)
+
+    def kill_all_now(self) -> None:
+        """Sends SIGKILL to every running job without waiting; for interpreter exit."""
+        for job in self._jobs.values():
+            if job.running:
+                _signal_group(job.process, signal.SIGKILL)
+
+
+_job_manager: Optional[JobManager] = None
+
+
+def get_job_manager() -> JobManager:
+    """Returns the process-wide job manager, created from the config on first use."""
+    global _job_manager
+    if _job_manager is None:
+        settings = getattr(get_config(), "native_commands", None)
+        if not isinstance(settings, NativeCommandSettings):
+            settings = NativeCommandSettings()
+        _job_manager = JobManager.from_settings(settings)
+        # Jobs run in their own process groups and would outlive the agent otherwise
+        atexit.register(_job_manager.kill_all_now)
+    return _job_manager
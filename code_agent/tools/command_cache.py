@@ -0,0 +1,311 @@
+"""
+Result cache for read-only terminal commands.
+
+Agents re-run ``git status``, ``ls -la`` or ``git diff`` between edits even when
+nothing has changed. `CommandResultCache` answers such repeats without spawning a
+process. Only commands classified as read-only are cached, keyed by their argv,
+the working directory and a workspace generation counter:
+
+* Our own edit tools and every command that is not read-only bump the generation,
+  which invalidates all entries at once.
+* Changes made by anything else (an editor, a background job) are caught by
+  comparing stat fingerprints, taken again at most once per ``verify_seconds`` for
+  each entry. Commands that only read the paths they name (``cat``, ``ls``,
+  ``wc``, ...) fingerprint just those paths. Others (``git status``, ``grep -r``)
+  need an mtime scan of the whole working directory, and are not cached when that
+  scan takes longer than running the command did.
+"""
+
+import functools
+import logging
+import os
+import shlex
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar
+
+from code_agent.config.config import get_config
+from code_agent.config.settings_based_config import NativeCommandSettings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ENTRIES = 128
+DEFAULT_VERIFY_SECONDS = 1.0
+DEFAULT_MAX_SCAN_ENTRIES = 20_000
+
+CACHED_MARKER = "(cached)"
+
+# Programs whose output depends only on the files they read
+_READ_ONLY_PROGRAMS = frozenset({"cat", "diff", "du", "file", "find", "grep", "head", "ls", "pwd", "rg", "stat", "tail", "tree", "wc"})
+_READ_ONLY_GIT_COMMANDS = frozenset({"blame", "diff", "grep", "log", "ls-files", "rev-parse", "show", "status"})
+# Arguments that make an otherwise read-only command write, run other programs or never finish
+_UNSAFE_ARGUMENTS = frozenset({"-delete", "-exec", "-execdir", "-ok", "-okdir", "-fprint", "-fprint0", "-fprintf", "-fls", "-f", "--follow"})
+_UNSAFE_ARGUMENT_PREFIXES = ("--output", "--ext-diff")
+# Short flags that only write for particular programs (grep -o is read-only, tree -o writes a file)
+_UNSAFE_SHORT_FLAGS = {"tree": frozenset("o")}
+# Programs whose output depends only on the paths they name, and one level of a named directory
+_OPERAND_PROGRAMS = frozenset({"cat", "diff", "file", "head", "ls", "stat", "tail", "wc"})
+# Short flags that make an operand program descend into directories
+_RECURSIVE_SHORT_FLAGS = {"ls": frozenset("R"), "diff": frozenset("rR")}
+# Categories from native_tools._categorize_command that rule caching out
+_UNCACHEABLE_CATEGORIES = frozenset({"network", "system", "package_management"})
+# Directories the mtime scan skips; git state is covered by the files below
+_SKIPPED_DIRECTORIES = frozenset({".git", ".hg", ".svn", "node_modules", ".venv", "venv", "__pycache__", ".mypy_cache", ".pytest_cache", ".ruff_cache"})
+_GIT_STATE_FILES = ("HEAD", "index", "ORIG_HEAD", "FETCH_HEAD")
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+def read_only_argv(command: str, categories: Optional[List[str]] = None) -> Optional[List[str]]:
+    """Returns the command's argv if its result may be cached, else None.
+
+    Args:
+        command: The command line, as run without a shell
+        categories: The command's categories from ``_categorize_command``, if known
+    """
+    if categories and _UNCACHEABLE_CATEGORIES.intersection(categories):
+        return None
+    try:
+        argv = shlex.split(command)
+    except ValueError:
+        return None
+    if not argv:
+        return None
+    program = os.path.basename(argv[0])
+    if program == "git":
+        # Options before the subcommand (-C, -c) change what git reads or runs, so they are not allowed either
+        if len(argv) < 2 or argv[1] not in _READ_ONLY_GIT_COMMANDS:
+            return None
+    elif program not in _READ_ONLY_PROGRAMS:
+        return None
+    if any(arg in _UNSAFE_ARGUMENTS or arg.startswith(_UNSAFE_ARGUMENT_PREFIXES) for arg in argv[1:]):
+        return None
+    unsafe_flags = _UNSAFE_SHORT_FLAGS.get(program)
+    # Short flags may be bundled, e.g. tree -ao out.txt
+    if unsafe_flags and any(arg.startswith("-") and not arg.startswith("--") and not unsafe_flags.isdisjoint(arg[1:]) for arg in argv[1:]):
+        return None
+    # The mtime scan only covers the working directory, so nothing outside it may be read
+    if any(arg.startswith(("/", "~")) or ".." in Path(arg).parts for arg in argv[1:]):
+        return None
+    return argv
+
+
+def workspace_fingerprint(directory: str, max_entries: int = DEFAULT_MAX_SCAN_ENTRIES) -> Optional[Tuple[int, int, int]]:
+    """Summarizes the tree under `directory` as (entries, newest mtime, total size).
+
+    Directory mtimes catch added, removed and renamed files; file mtimes and sizes
+    catch edits. Returns None when the tree has more than `max_entries` entries.
+    """
+    count = newest = total = 0
+    pending = [directory]
+    while pending:
+        current = pending.pop()
+        try:
+            with os.scandir(current) as entries:
+                stat = os.stat(current)
+                newest = max(newest, stat.st_mtime_ns)
+                for entry in entries:
+                    count += 1
+                    if count > max_entries:
+                        return None
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.name not in _SKIPPED_DIRECTORIES:
+                            pending.append(entry.path)
+                        continue
+                    stat = entry.stat(follow_symlinks=False)
+                    newest = max(newest, stat.st_mtime_ns)
+                    total += stat.st_size
+        except OSError:
+            continue
+    # git commands also depend on the repository's state, which may live in a parent directory
+    git_dir = next((parent / ".git" for parent in (Path(directory), *Path(directory).parents) if (parent / ".git").is_dir()), None)
+    for name in _GIT_STATE_FILES if git_dir else ():
+        try:
+            stat = (git_dir / name).stat()
+        except OSError:
+            continue
+        newest = max(newest, stat.st_mtime_ns)
+        total += stat.st_size
+    return count, newest, total
+
+
+def _stat_key(stat: os.stat_result) -> Tuple[int, int, int, int]:
+    return stat.st_mtime_ns, stat.st_ctime_ns, stat.st_size, stat.st_ino
+
+
+def operand_fingerprint(argv: List[str], directory: str, max_entries: int = DEFAULT_MAX_SCAN_ENTRIES) -> Optional[Tuple[Any, ...]]:
+    """Summarizes only the paths `argv` names, for programs whose output depends on nothing else.
+
+    A named directory is summarized one level deep. Costs a few stat calls however
+    large the tree is. Returns None for other commands (including recursive ones and
+    those reading stdin), or when a named directory has more than `max_entries` entries.
+    """
+    program = os.path.basename(argv[0])
+    if program not in _OPERAND_PROGRAMS:
+        return None
+    recursive = _RECURSIVE_SHORT_FLAGS.get(program, frozenset())
+    operands = []
+    for arg in argv[1:]:
+        if arg == "--recursive" or (arg.startswith("-") and not arg.startswith("--") and not recursive.isdisjoint(arg[1:])):
+            return None
+        if not arg.startswith("-"):
+            # Flag values (head -n 5) are stat'ed as well; a missing path is part of the summary too
+            operands.append(arg)
+    if not operands:
+        if program != "ls":
+            return None
+        operands = ["."]
+
+    summary: List[Any] = []
+    count = 0
+    for operand in operands:
+        path = os.path.join(directory, operand)
+        try:
+            summary.append((operand, _stat_key(os.stat(path))))
+        except OSError:
+            summary.append((operand, None))
+            continue
+        if not os.path.isdir(path):
+            continue
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    count += 1
+                    if count > max_entries:
+                        return None
+                    summary.append((entry.path, _stat_key(entry.stat(follow_symlinks=False))))
+        except OSError:
+            continue
+    return tuple(summary)
+
+
+class _Entry:
+    __slots__ = ("fingerprint", "generation", "result", "verified")
+
+    def __init__(self, result: str, generation: int, fingerprint: Tuple[Any, ...], verified: float):
+        self.result = result
+        self.generation = generation
+        self.fingerprint = fingerprint
+        self.verified = verified
+
+
+class CommandResultCache:
+    """Caches the output of read-only commands until the workspace changes.
+
+    Args:
+        max_entries: Results kept; the least recently used are dropped first
+        verify_seconds: Time after which an entry's fingerprint is taken again before it is reused
+        max_scan_entries: Directories with more entries than this are never cached
+    """
+
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        verify_seconds: float = DEFAULT_VERIFY_SECONDS,
+        max_scan_entries: int = DEFAULT_MAX_SCAN_ENTRIES,
+    ):
+        self.max_entries = max_entries
+        self.verify_seconds = verify_seconds
+        self.max_scan_entries = max_scan_entries
+        self.generation = 0
+
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Tuple[Tuple[str, ...], str], _Entry]" = OrderedDict()
+
+    @classmethod
+    def from_settings(cls, settings: Any) -> "CommandResultCache":
+        """Creates a cache from the ``native_commands`` config section."""
+        return cls(max_entries=settings.command_cache_entries, verify_seconds=settings.command_cache_verify_seconds)
+
+    def invalidate(self) -> None:
+        """Records a workspace change; every cached result becomes stale."""
+        self.generation += 1
+        self._entries.clear()
+
+    @staticmethod
+    def _key(argv: List[str], cwd: Optional[str]) -> Tuple[Tuple[str, ...], str]:
+        return tuple(argv), os.path.realpath(cwd or os.getcwd())
+
+    def _fingerprint(self, argv: List[str], directory: str) -> Optional[Tuple[Any, ...]]:
+        fingerprint = operand_fingerprint(argv, directory, self.max_scan_entries)
+        return fingerprint if fingerprint is not None else workspace_fingerprint(directory, self.max_scan_entries)
+
+    def get(self, argv: List[str], cwd: Optional[str] = None) -> Optional[str]:
+        """Returns the cached result of `argv` run in `cwd`, if the workspace has not changed since."""
+        key = self._key(argv, cwd)
+        entry = self._entries.get(key)
+        if entry is None or entry.generation != self.generation:
+            self.misses += 1
+            return None
+        now = time.monotonic()
+        if now - entry.verified >= self.verify_seconds:
+            if self._fingerprint(argv, key[1]) != entry.fingerprint:
+                # Changed by something other than our tools: nothing cached is current
+                logger.debug(f"Workspace changed under {key[1]}; dropping cached command results")
+                self.invalidate()
+                self.misses += 1
+                return None
+            entry.verified = now
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry.result
+
+    def put(self, argv: List[str], result: str, cwd: Optional[str] = None, elapsed: Optional[float] = None) -> None:
+        """Caches the result of `argv` run in `cwd` unless checking it for changes costs too much.
+
+        Args:
+            argv: The command that was run
+            result: Its formatted output
+            cwd: The directory it ran in
+            elapsed: Seconds the command took; a fingerprint that takes longer than this is not worth keeping
+        """
+        key = self._key(argv, cwd)
+        started = time.perf_counter()
+        fingerprint = self._fingerprint(argv, key[1])
+        if fingerprint is None:
+            return
+        if elapsed is not None and time.perf_counter() - started >= elapsed:
+            logger.debug(f"Not caching {argv[0]}: checking {key[1]} for changes takes longer than running it")
+            return
+        self._entries[key] = _Entry(result, self.generation, fingerprint, time.monotonic())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self._entries), "generation": self.generation, "hits": self.hits, "misses": self.misses}
+
+
+_command_cache: Optional[CommandResultCache] = None
+
+
+def get_command_cache() -> CommandResultCache:
+    """Returns the process-wide command result cache, configured on first use."""
+    global _command_cache
+    if _command_cache is None:
+        settings = getattr(get_config(), "native_commands", None)
+        if not isinstance(settings, NativeCommandSettings):
+            settings = NativeCommandSettings()
+        _command_cache = CommandResultCache.from_settings(settings)
+    return _command_cache
+
+
+def note_workspace_change() -> None:
+    """Invalidates cached command results; called by tools that modify files."""
+    if _command_cache is not None:
+        _command_cache.invalidate()
+
+
+def invalidates_command_cache(func: F) -> F:
+    """Decorates a file-modifying tool so cached command results are dropped after it runs."""
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        finally:
+            note_workspace_change()
+
+    return wrapper  # type: ignore[return-value]
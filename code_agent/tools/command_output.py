@@ -0,0 +1,217 @@
+"""
+Bounded capture of a running command's output.
+
+`OutputCapture` reads a subprocess's stdout and stderr as they are produced instead
+of buffering everything with ``communicate()``. Each stream keeps only its first and
+last bytes in memory; the rest is summarized by a marker. Once the output grows
+past what the buffers hold, everything is also written to a temporary file so the
+full output stays available. A total byte cap stops the command early.
+"""
+
+import asyncio
+import codecs
+import tempfile
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+DEFAULT_HEAD_BYTES = 16 * 1024
+DEFAULT_TAIL_BYTES = 16 * 1024
+DEFAULT_MAX_OUTPUT_BYTES = 100 * 1024 * 1024
+
+_READ_CHUNK_BYTES = 64 * 1024
+# Longest unfinished line held for echoing; longer ones are echoed in pieces of this size
+_MAX_ECHO_LINE_CHARS = 4 * 1024
+
+# Called with the stream name ("stdout" or "stderr") and one line of output, without the newline
+EchoCallback = Callable[[str, str], None]
+
+
+class HeadTailBuffer:
+    """Keeps the first `head_bytes` and the last `tail_bytes` of a byte stream."""
+
+    def __init__(self, head_bytes: int = DEFAULT_HEAD_BYTES, tail_bytes: int = DEFAULT_TAIL_BYTES):
+        self.head_bytes = head_bytes
+        self.tail_bytes = tail_bytes
+        self.total = 0
+        self._head = bytearray()
+        self._tail = bytearray()
+
+    def append(self, data: bytes) -> None:
+        self.total += len(data)
+        room = self.head_bytes - len(self._head)
+        if room > 0:
+            self._head += data[:room]
+            data = data[room:]
+        if data and self.tail_bytes:
+            self._tail += data
+            if len(self._tail) > self.tail_bytes:
+                del self._tail[: len(self._tail) - self.tail_bytes]
+
+    @property
+    def omitted(self) -> int:
+        """Number of bytes dropped from the middle of the stream."""
+        return self.total - len(self._head) - len(self._tail)
+
+    def text(self) -> str:
+        """Returns the kept output as text, with a marker where bytes were omitted."""
+        if not self.omitted:
+            return bytes(self._head + self._tail).decode("utf-8", errors="replace")
+        head = self._head.decode("utf-8", errors="replace")
+        tail = self._tail.decode("utf-8", errors="replace")
+        return f"{head}\n... [{self.omitted} bytes omitted] ...\n{tail}"
+
+
+class CommandOutput:
+    """Output captured from one command."""
+
+    def __init__(self, head_bytes: int, tail_bytes: int):
+        self.stdout = HeadTailBuffer(head_bytes, tail_bytes)
+        self.stderr = HeadTailBuffer(head_bytes, tail_bytes)
+        self.spill_path: Optional[Path] = None
+        """File holding the full output (stdout and stderr as received), if it was truncated."""
+        self.limit_exceeded = False
+        """Whether the command was stopped for producing more than the byte cap."""
+
+    @property
+    def total_bytes(self) -> int:
+        return self.stdout.total + self.stderr.total
+
+    @property
+    def truncated(self) -> bool:
+        return bool(self.stdout.omitted or self.stderr.omitted)
+
+    def notes(self, max_bytes: Optional[int] = None) -> List[str]:
+        """Returns notes about truncation and early termination for the command's result."""
+        notes = []
+        if self.truncated:
+            location = f"; the full output is in {self.spill_path}" if self.spill_path else ""
+            notes.append(f"[Output truncated: {self.total_bytes} bytes in total{location}]")
+        if self.limit_exceeded:
+            notes.append(f"[Output exceeded the {max_bytes} byte limit; the command was stopped]")
+        return notes
+
+
+class _LimitExceeded(Exception):
+    pass
+
+
+class OutputCapture:
+    """Reads a subprocess's output with bounded memory.
+
+    Args:
+        head_bytes: Bytes kept from the start of each stream
+        tail_bytes: Bytes kept from the end of each stream
+        max_bytes: Total bytes (both streams) after which the process is killed; None for no cap
+        spill: Write the full output to a temporary file when it does not fit the buffers
+        echo: Called with each complete line as it arrives, for live display
+    """
+
+    def __init__(
+        self,
+        head_bytes: int = DEFAULT_HEAD_BYTES,
+        tail_bytes: int = DEFAULT_TAIL_BYTES,
+        max_bytes: Optional[int] = DEFAULT_MAX_OUTPUT_BYTES,
+        spill: bool = True,
+        echo: Optional[EchoCallback] = None,
+    ):
+        self.head_bytes = head_bytes
+        self.tail_bytes = tail_bytes
+        self.max_bytes = max_bytes
+        self.spill = spill
+        self.echo = echo
+
+        self.output = CommandOutput(head_bytes, tail_bytes)
+        # Chunks received before spilling starts; at most the buffers' size plus one chunk
+        self._unspilled: List[bytes] = []
+        self._unspilled_bytes = 0
+        self._spill_file: Any = None
+        self._line_buffers: Dict[str, Tuple[Any, str]] = {}
+
+    @classmethod
+    def from_settings(cls, settings: Any, echo: Optional[EchoCallback] = None) -> "OutputCapture":
+        """Creates a capture from the ``native_commands`` config section."""
+        return cls(
+            head_bytes=settings.output_head_bytes,
+            tail_bytes=settings.output_tail_bytes,
+            max_bytes=settings.max_output_bytes,
+            spill=settings.spill_output,
+            echo=echo,
+        )
+
+    async def read(self, process: asyncio.subprocess.Process) -> CommandOutput:
+        """Reads the process's stdout and stderr until both close or the byte cap is hit.
+
+        The process is killed when the cap is exceeded; the caller still waits for it.
+        The partial output remains in `output` if reading is cancelled, for example on timeout.
+        """
+        streams = [(name, stream) for name, stream in (("stdout", process.stdout), ("stderr", process.stderr)) if stream is not None]
+        tasks = [asyncio.create_task(self._pump(name, stream)) for name, stream in streams]
+        try:
+            await asyncio.gather(*tasks)
+        except _LimitExceeded:
+            self.output.limit_exceeded = True
+            try:
+                process.kill()
+            except ProcessLookupError:
+                pass
+        finally:
+            for task in tasks:
+                task.cancel()
+            self._finish()
+        return self.output
+
+    async def _pump(self, name: str, stream: asyncio.StreamReader) -> None:
+        buffer = getattr(self.output, name)
+        while True:
+            chunk = await stream.read(_READ_CHUNK_BYTES)
+            if not chunk:
+                self._echo(name, b"", final=True)
+                return
+            buffer.append(chunk)
+            self._record(chunk)
+            self._echo(name, chunk)
+            if self.max_bytes is not None and self.output.total_bytes > self.max_bytes:
+                raise _LimitExceeded()
+
+    def _record(self, chunk: bytes) -> None:
+        if not self.spill:
+            return
+        if self._spill_file is None:
+            self._unspilled.append(chunk)
+            self._unspilled_bytes += len(chunk)
+            if self._unspilled_bytes <= self.head_bytes + self.tail_bytes:
+                return
+            # More output than the buffers can hold: from now on keep all of it on disk
+            self._spill_file = tempfile.NamedTemporaryFile(prefix="code-agent-output-", suffix=".log", delete=False)
+            self.output.spill_path = Path(self._spill_file.name)
+            chunks, self._unspilled = self._unspilled, []
+            for pending in chunks:
+                self._spill_file.write(pending)
+            return
+        self._spill_file.write(chunk)
+
+    def _echo(self, name: str, chunk: bytes, final: bool = False) -> None:
+        if self.echo is None:
+            return
+        decoder, partial = self._line_buffers.get(name) or (codecs.getincrementaldecoder("utf-8")(errors="replace"), "")
+        *lines, partial = (partial + decoder.decode(chunk, final=final)).split("\n")
+        if final and partial:
+            lines.append(partial)
+            partial = ""
+        # Otherwise one huge line would be held, and re-concatenated on every chunk, until it ends
+        while len(partial) > _MAX_ECHO_LINE_CHARS:
+            lines.append(partial[:_MAX_ECHO_LINE_CHARS])
+            partial = partial[_MAX_ECHO_LINE_CHARS:]
+        self._line_buffers[name] = (decoder, partial)
+        for line in lines:
+            self.echo(name, line.rstrip("\r"))
+
+    def _finish(self) -> None:
+        if self._spill_file is None:
+            return
+        self._spill_file.close()
+        self._spill_file = None
+        # Both streams fit their buffers after all (only their sum did not): nothing to refer to
+        if not self.output.truncated and self.output.spill_path is not None:
+            self.output.spill_path.unlink(missing_ok=True)
+            self.output.spill_path = None
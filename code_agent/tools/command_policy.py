@@ -0,0 +1,345 @@
+"""
+Compiled command policy used by ``security.is_command_safe``.
+
+Checking a command against the dangerous and risky patterns one ``re.search`` at a
+time costs a regex scan per rule. `CommandPolicy` instead indexes each rule by a
+three-character slice of literal text every match must contain (``sud`` for
+``sudo\\s+rm``), picking the slice the fewest other rules share. One set
+intersection with the command's own slices finds the few rules that could match,
+and only those are searched. Rules without literal text share one alternation,
+scanned once, and are searched only if it matches. The cost of a check therefore
+grows with the number of rules that could match, not with the size of the rule
+set. Rules are tried in list order, dangerous before risky, so the reported
+pattern is the one a linear scan would report.
+
+Allowlist entries are ``shlex``-split into a token trie. A command is allowlisted
+only if every segment of its pipelines and ``&&``/``||``/``;`` chains starts with
+an allowlisted token sequence, so ``ls && rm -rf build`` is not covered by ``ls``.
+
+Policies are cached per config generation: a new policy is compiled when the
+pattern or allowlist lists are replaced (as loading a config does) or change
+length; the same lists keep returning the compiled policy.
+"""
+
+import re
+import shlex
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Pattern, Sequence, Tuple
+
+# Tokens that separate the commands of a pipeline or chain
+_SEGMENT_OPERATORS = frozenset({"|", "||", "|&", "&&", "&", ";", ";;"})
+_OPERATOR_CHARACTERS = frozenset("|&;")
+_METACHARACTERS = frozenset(".^$*+?{}[]|()")
+_QUANTIFIERS = frozenset("*+?{")
+_BRACE_QUANTIFIER = re.compile(r"\{\d*,?\d*\}")
+# What follows a backslash in an escape that is not a plain literal: code points, named
+# characters, octal escapes and group references, or a single-letter class or anchor
+_ESCAPE_PAYLOAD = re.compile(r"x[0-9A-Fa-f]{0,2}|u[0-9A-Fa-f]{0,4}|U[0-9A-Fa-f]{0,8}|N\{[^}]*\}?|\d{1,3}|.", re.DOTALL)
+# Patterns with global flags or relying on their own group names or numbers cannot share one alternation
+_NOT_COMBINABLE = re.compile(r"\\[1-9]|\(\?P[<=]|\(\?<[^=!]|\(\?[aiLmsux]+\)")
+
+# Rules whose flags change what a literal matches cannot be indexed by their literals
+_UNINDEXABLE_FLAGS = re.IGNORECASE | re.VERBOSE
+
+_TERMINAL = ""
+
+
+@dataclass(frozen=True)
+class CommandVerdict:
+    """Outcome of checking one command against a `CommandPolicy`."""
+
+    is_safe: bool
+    """False only if the command must be blocked."""
+    reason: str
+    is_warning: bool
+    pattern: Optional[str] = None
+    """The dangerous or risky pattern that matched, if any."""
+
+
+SAFE = CommandVerdict(True, "", False)
+
+
+def _skip_class(pattern: str, index: int) -> int:
+    """Returns the index after the character class opening at `index`."""
+    end = index + 1
+    if pattern[end : end + 1] == "^":
+        end += 1
+    # A ']' right at the start is a literal
+    if pattern[end : end + 1] == "]":
+        end += 1
+    while end < len(pattern) and pattern[end] != "]":
+        end += 2 if pattern[end] == "\\" else 1
+    return end + 1
+
+
+def _has_top_level_alternation(pattern: str) -> bool:
+    depth = 0
+    index = 0
+    while index < len(pattern):
+        char = pattern[index]
+        if char == "\\":
+            index += 2
+            continue
+        if char == "[":
+            index = _skip_class(pattern, index)
+            continue
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "|" and depth == 0:
+            return True
+        index += 1
+    return False
+
+
+def required_literals(pattern: str) -> List[str]:
+    """Returns runs of literal text that every match of `pattern` contains.
+
+    Errs on the side of returning less: groups, classes and anything not plainly
+    a literal end a run, and a pattern with a top-level ``|`` has none.
+    """
+    if _has_top_level_alternation(pattern):
+        return []
+    runs: List[str] = []
+    run: List[str] = []
+    depth = 0
+    index = 0
+    while index < len(pattern):
+        char = pattern[index]
+        literal = None
+        if char == "\\":
+            escaped = pattern[index + 1 : index + 2]
+            if escaped and not escaped.isalnum():
+                literal = escaped
+                index += 2
+            else:
+                # Letters and digits after a backslash are classes, anchors, references or character codes
+                # (\x2f), which end the run; their payload is not literal text either
+                payload = _ESCAPE_PAYLOAD.match(pattern, index + 1)
+                index = payload.end() if payload else index + 1
+        elif char == "[":
+            index = _skip_class(pattern, index)
+        elif char == "{" and (quantifier := _BRACE_QUANTIFIER.match(pattern, index)):
+            index = quantifier.end()
+        elif char == "(":
+            depth += 1
+            index += 1
+        elif char == ")":
+            depth -= 1
+            index += 1
+        elif char in _METACHARACTERS:
+            index += 1
+        else:
+            literal = char
+            index += 1
+        # Literals inside groups may be optional; a quantified literal may be absent or repeated
+        if literal is not None and depth == 0 and (index >= len(pattern) or pattern[index] not in _QUANTIFIERS):
+            run.append(literal)
+            continue
+        if run:
+            runs.append("".join(run))
+            run = []
+    if run:
+        runs.append("".join(run))
+    return runs
+
+
+def split_segments(command: str) -> List[List[str]]:
+    """Splits a command line into the argv of each command in its pipelines and chains.
+
+    Unbalanced quotes make the line unparseable for the shell as well; it is then
+    split on whitespace as a single segment.
+    """
+    if not _OPERATOR_CHARACTERS.intersection(command):
+        try:
+            return [shlex.split(command)]
+        except ValueError:
+            return [command.split()]
+    lexer = shlex.shlex(command, posix=True, punctuation_chars=True)
+    lexer.whitespace_split = True
+    segments: List[List[str]] = [[]]
+    try:
+        for token in lexer:
+            if token in _SEGMENT_OPERATORS:
+                segments.append([])
+            else:
+                segments[-1].append(token)
+    except ValueError:
+        return [command.split()]
+    return [segment for segment in segments if segment]
+
+
+class _AllowlistTrie:
+    """Token-prefix trie over allowlisted command prefixes."""
+
+    def __init__(self, entries: Iterable[str]):
+        self._root: Dict[str, dict] = {}
+        self.size = 0
+        for entry in entries:
+            if not isinstance(entry, str) or not entry.strip():
+                continue
+            try:
+                tokens = shlex.split(entry)
+            except ValueError:
+                tokens = entry.split()
+            node = self._root
+            for token in tokens:
+                node = node.setdefault(token, {})
+            node[_TERMINAL] = {}
+            self.size += 1
+
+    def covers(self, argv: Sequence[str]) -> bool:
+        """Whether some allowlisted token sequence is a prefix of `argv`."""
+        node = self._root
+        for token in argv:
+            if _TERMINAL in node:
+                return True
+            node = node.get(token)
+            if node is None:
+                return False
+        return _TERMINAL in node
+
+
+class _Rule:
+    __slots__ = ("compiled", "dangerous", "pattern")
+
+    def __init__(self, pattern: str, compiled: Pattern[str], dangerous: bool):
+        self.pattern = pattern
+        self.compiled = compiled
+        self.dangerous = dangerous
+
+
+def _compile_alternation(rules: List[_Rule]) -> Optional[Pattern[str]]:
+    if not rules:
+        return None
+    # Capturing groups would cost the regex engine its prefix optimizations, so the rule is identified separately
+    return re.compile("|".join(f"(?:{rule.pattern})" for rule in rules))
+
+
+class CommandPolicy:
+    """Dangerous and risky command patterns plus an allowlist, compiled for fast checks.
+
+    Args:
+        dangerous_patterns: Regexes of commands that are always blocked
+        risky_patterns: Regexes of commands that are allowed with a warning
+        allowlist: Command prefixes, such as ``git status``, that need no confirmation
+
+    Invalid regexes are skipped, as they always have been.
+    """
+
+    def __init__(self, dangerous_patterns: Iterable[str], risky_patterns: Iterable[str], allowlist: Iterable[str] = ()):
+        # Dangerous rules first: rule order is precedence order
+        self._rules: List[_Rule] = []
+        for dangerous, patterns in ((True, dangerous_patterns), (False, risky_patterns)):
+            for pattern in patterns:
+                try:
+                    self._rules.append(_Rule(pattern, re.compile(pattern), dangerous))
+                except (re.error, TypeError):
+                    continue
+
+        # Index each rule by the trigram of its required text that the fewest rules share
+        trigrams = [self._trigrams(rule) for rule in self._rules]
+        frequency = Counter(trigram for rule_trigrams in trigrams for trigram in rule_trigrams)
+        index: Dict[Tuple[str, str, str], List[int]] = {}
+        unindexed: List[int] = []
+        always: List[int] = []
+        for rule_id, rule in enumerate(self._rules):
+            if trigrams[rule_id]:
+                index.setdefault(min(trigrams[rule_id], key=frequency.__getitem__), []).append(rule_id)
+            elif _NOT_COMBINABLE.search(rule.pattern):
+                always.append(rule_id)
+            else:
+                unindexed.append(rule_id)
+        try:
+            self._unindexed_filter = _compile_alternation([self._rules[rule_id] for rule_id in unindexed])
+            self._unindexed_dangerous_filter = _compile_alternation([self._rules[rule_id] for rule_id in unindexed if self._rules[rule_id].dangerous])
+        except re.error:
+            # Some combination of patterns the checks above did not foresee: search them one by one
+            self._unindexed_filter = self._unindexed_dangerous_filter = None
+            always, unindexed = sorted(always + unindexed), []
+        self._index = {gram: tuple(rule_ids) for gram, rule_ids in index.items()}
+        self._grams = frozenset(self._index)
+        self._always = tuple(always)
+        self._unindexed = tuple(unindexed)
+        self._allowlist = _AllowlistTrie(allowlist)
+
+    @staticmethod
+    def _trigrams(rule: _Rule) -> List[Tuple[str, str, str]]:
+        if rule.compiled.flags & _UNINDEXABLE_FLAGS:
+            return []
+        # Ordered and de-duplicated, so ties go to the earliest trigram
+        return list(dict.fromkeys(trigram for run in required_literals(rule.pattern) for trigram in zip(run, run[1:], run[2:], strict=False)))
+
+    @property
+    def rule_count(self) -> int:
+        return len(self._rules)
+
+    def _candidates(self, command: str, check_risky: bool) -> List[int]:
+        """Ids of the rules that may match `command`, in precedence order."""
+        rule_ids = list(self._always)
+        # One scan rejects all rules without literal text unless one of them matches
+        unindexed_filter = self._unindexed_filter if check_risky else self._unindexed_dangerous_filter
+        if unindexed_filter is not None and unindexed_filter.search(command):
+            rule_ids.extend(self._unindexed)
+        # Indexed rules are candidates only if their trigram occurs in the command
+        for gram in self._grams.intersection(zip(command, command[1:], command[2:], strict=False)):
+            rule_ids.extend(self._index[gram])
+        rule_ids.sort()
+        return rule_ids
+
+    def check(self, command: str, check_risky: bool = True) -> CommandVerdict:
+        """Checks `command` against the dangerous and, if `check_risky`, the risky patterns.
+
+        When several rules match, the first dangerous one is reported, else the first risky one.
+        """
+        for rule_id in self._candidates(command, check_risky):
+            rule = self._rules[rule_id]
+            if not rule.dangerous:
+                # Every dangerous candidate has been tried
+                if not check_risky:
+                    break
+                if rule.compiled.search(command):
+                    return _risky(rule.pattern)
+            elif rule.compiled.search(command):
+                return _dangerous(rule.pattern)
+        return SAFE
+
+    def is_allowlisted(self, command: str) -> bool:
+        """Whether every command in the line's pipelines and chains starts with an allowlisted prefix."""
+        if not self._allowlist.size:
+            return False
+        segments = split_segments(command)
+        return bool(segments) and all(self._allowlist.covers(segment) for segment in segments)
+
+
+def _dangerous(pattern: str) -> CommandVerdict:
+    return CommandVerdict(False, f"Command matches dangerous pattern: {pattern}", False, pattern)
+
+
+def _risky(pattern: str) -> CommandVerdict:
+    return CommandVerdict(True, f"Command matches risky pattern: {pattern}", True, pattern)
+
+
+def _as_list(value: object) -> list:
+    try:
+        return list(value)  # type: ignore[call-overload]
+    except TypeError:
+        return []
+
+
+_cached: Optional[Tuple[Tuple[object, ...], Tuple[int, ...], CommandPolicy]] = None
+
+
+def get_command_policy(dangerous_patterns: Sequence[str], risky_patterns: Sequence[str], allowlist: Sequence[str]) -> CommandPolicy:
+    """Returns the compiled policy for these lists, compiling it only when they change."""
+    global _cached
+    sources = (dangerous_patterns, risky_patterns, allowlist)
+    sizes = tuple(len(source) if hasattr(source, "__len__") else -1 for source in sources)
+    cached = _cached
+    if cached is not None and cached[1] == sizes and all(old is new for old, new in zip(cached[0], sources, strict=True)):
+        return cached[2]
+    policy = CommandPolicy(_as_list(dangerous_patterns), _as_list(risky_patterns), _as_list(allowlist))
+    _cached = (sources, sizes, policy)
+    return policy
@@ -14,12 +14,13 @@ from rich.table import Table
 from rich.text import Text
 
 from code_agent.config import initialize_config
+from code_agent.tools.command_cache import invalidates_command_cache
 from code_agent.tools.error_utils import (
     format_file_error,
     format_path_restricted_error,
 )
 from code_agent.tools.progress_indicators import file_operation_indicator, operation_complete, operation_warning, step_progress
-from code_agent.tools.security import is_path_safe
+from code_agent.tools.security import is_path_safe, validate_paths
 
 console = Console()
 
@@ -177,6 +178,12 @@ def find_files(root_dir: str, pattern: str = "*", max_depth: Optional[int] = Non
         # Start the search
         search_directory(root)
 
+        # A symlinked file can resolve outside the workspace; every match is checked in one batch,
+        # spelled as under the root the caller gave, since absolute paths are always outside it
+        candidates = [str(Path(root_dir) / Path(match).relative_to(root)) for match in matching_files]
+        verdicts = validate_paths(candidates)
+        matching_files = [match for match, (is_safe, _) in zip(matching_files, verdicts, strict=True) if is_safe]
+
         # Sort the results for consistent output
         matching_files.sort()
 
@@ -189,6 +196,7 @@ def find_files(root_dir: str, pattern: str = "*", max_depth: Optional[int] = Non
         return []
 
 
+@invalidates_command_cache
 def write_file(path: str, content: str, create_parent_dirs: bool = True) -> str:
     """
     Write content to a file, optionally creating parent directories.
@@ -368,6 +376,7 @@ async def read_file(args: ReadFileArgs) -> str:
 
 
 # --- Delete File Tool Function ---
+@invalidates_command_cache
 def delete_file(path: str) -> str:
     """Deletes a file at the given path, restricted to CWD."""
     is_safe, reason = is_path_safe(path)
@@ -443,6 +452,7 @@ def _get_file_metadata(file_path: Path) -> dict:
         }
 
 
+@invalidates_command_cache
 def apply_edit(target_file: str, code_edit: str) -> str:
     """Apply a code edit to a file.
 
@@ -1,9 +1,10 @@
 import asyncio
 import shlex
+import time
 from typing import List, Optional, Tuple
 
 from pydantic import BaseModel, Field
-from rich import box, print
+from rich import box, get_console, print
 from rich.console import Console
 from rich.panel import Panel
 from rich.prompt import Confirm
@@ -12,8 +13,14 @@ from rich.table import Table
 from rich.text import Text
 
 from code_agent.config.config import get_config
+from code_agent.config.settings_based_config import NativeCommandSettings
+from code_agent.telemetry import traced
+from code_agent.tools.background_jobs import JobLimitError, get_job_manager
+from code_agent.tools.command_cache import CACHED_MARKER, get_command_cache, note_workspace_change, read_only_argv
+from code_agent.tools.command_output import OutputCapture
 from code_agent.tools.progress_indicators import command_execution_indicator, operation_complete, operation_error, step_progress
-from code_agent.tools.security import is_command_safe
+from code_agent.tools.security import is_command_allowlisted, is_command_safe
+from code_agent.tools.shell_session import get_shell_pool, uses_shell_syntax
 
 # --- Native Terminal Command Execution ---
 
@@ -124,17 +131,56 @@ def _analyze_command_impact(command: str) -> Tuple[str, List[str]]:
     return impact_level, warnings
 
 
-async def run_native_command(command: str, working_directory: Optional[str] = None, timeout: Optional[int] = None) -> str:
-    """Executes a native terminal command after approval checks (async)."""
-    config = get_config()
+def _echo_output_line(stream: str, line: str) -> None:
+    """Shows one line of a running command's output above the progress spinner."""
+    get_console().print(line, style="red" if stream == "stderr" else "dim", markup=False, highlight=False)
 
-    # Use config defaults if values not provided
-    if working_directory is None and hasattr(config, "native_commands"):
-        working_directory = getattr(config.native_commands, "default_working_directory", None)
 
-    if timeout is None and hasattr(config, "native_commands"):
-        timeout = getattr(config.native_commands, "default_timeout", None)
+def _native_command_settings(config) -> NativeCommandSettings:
+    """Returns the 'native_commands' settings, or the defaults when the config has none."""
+    settings = getattr(config, "native_commands", None)
+    return settings if isinstance(settings, NativeCommandSettings) else NativeCommandSettings()
+
+
+def _output_capture(config) -> OutputCapture:
+    """Creates the output capture for a command from the 'native_commands' settings."""
+    settings = _native_command_settings(config)
+    return OutputCapture.from_settings(settings, echo=_echo_output_line if settings.echo_output else None)
+
+
+async def _run_in_persistent_shell(command: str, session_id: str, working_directory: Optional[str], timeout: Optional[int]) -> str:
+    """Runs an approved command in the session's persistent shell and formats the result like a spawned command's."""
+    with command_execution_indicator(command):
+        result = await get_shell_pool().get(session_id).run(command, working_directory=working_directory, timeout=timeout)
+
+    if result.timed_out:
+        error_message = f"Command timed out after {timeout} seconds"
+        operation_error(error_message)
+        partial_output = result.stdout.strip()
+        if partial_output:
+            error_message += f"\n\nOutput before the timeout:\n{partial_output}"
+        return error_message + "\n[The persistent shell was restarted; directory and environment changes were reset]"
+
+    output = result.stdout
+    if result.return_code != 0:
+        output += f"\n\n[red]Error (exit code: {result.return_code}):[/red]\n{result.stderr}"
+        operation_error(f"Command failed with exit code {result.return_code}")
+    else:
+        operation_complete("Command executed successfully")
+    if result.shell_exited:
+        output = output.strip() + "\n\n[The command ended the persistent shell; the next command starts a new one]"
+    return output.strip()
+
+
+async def review_native_command(command: str, working_directory: Optional[str], timeout: Optional[int], config, shell: bool = False) -> Optional[str]:
+    """Runs the security checks on a command, shows it, and asks for confirmation when needed.
+
+    Args:
+        shell: Whether the command runs in a persistent shell, which expands what a spawned process gets literally
 
+    Returns:
+        None if the command may run, otherwise the message explaining why it may not
+    """
     step_progress("Validating command", "blue")
     # Security check for command
     is_safe, reason, is_warning = is_command_safe(command)
@@ -146,6 +192,13 @@ async def run_native_command(command: str, working_directory: Optional[str] = No
         print(Panel(f"[red]{reason}[/red]", title="⚠️ [bold red]SECURITY VIOLATION[/bold red]", border_style="red"))
         return f"Command execution not permitted: {reason}"
 
+    # The safety checks and the allowlist see plain arguments; in a shell, ~, $VAR, globs and operators expand
+    shell_expanded = shell and uses_shell_syntax(command)
+    if shell_expanded:
+        shell_reason = "The persistent shell expands this command's operators, substitutions, variables, globs or ~"
+        reason = f"{reason}\n{shell_reason}" if is_warning and reason else shell_reason
+        is_warning = True
+
     step_progress("Analyzing command impact", "blue")
     # Get more context about the command
     command_categories = _categorize_command(command)
@@ -156,9 +209,6 @@ async def run_native_command(command: str, working_directory: Optional[str] = No
     cmd_table.add_column("Property", style="bold")
     cmd_table.add_column("Value")
 
-    # Add command with syntax highlighting
-    cmd_parts = command.split()
-
     # Add basic command info
     cmd_table.add_row("Command", Syntax(command, "bash", theme="monokai", word_wrap=True))
 
@@ -200,8 +250,11 @@ async def run_native_command(command: str, working_directory: Optional[str] = No
         warning_panel = Panel("\n".join(warnings_to_show), title="⚠️ Warnings", border_style="yellow")
         console.print(warning_panel)
 
-    # Only ask for confirmation if auto-approve is disabled AND the command is risky
-    if not config.auto_approve_native_commands and is_warning:
+    # Only ask for confirmation if auto-approve is disabled AND the command is risky, unless the allowlist covers it
+    needs_confirmation = not config.auto_approve_native_commands and is_warning
+    if needs_confirmation and not shell_expanded and is_command_allowlisted(command):
+        print("[yellow]Running allowlisted command without confirmation.[/yellow]")
+    elif needs_confirmation:
         # Display the confirmation prompt
         console.print()
         confirm_text = "[bold blue]Execute this command?[/bold blue]"
@@ -212,7 +265,52 @@ async def run_native_command(command: str, working_directory: Optional[str] = No
     else:
         print("[yellow]Auto-approving command based on configuration.[/yellow]")
 
+    return None
+
+
+@traced("code_agent.native_command", record=("command", "working_directory"))
+async def run_native_command(command: str, working_directory: Optional[str] = None, timeout: Optional[int] = None, session_id: Optional[str] = None) -> str:
+    """Executes a native terminal command after approval checks (async).
+
+    With the 'native_commands.persistent_shell' setting, the command runs in the persistent
+    shell of `session_id` (or a shared default one) instead of a new process.
+    """
+    config = get_config()
+
+    # Use config defaults if values not provided
+    if working_directory is None and hasattr(config, "native_commands"):
+        working_directory = getattr(config.native_commands, "default_working_directory", None)
+
+    if timeout is None and hasattr(config, "native_commands"):
+        timeout = getattr(config.native_commands, "default_timeout", None)
+
+    settings = _native_command_settings(config)
+    # A persistent shell has its own working directory, which the cache key cannot see
+    cacheable_argv = None
+    if settings.cache_read_only_commands and not settings.persistent_shell:
+        cacheable_argv = read_only_argv(command, _categorize_command(command))
+        cached = get_command_cache().get(cacheable_argv, working_directory) if cacheable_argv else None
+        if cached is not None:
+            operation_complete("Workspace unchanged; reusing the previous result")
+            return f"{cached}\n{CACHED_MARKER}"
+
+    refusal = await review_native_command(command, working_directory, timeout, config, shell=settings.persistent_shell)
+    if refusal is not None:
+        return refusal
+
+    if cacheable_argv is None:
+        # The command may change files, making cached results stale
+        note_workspace_change()
+
     # If we got here, the command passed all security checks or was manually approved
+    if settings.persistent_shell:
+        try:
+            return await _run_in_persistent_shell(command, session_id or "default", working_directory, timeout)
+        except Exception as e:
+            error_message = f"Error executing command: {e}"
+            operation_error(error_message)
+            return error_message
+
     try:
         step_progress("Preparing command execution", "green")
         # Split the command for safer execution
@@ -227,12 +325,15 @@ async def run_native_command(command: str, working_directory: Optional[str] = No
             return error_message
 
         # Use asyncio.create_subprocess_exec for async execution
+        capture = _output_capture(config)
+        started = time.perf_counter()
         with command_execution_indicator(command):
             process = await asyncio.create_subprocess_exec(*cmd_parts, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE, cwd=working_directory)
 
             try:
-                # Wait for the command to complete or timeout
-                stdout_bytes, stderr_bytes = await asyncio.wait_for(process.communicate(), timeout=timeout)
+                # Stream the output into bounded buffers until the command completes or times out
+                output = await asyncio.wait_for(capture.read(process), timeout=timeout)
+                await process.wait()
             except asyncio.TimeoutError:
                 timeout_value = timeout or "default"
                 error_message = f"Command timed out after {timeout_value} seconds"
@@ -243,14 +344,14 @@ async def run_native_command(command: str, working_directory: Optional[str] = No
                     await process.wait()  # Wait for cleanup
                 except ProcessLookupError:
                     pass  # Process already terminated
-                return error_message
-
-        # Decode stdout and stderr
-        stdout = stdout_bytes.decode("utf-8", errors="replace") if stdout_bytes else ""
-        stderr = stderr_bytes.decode("utf-8", errors="replace") if stderr_bytes else ""
+                partial_output = capture.output.stdout.text().strip()
+                if partial_output:
+                    error_message += f"\n\nOutput before the timeout:\n{partial_output}"
+                return "\n".join([error_message, *capture.output.notes(capture.max_bytes)])
 
         # Prepare result with both stdout and stderr
-        result = stdout
+        stderr = output.stderr.text()
+        result = output.stdout.text()
 
         # Add error info if there was an error
         if process.returncode != 0:
@@ -259,7 +360,15 @@ async def run_native_command(command: str, working_directory: Optional[str] = No
         else:
             operation_complete("Command executed successfully")
 
-        return result.strip()  # Strip trailing whitespace often added
+        # Say where the full output is when only its head and tail were kept
+        notes = output.notes(capture.max_bytes)
+        if notes:
+            result = result.strip() + "\n\n" + "\n".join(notes)
+
+        result = result.strip()  # Strip trailing whitespace often added
+        if cacheable_argv is not None and process.returncode == 0 and not notes:
+            get_command_cache().put(cacheable_argv, result, working_directory, elapsed=time.perf_counter() - started)
+        return result
 
     except FileNotFoundError as e:
         # Handle case where the command itself is not found
@@ -273,6 +382,53 @@ async def run_native_command(command: str, working_directory: Optional[str] = No
         return error_message
 
 
+@traced("code_agent.native_command.background", record=("command", "working_directory"))
+async def start_native_command_in_background(command: str, session_id: str, working_directory: Optional[str] = None) -> str:
+    """Starts a native terminal command as a background job after approval checks.
+
+    Returns:
+        A message with the job ID to poll, wait for or kill the job with, or an error message
+    """
+    config = get_config()
+    if working_directory is None and hasattr(config, "native_commands"):
+        working_directory = getattr(config.native_commands, "default_working_directory", None)
+
+    refusal = await review_native_command(command, working_directory, None, config)
+    if refusal is not None:
+        return refusal
+
+    try:
+        cmd_parts = shlex.split(command)
+        if not cmd_parts:
+            raise ValueError("Command string resulted in empty list after splitting.")
+    except ValueError as e:
+        error_message = f"Error parsing command: {e}"
+        operation_error(error_message)
+        return error_message
+
+    # A background command may change files at any time; its later changes are caught by the cache's mtime scan
+    note_workspace_change()
+    try:
+        job = await get_job_manager().start(session_id, cmd_parts, working_directory=working_directory, command=command)
+    except JobLimitError as e:
+        operation_error(str(e))
+        return f"Error: {e}"
+    except FileNotFoundError as e:
+        error_message = f"Error executing command: Command not found or invalid: {cmd_parts[0]}. Details: {e}"
+        operation_error(error_message)
+        return error_message
+    except Exception as e:
+        error_message = f"Error executing command: {e}"
+        operation_error(error_message)
+        return error_message
+
+    operation_complete(f"Started background job {job.job_id}")
+    return (
+        f"Started background job {job.job_id} (pid {job.process.pid}): {command}\n"
+        f"Check its output with check_background_job, wait for it with wait_for_background_job, or stop it with kill_background_job."
+    )
+
+
 # Legacy function that accepts RunNativeCommandArgs for compatibility
 async def run_native_command_legacy(args: RunNativeCommandArgs) -> str:
     return await run_native_command(args.command, working_directory=args.working_directory, timeout=args.timeout)
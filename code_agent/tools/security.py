@@ -6,10 +6,13 @@ This module provides configurable security checks for file operations and comman
 import os
 import pathlib
 import re
+import time
+from collections import OrderedDict
 from pathlib import Path
-from typing import List, Optional, Tuple, Union
+from typing import Dict, Iterable, List, Optional, Tuple, Union
 
 from code_agent.config.config import get_config
+from code_agent.tools.command_policy import CommandPolicy, get_command_policy
 
 # List of patterns for potentially dangerous path traversal
 DANGEROUS_PATH_PATTERNS = [
@@ -56,84 +59,201 @@ RISKY_COMMAND_PATTERNS = [
 SEP = os.path.sep
 
 
-def is_path_safe(path_str: str, strict: bool = False) -> Tuple[bool, Optional[str]]:
-    """
-    Check if a path is safe to access.
+# Absolute paths that are never accessed when path validation is enabled
+UNSAFE_ABSOLUTE_PATH_PATTERNS = [
+    r"^/etc/",  # System config files
+    r"^/root/",  # Root's home
+    r"^/home/",  # User home directories (except workspace)
+    r"^/var/",  # System variable data
+    r"^/usr/",  # User programs
+    r"^/bin/",  # System binaries
+    r"^/sbin/",  # System admin binaries
+    r"^~",  # Home directory
+    # Add Windows-specific patterns
+    r"^[A-Za-z]:\\Windows",  # Windows system
+    r"^[A-Za-z]:\\Program Files",  # Program installations
+    r"^[A-Za-z]:\\Users",  # User directories
+]
 
-    Returns a tuple with (is_safe, reason). If is_safe is False, reason contains explanation.
+_UNSAFE_ABSOLUTE_PATH = re.compile("|".join(f"(?:{pattern})" for pattern in UNSAFE_ABSOLUTE_PATH_PATTERNS))
+_WINDOWS_DRIVE = re.compile(r"^[a-zA-Z]:\\")
+
+DEFAULT_PATH_CACHE_ENTRIES = 1024
+# Verdicts depend on symlinks, which can change; they are reused only this long
+DEFAULT_PATH_CACHE_SECONDS = 2.0
+
+PathVerdict = Tuple[bool, Optional[str]]
+
+
+class PathPolicy:
+    """The checks of `is_path_safe` for one configuration, with verdicts memoized.
+
+    Args:
+        path_validation: Reject parent references and system locations
+        workspace_restriction: Reject paths that resolve outside the working directory
+        max_entries: Verdicts kept; the least recently used are dropped first
+        max_age: Seconds a verdict is reused before the path is checked again
     """
-    # Get security settings
-    config = get_config()
 
-    # Early check for empty or whitespace paths
-    if not path_str or path_str.isspace():
-        return False, "Path cannot be empty or whitespace."
-
-    if "\0" in path_str:
-        return False, "Path contains unsafe null character."
-
-    # 2. Get validation settings from config
-    path_validation = strict or (config and getattr(config, "path_validation", True))
-    workspace_restriction = strict or (config and getattr(config, "workspace_restriction", True))
-
-    # 3. If both validation types are disabled and not in strict mode, skip checks
-    if not strict and not path_validation and not workspace_restriction:
-        return True, "Path validation and workspace restriction disabled in configuration."
-
-    # 4. Check for dangerous path patterns if path validation is enabled
-    #    (these are checked first as they're less expensive)
-    if path_validation:
-        # Check for parent directory traversal which is commonly used in attacks
-        if ".." in path_str:
-            return False, "Path contains potentially unsafe pattern: parent directory reference"
-
-        # Check for certain unwanted absolute path patterns
-        absolute_path_patterns = [
-            r"^/etc/",  # System config files
-            r"^/root/",  # Root's home
-            r"^/home/",  # User home directories (except workspace)
-            r"^/var/",  # System variable data
-            r"^/usr/",  # User programs
-            r"^/bin/",  # System binaries
-            r"^/sbin/",  # System admin binaries
-            r"^~",  # Home directory
-            # Add Windows-specific patterns
-            r"^[A-Za-z]:\\Windows",  # Windows system
-            r"^[A-Za-z]:\\Program Files",  # Program installations
-            r"^[A-Za-z]:\\Users",  # User directories
-        ]
-
-        for pattern in absolute_path_patterns:
-            if re.match(pattern, path_str):
+    def __init__(
+        self,
+        path_validation: bool = True,
+        workspace_restriction: bool = True,
+        max_entries: int = DEFAULT_PATH_CACHE_ENTRIES,
+        max_age: float = DEFAULT_PATH_CACHE_SECONDS,
+    ):
+        self.path_validation = path_validation
+        self.workspace_restriction = workspace_restriction
+        self.max_entries = max_entries
+        self.max_age = max_age
+
+        self._verdicts: "OrderedDict[Tuple[str, str, bool], Tuple[PathVerdict, float]]" = OrderedDict()
+        self._workspace: Optional[Tuple[str, Path]] = None
+
+    def check(self, path_str: str, strict: bool = False) -> PathVerdict:
+        """Returns (is_safe, reason) for one path, like `is_path_safe`."""
+        return self.validate_paths([path_str], strict)[0]
+
+    def validate_paths(self, paths: Iterable[str], strict: bool = False) -> List[PathVerdict]:
+        """Returns (is_safe, reason) for each path, in order.
+
+        Paths in the same directory share the resolution of that directory, so a batch
+        costs one symlink check per path instead of one per path component.
+        """
+        try:
+            cwd: Optional[str] = os.getcwd()
+        except OSError:
+            cwd = None
+        now = time.monotonic()
+        resolved_parents: Dict[Path, Path] = {}
+        verdicts = []
+        for path_str in paths:
+            key = (path_str, cwd, strict)
+            cached = self._verdicts.get(key) if cwd is not None else None
+            if cached is not None and now - cached[1] < self.max_age:
+                self._verdicts.move_to_end(key)
+                verdicts.append(cached[0])
+                continue
+            verdict = self._evaluate(path_str, strict, cwd, resolved_parents)
+            if cwd is not None:
+                self._verdicts[key] = (verdict, now)
+                self._verdicts.move_to_end(key)
+                if len(self._verdicts) > self.max_entries:
+                    self._verdicts.popitem(last=False)
+            verdicts.append(verdict)
+        return verdicts
+
+    def clear(self) -> None:
+        self._verdicts.clear()
+        self._workspace = None
+
+    def _workspace_root(self, cwd: Optional[str]) -> Path:
+        # The OS reports the working directory with symlinks already resolved
+        if cwd is None:
+            return Path.cwd()
+        if self._workspace is None or self._workspace[0] != cwd:
+            self._workspace = (cwd, Path.cwd())
+        return self._workspace[1]
+
+    def _evaluate(self, path_str: str, strict: bool, cwd: Optional[str] = None, resolved_parents: Optional[Dict[Path, Path]] = None) -> PathVerdict:
+        # Early check for empty or whitespace paths
+        if not path_str or path_str.isspace():
+            return False, "Path cannot be empty or whitespace."
+
+        if "\0" in path_str:
+            return False, "Path contains unsafe null character."
+
+        path_validation = strict or self.path_validation
+        workspace_restriction = strict or self.workspace_restriction
+
+        # If both validation types are disabled and not in strict mode, skip checks
+        if not strict and not path_validation and not workspace_restriction:
+            return True, "Path validation and workspace restriction disabled in configuration."
+
+        # Check for dangerous path patterns if path validation is enabled
+        # (these are checked first as they're less expensive)
+        if path_validation:
+            # Check for parent directory traversal which is commonly used in attacks
+            if ".." in path_str:
+                return False, "Path contains potentially unsafe pattern: parent directory reference"
+
+            # Check for certain unwanted absolute path patterns
+            if _UNSAFE_ABSOLUTE_PATH.match(path_str):
                 return False, f"Path contains potentially unsafe pattern: {path_str}"
 
-    # 5. Check if path resolves to location outside workspace if workspace restriction is enabled
-    if workspace_restriction:
-        try:
-            # Handle Windows vs POSIX paths
-            path_obj = Path(path_str)
-            # First check if it's an absolute path
-            if path_obj.is_absolute():
-                # Handle Windows paths
-                if str(path_obj).startswith(("C:\\", "D:\\")) or re.match(r"^[a-zA-Z]:\\", str(path_obj)):
-                    return False, "Absolute path (Windows) is outside the workspace."
-                # Handle POSIX paths
-                else:
-                    return False, "Absolute path (POSIX) is outside the workspace."
+        # Check if path resolves to location outside workspace if workspace restriction is enabled
+        if workspace_restriction:
+            try:
+                # Handle Windows vs POSIX paths
+                path_obj = Path(path_str)
+                # First check if it's an absolute path
+                if path_obj.is_absolute():
+                    # Handle Windows paths
+                    if str(path_obj).startswith(("C:\\", "D:\\")) or _WINDOWS_DRIVE.match(str(path_obj)):
+                        return False, "Absolute path (Windows) is outside the workspace."
+                    # Handle POSIX paths
+                    else:
+                        return False, "Absolute path (POSIX) is outside the workspace."
+
+                # For relative paths, resolve them relative to workspace root
+                workspace_root = self._workspace_root(cwd)
+                resolved_path = _resolve(path_obj, resolved_parents)
+
+                # Check if the path resolves outside the workspace
+                if not resolved_path.is_relative_to(workspace_root):
+                    return False, "Path resolves outside the workspace."
+
+            except OSError as e:
+                return False, f"Unable to resolve path due to OS error: {e}"
+
+        # All checks passed
+        return True, None
+
+
+def _resolve(path: Path, resolved_parents: Optional[Dict[Path, Path]]) -> Path:
+    """Resolves a relative path, reusing the resolution of its directory from `resolved_parents`."""
+    if resolved_parents is None or path.name in ("", ".", "..") or ".." in path.parts:
+        return path.resolve()
+    parent = path.parent
+    resolved_parent = resolved_parents.get(parent)
+    if resolved_parent is None:
+        resolved_parent = resolved_parents[parent] = parent.resolve()
+    resolved = resolved_parent / path.name
+    # Only the last component is left to check for a symlink
+    return path.resolve() if resolved.is_symlink() else resolved
+
+
+_path_policy: Optional[Tuple[object, Tuple[bool, bool], PathPolicy]] = None
+
+
+def get_path_policy(config: object) -> PathPolicy:
+    """Returns the path policy for `config`, keeping its verdicts while the config is unchanged."""
+    global _path_policy
+    flags = (bool(config and getattr(config, "path_validation", True)), bool(config and getattr(config, "workspace_restriction", True)))
+    cached = _path_policy
+    if cached is not None and cached[0] is config and cached[1] == flags:
+        return cached[2]
+    policy = PathPolicy(*flags)
+    _path_policy = (config, flags, policy)
+    return policy
 
-            # For relative paths, resolve them relative to workspace root
-            workspace_root = Path.cwd()  # Use current directory as workspace
-            resolved_path = path_obj.resolve()
 
-            # Check if the path resolves outside the workspace
-            if not resolved_path.is_relative_to(workspace_root):
-                return False, "Path resolves outside the workspace."
+def is_path_safe(path_str: str, strict: bool = False) -> Tuple[bool, Optional[str]]:
+    """
+    Check if a path is safe to access.
+
+    Returns a tuple with (is_safe, reason). If is_safe is False, reason contains explanation.
+    """
+    return get_path_policy(get_config()).check(path_str, strict)
 
-        except OSError as e:
-            return False, f"Unable to resolve path due to OS error: {e}"
 
-    # 6. All checks passed
-    return True, None
+def validate_paths(paths: Iterable[str], strict: bool = False) -> List[Tuple[bool, Optional[str]]]:
+    """
+    Check many paths at once, as `is_path_safe` would check each of them.
+
+    Returns a list with an (is_safe, reason) tuple per path, in order.
+    """
+    return get_path_policy(get_config()).validate_paths(paths, strict)
 
 
 def is_command_safe(command: str) -> Tuple[bool, str, bool]:
@@ -152,58 +272,29 @@ def is_command_safe(command: str) -> Tuple[bool, str, bool]:
     config = get_config()
     security = getattr(config, "security", None)
 
-    # Initialize variables
-    is_risky = False
-    is_allowed = False
-    risky_reason = ""
+    # Dangerous patterns are always blocked; risky ones only warn, and only while validation is enabled
+    command_validation_enabled = bool(security and getattr(security, "command_validation", True))
+    verdict = _command_policy(config).check(command, check_risky=command_validation_enabled)
+    # Allowlisted commands are not exempt: they still get blocked or warned about like any other
+    return verdict.is_safe, verdict.reason, verdict.is_warning
 
-    # 1. Check if validation is disabled BUT still check dangerous patterns
-    command_validation_enabled = security and getattr(security, "command_validation", True)
 
-    # 2. Check against dangerous patterns (these are always blocked regardless of validation setting)
-    dangerous_patterns = DANGEROUS_COMMAND_PATTERNS
-    for pattern in dangerous_patterns:
-        try:
-            if re.search(pattern, command):
-                return False, f"Command matches dangerous pattern: {pattern}", False
-        except re.error:
-            # If regex fails, just continue
-            continue
+def is_command_allowlisted(command: str) -> bool:
+    """
+    Checks if a command is covered by the native command allowlist and may run without confirmation.
 
-    # If validation is disabled, return safe for non-dangerous commands
-    if not command_validation_enabled:
-        return True, "", False
+    Every command of the line's pipelines and ``&&``/``||``/``;`` chains must start with
+    an allowlisted prefix, so ``ls && rm -rf build`` is not covered by ``ls``.
+    """
+    return _command_policy(get_config()).is_allowlisted(command)
 
-    # 3. Check command against allowlist (if it's in allowlist, consider it safe)
-    allowlist = getattr(config, "native_command_allowlist", [])
-    if allowlist:
-        # For each allowlist item, check if the command starts with it
-        for allowed in allowlist:
-            if allowed and command.startswith(allowed):
-                is_allowed = True  # noqa: F841
-                break
 
-    # 4. Check against risky patterns (warnings only, not blocked)
+def _command_policy(config) -> CommandPolicy:
+    security = getattr(config, "security", None)
     risky_patterns = getattr(security, "risky_command_patterns", []) if security else RISKY_COMMAND_PATTERNS
-    for pattern in risky_patterns:
-        try:
-            if re.search(pattern, command):
-                is_risky = True
-                risky_reason = f"Command matches risky pattern: {pattern}"
-                break
-        except re.error:
-            # If regex fails, just continue
-            continue
-
-    # Return based on checks:
-    # - Allowed commands always pass (but might get warning for risky)
-    # - Non-allowed commands are allowed by default if not dangerous
-    # - Risky commands generate warnings but are not blocked
-
-    if is_risky:
-        return True, risky_reason, True  # Safe but with warning
-    else:
-        return True, "", False  # Safe without warning
+    allowlist = getattr(config, "native_command_allowlist", [])
+    # Compiled once per config; a check searches only the rules whose literal text occurs in the command
+    return get_command_policy(DANGEROUS_COMMAND_PATTERNS, risky_patterns, allowlist)
 
 
 def validate_commands_allowlist(allowlist: List[str]) -> List[str]:
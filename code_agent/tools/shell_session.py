@@ -0,0 +1,324 @@
+"""
+Persistent shell sessions.
+
+`ShellSession` keeps one bash process alive and runs commands in it, so ``cd``,
+exported variables and activated virtualenvs carry over from one command to the
+next, and each command costs a write to a pipe instead of a fork, exec and shell
+start-up. Commands are framed by a random sentinel: after each command the shell
+prints the sentinel and the exit status on stdout and the sentinel alone on
+stderr, and reading stops once both have arrived.
+
+Commands run with stdin redirected from /dev/null so they cannot consume the
+framing. A command that times out cannot be interrupted on its own, so the shell
+and everything it started are killed and the next command starts a fresh shell.
+
+Because bash interprets each command, `uses_shell_syntax` tells callers which
+commands mean more than their plain arguments, so they can ask for approval first.
+
+`ShellSessionPool` closes a session's shell when the session ends, and shells that
+go unused for ``idle_timeout`` seconds, so long-lived processes such as the
+``serve`` daemon do not accumulate them.
+"""
+
+import asyncio
+import atexit
+import itertools
+import logging
+import os
+import secrets
+import shlex
+import shutil
+import signal
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from code_agent.config.config import get_config
+from code_agent.config.settings_based_config import NativeCommandSettings
+from code_agent.tools.command_output import DEFAULT_HEAD_BYTES, DEFAULT_TAIL_BYTES, HeadTailBuffer
+
+logger = logging.getLogger(__name__)
+
+_READ_CHUNK_BYTES = 64 * 1024
+
+# Characters shlex splits off as operators: redirects, pipes, chains and subshells
+_SHELL_PUNCTUATION = frozenset("();<>|&")
+# Text that makes the shell run something other than the command itself
+_SHELL_EXPANSIONS = ("$(", "`", "\n", "\r")
+# Characters bash expands inside a word: variables, globs and brace lists
+_WORD_EXPANSIONS = frozenset("$*?[{")
+
+
+def command_tokens(command: str) -> Optional[List[str]]:
+    """Splits a command into tokens; None if it is malformed or uses shell syntax."""
+    if any(expansion in command for expansion in _SHELL_EXPANSIONS):
+        return None
+    lexer = shlex.shlex(command, posix=True, punctuation_chars=True)
+    lexer.whitespace_split = True
+    try:
+        tokens = list(lexer)
+    except ValueError:
+        return None
+    # Quoted operators come back as the same tokens; refusing those too only costs an approval
+    if any(_SHELL_PUNCTUATION.issuperset(token) for token in tokens):
+        return None
+    return tokens
+
+
+def uses_shell_syntax(command: str) -> bool:
+    """Whether bash would read `command` as more than its plain arguments.
+
+    True for operators, substitutions, variables, globs, brace lists and ``~``, which
+    a spawned process receives literally but a `ShellSession` expands. Quoted
+    characters are counted too; that only costs an approval.
+    """
+    tokens = command_tokens(command)
+    if tokens is None:
+        return True
+    return any(token.startswith("~") or not _WORD_EXPANSIONS.isdisjoint(token) for token in tokens)
+
+
+@dataclass
+class ShellResult:
+    """Result of one command run in a `ShellSession`."""
+
+    stdout: str
+    stderr: str
+    return_code: Optional[int]
+    """Exit status of the command; None if it timed out."""
+    timed_out: bool = False
+    shell_exited: bool = False
+    """Whether the command ended the shell (e.g. with ``exit``); its state is lost."""
+
+
+class _ShellExited(Exception):
+    pass
+
+
+def _default_shell() -> List[str]:
+    bash = shutil.which("bash")
+    # Skip the user's profile and rc files: they are slow and may print or prompt
+    return [bash, "--noprofile", "--norc"] if bash else ["/bin/sh"]
+
+
+async def _read_until_marker(stream: asyncio.StreamReader, marker: bytes, buffer: HeadTailBuffer) -> bytes:
+    """Copies `stream` into `buffer` up to `marker` and returns the rest of the marker's line."""
+    pending = b""
+    while (index := pending.find(marker)) < 0:
+        # Hold back only what could be the start of a marker split across reads
+        output_end = len(pending) - len(marker) + 1
+        if output_end > 0:
+            buffer.append(pending[:output_end])
+            pending = pending[output_end:]
+        chunk = await stream.read(_READ_CHUNK_BYTES)
+        if not chunk:
+            buffer.append(pending)
+            raise _ShellExited()
+        pending += chunk
+    buffer.append(pending[:index])
+    rest = pending[index + len(marker) :]
+    while b"\n" not in rest:
+        chunk = await stream.read(_READ_CHUNK_BYTES)
+        if not chunk:
+            raise _ShellExited()
+        rest += chunk
+    return rest.split(b"\n", 1)[0]
+
+
+class ShellSession:
+    """A long-lived shell that runs one command at a time.
+
+    Args:
+        shell: Command line starting the shell; bash without rc files by default
+        head_bytes: Bytes kept from the start of each output stream of a command
+        tail_bytes: Bytes kept from the end of each output stream of a command
+    """
+
+    def __init__(self, shell: Optional[List[str]] = None, head_bytes: int = DEFAULT_HEAD_BYTES, tail_bytes: int = DEFAULT_TAIL_BYTES):
+        self.shell = shell or _default_shell()
+        self.head_bytes = head_bytes
+        self.tail_bytes = tail_bytes
+        self.starts = 0
+        self.commands_run = 0
+        self.last_used = time.monotonic()
+
+        self._process: Optional[asyncio.subprocess.Process] = None
+        self._lock = asyncio.Lock()
+        self._token = secrets.token_hex(8)
+        self._counter = itertools.count(1)
+
+    @property
+    def running(self) -> bool:
+        return self._process is not None and self._process.returncode is None
+
+    async def _ensure_started(self) -> asyncio.subprocess.Process:
+        if not self.running:
+            self._process = await asyncio.create_subprocess_exec(
+                *self.shell,
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                # A process group of its own, so a timeout can stop the shell and its children together
+                start_new_session=True,
+            )
+            self.starts += 1
+            logger.debug(f"Started persistent shell (pid {self._process.pid})")
+        return self._process
+
+    def _frame(self, command: str, marker: str, working_directory: Optional[str]) -> bytes:
+        run = f"eval {shlex.quote(command)} < /dev/null"
+        if working_directory:
+            # Run in the directory but return to the shell's own one, keeping every other change
+            run = f'__code_agent_pwd=$PWD; cd -- {shlex.quote(working_directory)} && {run}; __code_agent_status=$?; cd -- "$__code_agent_pwd"'
+        else:
+            run = f"{run}; __code_agent_status=$?"
+        return f"{run}\nprintf '%s %d\\n' {marker} \"$__code_agent_status\"; printf '%s\\n' {marker} >&2\n".encode()
+
+    async def run(self, command: str, working_directory: Optional[str] = None, timeout: Optional[float] = None) -> ShellResult:
+        """Runs `command` in the shell, starting a new shell if there is none.
+
+        Raises:
+            OSError: If the shell cannot be started
+        """
+        async with self._lock:
+            process = await self._ensure_started()
+            marker = f"__code_agent_{self._token}_{next(self._counter)}__"
+            stdout = HeadTailBuffer(self.head_bytes, self.tail_bytes)
+            stderr = HeadTailBuffer(self.head_bytes, self.tail_bytes)
+            self.commands_run += 1
+            try:
+                process.stdin.write(self._frame(command, marker, working_directory))
+                await process.stdin.drain()
+                status, _ = await asyncio.wait_for(
+                    asyncio.gather(
+                        _read_until_marker(process.stdout, marker.encode(), stdout),
+                        _read_until_marker(process.stderr, marker.encode(), stderr),
+                    ),
+                    timeout=timeout,
+                )
+            except asyncio.TimeoutError:
+                logger.info(f"Command timed out in the persistent shell; restarting it: {command}")
+                await self._kill()
+                return ShellResult(stdout.text(), stderr.text(), None, timed_out=True)
+            except (_ShellExited, BrokenPipeError, ConnectionResetError):
+                return_code = await process.wait()
+                self._process = None
+                return ShellResult(stdout.text(), stderr.text(), return_code, shell_exited=True)
+            except BaseException:
+                # Cancelled mid-command: the shell's state and output framing are unknown
+                await self._kill()
+                raise
+            finally:
+                self.last_used = time.monotonic()
+            return ShellResult(stdout.text(), stderr.text(), int(status))
+
+    @property
+    def busy(self) -> bool:
+        """Whether a command is running or waiting to run."""
+        return self._lock.locked()
+
+    async def _kill(self) -> None:
+        process, self._process = self._process, None
+        if process is None or process.returncode is not None:
+            return
+        _kill_group(process)
+        await process.wait()
+
+    async def close(self) -> None:
+        """Stops the shell and everything it started."""
+        async with self._lock:
+            await self._kill()
+
+
+def _kill_group(process: asyncio.subprocess.Process) -> None:
+    try:
+        if hasattr(os, "killpg"):
+            os.killpg(process.pid, signal.SIGKILL)
+        else:
+            process.kill()
+    except ProcessLookupError:
+        pass
+
+
+class ShellSessionPool:
+    """One `ShellSession` per agent session, created on first use.
+
+    Args:
+        head_bytes: Bytes kept from the start of each output stream of a command
+        tail_bytes: Bytes kept from the end of each output stream of a command
+        idle_timeout: Seconds a shell may go unused before it is closed; None keeps it until its session ends
+    """
+
+    def __init__(self, head_bytes: int = DEFAULT_HEAD_BYTES, tail_bytes: int = DEFAULT_TAIL_BYTES, idle_timeout: Optional[float] = None):
+        self.head_bytes = head_bytes
+        self.tail_bytes = tail_bytes
+        self.idle_timeout = idle_timeout
+        self._sessions: Dict[str, ShellSession] = {}
+        self._reaper: Optional[asyncio.Task] = None
+
+    def get(self, session_id: str) -> ShellSession:
+        shell = self._sessions.get(session_id)
+        if shell is None:
+            shell = self._sessions[session_id] = ShellSession(head_bytes=self.head_bytes, tail_bytes=self.tail_bytes)
+        self._ensure_reaper()
+        return shell
+
+    def _ensure_reaper(self) -> None:
+        if self.idle_timeout is None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        # A reaper left on a loop that has since closed never finishes, so check the loop as well
+        if self._reaper is None or self._reaper.done() or self._reaper.get_loop() is not loop:
+            self._reaper = loop.create_task(self._reap_idle(), name="shell-idle-reaper")
+
+    async def _reap_idle(self) -> None:
+        while self._sessions:
+            await asyncio.sleep(self.idle_timeout / 2)
+            await self.close_idle()
+
+    async def close_idle(self) -> int:
+        """Closes the shells that have gone unused for ``idle_timeout`` seconds and returns how many."""
+        if self.idle_timeout is None:
+            return 0
+        cutoff = time.monotonic() - self.idle_timeout
+        # Removed before awaiting anything, so `get` cannot hand out a shell that is being closed
+        idle = [self._sessions.pop(session_id) for session_id, shell in list(self._sessions.items()) if not shell.busy and shell.last_used <= cutoff]
+        await asyncio.gather(*(shell.close() for shell in idle))
+        if idle:
+            logger.debug(f"Closed {len(idle)} idle persistent shell(s)")
+        return len(idle)
+
+    async def close_session(self, session_id: str) -> None:
+        shell = self._sessions.pop(session_id, None)
+        if shell is not None:
+            await shell.close()
+
+    async def close_all(self) -> None:
+        reaper, self._reaper = self._reaper, None
+        if reaper is not None:
+            reaper.cancel()
+        await asyncio.gather(*(self.close_session(session_id) for session_id in list(self._sessions)))
+
+    def kill_all_now(self) -> None:
+        """Kills every shell without waiting; for interpreter exit."""
+        for shell in self._sessions.values():
+            if shell.running:
+                _kill_group(shell._process)
+
+
+_shell_pool: Optional[ShellSessionPool] = None
+
+
+def get_shell_pool() -> ShellSessionPool:
+    """Returns the process-wide pool of persistent shells, configured on first use."""
+    global _shell_pool
+    if _shell_pool is None:
+        settings = getattr(get_config(), "native_commands", None)
+        if not isinstance(settings, NativeCommandSettings):
+            settings = NativeCommandSettings()
+        _shell_pool = ShellSessionPool(head_bytes=settings.output_head_bytes, tail_bytes=settings.output_tail_bytes, idle_timeout=settings.shell_idle_timeout)
+        atexit.register(_shell_pool.kill_all_now)
+    return _shell_pool
@@ -15,6 +15,7 @@ from rich.prompt import Confirm
 from rich.syntax import Syntax
 
 from code_agent.config.config import get_config
+from code_agent.tools.command_cache import invalidates_command_cache
 from code_agent.tools.error_utils import (
     format_file_error,
     format_file_size_error,
@@ -123,6 +124,7 @@ def read_file(path: str) -> str:
 
 
 # --- APPLY EDIT Tool ---
+@invalidates_command_cache
 def apply_edit(target_file: str, content: str, explanation: Optional[str] = None) -> str:
     """
     Apply an edit to a file by creating the file or replacing its contents.
@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+"""Load test for SessionTokenManager / SessionSecurityManager expiry and revocation.
+
+Generates many tokens spread over many users, then measures revocation for one user
+and expiry cleanup of a small slice, both of which should scale with the number of
+affected tokens rather than the total.
+
+Usage:
+    uv run python scripts/load_test_session_security.py --tokens 1000000 --users 10000
+"""
+
+import argparse
+import time
+from datetime import datetime, timedelta
+
+from code_agent.adk.security import SessionSecurityManager, SessionTokenManager
+
+
+def _timed(label: str, fn):
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<45} {elapsed * 1000:>10.2f} ms  -> {result}")
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tokens", type=int, default=1_000_000, help="Number of tokens to generate")
+    parser.add_argument("--users", type=int, default=10_000, help="Number of distinct users")
+    parser.add_argument("--expire", type=int, default=1_000, help="Number of tokens to force-expire")
+    args = parser.parse_args()
+
+    token_manager = SessionTokenManager()
+    security_manager = SessionSecurityManager(token_manager=token_manager)
+
+    def generate():
+        for i in range(args.tokens):
+            security_manager.register_session(f"session-{i}", f"user-{i % args.users}")
+        return len(token_manager.tokens)
+
+    _timed(f"register {args.tokens:,} sessions/tokens", generate)
+    _timed("revoke_all_tokens_for_user (1 user)", lambda: token_manager.revoke_all_tokens_for_user("user-0"))
+    _timed("cleanup_expired_tokens (nothing due)", token_manager.cleanup_expired_tokens)
+    _timed("cleanup_expired_sessions (nothing due)", security_manager.cleanup_expired_sessions)
+
+    past = datetime.utcnow() - timedelta(seconds=1)
+    tokens = list(token_manager.tokens)[: args.expire]
+    for token in tokens:
+        token_manager.tokens[token].expires_at = past
+    for i in range(args.expire):
+        security_manager.session_activity[f"session-{i}"] = past - timedelta(seconds=security_manager.session_expiry_seconds)
+
+    _timed(f"cleanup_expired_sessions ({args.expire:,} due)", security_manager.cleanup_expired_sessions)
+    print(f"remaining tokens: {len(token_manager.tokens):,}, sessions: {len(security_manager.authorized_sessions):,}")
+
+
+if __name__ == "__main__":
+    main()
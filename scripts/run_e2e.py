@@ -23,6 +23,7 @@ from google.genai.types import Content, Part  # Import genai types
 
 # Import the custom JSON memory service
 from code_agent.adk.json_memory_service import JsonFileMemoryService
+from code_agent.adk.response_cache import ResponseCache
 
 # Import the agent definition
 from code_agent.agent.software_engineer.software_engineer.agent import root_agent
@@ -72,6 +73,15 @@ async def main(log_level_arg: str):
         logger.info("Using InMemoryMemoryService.")
         memory_service = InMemoryMemoryService()
 
+    # Optional on-disk response cache, so repeated deterministic runs skip the model
+    response_cache = None
+    response_cache_dir = os.getenv("ADK_E2E_RESPONSE_CACHE_DIR")
+    if response_cache_dir:
+        deterministic_only = os.getenv("ADK_E2E_RESPONSE_CACHE_ALL", "").lower() not in ("1", "true", "yes")
+        response_cache = ResponseCache(cache_dir=response_cache_dir, deterministic_only=deterministic_only)
+        response_cache.attach(root_agent)
+        logger.info(f"Using response cache in {response_cache_dir} (deterministic requests only: {deterministic_only})")
+
     # Configure the runner
     runner = Runner(
         agent=root_agent,
@@ -180,6 +190,8 @@ async def main(log_level_arg: str):
         except Exception as e:
             logger.error(f"Error during final session saving for {session_id}: {e}", exc_info=True)
         # ------------------------------------------
+        if response_cache is not None:
+            logger.info(f"Response cache stats: {response_cache.stats()}")
     logger.info("Agent run finished.")
 
 
@@ -43,6 +43,11 @@ export ADK_E2E_APP_NAME="e2e_json_file_test_app" # Optional: Distinct app name
 
 # Default remains InMemoryMemoryService if nothing else is configured
 
+# --- Optional: response cache (repeated runs skip the model) ---
+# Only requests sent with temperature 0 are cached unless ADK_E2E_RESPONSE_CACHE_ALL=1
+# export ADK_E2E_RESPONSE_CACHE_DIR="./.e2e_response_cache"
+# export ADK_E2E_RESPONSE_CACHE_ALL="1"
+
 # Ensure google-adk[vertexai] is installed if using Vertex AI RAG service
 # uv pip install "google-adk[vertexai]"
 
@@ -0,0 +1,59 @@
+"""
+Import-time regression benchmark for lightweight CLI commands.
+
+Runs each command in a fresh interpreter under `python -X importtime` and fails
+when it imports ADK/genai/litellm or its total import time goes over budget.
+"""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+# Total import time allowed for a lightweight command. The lazy CLI needs about
+# 0.3s here; importing ADK alone takes several seconds.
+IMPORT_BUDGET_SECONDS = float(os.environ.get("CODE_AGENT_IMPORT_BUDGET_SECONDS", "1.5"))
+
+HEAVY_MODULES = ("google.adk", "google.genai", "litellm")
+
+LIGHTWEIGHT_COMMANDS = [
+    ["--version"],
+    ["--help"],
+    ["config", "--help"],
+    ["config", "show"],
+    ["providers", "--help"],
+    ["providers", "list"],
+    ["sessions", "--help"],
+]
+
+
+def _import_times(args, home):
+    """Runs the CLI with -X importtime and returns {module: self time in seconds}."""
+    env = {**os.environ, "HOME": str(home), "PYTHONDONTWRITEBYTECODE": ""}
+    command = [sys.executable, "-X", "importtime", "-m", "code_agent.cli.main", *args]
+    result = subprocess.run(command, capture_output=True, text=True, env=env, timeout=120)
+    assert result.returncode == 0, result.stdout + result.stderr
+
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line[len("import time:") :].split("|")
+        times[name.strip()] = int(self_us) / 1_000_000
+    return times
+
+
+@pytest.mark.integration
+@pytest.mark.parametrize("args", LIGHTWEIGHT_COMMANDS, ids=" ".join)
+def test_lightweight_command_import_time(args, tmp_path):
+    # Warm run so the measurement does not include writing bytecode caches
+    _import_times(args, tmp_path)
+    times = _import_times(args, tmp_path)
+
+    heavy = sorted(name for name in times if name.startswith(HEAVY_MODULES))
+    assert not heavy, f"'code-agent {' '.join(args)}' imported heavy modules: {heavy[:10]}"
+
+    total = sum(times.values())
+    slowest = sorted(times.items(), key=lambda item: item[1], reverse=True)[:5]
+    assert total < IMPORT_BUDGET_SECONDS, f"'code-agent {' '.join(args)}' spent {total:.2f}s importing (budget {IMPORT_BUDGET_SECONDS}s); slowest: {slowest}"
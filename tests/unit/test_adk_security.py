@@ -2,12 +2,16 @@
 Tests for the code_agent.adk.security module.
 """
 
+import asyncio
 import datetime
 from unittest.mock import MagicMock, patch
 
+import pytest
+
 from code_agent.adk.security import (
     DEFAULT_SESSION_EXPIRY_SECONDS,
     DEFAULT_TOKEN_VALIDITY_SECONDS,
+    ExpiryHeap,
     SessionSecurityManager,
     SessionToken,
     SessionTokenManager,
@@ -482,3 +486,126 @@ class TestSessionSecurityManager:
         assert "session-1" not in manager.session_activity
         assert "session-2" not in manager.session_activity
         assert "session-3" in manager.session_activity
+
+    def test_cleanup_after_extending_session_activity(self):
+        """Test that renewed activity moves a session's expiry instead of expiring it early."""
+        manager = SessionSecurityManager(session_expiry_seconds=10)
+        now = datetime.datetime.utcnow()
+        manager.authorized_sessions["session-1"] = "user-1"
+        manager.session_activity["session-1"] = now - datetime.timedelta(seconds=20)
+        manager.session_activity["session-1"] = now
+
+        assert manager.cleanup_expired_sessions() == 0
+        assert "session-1" in manager.authorized_sessions
+
+    def test_changing_expiry_window_reschedules_sessions(self):
+        """Test that shortening session_expiry_seconds applies to already tracked sessions."""
+        manager = SessionSecurityManager(session_expiry_seconds=60)
+        manager.authorized_sessions["session-1"] = "user-1"
+        manager.session_activity["session-1"] = datetime.datetime.utcnow() - datetime.timedelta(seconds=5)
+
+        manager.session_expiry_seconds = 1
+
+        assert manager.cleanup_expired_sessions() == 1
+        assert "session-1" not in manager.authorized_sessions
+
+    def test_seconds_until_next_expiry(self):
+        """Test the cleanup task sleeps until the earliest deadline, capped by the max interval."""
+        manager = SessionSecurityManager(token_manager=SessionTokenManager(token_validity_seconds=1000), session_expiry_seconds=5)
+        assert manager.seconds_until_next_expiry(max_interval_seconds=30) == 30
+
+        manager.register_session("session-1", "user-1")
+        assert 4 < manager.seconds_until_next_expiry(max_interval_seconds=30) <= 5
+        assert manager.seconds_until_next_expiry(max_interval_seconds=2) == 2
+
+    def test_start_cleanup_task_without_running_loop(self):
+        """Test that starting the cleanup task outside an event loop is a no-op."""
+        manager = SessionSecurityManager()
+        assert manager.start_cleanup_task() is None
+
+    @pytest.mark.asyncio
+    async def test_cleanup_task_expires_sessions(self):
+        """Test that the background task expires sessions once their deadline passes."""
+        manager = SessionSecurityManager(session_expiry_seconds=0.05)
+        manager.register_session("session-1", "user-1")
+
+        task = manager.start_cleanup_task(max_interval_seconds=1)
+        assert manager.start_cleanup_task() is task
+        try:
+            await asyncio.sleep(0.2)
+            assert "session-1" not in manager.authorized_sessions
+            assert "session-1" not in manager.session_activity
+        finally:
+            manager.stop_cleanup_task()
+
+
+class TestTokenIndexes:
+    """Tests for the per-user token index and expiry schedule of SessionTokenManager."""
+
+    def test_revoke_all_tokens_for_user_only_touches_that_user(self):
+        """Test revocation goes through the user index."""
+        manager = SessionTokenManager()
+        user_tokens = [manager.generate_token("user-1") for _ in range(3)]
+        other_token = manager.generate_token("user-2")
+
+        assert manager.revoke_all_tokens_for_user("user-1") == 3
+        assert manager.revoke_all_tokens_for_user("user-1") == 0
+        assert all(manager.tokens[token].revoked for token in user_tokens)
+        assert manager.tokens[other_token].revoked is False
+
+    def test_cleanup_removes_token_from_user_index(self):
+        """Test that expired tokens are dropped from the user index."""
+        manager = SessionTokenManager()
+        token = manager.generate_token("user-1")
+        manager.tokens[token].expires_at = datetime.datetime.utcnow() - datetime.timedelta(seconds=1)
+
+        assert manager.cleanup_expired_tokens() == 1
+        assert manager.revoke_all_tokens_for_user("user-1") == 0
+        assert manager.next_expiry() is None
+
+    def test_extending_token_expiry_postpones_cleanup(self):
+        """Test that moving expires_at later keeps the token past its original deadline."""
+        manager = SessionTokenManager(token_validity_seconds=1)
+        token = manager.generate_token("user-1")
+        manager.tokens[token].expires_at = datetime.datetime.utcnow() + datetime.timedelta(hours=1)
+
+        future_time = datetime.datetime.utcnow() + datetime.timedelta(seconds=2)
+        with patch("code_agent.adk.security.datetime") as mock_datetime:
+            mock_datetime.utcnow.return_value = future_time
+            assert manager.cleanup_expired_tokens() == 0
+        assert token in manager.tokens
+
+
+class TestExpiryHeap:
+    """Tests for the ExpiryHeap scheduler."""
+
+    def test_pop_due_in_deadline_order(self):
+        heap = ExpiryHeap()
+        now = datetime.datetime(2024, 1, 1)
+        for key, offset in (("c", 3), ("a", 1), ("b", 2), ("later", 100)):
+            heap.schedule(key, now + datetime.timedelta(seconds=offset))
+
+        assert heap.pop_due(now + datetime.timedelta(seconds=3)) == ["a", "b", "c"]
+        assert len(heap) == 1
+        assert heap.next_deadline() == now + datetime.timedelta(seconds=100)
+
+    def test_reschedule_and_cancel_skip_stale_entries(self):
+        heap = ExpiryHeap()
+        now = datetime.datetime(2024, 1, 1)
+        heap.schedule("moved", now)
+        heap.schedule("moved", now + datetime.timedelta(seconds=10))
+        heap.schedule("cancelled", now)
+        heap.cancel("cancelled")
+
+        assert heap.pop_due(now) == []
+        assert "cancelled" not in heap
+        assert heap.pop_due(now + datetime.timedelta(seconds=10)) == ["moved"]
+
+    def test_compaction_bounds_heap_size(self):
+        heap = ExpiryHeap()
+        now = datetime.datetime(2024, 1, 1)
+        for i in range(5000):
+            heap.schedule("key", now + datetime.timedelta(seconds=i))
+
+        assert len(heap) == 1
+        assert len(heap._heap) <= 2 * 1024 + 1
@@ -247,8 +247,8 @@ async def test_add_tool_result(mock_get_session, session_manager: CodeAgentADKSe
     with patch.object(session_manager, "_session_service", mock_service):
         # Remove auth_token from this call
         await session_manager.add_tool_result(session_id, tool_call_id, tool_name, content, invocation_id="inv_test")
-        # Verify manager's get_session was called first (internally by add_event, which receives auth_token=None, resulting in this call signature)
-        mock_get_session.assert_called_once_with(session_id)
+        # Verify manager's get_session was called first (internally by add_events with auth_token=None)
+        mock_get_session.assert_called_once_with(session_id, None)
         # Check that underlying append_event was called
         mock_service.append_event.assert_called_once()
         added_event: Event = mock_service.append_event.call_args.kwargs["event"]
@@ -262,6 +262,59 @@ async def test_add_tool_result(mock_get_session, session_manager: CodeAgentADKSe
         assert func_resp.response == {"result": content}  # response structure wraps content
 
 
+@patch("code_agent.adk.services.CodeAgentADKSessionManager.get_session", new_callable=AsyncMock)
+async def test_add_events_batches_lookup_and_memory(mock_get_session, session_manager: CodeAgentADKSessionManager, mock_session: MagicMock):
+    """Test that add_events looks the session up once and writes memories in one batch."""
+    session_id = MOCK_SESSION_ID
+    mock_get_session.return_value = mock_session
+    events = [session_manager.build_tool_result_event(f"tool_{i}", f"result {i}") for i in range(10)]
+
+    mock_service = AsyncMock(spec=BaseSessionService)
+    mock_service.append_event = AsyncMock(return_value=None)
+    memory_manager = MagicMock()
+
+    with patch.object(session_manager, "_session_service", mock_service), patch.object(session_manager, "_get_memory_manager", return_value=memory_manager):
+        await session_manager.add_events(session_id, events)
+
+    mock_get_session.assert_called_once_with(session_id, None)
+    assert mock_service.append_event.call_count == 10
+    memory_manager.add_memories.assert_called_once()
+    entries = memory_manager.add_memories.call_args.args[0]
+    assert [entry["metadata"]["function_name"] for entry in entries] == [f"tool_{i}" for i in range(10)]
+    assert entries[3]["content"] == "Function tool_3 returned: result 3"
+
+
+@patch("code_agent.adk.services.CodeAgentADKSessionManager.get_session", new_callable=AsyncMock)
+async def test_add_events_rejects_batch_over_event_limit(mock_get_session, session_manager: CodeAgentADKSessionManager, mock_session: MagicMock):
+    """Test that a batch exceeding max_events_per_session is rejected before anything is appended."""
+    mock_get_session.return_value = mock_session
+    session_manager.config.max_events_per_session = 2
+    mock_service = AsyncMock(spec=BaseSessionService)
+
+    with patch.object(session_manager, "_session_service", mock_service):
+        with pytest.raises(ValueError):
+            await session_manager.add_events(MOCK_SESSION_ID, [session_manager.build_user_message_event(str(i)) for i in range(3)])
+
+    mock_service.append_event.assert_not_called()
+
+
+@patch("code_agent.adk.services.CodeAgentADKSessionManager.get_session", new_callable=AsyncMock)
+async def test_session_scope_reuses_validated_handle(mock_get_session, session_manager: CodeAgentADKSessionManager, mock_session: MagicMock):
+    """Test that calls inside session_scope() share one session lookup."""
+    mock_get_session.return_value = mock_session
+    mock_service = MagicMock(spec=BaseSessionService)  # Synchronous append_event, as in ADK
+
+    with patch.object(session_manager, "_session_service", mock_service):
+        async with session_manager.session_scope():
+            await session_manager.add_user_message(MOCK_SESSION_ID, "run the tests")
+            for i in range(3):
+                await session_manager.add_tool_result(MOCK_SESSION_ID, f"call_{i}", "run_terminal_cmd", "ok")
+        await session_manager.add_user_message(MOCK_SESSION_ID, "outside the scope")
+
+    assert mock_get_session.call_count == 2
+    assert mock_service.append_event.call_count == 5
+
+
 @patch("code_agent.adk.services.CodeAgentADKSessionManager.get_session", new_callable=AsyncMock)
 async def test_add_system_message(mock_get_session, session_manager: CodeAgentADKSessionManager, mock_session: MagicMock):  # Patch manager's get_session
     """Test adding a system message event."""
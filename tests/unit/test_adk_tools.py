@@ -1,5 +1,6 @@
 """Unit tests for ADK tool wrappers."""
 
+import asyncio
 import os
 from pathlib import Path
 from unittest import mock
@@ -16,6 +17,7 @@ from code_agent.adk.tools import (
 
 # Import CodeAgentSettings for mocking
 from code_agent.config.settings_based_config import CodeAgentSettings
+from code_agent.tools.background_jobs import get_job_manager
 
 
 class MockLogger:
@@ -311,7 +313,11 @@ async def test_run_terminal_cmd_tool(mock_tool_context):
 
     # Mock setup for asyncio.create_subprocess_exec
     mock_process = mock.AsyncMock()
-    mock_process.communicate.return_value = (b"Hello, world!", b"")  # stdout, stderr as bytes
+    mock_process.stdout = asyncio.StreamReader()
+    mock_process.stdout.feed_data(b"Hello, world!")
+    mock_process.stdout.feed_eof()
+    mock_process.stderr = asyncio.StreamReader()
+    mock_process.stderr.feed_eof()
     mock_process.returncode = 0
 
     with (
@@ -351,7 +357,11 @@ async def test_run_terminal_cmd_with_background(mock_tool_context):
 
     # Mock setup for asyncio.create_subprocess_exec
     mock_process = mock.AsyncMock()
-    mock_process.communicate.return_value = (b"", b"")  # No output for background usually
+    mock_process.stdout = asyncio.StreamReader()
+    mock_process.stdout.feed_data(b"")
+    mock_process.stdout.feed_eof()
+    mock_process.stderr = asyncio.StreamReader()
+    mock_process.stderr.feed_eof()
     mock_process.returncode = 0
 
     with (
@@ -364,23 +374,20 @@ async def test_run_terminal_cmd_with_background(mock_tool_context):
         mock.patch("code_agent.tools.native_tools.print"),
         mock.patch("code_agent.tools.progress_indicators.print"),
         # Correct mock target for async subprocess
-        mock.patch("asyncio.create_subprocess_exec", return_value=mock_process),  # as mock_create_subprocess,
+        mock.patch("asyncio.create_subprocess_exec", return_value=mock_process) as mock_create_subprocess,
     ):
         # Setup mock Text to return a string-like object
         mock_text.return_value = "EXECUTE COMMAND"
 
         # Act
-        # result = await tool.func(mock_tool_context, command, is_background=True) # Commented out unused assignment
-        await tool.func(mock_tool_context, command, is_background=True)
+        result = await tool.func(mock_tool_context, command, is_background=True)
 
-        # Assert
-        # NOTE: The ADK wrapper currently logs a warning and doesn't support background.
-        # The original function might, but the wrapper overrides.
-        # We assert the warning log instead of subprocess call for now.
-        # If background support is added to wrapper, change this assertion.
-        assert len(mock_tool_context.logger.warning_messages) >= 1
-        assert "Background execution requested but not supported" in mock_tool_context.logger.warning_messages[0]
-        # mock_create_subprocess.assert_not_called() # Or assert called depending on implementation
+        # Assert: the command is started as a job in its own process group and not waited for
+        assert result.startswith("Started background job job-")
+        mock_create_subprocess.assert_called_once()
+        assert mock_create_subprocess.call_args.kwargs["start_new_session"] is True
+        assert mock_tool_context.logger.warning_messages == []
+        await get_job_manager().close_session("default")
 
 
 @pytest.mark.asyncio
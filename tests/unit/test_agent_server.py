@@ -0,0 +1,276 @@
+"""Unit tests for the agent daemon (code_agent.services.agent_server) and its client."""
+
+import asyncio
+import json
+import os
+import socket
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from typing import ClassVar
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from google.adk.events import Event
+from google.adk.sessions.in_memory_session_service import InMemorySessionService
+from google.genai import types as genai_types
+
+from code_agent.services.agent_client import AgentClient, AgentServerError, parse_address, resolve_address, token_path
+from code_agent.services.agent_server import AgentServer, event_to_message
+
+
+class FakeRunner:
+    """Stands in for google.adk.runners.Runner, echoing the user message back."""
+
+    instances: ClassVar[list] = []
+    delay = 0.0
+    concurrent = 0
+    max_concurrent = 0
+
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+        FakeRunner.instances.append(self)
+
+    async def run_async(self, user_id, session_id, new_message):
+        FakeRunner.concurrent += 1
+        FakeRunner.max_concurrent = max(FakeRunner.max_concurrent, FakeRunner.concurrent)
+        try:
+            await asyncio.sleep(FakeRunner.delay)
+            text = new_message.parts[0].text
+            yield Event(author="agent", content=genai_types.Content(role="model", parts=[genai_types.Part(text=f"echo: {text}")]))
+        finally:
+            FakeRunner.concurrent -= 1
+
+
+class TestAddressParsing(unittest.TestCase):
+    """Tests for parse_address and resolve_address."""
+
+    def test_unix_socket_path(self):
+        self.assertEqual(parse_address("/tmp/agent.sock"), ("unix", "/tmp/agent.sock"))
+
+    def test_loopback_tcp(self):
+        self.assertEqual(parse_address("127.0.0.1:8765"), ("tcp", ("127.0.0.1", 8765)))
+        self.assertEqual(parse_address("[::1]:8765"), ("tcp", ("::1", 8765)))
+
+    def test_non_loopback_tcp_is_rejected(self):
+        with self.assertRaises(ValueError):
+            parse_address("0.0.0.0:8765")
+
+    def test_resolve_address_default(self):
+        self.assertTrue(resolve_address(None).endswith("agent.sock"))
+        self.assertEqual(resolve_address("127.0.0.1:1"), "127.0.0.1:1")
+
+
+class TestEventToMessage(unittest.TestCase):
+    """Tests for event_to_message."""
+
+    def test_text_event(self):
+        event = Event(author="agent", content=genai_types.Content(role="model", parts=[genai_types.Part(text="hi")]))
+        message = event_to_message(event)
+        self.assertEqual(message["type"], "event")
+        self.assertEqual(message["text"], "hi")
+        self.assertTrue(message["final"])
+        self.assertEqual(message["tool_calls"], [])
+
+    def test_tool_call_event(self):
+        call = genai_types.Part(function_call=genai_types.FunctionCall(name="read_file", args={"path": "a.txt"}))
+        event = Event(author="agent", content=genai_types.Content(role="model", parts=[call]))
+        message = event_to_message(event)
+        self.assertEqual(message["tool_calls"], [{"name": "read_file", "args": {"path": "a.txt"}}])
+        self.assertFalse(message["final"])
+
+
+@patch("code_agent.services.agent_server.Runner", FakeRunner)
+class TestAgentServer(unittest.TestCase):
+    """End-to-end tests running the daemon in a background thread."""
+
+    def setUp(self):
+        FakeRunner.instances = []
+        FakeRunner.delay = 0.0
+        FakeRunner.concurrent = 0
+        FakeRunner.max_concurrent = 0
+        self.temp_dir = tempfile.TemporaryDirectory()
+        # Registered first so it runs after the daemon shutdown cleanups
+        self.addCleanup(self.temp_dir.cleanup)
+        token_dir = patch("code_agent.services.agent_client.TOKEN_DIR", Path(self.temp_dir.name))
+        token_dir.start()
+        self.addCleanup(token_dir.stop)
+        self.agent_loader = MagicMock(return_value=MagicMock(name="agent"))
+        self.session_service = InMemorySessionService()
+
+    def _start(self, address, max_concurrency=4):
+        server = AgentServer(
+            agent_loader=self.agent_loader,
+            session_service=self.session_service,
+            memory_service=MagicMock(),
+            artifact_service=MagicMock(),
+            app_name="test_app",
+            user_id="test_user",
+            max_concurrency=max_concurrency,
+            workspace=Path(os.getcwd()),
+        )
+        ready = threading.Event()
+        bound = {}
+
+        def on_ready(bound_address):
+            bound["address"] = bound_address
+            ready.set()
+
+        thread = threading.Thread(target=lambda: asyncio.run(server.serve(address, on_ready=on_ready)), daemon=True)
+        thread.start()
+        self.assertTrue(ready.wait(5))
+        client = AgentClient(bound["address"])
+        self.addCleanup(thread.join, 5)
+        self.addCleanup(client.shutdown)
+        return server, client
+
+    def test_run_over_unix_socket_reuses_warm_runner(self):
+        socket_path = Path(self.temp_dir.name) / "agent.sock"
+        _, client = self._start(str(socket_path))
+        self.assertEqual(socket_path.stat().st_mode & 0o777, 0o600)
+
+        messages = list(client.run("hello", "/agents/demo"))
+        self.assertEqual(messages[0]["type"], "session_created")
+        self.assertEqual(messages[1]["text"], "echo: hello")
+        self.assertEqual(messages[-1]["type"], "done")
+        session_id = messages[-1]["session_id"]
+
+        # A follow-up turn keeps the session and does not reload the agent
+        follow_up = list(client.run("again", "/agents/demo", session_id=session_id))
+        self.assertEqual(follow_up[-1], {"type": "done", "session_id": session_id})
+        self.assertEqual(len(FakeRunner.instances), 1)
+        self.agent_loader.assert_called_once_with(Path("/agents/demo"))
+
+        status = client.ping()
+        self.assertEqual(status["agents"], ["/agents/demo"])
+        self.assertEqual(client.get_session(session_id)["id"], session_id)
+
+    def test_agent_loading_does_not_block_other_connections(self):
+        loading = threading.Event()
+        release = threading.Event()
+
+        def slow_loader(path):
+            loading.set()
+            release.wait(5)
+            return MagicMock(name="agent")
+
+        self.agent_loader.side_effect = slow_loader
+        _, client = self._start("127.0.0.1:0")
+        messages = []
+        run_thread = threading.Thread(target=lambda: messages.extend(client.run("hello", "/agents/demo")))
+        run_thread.start()
+        self.assertTrue(loading.wait(5))
+
+        # The daemon still answers while the agent is being imported
+        self.assertEqual(client.ping()["agents"], [])
+        release.set()
+        run_thread.join(5)
+        self.assertEqual(messages[-1]["type"], "done")
+
+    def test_concurrency_limit_over_tcp(self):
+        FakeRunner.delay = 0.05
+        _, client = self._start("127.0.0.1:0", max_concurrency=2)
+
+        threads = [threading.Thread(target=lambda: list(client.run("hi", "/agents/demo"))) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(FakeRunner.max_concurrent, 2)
+
+    def test_tcp_requests_need_the_owner_only_token(self):
+        _, client = self._start("127.0.0.1:0")
+        port = int(client.address.rpartition(":")[2])
+        token_file = token_path(port)
+        self.assertEqual(token_file.stat().st_mode & 0o777, 0o600)
+        self.assertEqual(client.ping()["type"], "pong")
+
+        for token in (None, "wrong"):
+            with socket.create_connection(("127.0.0.1", port), timeout=5) as sock, sock.makefile("rb") as stream:
+                sock.sendall(json.dumps({"op": "ping", "token": token}).encode("utf-8") + b"\n")
+                self.assertEqual(json.loads(stream.readline())["type"], "error")
+                # The connection is closed after a failed attempt
+                self.assertEqual(stream.readline(), b"")
+
+    def _patch_cleanup(self):
+        job_manager = MagicMock(close_session=AsyncMock(return_value=0), close_all=AsyncMock(return_value=0))
+        shell_pool = MagicMock(close_session=AsyncMock(), close_all=AsyncMock())
+        for name, value in (("get_job_manager", job_manager), ("get_shell_pool", shell_pool)):
+            patcher = patch(f"code_agent.services.agent_server.{name}", return_value=value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        return job_manager, shell_pool
+
+    def test_session_jobs_and_shell_outlive_connections_until_closed(self):
+        job_manager, shell_pool = self._patch_cleanup()
+        _, client = self._start(str(Path(self.temp_dir.name) / "agent.sock"))
+        session_id = list(client.run("hi", "/agents/demo"))[-1]["session_id"]
+
+        # Every request is its own connection; a later turn must still find the session's jobs and shell
+        list(client.run("again", "/agents/demo", session_id=session_id))
+        client.ping()
+        job_manager.close_session.assert_not_awaited()
+
+        client.close_session(session_id)
+        job_manager.close_session.assert_awaited_once_with(session_id)
+        shell_pool.close_session.assert_awaited_once_with(session_id)
+
+    def test_idle_sessions_are_closed(self):
+        job_manager, _ = self._patch_cleanup()
+        server = AgentServer(
+            agent_loader=self.agent_loader,
+            session_service=self.session_service,
+            memory_service=MagicMock(),
+            artifact_service=MagicMock(),
+            app_name="test_app",
+            user_id="test_user",
+            workspace=Path(os.getcwd()),
+            session_idle_timeout=60,
+        )
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        async def main():
+            await server.run_turn({"instruction": "hi", "agent_path": "/agents/demo"}, send)
+            fresh = await server.close_idle_sessions()
+            with patch("code_agent.services.agent_server.time.monotonic", return_value=10**9):
+                return fresh, await server.close_idle_sessions()
+
+        with patch("code_agent.services.agent_server.Runner", FakeRunner):
+            self.assertEqual(asyncio.run(main()), (0, 1))
+        job_manager.close_session.assert_awaited_once_with(sent[-1]["session_id"])
+
+    def test_other_workspace_is_rejected(self):
+        _, client = self._start("127.0.0.1:0")
+        with patch("code_agent.services.agent_client.os.getcwd", return_value=self.temp_dir.name):
+            with self.assertRaises(AgentServerError):
+                list(client.run("hi", "/agents/demo"))
+
+    def test_second_daemon_on_same_socket_fails(self):
+        socket_path = str(Path(self.temp_dir.name) / "agent.sock")
+        self._start(socket_path)
+        server = AgentServer(
+            agent_loader=self.agent_loader,
+            session_service=self.session_service,
+            memory_service=MagicMock(),
+            artifact_service=MagicMock(),
+            app_name="test_app",
+            user_id="test_user",
+        )
+        with self.assertRaises(RuntimeError):
+            asyncio.run(server.serve(socket_path))
+
+
+class TestAgentClient(unittest.TestCase):
+    """Tests for AgentClient without a running daemon."""
+
+    def test_ping_without_daemon(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            self.assertIsNone(AgentClient(str(Path(temp_dir) / "missing.sock")).ping())
+
+
+if __name__ == "__main__":
+    unittest.main()
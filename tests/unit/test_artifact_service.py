@@ -0,0 +1,158 @@
+"""Unit tests for FileSystemArtifactService class in code_agent.services.artifact_service."""
+
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from google.genai import types as genai_types
+
+from code_agent.services.artifact_service import FileSystemArtifactService
+
+
+class TestFileSystemArtifactService(unittest.TestCase):
+    """Tests for FileSystemArtifactService."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.artifacts_dir = Path(self.temp_dir.name)
+        self.service = FileSystemArtifactService(artifacts_dir=str(self.artifacts_dir))
+        self.keys = {"app_name": "test_app", "user_id": "test_user", "session_id": "session_1"}
+
+    def tearDown(self):
+        """Clean up test fixtures."""
+        self.temp_dir.cleanup()
+
+    def _blob_files(self):
+        return [p for p in (self.artifacts_dir / "blobs").glob("*/*") if p.is_file()]
+
+    def test_init_with_empty_dir(self):
+        """Test initialization with an empty directory string."""
+        with self.assertRaises(ValueError):
+            FileSystemArtifactService(artifacts_dir="")
+
+    @patch("pathlib.Path.mkdir")
+    def test_init_with_mkdir_error(self, mock_mkdir):
+        """Test initialization with an error creating directory."""
+        mock_mkdir.side_effect = OSError("Permission denied")
+        with self.assertRaises(RuntimeError):
+            FileSystemArtifactService(artifacts_dir="/nonexistent/path")
+
+    def test_save_and_load_inline_data(self):
+        """Test saving and loading a binary artifact."""
+        part = genai_types.Part(inline_data=genai_types.Blob(data=b"\x00\x01binary", mime_type="application/octet-stream"))
+        version = self.service.save_artifact(filename="data.bin", artifact=part, **self.keys)
+
+        self.assertEqual(version, 0)
+        loaded = self.service.load_artifact(filename="data.bin", **self.keys)
+        self.assertEqual(loaded.inline_data.data, b"\x00\x01binary")
+        self.assertEqual(loaded.inline_data.mime_type, "application/octet-stream")
+
+    def test_save_and_load_text_and_empty_payload(self):
+        """Test text artifacts round-trip, including empty ones."""
+        self.service.save_artifact(filename="notes.txt", artifact=genai_types.Part(text="hello"), **self.keys)
+        self.service.save_artifact(filename="empty.txt", artifact=genai_types.Part(text=""), **self.keys)
+
+        self.assertEqual(self.service.load_artifact(filename="notes.txt", **self.keys).text, "hello")
+        self.assertEqual(self.service.load_artifact(filename="empty.txt", **self.keys).text, "")
+
+    def test_versions(self):
+        """Test that each save creates a new version and older versions stay readable."""
+        for text in ("v0", "v1", "v2"):
+            self.service.save_artifact(filename="doc.md", artifact=genai_types.Part(text=text), **self.keys)
+
+        self.assertEqual(self.service.list_versions(filename="doc.md", **self.keys), [0, 1, 2])
+        self.assertEqual(self.service.load_artifact(filename="doc.md", **self.keys).text, "v2")
+        self.assertEqual(self.service.load_artifact(filename="doc.md", version=0, **self.keys).text, "v0")
+        self.assertIsNone(self.service.load_artifact(filename="doc.md", version=7, **self.keys))
+
+    def test_load_missing_artifact(self):
+        """Test loading an artifact that was never saved."""
+        self.assertIsNone(self.service.load_artifact(filename="missing.txt", **self.keys))
+        self.assertEqual(self.service.list_versions(filename="missing.txt", **self.keys), [])
+
+    def test_identical_content_is_deduplicated_across_sessions(self):
+        """Test that identical payloads share one blob file."""
+        part = genai_types.Part(text="shared content")
+        self.service.save_artifact(filename="a.txt", artifact=part, **self.keys)
+        self.service.save_artifact(app_name="test_app", user_id="test_user", session_id="session_2", filename="b.txt", artifact=part)
+        self.service.save_artifact(filename="a.txt", artifact=part, **self.keys)
+
+        self.assertEqual(len(self._blob_files()), 1)
+
+    def test_persists_across_instances(self):
+        """Test that a new service instance sees previously saved artifacts."""
+        self.service.save_artifact(filename="report.txt", artifact=genai_types.Part(text="persisted"), **self.keys)
+
+        reopened = FileSystemArtifactService(artifacts_dir=str(self.artifacts_dir))
+        self.assertEqual(reopened.load_artifact(filename="report.txt", **self.keys).text, "persisted")
+        self.assertEqual(reopened.list_artifact_keys(**self.keys), ["report.txt"])
+
+    def test_user_namespace_is_shared_between_sessions(self):
+        """Test that 'user:' artifacts are visible from every session of the user."""
+        self.service.save_artifact(filename="user:profile", artifact=genai_types.Part(text="me"), **self.keys)
+        self.service.save_artifact(filename="local.txt", artifact=genai_types.Part(text="x"), **self.keys)
+
+        other_session = dict(self.keys, session_id="session_2")
+        self.assertEqual(self.service.list_artifact_keys(**self.keys), ["local.txt", "user:profile"])
+        self.assertEqual(self.service.list_artifact_keys(**other_session), ["user:profile"])
+        self.assertEqual(self.service.load_artifact(filename="user:profile", **other_session).text, "me")
+
+    def test_manifest_is_per_session(self):
+        """Test that each session gets its own small manifest file."""
+        self.service.save_artifact(filename="a.txt", artifact=genai_types.Part(text="a"), **self.keys)
+
+        manifest_path = self.artifacts_dir / "manifests" / "test_app" / "test_user" / "sessions" / "session_1.json"
+        manifest = json.loads(manifest_path.read_text())
+        self.assertEqual(list(manifest["artifacts"]), ["a.txt"])
+        self.assertEqual(manifest["artifacts"]["a.txt"][0]["kind"], "text")
+
+    def test_unsafe_identifiers_stay_inside_artifacts_dir(self):
+        """Test that path separators in identifiers cannot escape the manifests directory."""
+        self.service.save_artifact(app_name="../app", user_id="a/b", session_id="..", filename="x.txt", artifact=genai_types.Part(text="x"))
+
+        manifests = list((self.artifacts_dir / "manifests").rglob("*.json"))
+        self.assertEqual(len(manifests), 1)
+        self.assertTrue(manifests[0].resolve().is_relative_to(self.artifacts_dir.resolve()))
+
+    def test_open_artifact_streams_payload(self):
+        """Test streaming access to an artifact payload."""
+        payload = b"x" * 100_000
+        part = genai_types.Part(inline_data=genai_types.Blob(data=payload, mime_type="application/octet-stream"))
+        self.service.save_artifact(filename="big.bin", artifact=part, **self.keys)
+
+        with self.service.open_artifact(filename="big.bin", **self.keys) as stream:
+            self.assertEqual(stream.read(10), b"x" * 10)
+            self.assertEqual(len(stream.read()), len(payload) - 10)
+        self.assertIsNone(self.service.open_artifact(filename="missing.bin", **self.keys))
+
+    def test_delete_keeps_shared_blobs_until_pruned(self):
+        """Test that deleting an artifact keeps blobs still referenced elsewhere."""
+        shared = genai_types.Part(text="shared")
+        self.service.save_artifact(filename="a.txt", artifact=shared, **self.keys)
+        self.service.save_artifact(filename="b.txt", artifact=shared, **self.keys)
+        self.service.save_artifact(filename="c.txt", artifact=genai_types.Part(text="only c"), **self.keys)
+
+        self.service.delete_artifact(filename="a.txt", **self.keys)
+        self.service.delete_artifact(filename="c.txt", **self.keys)
+        self.assertEqual(self.service.list_artifact_keys(**self.keys), ["b.txt"])
+
+        self.assertEqual(self.service.prune_blobs(), 1)
+        self.assertEqual(self.service.load_artifact(filename="b.txt", **self.keys).text, "shared")
+
+    def test_services_sharing_a_store_see_each_others_versions(self):
+        """Test that a second service on the same directory, as in another process, loses nothing."""
+        other = FileSystemArtifactService(artifacts_dir=str(self.artifacts_dir))
+        self.service.save_artifact(filename="user:notes.txt", artifact=genai_types.Part(text="one"), **self.keys)
+        self.assertEqual(other.save_artifact(filename="user:notes.txt", artifact=genai_types.Part(text="two"), **self.keys), 1)
+        other.save_artifact(filename="report.txt", artifact=genai_types.Part(text="other"), **self.keys)
+
+        self.assertEqual(self.service.save_artifact(filename="user:notes.txt", artifact=genai_types.Part(text="three"), **self.keys), 2)
+        self.assertEqual(other.list_versions(filename="user:notes.txt", **self.keys), [0, 1, 2])
+        self.assertEqual(self.service.list_artifact_keys(**self.keys), ["report.txt", "user:notes.txt"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,133 @@
+"""
+Tests for background jobs in code_agent.tools.background_jobs and their ADK tools.
+"""
+
+import asyncio
+import sys
+import time
+from types import SimpleNamespace
+from unittest import mock
+
+import pytest
+
+from code_agent.adk.tools import check_background_job, kill_background_job, wait_for_background_job
+from code_agent.tools.background_jobs import JobLimitError, JobManager, OutputLog
+
+
+def _python(script):
+    return [sys.executable, "-c", script]
+
+
+def test_output_log_reads_by_offset_and_reports_discarded_bytes():
+    log = OutputLog(max_bytes=8)
+    log.append(b"0123456789")
+    log.append(b"ab")
+    assert (log.total, log.start) == (12, 4)
+    assert log.read(0) == (b"456789ab", 4, 12)
+    assert log.read(6, max_bytes=3) == (b"678", 6, 9)
+    assert log.read(12) == (b"", 12, 12)
+    assert log.read(50) == (b"", 12, 12)
+
+
+def test_job_output_is_polled_incrementally():
+    async def main():
+        manager = JobManager()
+        job = await manager.start("s1", _python("import time; print('first', flush=True); time.sleep(0.5); print('second')"), command="job")
+        while job.output.total == 0:
+            await asyncio.sleep(0.01)
+        first = job.describe(0)
+        assert await job.wait(10)
+        second = job.describe(job.output.total - len("second\n"))
+        return job, first, second
+
+    job, first, second = asyncio.run(main())
+
+    assert first.startswith("Job job-1 (job): running after")
+    assert "first\n" in first and "[Next output offset: 6]" in first
+    assert job.status == "exited with code 0"
+    assert "second\n" in second and "first" not in second
+    assert second.endswith(f"[Next output offset: {job.output.total}]")
+
+
+def test_sessions_are_limited_and_isolated():
+    async def main():
+        manager = JobManager(max_jobs_per_session=1)
+        job = await manager.start("s1", _python("import time; time.sleep(30)"))
+        with pytest.raises(JobLimitError):
+            await manager.start("s1", _python("pass"))
+        other = await manager.start("s2", _python("pass"))
+        assert manager.get("s2", job.job_id) is None
+        assert manager.get("s1", job.job_id) is job
+        await other.wait(10)
+
+        start = time.perf_counter()
+        assert await manager.close_session("s1") == 1
+        elapsed = time.perf_counter() - start
+        return manager, job, elapsed
+
+    manager, job, elapsed = asyncio.run(main())
+
+    assert job.status == "killed"
+    assert elapsed < 3
+    assert manager.jobs("s1") == []
+    assert len(manager.jobs("s2")) == 1
+
+
+def test_wait_times_out_and_kill_stops_child_processes():
+    script = "import subprocess, time; subprocess.Popen(['sleep', '30']); print('started', flush=True); time.sleep(30)"
+
+    async def main():
+        manager = JobManager()
+        job = await manager.start("s1", _python(script))
+        assert not await job.wait(0.2)
+        await manager.kill(job)
+        return job
+
+    start = time.perf_counter()
+    job = asyncio.run(main())
+
+    # The output pipe only closes once the grandchild holding it is gone as well
+    assert time.perf_counter() - start < 5
+    assert not job.running
+    assert "started" in job.describe()
+
+
+def test_kill_all_now_stops_jobs_whose_reader_was_cancelled():
+    manager = JobManager()
+    loop = asyncio.new_event_loop()
+    try:
+        job = loop.run_until_complete(manager.start("s1", _python("import time; time.sleep(30)")))
+        # As asyncio.run does on the way out: the output reader is cancelled, the process lives on
+        job._reader.cancel()
+        loop.run_until_complete(asyncio.sleep(0.05))
+        assert job.running
+
+        manager.kill_all_now()
+        assert loop.run_until_complete(asyncio.wait_for(job.process.wait(), 5)) == -9
+    finally:
+        loop.close()
+
+
+def test_adk_tools_poll_wait_and_kill_jobs_of_their_session():
+    manager = JobManager()
+    context = mock.MagicMock()
+    context._invocation_context.session = SimpleNamespace(id="session-1")
+    other_context = mock.MagicMock()
+    other_context._invocation_context.session = SimpleNamespace(id="session-2")
+
+    async def main():
+        done = await manager.start("session-1", _python("print('done')"))
+        sleeper = await manager.start("session-1", _python("import time; time.sleep(30)"))
+        waited = await wait_for_background_job(context, done.job_id, timeout=10)
+        still_running = await wait_for_background_job(context, sleeper.job_id, timeout=0)
+        hidden = await check_background_job(other_context, sleeper.job_id)
+        killed = await kill_background_job(context, sleeper.job_id)
+        return waited, still_running, hidden, killed
+
+    with mock.patch("code_agent.adk.tools.get_job_manager", return_value=manager):
+        waited, still_running, hidden, killed = asyncio.run(main())
+
+    assert "exited with code 0" in waited and "done" in waited
+    assert still_running.endswith("[Still running after waiting 0s]")
+    assert hidden == "Error: No background job 'job-2' in this session."
+    assert ": killed after" in killed
@@ -0,0 +1,218 @@
+"""Unit tests for concurrent batch execution (code_agent.services.batch_runner) and the 'batch' command."""
+
+import asyncio
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from google.adk.events import Event
+from google.adk.sessions.in_memory_session_service import InMemorySessionService
+from google.genai import types as genai_types
+from typer.testing import CliRunner
+
+from code_agent.cli.main import app
+from code_agent.services.batch_runner import BatchRunner, parse_instruction, usage_from_event
+
+
+class FakeRunner:
+    """Stands in for google.adk.runners.Runner: one tool call, then an echo of the instruction."""
+
+    def __init__(self, delay=0.0, **kwargs):
+        self.delay = delay
+        self.concurrent = 0
+        self.max_concurrent = 0
+        self.order = []
+
+    async def run_async(self, user_id, session_id, new_message):
+        text = new_message.parts[0].text
+        self.order.append(text)
+        self.concurrent += 1
+        self.max_concurrent = max(self.max_concurrent, self.concurrent)
+        try:
+            if text == "boom":
+                raise RuntimeError("model unavailable")
+            call = genai_types.Part(function_call=genai_types.FunctionCall(name="read_file", args={"path": "a.txt"}))
+            yield Event(author="agent", content=genai_types.Content(role="model", parts=[call]))
+            await asyncio.sleep(self.delay)
+            yield Event(author="agent", content=genai_types.Content(role="model", parts=[genai_types.Part(text=f"echo: {text}")]))
+        finally:
+            self.concurrent -= 1
+
+
+def _run_batch(lines, runner=None, max_concurrency=2):
+    runner = runner or FakeRunner()
+    batch = BatchRunner(
+        runner=runner,
+        session_service=InMemorySessionService(),
+        app_name="test_app",
+        user_id="test_user",
+        max_concurrency=max_concurrency,
+    )
+    results = []
+    summary = asyncio.run(batch.run(lines, results.append))
+    return sorted(results, key=lambda result: result["index"]), summary
+
+
+class TestParseInstruction(unittest.TestCase):
+    """Tests for parse_instruction."""
+
+    def test_object_and_string_lines(self):
+        self.assertEqual(parse_instruction('{"instruction": "hi", "id": "a"}'), {"instruction": "hi", "id": "a"})
+        self.assertEqual(parse_instruction('"hi"'), {"instruction": "hi"})
+
+    def test_invalid_lines(self):
+        for line in ["not json", "[1, 2]", '{"id": "a"}', '{"instruction": "  "}']:
+            with self.subTest(line=line), self.assertRaises(ValueError):
+                parse_instruction(line)
+
+
+class TestBatchRunner(unittest.TestCase):
+    """Tests for BatchRunner."""
+
+    def test_results_for_every_instruction(self):
+        lines = ['{"instruction": "one", "id": "first"}', "", '"two"', "not json", '"boom"']
+        results, summary = _run_batch(lines)
+
+        self.assertEqual([result["index"] for result in results], [0, 2, 3, 4])
+        first = results[0]
+        self.assertEqual(first["id"], "first")
+        self.assertEqual(first["status"], "ok")
+        self.assertEqual(first["final_text"], "echo: one")
+        self.assertEqual(first["tool_calls"], 1)
+        self.assertTrue(first["usage"]["estimated"])
+        self.assertIsNotNone(first["session_id"])
+        self.assertGreaterEqual(first["latency_s"], 0)
+        self.assertNotEqual(results[1]["session_id"], first["session_id"])
+
+        self.assertEqual(results[2]["status"], "error")
+        self.assertIn("Invalid input line", results[2]["error"])
+        self.assertEqual(set(results[2]), set(first))
+        self.assertIsNone(results[2]["session_id"])
+        self.assertIsNone(results[2]["latency_s"])
+        self.assertEqual(results[3]["status"], "error")
+        self.assertEqual(results[3]["error"], "RuntimeError: model unavailable")
+
+        self.assertEqual(summary["total"], 4)
+        self.assertEqual(summary["succeeded"], 2)
+        self.assertEqual(summary["failed"], 2)
+
+    def test_concurrency_is_bounded(self):
+        runner = FakeRunner(delay=0.02)
+        results, _ = _run_batch([f'"task {i}"' for i in range(8)], runner=runner, max_concurrency=3)
+        self.assertEqual(len(results), 8)
+        self.assertEqual(runner.max_concurrent, 3)
+
+    def test_shared_session_runs_in_input_order(self):
+        runner = FakeRunner(delay=0.01)
+        session_service = InMemorySessionService()
+        session_id = session_service.create_session(app_name="test_app", user_id="test_user").id
+        lines = [json.dumps({"instruction": f"step {i}", "session_id": session_id}) for i in range(4)]
+        batch = BatchRunner(runner=runner, session_service=session_service, app_name="test_app", user_id="test_user", max_concurrency=4)
+
+        asyncio.run(batch.run(lines, lambda result: None))
+
+        self.assertEqual(runner.order, [f"step {i}" for i in range(4)])
+        self.assertEqual(runner.max_concurrent, 1)
+
+    def test_sessions_are_closed_after_their_last_instruction(self):
+        session_service = InMemorySessionService()
+        shared = session_service.create_session(app_name="test_app", user_id="test_user").id
+        lines = [json.dumps({"instruction": f"step {i}", "session_id": shared}) for i in range(3)] + ['"alone"']
+        batch = BatchRunner(runner=FakeRunner(delay=0.01), session_service=session_service, app_name="test_app", user_id="test_user")
+        results = []
+        job_manager = MagicMock(close_session=AsyncMock(return_value=0))
+        shell_pool = MagicMock(close_session=AsyncMock())
+
+        with (
+            patch("code_agent.services.batch_runner.get_job_manager", return_value=job_manager),
+            patch("code_agent.services.batch_runner.get_shell_pool", return_value=shell_pool),
+        ):
+            asyncio.run(batch.run(lines, results.append))
+
+        closed = sorted(call.args[0] for call in job_manager.close_session.await_args_list)
+        self.assertEqual(closed, sorted({result["session_id"] for result in results}))
+        self.assertEqual(shell_pool.close_session.await_count, 2)
+
+    def test_usage_from_event(self):
+        event = MagicMock(usage_metadata=MagicMock(prompt_token_count=10, candidates_token_count=5, total_token_count=15))
+        self.assertEqual(usage_from_event(event), {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15})
+        self.assertIsNone(usage_from_event(Event(author="agent")))
+
+    def test_usage_is_summed_across_events(self):
+        usage = {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15}
+        with patch("code_agent.services.batch_runner.usage_from_event", return_value=usage):
+            results, _ = _run_batch(['"one"'])
+        self.assertEqual(results[0]["usage"], {"prompt_tokens": 20, "completion_tokens": 10, "total_tokens": 30})
+
+    def test_usage_is_estimated_when_the_model_does_not_report_it(self):
+        session_service = InMemorySessionService()
+        session = session_service.create_session(app_name="test_app", user_id="test_user")
+        history = Event(author="agent", content=genai_types.Content(role="model", parts=[genai_types.Part(text="earlier answer " * 50)]))
+        session_service.append_event(session, history)
+        batch = BatchRunner(runner=FakeRunner(), session_service=session_service, app_name="test_app", user_id="test_user")
+
+        result = asyncio.run(batch.run_instruction({"instruction": "one", "session_id": session.id}))
+
+        usage = result["usage"]
+        self.assertTrue(usage["estimated"])
+        # Two model responses, each sent the prior history, which already includes the earlier answer
+        self.assertGreater(usage["prompt_tokens"], 2 * 100)
+        self.assertGreater(usage["completion_tokens"], 0)
+        self.assertEqual(usage["total_tokens"], usage["prompt_tokens"] + usage["completion_tokens"])
+
+    def test_invalid_concurrency(self):
+        with self.assertRaises(ValueError):
+            BatchRunner(runner=FakeRunner(), session_service=InMemorySessionService(), app_name="a", user_id="u", max_concurrency=0)
+
+
+class TestBatchCommand(unittest.TestCase):
+    """Tests for the 'batch' CLI command."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.input_path = Path(self.tmp.name) / "instructions.jsonl"
+        self.output_path = Path(self.tmp.name) / "results.jsonl"
+
+        cfg = MagicMock(app_name="test_app", user_id="test_user", verbosity=1)
+        for target, kwargs in [
+            ("code_agent.cli.commands.batch.initialize_config", {}),
+            ("code_agent.cli.commands.batch.get_config", {"return_value": cfg}),
+            ("code_agent.cli.commands.batch.setup_logging", {}),
+            ("code_agent.cli.commands.batch._resolve_agent_path_str", {"return_value": self.tmp.name}),
+            ("code_agent.cli.commands.batch.load_agent", {"return_value": MagicMock()}),
+            ("code_agent.cli.commands.batch.create_services", {"return_value": (InMemorySessionService(), None, None)}),
+            ("google.adk.runners.Runner", {"side_effect": FakeRunner}),
+        ]:
+            patcher = patch(target, **kwargs)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_writes_jsonl_results(self):
+        self.input_path.write_text('"one"\n{"instruction": "two", "id": "b"}\n', encoding="utf-8")
+
+        result = CliRunner(mix_stderr=False).invoke(app, ["batch", str(self.input_path), "-o", str(self.output_path), "-c", "2"])
+
+        self.assertEqual(result.exit_code, 0, result.stderr)
+        results = [json.loads(line) for line in self.output_path.read_text(encoding="utf-8").splitlines()]
+        self.assertEqual(sorted(r["final_text"] for r in results), ["echo: one", "echo: two"])
+        self.assertIn("2/2 instructions succeeded", result.stderr)
+
+    def test_failures_set_exit_code(self):
+        self.input_path.write_text('"boom"\n', encoding="utf-8")
+
+        result = CliRunner(mix_stderr=False).invoke(app, ["batch", str(self.input_path)])
+
+        self.assertEqual(result.exit_code, 1)
+        self.assertEqual(json.loads(result.stdout)["status"], "error")
+
+    def test_missing_input_file(self):
+        result = CliRunner(mix_stderr=False).invoke(app, ["batch", str(self.input_path)])
+        self.assertEqual(result.exit_code, 1)
+        self.assertIn("Could not read instructions", result.stderr)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+"""
+Tests for the microbenchmark harness in benchmarks/.
+"""
+
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from benchmarks import harness
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+
+
+def test_measure_scales_loops():
+    calls = []
+    stats = harness.measure(lambda: calls.append(1), min_time=0.001, repeat=3)
+
+    assert stats["repeat"] == 3
+    assert stats["loops"] > 1
+    assert len(calls) > 3 * stats["loops"]
+    assert 0 < stats["min"] <= stats["median"]
+    assert stats["stdev"] >= 0
+
+
+def test_benchmark_names_are_unique(monkeypatch):
+    monkeypatch.setattr(harness, "BENCHMARKS", {})
+    harness.benchmark("a.b")(lambda workspace: None)
+    with pytest.raises(ValueError):
+        harness.benchmark("a.b")(lambda workspace: None)
+
+
+def test_results_round_trip_and_compare(tmp_path):
+    baseline = harness.new_results(min_time=0.1, repeat=3)
+    baseline["benchmarks"] = {"fast": {"min": 1.0}, "slow": {"min": 1.0}, "removed": {"min": 1.0}}
+    harness.save_results(baseline, tmp_path / "base.json")
+    loaded = harness.load_results(tmp_path / "base.json")
+    assert loaded == baseline
+
+    current = {"benchmarks": {"fast": {"min": 0.5}, "slow": {"min": 1.3}, "added": {"min": 1.0}}}
+    comparisons = {c.name: c for c in harness.compare(loaded, current, threshold=1.25)}
+    assert set(comparisons) == {"fast", "slow"}
+    assert comparisons["fast"].ratio == 0.5
+    assert not comparisons["fast"].regressed
+    assert comparisons["slow"].regressed
+
+
+def test_load_results_rejects_other_files(tmp_path):
+    path = tmp_path / "other.json"
+    path.write_text(json.dumps({"version": 99, "benchmarks": {}}))
+    with pytest.raises(ValueError):
+        harness.load_results(path)
+
+
+def test_format_seconds():
+    assert harness.format_seconds(2.5) == "2.50 s"
+    assert harness.format_seconds(0.0125) == "12.50 ms"
+    assert harness.format_seconds(3e-6) == "3.00 us"
+    assert harness.format_seconds(4e-8) == "40 ns"
+
+
+def test_run_flags_regressions(tmp_path):
+    name = "security.is_command_safe.mix_8"
+    baseline = harness.new_results(min_time=0.01, repeat=1)
+    baseline["benchmarks"][name] = {"min": 1e-12}
+    harness.save_results(baseline, tmp_path / "baseline.json")
+
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-m",
+            "benchmarks",
+            "-k",
+            name,
+            "--min-time",
+            "0.01",
+            "--repeat",
+            "2",
+            "-o",
+            str(tmp_path / "run.json"),
+            "--compare",
+            str(tmp_path / "baseline.json"),
+        ],
+        cwd=REPO_ROOT,
+        capture_output=True,
+        text=True,
+        timeout=120,
+    )
+
+    assert result.returncode == 1, result.stdout + result.stderr
+    assert "REGRESSION" in result.stdout
+    written = harness.load_results(tmp_path / "run.json")
+    assert list(written["benchmarks"]) == [name]
+    assert written["benchmarks"][name]["repeat"] == 2
@@ -3,10 +3,13 @@ Tests to increase coverage for code_agent.cli.commands.run module.
 """
 
 import importlib
+import subprocess
+import sys
 from pathlib import Path
 from unittest.mock import MagicMock, patch
 
 import pytest
+import typer
 from rich.console import Console
 
 from code_agent.cli.commands.run import run_command
@@ -46,7 +49,6 @@ class TestRunCommandAdditionalCoverage:
     @patch("pathlib.Path.is_dir")
     @patch("importlib.util.spec_from_file_location")
     @patch("importlib.util.module_from_spec")
-    @patch("sys.modules", {"warnings": MagicMock(), "dataclasses": MagicMock()})  # Mock both required modules
     def test_run_command_with_temperature_and_max_tokens_override(
         self,
         mock_module_from_spec,
@@ -72,7 +74,6 @@ class TestRunCommandAdditionalCoverage:
     @patch("code_agent.cli.commands.run._resolve_agent_path_str")
     @patch("code_agent.cli.commands.run.run_cli")
     @patch("code_agent.cli.commands.run.JsonFileMemoryService")
-    @patch("sys.modules", {"warnings": MagicMock(), "dataclasses": MagicMock()})  # Mock both required modules
     def test_run_command_with_memory_service(
         self, mock_json_memory_service, mock_run_cli, mock_resolve_path, mock_get_config, mock_init_config, mock_console_class
     ):
@@ -126,13 +127,157 @@ class TestRunCommandAdditionalCoverage:
         call_kwargs = mock_run_cli.call_args[1]
         assert "artifact_service" in call_kwargs, "artifact_service should be passed to run_cli"
 
+    @patch("code_agent.cli.commands.run.Console")
+    @patch("code_agent.cli.commands.run.ADK_INSTALLED", True)
+    @patch("code_agent.cli.commands.run.InMemorySessionService", MagicMock())
+    @patch("code_agent.cli.commands.run.FileSystemArtifactService")
+    @patch("code_agent.cli.commands.run.initialize_config")
+    @patch("code_agent.cli.commands.run.get_config")
+    @patch("code_agent.cli.commands.run._resolve_agent_path_str")
+    @patch("code_agent.cli.commands.run.run_cli")
+    def test_run_command_with_filesystem_artifact_service(
+        self, mock_run_cli, mock_resolve_path, mock_get_config, mock_init_config, mock_fs_artifact_service, mock_console_class
+    ):
+        """Test run_command selects FileSystemArtifactService from config."""
+        mock_console_class.return_value = self.mock_console
+        self.mock_config.artifacts = MagicMock(storage="filesystem", artifacts_dir=None)
+        mock_get_config.return_value = self.mock_config
+        mock_resolve_path.return_value = str(self.agent_file_path)
+
+        with patch.object(importlib, "import_module") as mock_import:
+            mock_module = MagicMock()
+            mock_module.root_agent = MagicMock()
+            mock_import.return_value = mock_module
+
+            with patch.object(Path, "is_file", return_value=False):
+                with patch.object(Path, "is_dir", return_value=True):
+                    with patch.object(Path, "mkdir"):
+                        run_command(
+                            instruction="Test instruction",
+                            agent_path=self.agent_file_path,
+                            session_id=None,
+                            interactive=False,
+                            show_timestamps=False,
+                            log_level=None,
+                            provider=None,
+                            model=None,
+                            temperature=None,
+                            max_tokens=None,
+                            save_session_cli=False,
+                            verbose=False,
+                        )
+
+        mock_fs_artifact_service.assert_called_once_with(artifacts_dir=str(Path("/tmp/sessions/artifacts")))
+        assert mock_run_cli.call_args[1]["artifact_service"] is mock_fs_artifact_service.return_value
+
+    @patch("code_agent.cli.commands.run.Console")
+    @patch("code_agent.cli.commands.run.ADK_INSTALLED", True)
+    @patch("code_agent.cli.commands.run.InMemorySessionService", MagicMock())
+    @patch("code_agent.cli.commands.run.initialize_config")
+    @patch("code_agent.cli.commands.run.get_config")
+    @patch("code_agent.cli.commands.run._resolve_agent_path_str")
+    @patch("code_agent.cli.commands.run.run_cli")
+    @patch("code_agent.cli.commands.run.load_agent")
+    @patch("code_agent.cli.commands.run.AgentClient")
+    def test_run_command_forwards_to_server(
+        self, mock_client_class, mock_load_agent, mock_run_cli, mock_resolve_path, mock_get_config, mock_init_config, mock_console_class
+    ):
+        """Test run_command --server forwards the instruction to the daemon instead of loading the agent."""
+        mock_console_class.return_value = self.mock_console
+        self.mock_config.server = MagicMock(address="/tmp/test-agent.sock")
+        mock_get_config.return_value = self.mock_config
+        mock_resolve_path.return_value = str(self.agent_file_path)
+        mock_client = mock_client_class.return_value
+        mock_client.run.return_value = iter(
+            [
+                {"type": "event", "author": "agent", "text": "Done", "partial": False, "final": True, "tool_calls": [], "error": None},
+                {"type": "done", "session_id": "remote-session"},
+            ]
+        )
+
+        run_command(
+            instruction="Test instruction",
+            agent_path=self.agent_file_path,
+            session_id=None,
+            interactive=False,
+            show_timestamps=False,
+            log_level=None,
+            provider=None,
+            model=None,
+            temperature=None,
+            max_tokens=None,
+            save_session_cli=False,
+            verbose=False,
+            server=True,
+        )
+
+        mock_client_class.assert_called_once_with("/tmp/test-agent.sock")
+        mock_client.run.assert_called_once_with("Test instruction", str(self.agent_file_path), session_id=None, user_id="test_user")
+        mock_client.close_session.assert_called_once_with("remote-session")
+        mock_load_agent.assert_not_called()
+        mock_run_cli.assert_not_called()
+
+    @patch("code_agent.cli.commands.run.Console")
+    @patch("code_agent.cli.commands.run.initialize_config")
+    @patch("code_agent.cli.commands.run.AgentClient")
+    def test_run_command_rejects_model_options_with_server(self, mock_client_class, mock_init_config, mock_console_class):
+        """Test run_command --server refuses model options the daemon would silently ignore."""
+        mock_console_class.return_value = self.mock_console
+        with pytest.raises(typer.Exit):
+            run_command(instruction="Test instruction", agent_path=self.agent_file_path, model="gpt-4o", temperature=0.2, server=True)
+        mock_init_config.assert_not_called()
+        mock_client_class.assert_not_called()
+
+    @patch("code_agent.cli.commands.run.Console")
+    @patch("code_agent.cli.commands.run.initialize_config")
+    @patch("code_agent.cli.commands.run.AgentClient")
+    def test_run_command_rejects_local_options_with_server(self, mock_client_class, mock_init_config, mock_console_class):
+        """Test run_command --server refuses --trace, --profile and --stream, which would only apply to this process."""
+        mock_console_class.return_value = self.mock_console
+        for option in ({"trace_file": Path("trace.json")}, {"profile_dir": Path("profiles")}, {"stream": True}):
+            with pytest.raises(typer.Exit):
+                run_command(instruction="Test instruction", agent_path=self.agent_file_path, server=True, **option)
+        mock_init_config.assert_not_called()
+        mock_client_class.assert_not_called()
+
+    @patch("code_agent.cli.commands.run.Console")
+    @patch("code_agent.cli.commands.run.initialize_config")
+    @patch("code_agent.cli.commands.run.get_config")
+    @patch("code_agent.cli.commands.run._resolve_agent_path_str")
+    @patch("code_agent.cli.commands.run.AgentClient")
+    def test_run_command_saves_server_session_with_session_service(
+        self, mock_client_class, mock_resolve_path, mock_get_config, mock_init_config, mock_console_class, tmp_path
+    ):
+        """Test run_command --server --save-session writes the daemon's session through FileSystemSessionService."""
+        from google.adk.sessions import Session
+
+        mock_console_class.return_value = self.mock_console
+        self.mock_config.server = MagicMock(address="/tmp/test-agent.sock")
+        self.mock_config.sessions_dir = str(tmp_path / "sessions")
+        mock_get_config.return_value = self.mock_config
+        mock_resolve_path.return_value = str(self.agent_file_path)
+        mock_client = mock_client_class.return_value
+        mock_client.run.return_value = iter([{"type": "done", "session_id": "remote-session"}])
+        session = Session(id="remote-session", app_name="test_app", user_id="test_user")
+        mock_client.get_session.return_value = session.model_dump(mode="json")
+
+        run_command(instruction="Test instruction", agent_path=self.agent_file_path, save_session_cli=True, server=True, stream=False)
+
+        saved = Path(self.mock_config.sessions_dir) / "remote-session.session.json"
+        assert Session.model_validate_json(saved.read_text()) == session
+
+    def test_importing_run_does_not_import_adk(self):
+        """Test that the module 'run --server' loads leaves ADK and genai unimported."""
+        script = "import sys, code_agent.cli.commands.run; print(sorted(m for m in ('google.adk', 'google.genai') if m in sys.modules))"
+        result = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True)
+        assert result.stdout.strip() == "[]"
+
     @patch("code_agent.cli.commands.run.Console")
     @patch("code_agent.cli.commands.run.ADK_INSTALLED", True)
     @patch("code_agent.cli.commands.run.InMemorySessionService", MagicMock())
     @patch("code_agent.cli.commands.run.initialize_config")
     @patch("code_agent.cli.commands.run.get_config")
     @patch("code_agent.cli.commands.run._resolve_agent_path_str")
-    @patch("sys.modules", {"warnings": MagicMock(), "dataclasses": MagicMock()})  # Mock both required modules
     def test_run_command_with_neither_file_nor_directory(self, mock_resolve_path, mock_get_config, mock_init_config, mock_console_class):
         """Test run_command with a path that is neither a file nor a directory."""
         # Skip this test as it requires deeper mocking to fix
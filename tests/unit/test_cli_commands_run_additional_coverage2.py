@@ -38,7 +38,6 @@ class TestCliCommandsRun:
     @patch("code_agent.cli.commands.run.initialize_config")
     @patch("code_agent.cli.commands.run.get_config")
     @patch("code_agent.cli.commands.run._resolve_agent_path_str")
-    @patch("sys.modules", {"warnings": MagicMock(), "dataclasses": MagicMock()})  # Mock both required modules
     def test_agent_path_resolution_failure(self, mock_resolve_path, mock_get_config, mock_init_config, mock_console_class):
         """Test run_command when agent path resolution fails."""
         # Skip this test as it requires deeper mocking to fix
@@ -53,7 +52,6 @@ class TestCliCommandsRun:
     @patch("pathlib.Path.is_file")
     @patch("pathlib.Path.is_dir")
     @patch("importlib.util.spec_from_file_location")
-    @patch("sys.modules", {"warnings": MagicMock(), "dataclasses": MagicMock()})  # Mock both required modules
     def test_agent_module_spec_creation_failure(
         self, mock_spec_from_file, mock_is_dir, mock_is_file, mock_resolve_path, mock_get_config, mock_init_config, mock_console_class
     ):
@@ -71,7 +69,6 @@ class TestCliCommandsRun:
     @patch("pathlib.Path.is_dir")
     @patch("importlib.util.spec_from_file_location")
     @patch("importlib.util.module_from_spec")
-    @patch("sys.modules", {"warnings": MagicMock(), "dataclasses": MagicMock()})  # Mock both required modules
     def test_agent_module_import_failure(
         self, mock_module_from_spec, mock_spec_from_file, mock_is_dir, mock_is_file, mock_resolve_path, mock_get_config, mock_init_config, mock_console_class
     ):
@@ -89,7 +86,6 @@ class TestCliCommandsRun:
     @patch("pathlib.Path.is_dir")
     @patch("importlib.util.spec_from_file_location")
     @patch("importlib.util.module_from_spec")
-    @patch("sys.modules", {"warnings": MagicMock(), "dataclasses": MagicMock()})  # Mock both required modules
     def test_agent_module_missing_root_agent(
         self, mock_module_from_spec, mock_spec_from_file, mock_is_dir, mock_is_file, mock_resolve_path, mock_get_config, mock_init_config, mock_console_class
     ):
@@ -0,0 +1,80 @@
+"""
+Tests for lazy subcommand loading in code_agent.cli.lazy.
+"""
+
+import sys
+import types
+from typing import ClassVar, Dict
+
+import pytest
+import typer
+from typer.testing import CliRunner
+
+from code_agent.cli.lazy import LazyCommand, LazyTyperGroup
+
+MODULE_NAME = "code_agent_lazy_test_commands"
+
+
+@pytest.fixture
+def commands_module():
+    """Registers a fake command module that records when it is imported."""
+    module = types.ModuleType(MODULE_NAME)
+    sub_app = typer.Typer(help="Sub-app help.")
+
+    @sub_app.command("list")
+    def sub_list():
+        print("listed")
+
+    def greet(name: str = typer.Option("world", "--name")):
+        """Say hello."""
+        print(f"hello {name}")
+
+    module.greet = greet
+    module.sub_app = sub_app
+    sys.modules[MODULE_NAME] = module
+    yield module
+    sys.modules.pop(MODULE_NAME, None)
+
+
+@pytest.fixture
+def app():
+    class Group(LazyTyperGroup):
+        lazy_commands: ClassVar[Dict[str, LazyCommand]] = {
+            "greet": LazyCommand(MODULE_NAME, "greet", "Say hello."),
+            "sub": LazyCommand(MODULE_NAME, "sub_app", "Sub-app help."),
+        }
+
+    lazy_app = typer.Typer(cls=Group)
+
+    @lazy_app.callback()
+    def main():
+        pass
+
+    return lazy_app
+
+
+def test_help_lists_commands_without_importing(app, commands_module, monkeypatch):
+    monkeypatch.delitem(sys.modules, MODULE_NAME)
+    result = CliRunner().invoke(app, ["--help"])
+
+    assert result.exit_code == 0
+    assert "greet" in result.stdout
+    assert "Sub-app help." in result.stdout
+    assert MODULE_NAME not in sys.modules
+
+
+def test_invokes_lazy_function_command(app, commands_module):
+    result = CliRunner().invoke(app, ["greet", "--name", "lazy"])
+    assert result.exit_code == 0
+    assert "hello lazy" in result.stdout
+
+
+def test_invokes_lazy_sub_app(app, commands_module):
+    result = CliRunner().invoke(app, ["sub", "list"])
+    assert result.exit_code == 0
+    assert "listed" in result.stdout
+
+
+def test_unknown_command(app, commands_module):
+    result = CliRunner().invoke(app, ["missing"])
+    assert result.exit_code != 0
@@ -25,8 +25,8 @@ class TestProviderList:
         """Test 'provider list' when all cloud providers have keys."""
         # Arrange
         mock_config = MagicMock()
-        mock_config.llm.provider = "openai"  # Example default
-        mock_config.llm.model = "gpt-4o"
+        mock_config.default_provider = "openai"  # Example default
+        mock_config.default_model = "gpt-4o"
         mock_config.ollama = None  # Use default Ollama URL
         mock_get_config.return_value = mock_config
 
@@ -63,8 +63,8 @@ class TestProviderList:
         """Test 'provider list' when no cloud keys found and Ollama is default."""
         # Arrange
         mock_config = MagicMock()
-        mock_config.llm.provider = "ollama"  # Ollama default
-        mock_config.llm.model = "llama3"
+        mock_config.default_provider = "ollama"  # Ollama default
+        mock_config.default_model = "llama3"
         mock_config.ollama.url = "http://custom-ollama:11434"  # Custom Ollama URL
         mock_get_config.return_value = mock_config
 
@@ -105,8 +105,8 @@ class TestProviderList:
         """Test 'provider list' when no cloud keys found and a cloud provider is default."""
         # Arrange
         mock_config = MagicMock()
-        mock_config.llm.provider = "anthropic"  # Cloud default, but key missing
-        mock_config.llm.model = "claude-3-haiku"
+        mock_config.default_provider = "anthropic"  # Cloud default, but key missing
+        mock_config.default_model = "claude-3-haiku"
         mock_config.ollama = None  # Default Ollama URL
         mock_get_config.return_value = mock_config
 
@@ -74,7 +74,9 @@ class TestRunCli:
         )
 
         # Verify Runner was initialized correctly
-        mock_runner_class.assert_called_once_with(session_service=mock_session_service, app_name="test_app", agent=mock_agent, memory_service=None)
+        mock_runner_class.assert_called_once_with(
+            session_service=mock_session_service, app_name="test_app", agent=mock_agent, artifact_service=None, memory_service=None
+        )
 
         # Verify signal handler was set up
         mock_signal.assert_called_with(signal.SIGINT, ANY)
@@ -153,7 +155,7 @@ class TestRunCli:
         mock_runner_class.return_value = mock_runner
 
         # Set up mock async function
-        mock_asyncio_run.return_value = ("test_session_id", True)
+        mock_asyncio_run.return_value = "test_session_id"
 
         # Call run_cli in interactive mode with instruction
         run_cli(
@@ -167,8 +169,8 @@ class TestRunCli:
             initial_instruction="Initial instruction",
         )
 
-        # Should run asyncio.run twice - once for initial instruction, once for interactive mode
-        assert mock_asyncio_run.call_count == 2
+        # The initial instruction and the interactive turns share a single event loop
+        mock_asyncio_run.assert_called_once()
 
     @patch("code_agent.cli.utils.Runner")
     @patch("code_agent.cli.utils.Prompt.ask")
@@ -0,0 +1,110 @@
+"""
+Tests for incremental rendering of streamed output in code_agent.cli.streaming.
+"""
+
+import asyncio
+import io
+from unittest.mock import patch
+
+from rich.console import Console
+
+from code_agent.cli.streaming import MarkdownBlocks, StreamRenderer
+
+
+def _console(terminal):
+    return Console(file=io.StringIO(), force_terminal=terminal, width=80, color_system=None)
+
+
+def test_blocks_finish_at_blank_lines():
+    blocks = MarkdownBlocks()
+    blocks.feed("# Title\n\nFirst para")
+    assert blocks.take_finished() == "# Title"
+    assert blocks.trailing == "First para"
+
+    blocks.feed("graph\n")
+    assert blocks.take_finished() == ""
+
+    blocks.feed("\nSecond")
+    assert blocks.take_finished() == "First paragraph"
+    assert blocks.trailing == "Second"
+
+
+def test_blocks_do_not_split_code_fences():
+    blocks = MarkdownBlocks()
+    blocks.feed("```python\nx = 1\n\ny = 2\n")
+    assert blocks.take_finished() == ""
+
+    blocks.feed("```\n\nafter")
+    assert blocks.take_finished() == "```python\nx = 1\n\ny = 2\n```"
+    assert blocks.trailing == "after"
+
+
+def test_blocks_join_fed_chunks_on_read():
+    blocks = MarkdownBlocks()
+    for _ in range(1000):
+        blocks.feed("ab")
+    assert blocks.text == "ab" * 1000
+    blocks.feed("\n\nc")
+    assert blocks.take_finished() == "ab" * 1000
+    assert blocks.trailing == "c"
+
+
+def test_raw_text_when_not_a_terminal():
+    console = _console(terminal=False)
+    renderer = StreamRenderer(console, header="Agent:")
+    assert not renderer.live_output
+
+    for chunk in ["**bold", "** text", "\n\nmore"]:
+        renderer.append(chunk)
+
+    assert renderer.finish("**bold** text\n\nmore and the rest") == "**bold** text\n\nmore and the rest"
+    assert console.file.getvalue() == "Agent:\n**bold** text\n\nmore and the rest\n"
+    assert not renderer.active
+
+
+def test_live_refreshes_are_capped():
+    now = [0.0]
+    renderer = StreamRenderer(_console(terminal=True), max_refresh_per_second=4, clock=lambda: now[0])
+    assert renderer.live_output
+
+    with patch.object(renderer, "_refresh", wraps=renderer._refresh) as refresh:
+        for _ in range(50):
+            renderer.append("word ")
+        assert refresh.call_count == 1
+
+        now[0] = 0.3
+        renderer.append("word ")
+        assert refresh.call_count == 2
+
+        renderer.finish()
+
+
+def test_throttled_chunk_is_drawn_after_the_refresh_interval():
+    async def stream():
+        renderer = StreamRenderer(_console(terminal=True), max_refresh_per_second=50)
+        with patch.object(renderer, "_refresh", wraps=renderer._refresh) as refresh:
+            renderer.append("first ")
+            renderer.append("last")
+            assert refresh.call_count == 1
+
+            # The stream stalls; the trailing refresh still draws the last chunk
+            await asyncio.sleep(0.1)
+            assert refresh.call_count == 2
+            renderer.finish()
+
+    asyncio.run(stream())
+
+
+def test_live_prints_each_block_once():
+    console = _console(terminal=True)
+    renderer = StreamRenderer(console, clock=lambda: 0.0, max_refresh_per_second=1)
+    renderer.append("# Heading\n\n")
+    renderer.append("Body text\n\n")
+    renderer.append("Tail")
+    renderer.finish("# Heading\n\nBody text\n\nTail end")
+
+    output = console.file.getvalue()
+    for text in ("Heading", "Body text", "Tail end"):
+        assert text in output
+    # Finished blocks are printed once above the live region, which is cleared on exit
+    assert output.count("Body text") == 1
@@ -6,6 +6,7 @@ Tests for code_agent.cli.utils module.
 import asyncio
 import logging
 import signal
+import threading
 import unittest  # Add this import
 from pathlib import Path  # Ensure Path is imported
 from unittest.mock import MagicMock, patch
@@ -327,6 +328,127 @@ def test_run_cli_sigint_interactive(
     assert mock_prompt_ask.call_count <= 1  # Called 0 or 1 times depending on timing
 
 
+def _final_event(text="done"):
+    from google.adk.events import Event
+    from google.genai import types as genai_types
+
+    return Event(author="mock_agent", content=genai_types.Content(role="model", parts=[genai_types.Part(text=text)]))
+
+
+@patch("code_agent.cli.utils.Runner")
+@patch("code_agent.cli.utils.Console")
+@patch("code_agent.cli.utils.Prompt.ask")
+def test_run_cli_interactive_background_work_runs_while_prompting(mock_prompt_ask, mock_console_class, mock_runner_class):
+    """Work scheduled on the session loop proceeds while the prompt waits for input."""
+    ran = threading.Event()
+    memory_service = MagicMock()
+
+    async def mock_run_async(*args, **kwargs):
+        # Stands in for work a model client leaves on the loop, such as closing a connection
+        asyncio.get_running_loop().call_later(0.01, ran.set)
+        yield _final_event()
+
+    mock_runner_class.return_value.run_async.side_effect = mock_run_async
+
+    ran_while_prompting = []
+
+    def ask(prompt):
+        # Only returns once the loop has run the scheduled callback
+        ran_while_prompting.append(ran.wait(timeout=5))
+        return "exit"
+
+    mock_prompt_ask.side_effect = ask
+
+    from code_agent.cli.utils import run_cli
+
+    with patch("code_agent.cli.utils.asyncio.run", wraps=asyncio.run) as mock_asyncio_run:
+        run_cli(
+            MockAgent(),
+            "test_app",
+            interactive=True,
+            initial_instruction="Do stuff",
+            session_service=InMemorySessionService(),
+            memory_service=memory_service,
+        )
+
+    assert ran_while_prompting == [True]
+    # Turns are not written to memory behind the user's back
+    memory_service.add_session_to_memory.assert_not_called()
+    # The initial instruction and the interactive turns share one event loop
+    mock_asyncio_run.assert_called_once()
+
+
+@patch("code_agent.cli.utils.Runner")
+@patch("code_agent.cli.utils.Console")
+def test_run_cli_stream_renders_partial_events(mock_console_class, mock_runner_class):
+    """Streamed chunks go through the stream renderer and the complete message is not printed again."""
+    from google.adk.agents.run_config import StreamingMode
+
+    from code_agent.cli.utils import run_cli
+
+    mock_console = MagicMock()
+    mock_console.is_terminal = False
+    mock_console_class.return_value = mock_console
+
+    async def mock_run_async(*args, **kwargs):
+        for chunk in ["Hello", ", world"]:
+            event = _final_event(chunk)
+            event.partial = True
+            yield event
+        yield _final_event("Hello, world")
+
+    mock_runner_class.return_value.run_async.side_effect = mock_run_async
+
+    run_cli(MockAgent(), "test_app", initial_instruction="Say hello", session_service=InMemorySessionService(), stream=True)
+
+    run_config = mock_runner_class.return_value.run_async.call_args.kwargs["run_config"]
+    assert run_config.streaming_mode == StreamingMode.SSE
+    streamed = [c.args[0] for c in mock_console.out.call_args_list if c.args and c.args[0]]
+    assert streamed == ["Hello", ", world"]
+    printed = [str(c.args[0]) for c in mock_console.print.call_args_list if c.args]
+    assert not any("Final Agent Response" in text for text in printed)
+
+
+@patch("code_agent.cli.utils.signal.signal")
+@patch("code_agent.cli.utils.Runner")
+@patch("code_agent.cli.utils.Console")
+@patch("code_agent.cli.utils.Prompt.ask")
+def test_run_cli_sigint_cancels_pending_prompt(mock_prompt_ask, mock_console_class, mock_runner_class, mock_signal):
+    """SIGINT while waiting for input ends the interactive session without waiting on stdin."""
+    mock_console = MagicMock()
+    mock_console_class.return_value = mock_console
+    handlers = {}
+    mock_signal.side_effect = lambda sig, handler: handlers.setdefault(sig, handler)
+
+    prompting = threading.Event()
+    release = threading.Event()
+
+    def ask(prompt):
+        prompting.set()
+        release.wait(timeout=5)
+        return "exit"
+
+    mock_prompt_ask.side_effect = ask
+
+    def interrupt():
+        prompting.wait(timeout=5)
+        handlers[signal.SIGINT](signal.SIGINT, None)
+
+    from code_agent.cli.utils import run_cli
+
+    interrupter = threading.Thread(target=interrupt)
+    interrupter.start()
+    try:
+        run_cli(MockAgent(), "test_app", interactive=True, session_service=InMemorySessionService())
+        # run_cli returned while the reader thread was still blocked on input
+        assert not release.is_set()
+    finally:
+        release.set()
+        interrupter.join()
+
+    mock_console.print.assert_any_call("\n[bold yellow]Exiting conversation mode.[/bold yellow]")
+
+
 @patch("builtins.open", new_callable=unittest.mock.mock_open)
 @patch("code_agent.cli.utils.yaml.safe_dump")  # Patch safe_dump used for saving
 def test_save_config_data_success(mock_yaml_dump, mock_open_func):
@@ -38,13 +38,13 @@ class TestRunCliAsyncHelpers:
         mock_runner_instance = MagicMock()
         mock_runner_class.return_value = mock_runner_instance
 
-        # Mock asyncio.run to return a session ID and success flag
-        mock_asyncio_run.return_value = ("test_session_id", True)
+        # Mock asyncio.run to return the final session ID
+        mock_asyncio_run.return_value = "test_session_id"
 
         # Call run_cli with the minimum required arguments
         result = run_cli(agent=MagicMock(), app_name="test_app", user_id="test_user", initial_instruction="Test message")
 
-        # Verify asyncio.run was called once (to run process_message_async)
+        # Verify asyncio.run was called once (to run the session on a single loop)
         mock_asyncio_run.assert_called_once()
 
         # Verify we got back the session ID from asyncio.run
@@ -63,19 +63,16 @@ class TestRunCliAsyncHelpers:
         mock_session_service_instance = MagicMock()
         mock_session_service.return_value = mock_session_service_instance
 
-        # First async call returns a session ID
-        mock_asyncio_run.side_effect = [
-            ("test_session_id", True),  # process_message_async
-            "interactive_session_id",  # run_interactively_async
-        ]
+        # The session loop returns the session ID left by the interactive turns
+        mock_asyncio_run.return_value = "interactive_session_id"
 
         # Call run_cli with interactive=True
         result = run_cli(agent=MagicMock(), app_name="test_app", user_id="test_user", initial_instruction="Test message", interactive=True)
 
-        # Verify asyncio.run was called twice (once for process_message_async, once for run_interactively_async)
-        assert mock_asyncio_run.call_count == 2
+        # Verify the initial instruction and the interactive turns ran on one event loop
+        mock_asyncio_run.assert_called_once()
 
-        # Verify we got back the session ID from the second asyncio.run call (run_interactively_async)
+        # Verify we got back the session ID from the interactive turns
         assert result == "interactive_session_id"
 
 
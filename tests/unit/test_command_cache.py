@@ -0,0 +1,161 @@
+"""
+Tests for the read-only command result cache in code_agent.tools.command_cache.
+"""
+
+import os
+import time
+
+import pytest
+
+from code_agent.tools import command_cache
+from code_agent.tools.command_cache import CommandResultCache, invalidates_command_cache, operand_fingerprint, read_only_argv, workspace_fingerprint
+from code_agent.tools.native_tools import _categorize_command
+
+
+@pytest.mark.parametrize(
+    "command",
+    [
+        "git status",
+        "git diff --stat",
+        "ls -la",
+        "find . -name '*.py'",
+        "grep -rn TODO src",
+        "grep -o TODO x.py",
+        "tree -a src",
+        "wc -l README.md",
+        "/usr/bin/ls",
+    ],
+)
+def test_read_only_commands(command):
+    assert read_only_argv(command, _categorize_command(command))
+
+
+@pytest.mark.parametrize(
+    "command",
+    [
+        "git commit -m x",
+        "git -C /tmp status",
+        "git branch new-branch",
+        "git diff --output=patch.diff",
+        "find . -delete",
+        "find . -exec rm {} ;",
+        "tail -f log.txt",
+        "tree -o out.txt",
+        "tree -ao out.txt",
+        "cat /etc/passwd",
+        "ls ../other",
+        "rm -rf build",
+        "echo hi",
+        "ls 'unclosed",
+        "",
+    ],
+)
+def test_commands_that_are_not_cached(command):
+    assert read_only_argv(command, _categorize_command(command)) is None
+
+
+def test_network_category_rules_caching_out():
+    assert read_only_argv("cat notes.txt", ["file_operations", "network"]) is None
+
+
+def test_fingerprint_tracks_edits_and_skips_noise(tmp_path):
+    (tmp_path / "a.txt").write_text("one")
+    (tmp_path / "__pycache__").mkdir()
+    before = workspace_fingerprint(str(tmp_path))
+
+    (tmp_path / "__pycache__" / "a.pyc").write_bytes(b"x")
+    assert workspace_fingerprint(str(tmp_path)) == before
+
+    (tmp_path / "a.txt").write_text("three")
+    assert workspace_fingerprint(str(tmp_path)) != before
+    assert workspace_fingerprint(str(tmp_path), max_entries=1) is None
+
+
+def test_operand_fingerprint_covers_only_the_named_paths(tmp_path):
+    (tmp_path / "a.txt").write_text("one")
+    (tmp_path / "src").mkdir()
+    before = operand_fingerprint(["cat", "a.txt"], str(tmp_path))
+    listing = operand_fingerprint(["ls", "-la"], str(tmp_path))
+
+    (tmp_path / "src" / "b.txt").write_text("elsewhere")
+    assert operand_fingerprint(["cat", "a.txt"], str(tmp_path)) == before
+    assert operand_fingerprint(["ls", "-la"], str(tmp_path)) != listing
+
+    (tmp_path / "a.txt").write_text("three")
+    assert operand_fingerprint(["cat", "a.txt"], str(tmp_path)) != before
+    for argv in (["ls", "-R"], ["diff", "-r", "a", "b"], ["grep", "x", "a.txt"], ["cat"]):
+        assert operand_fingerprint(argv, str(tmp_path)) is None
+
+
+def test_commands_cheaper_than_the_scan_are_not_cached(tmp_path):
+    cache = CommandResultCache()
+    cache.put(["git", "status"], "clean", str(tmp_path), elapsed=0.0)
+    assert cache.get(["git", "status"], str(tmp_path)) is None
+
+    cache.put(["git", "status"], "clean", str(tmp_path), elapsed=60.0)
+    assert cache.get(["git", "status"], str(tmp_path)) == "clean"
+
+
+def test_results_are_reused_until_the_generation_changes(tmp_path):
+    cache = CommandResultCache(verify_seconds=60)
+    argv = ["git", "status"]
+    assert cache.get(argv, str(tmp_path)) is None
+    cache.put(argv, "clean", str(tmp_path))
+
+    assert cache.get(argv, str(tmp_path)) == "clean"
+    assert cache.get(argv, str(tmp_path / "..")) is None
+
+    cache.invalidate()
+    assert cache.get(argv, str(tmp_path)) is None
+    assert cache.stats() == {"entries": 0, "generation": 1, "hits": 1, "misses": 3}
+
+
+def test_external_changes_are_caught_by_the_mtime_scan(tmp_path):
+    cache = CommandResultCache(verify_seconds=0)
+    cache.put(["ls"], "a.txt", str(tmp_path))
+    assert cache.get(["ls"], str(tmp_path)) == "a.txt"
+
+    (tmp_path / "b.txt").write_text("new")
+    assert cache.get(["ls"], str(tmp_path)) is None
+    assert cache.generation == 1
+
+
+def test_hits_skip_the_scan_within_the_verify_interval(tmp_path, monkeypatch):
+    cache = CommandResultCache(verify_seconds=60)
+    cache.put(["ls"], "a.txt", str(tmp_path))
+    monkeypatch.setattr(command_cache, "workspace_fingerprint", lambda *args: pytest.fail("scanned"))
+
+    start = time.perf_counter()
+    for _ in range(1000):
+        assert cache.get(["ls"], str(tmp_path)) == "a.txt"
+    # Well under a process spawn per lookup
+    assert (time.perf_counter() - start) / 1000 < 0.0005
+
+
+def test_lru_eviction(tmp_path):
+    cache = CommandResultCache(max_entries=2)
+    for name in ("a", "b"):
+        cache.put(["cat", name], name, str(tmp_path))
+    cache.get(["cat", "a"], str(tmp_path))
+    cache.put(["cat", "c"], "c", str(tmp_path))
+    assert cache.get(["cat", "b"], str(tmp_path)) is None
+    assert cache.get(["cat", "a"], str(tmp_path)) == "a"
+
+
+def test_edit_tools_invalidate_the_process_cache(tmp_path, monkeypatch):
+    cache = CommandResultCache()
+    monkeypatch.setattr(command_cache, "_command_cache", cache)
+    cache.put(["ls"], "", str(tmp_path))
+
+    @invalidates_command_cache
+    def failing_edit():
+        raise OSError("disk full")
+
+    with pytest.raises(OSError):
+        failing_edit()
+    assert cache.generation == 1
+
+    from code_agent.tools.file_tools import write_file
+
+    write_file(os.path.join(tmp_path, "new.txt"), "content")
+    assert cache.generation == 2
@@ -0,0 +1,89 @@
+"""
+Tests for bounded command output capture in code_agent.tools.command_output.
+"""
+
+import asyncio
+import sys
+
+from code_agent.config.settings_based_config import NativeCommandSettings
+from code_agent.tools.command_output import HeadTailBuffer, OutputCapture
+
+
+async def _run(capture, script):
+    process = await asyncio.create_subprocess_exec(sys.executable, "-c", script, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+    output = await capture.read(process)
+    await process.wait()
+    return output, process.returncode
+
+
+def test_head_tail_buffer():
+    buffer = HeadTailBuffer(head_bytes=4, tail_bytes=3)
+    for chunk in (b"ab", b"cdefg", b"hij"):
+        buffer.append(chunk)
+    assert buffer.total == 10
+    assert buffer.omitted == 3
+    assert buffer.text() == "abcd\n... [3 bytes omitted] ...\nhij"
+
+    small = HeadTailBuffer(head_bytes=4, tail_bytes=3)
+    small.append("héllo".encode())
+    assert small.omitted == 0
+    # A character split between head and tail is decoded whole
+    assert small.text() == "héllo"
+
+
+def test_small_output_is_kept_whole_without_spilling():
+    capture = OutputCapture(head_bytes=1024, tail_bytes=1024)
+    output, returncode = asyncio.run(_run(capture, "import sys; print('out'); print('err', file=sys.stderr)"))
+    assert returncode == 0
+    assert (output.stdout.text(), output.stderr.text()) == ("out\n", "err\n")
+    assert output.spill_path is None
+    assert output.notes() == []
+
+
+def test_large_output_keeps_head_and_tail_and_spills_everything(tmp_path):
+    lines = []
+    capture = OutputCapture(head_bytes=100, tail_bytes=100, echo=lambda stream, line: lines.append((stream, line)))
+    output, _ = asyncio.run(_run(capture, "for i in range(20000): print(f'line {i}')"))
+
+    text = output.stdout.text()
+    assert text.startswith("line 0\nline 1\n")
+    assert text.endswith("line 19998\nline 19999\n")
+    assert "bytes omitted" in text
+    assert output.truncated
+    assert output.spill_path.read_text().splitlines() == [f"line {i}" for i in range(20000)]
+    assert output.notes() == [f"[Output truncated: {output.total_bytes} bytes in total; the full output is in {output.spill_path}]"]
+    assert lines[0] == ("stdout", "line 0") and lines[-1] == ("stdout", "line 19999") and len(lines) == 20000
+    output.spill_path.unlink()
+
+
+def test_echo_splits_a_long_unfinished_line():
+    lines = []
+    capture = OutputCapture(head_bytes=100, tail_bytes=100, spill=False, echo=lambda stream, line: lines.append(line))
+    asyncio.run(_run(capture, "import sys; sys.stdout.write('x' * 1_000_000)"))
+
+    assert "".join(lines) == "x" * 1_000_000
+    assert max(len(line) for line in lines) == 4096
+    assert all(len(partial) <= 4096 for _, partial in capture._line_buffers.values())
+
+
+def test_spill_is_removed_when_each_stream_fits():
+    capture = OutputCapture(head_bytes=60, tail_bytes=60)
+    output, _ = asyncio.run(_run(capture, "import sys; print('o' * 100); print('e' * 100, file=sys.stderr)"))
+    assert not output.truncated
+    assert output.spill_path is None
+
+
+def test_byte_cap_stops_the_command():
+    capture = OutputCapture(head_bytes=100, tail_bytes=100, max_bytes=100_000, spill=False)
+    output, returncode = asyncio.run(_run(capture, "import time\nwhile True:\n    print('x' * 1000, flush=True)\n    time.sleep(0.0001)"))
+    assert output.limit_exceeded
+    assert returncode != 0
+    assert 100_000 < output.total_bytes < 200_000
+    assert output.spill_path is None
+    assert output.notes(100_000)[-1] == "[Output exceeded the 100000 byte limit; the command was stopped]"
+
+
+def test_from_settings():
+    settings = NativeCommandSettings(output_head_bytes=10, output_tail_bytes=20, max_output_bytes=None, spill_output=False)
+    capture = OutputCapture.from_settings(settings)
+    assert (capture.head_bytes, capture.tail_bytes, capture.max_bytes, capture.spill, capture.echo) == (10, 20, None, False, None)
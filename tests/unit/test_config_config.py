@@ -87,6 +87,7 @@ class TestConfigModule(unittest.TestCase):
             cli_auto_approve_native_commands=True,
             cli_log_level="DEBUG",
             cli_verbose=True,
+            use_cache=True,
         )
 
         # Verify validation was called
@@ -444,6 +444,7 @@ def test_initialize_config_calls_build(
         cli_auto_approve_native_commands=None,
         cli_log_level=None,
         cli_verbose=None,
+        use_cache=True,
     )
 
     # Check the global config singleton was set correctly
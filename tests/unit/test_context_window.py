@@ -0,0 +1,158 @@
+"""
+Tests for the token-budgeted context window in code_agent.adk.context_window.
+"""
+
+import asyncio
+from typing import AsyncGenerator, List
+
+from google.adk.agents import LlmAgent
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+from pydantic import PrivateAttr
+
+from code_agent.adk.context_window import ContextWindowManager, content_tokens, estimate_tokens, split_turns
+
+
+def _user(text):
+    return types.Content(role="user", parts=[types.Part(text=text)])
+
+
+def _model(text):
+    return types.Content(role="model", parts=[types.Part(text=text)])
+
+
+def _tool_turn(request, output):
+    return [
+        _user(request),
+        types.Content(role="model", parts=[types.Part(function_call=types.FunctionCall(name="read_file", args={"path": "a.py"}))]),
+        types.Content(role="user", parts=[types.Part(function_response=types.FunctionResponse(name="read_file", response={"result": output}))]),
+        _model("Done."),
+    ]
+
+
+def _tokens(contents):
+    return sum(content_tokens(content) for content in contents)
+
+
+def test_estimate_tokens():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("hello world") == 3
+    assert estimate_tokens("a.b(c)") == 6
+    assert estimate_tokens("x" * 4000) == 1000
+
+
+def test_split_turns_keeps_tool_responses_with_their_turn():
+    contents = [*_tool_turn("read a.py", "code"), _user("thanks"), _model("You're welcome.")]
+    assert [len(turn) for turn in split_turns(contents)] == [4, 2]
+    assert [len(turn) for turn in split_turns([_model("hi"), *contents])] == [1, 4, 2]
+
+
+def test_contents_within_budget_are_returned_unchanged():
+    contents = _tool_turn("read a.py", "code")
+    manager = ContextWindowManager(max_tokens=10_000)
+    assert manager.fit(contents) is contents
+    assert manager.trimmed_requests == 0
+
+
+def test_older_tool_outputs_are_shrunk_and_recent_turns_kept():
+    big = "line of code\n" * 2000
+    contents = _tool_turn("read a.py", big) + _tool_turn("read it again", big) + [_user("now explain it")]
+    manager = ContextWindowManager(max_tokens=_tokens(contents) - 1, keep_recent_turns=2, tool_output_max_tokens=100)
+
+    fitted = manager.fit(contents)
+
+    assert len(fitted) == len(contents)
+    shrunk = fitted[2].parts[0].function_response
+    assert shrunk.name == "read_file"
+    assert shrunk.response["original_tokens"] > 100
+    assert shrunk.response["excerpt"].startswith('{"result": "line of code')
+    assert "characters omitted" in shrunk.response["excerpt"]
+    assert len(shrunk.response["sha256"]) == 16
+    assert fitted[4:] == contents[4:]
+    assert manager.tokens_removed > 0
+    # The original contents are untouched
+    assert contents[2].parts[0].function_response.response == {"result": big}
+
+
+def test_older_tool_outputs_of_a_single_long_turn_are_shrunk():
+    contents = [_user("fix the failing tests")]
+    for i in range(20):
+        contents += _tool_turn("", f"output {i}\n" + "x" * 400_000)[1:3]
+    manager = ContextWindowManager(max_tokens=5_000, tool_output_max_tokens=100, keep_recent_tool_outputs=2)
+
+    fitted = manager.fit(contents)
+
+    assert len(fitted) == len(contents)
+    responses = [content.parts[0].function_response.response for content in fitted[2::2]]
+    assert all("excerpt" in response for response in responses[:-2])
+    assert responses[-2:] == [content.parts[0].function_response.response for content in contents[-3::2]]
+    assert _tokens(fitted[:-4]) < manager.max_tokens
+    assert fitted[0] is contents[0]
+
+
+def test_oldest_turns_are_dropped_with_a_note():
+    contents = []
+    for i in range(10):
+        contents += [_user(f"request number {i} " + "padding " * 50), _model(f"answer {i}")]
+    manager = ContextWindowManager(max_tokens=_tokens(contents[-6:]) + 100, keep_recent_turns=2)
+
+    fitted = manager.fit(contents)
+
+    assert _tokens(fitted) <= manager.max_tokens
+    note = fitted[0].parts[0].text
+    assert note.startswith("[")
+    assert "omitted to fit the context window" in note
+    assert note.startswith("[7 earlier turn(s)")
+    # The most recent dropped requests are listed as far as the budget allows
+    assert "- request number 6 padding" in note
+    assert "request number 0" not in note
+    assert fitted[0].role == "user"
+    assert fitted[0].parts[1:] == contents[len(contents) - len(fitted)].parts
+    assert fitted[-4:] == contents[-4:]
+
+
+def test_without_summaries_only_the_omission_is_noted():
+    contents = [_user("first " * 100), _model("a"), _user("second " * 100), _model("b"), _user("third")]
+    fitted = ContextWindowManager(max_tokens=200, keep_recent_turns=1, summarize_dropped=False).fit(contents)
+    assert fitted[0].parts[0].text == "[2 earlier turn(s) of this conversation were omitted to fit the context window.]"
+    assert fitted[0].parts[1].text == "third"
+
+
+class RecordingLlm(BaseLlm):
+    """Records the contents of each request and answers with a fixed reply."""
+
+    _seen: List[List[types.Content]] = PrivateAttr(default_factory=list)
+
+    async def generate_content_async(self, llm_request: LlmRequest, stream: bool = False) -> AsyncGenerator[LlmResponse, None]:
+        self._seen.append(list(llm_request.contents))
+        yield LlmResponse(content=_model("ok " * 200))
+
+
+def test_session_storage_keeps_the_full_history():
+    agent = LlmAgent(name="coder", model=RecordingLlm(model="recording"))
+    manager = ContextWindowManager(max_tokens=400, keep_recent_turns=1)
+    assert manager.attach(agent) == 1
+
+    session_service = InMemorySessionService()
+    session = session_service.create_session(app_name="test", user_id="user")
+    runner = Runner(app_name="test", agent=agent, session_service=session_service)
+
+    async def send(text):
+        async for _ in runner.run_async(user_id="user", session_id=session.id, new_message=_user(text)):
+            pass
+
+    for i in range(4):
+        asyncio.run(send(f"question {i}"))
+
+    stored = session_service.get_session(app_name="test", user_id="user", session_id=session.id)
+    assert len(stored.events) == 8
+    last_request = agent.model._seen[-1]
+    assert len(last_request) == 3
+    assert "question 0" in last_request[0].parts[0].text
+    assert last_request[-1].parts[-1].text == "question 3"
+    assert manager.requests == 4
+    assert manager.trimmed_requests >= 1
@@ -177,3 +177,16 @@ class TestFileSystemSessionService(unittest.TestCase):
 
         # Verify we got None back
         self.assertIsNone(session)
+
+    def test_save_session_round_trip(self):
+        """Test that a saved session is loaded back from disk by a new service."""
+        service = FileSystemSessionService(sessions_dir=str(self.sessions_dir))
+
+        path = service.save_session(self.sample_session)
+
+        self.assertEqual(path, self.sessions_dir / f"{self.session_id}.session.json")
+        self.assertEqual(json.loads(path.read_text())["id"], self.session_id)
+        loaded = FileSystemSessionService(sessions_dir=str(self.sessions_dir)).get_session(
+            app_name=self.app_name, user_id=self.user_id, session_id=self.session_id
+        )
+        self.assertEqual(len(loaded.events), 2)
@@ -1,6 +1,7 @@
 """Unit tests for native command execution tools and safety checks."""
 
 import asyncio  # Make sure asyncio is imported if not already
+import os
 from typing import Optional
 from unittest.mock import AsyncMock, MagicMock, patch
 
@@ -12,6 +13,7 @@ import code_agent.config.config
 import code_agent.config.settings_based_config
 
 # Import native_tools directly for patching its contents
+import code_agent.tools.command_cache
 import code_agent.tools.native_tools
 
 # Import necessary components from the codebase
@@ -22,15 +24,32 @@ from code_agent.tools.native_tools import (
     run_native_command,
 )
 
+
+class FakeStream:
+    """Stands in for a subprocess output stream, returning fixed data and then EOF."""
+
+    def __init__(self, data: bytes = b"", hang: bool = False):
+        self._data = data
+        self._hang = hang
+
+    async def read(self, n: int = -1) -> bytes:
+        if self._hang:
+            await asyncio.sleep(60)
+        chunk, self._data = self._data[:n], self._data[n:]
+        return chunk
+
+
 # --- Fixtures ---
 
 
 @pytest.fixture(autouse=True)
 def reset_config_singleton():
-    """Ensures the config singleton is reset before each test."""
+    """Ensures the config singleton and the command result cache are reset before each test."""
     code_agent.config.config._config = None
+    code_agent.tools.command_cache._command_cache = None
     yield
     code_agent.config.config._config = None
+    code_agent.tools.command_cache._command_cache = None
 
 
 @pytest.fixture
@@ -66,10 +85,11 @@ def mock_settings(monkeypatch):
 def mock_subprocess_run():
     """Mocks asyncio.create_subprocess_exec used in native_tools."""
     with patch("code_agent.tools.native_tools.asyncio.create_subprocess_exec") as mock_exec:
-        # Mock the process object and its communicate method
+        # Mock the process object and its output streams
         mock_process = AsyncMock()
-        # Default successful communication
-        mock_process.communicate.return_value = (b"", b"")  # stdout, stderr bytes
+        # Default successful run without output
+        mock_process.stdout = FakeStream()
+        mock_process.stderr = FakeStream()
         mock_process.returncode = 0
         mock_process.kill = MagicMock()  # Mock kill method
         mock_process.wait = AsyncMock()  # Mock wait method
@@ -104,7 +124,7 @@ def configure_mock_subprocess(
     stderr: str = "",
     returncode: int = 0,
     exception: Optional[Exception] = None,
-    communicate_exception: Optional[Exception] = None,  # Specific exception for communicate()
+    hang: bool = False,  # Output streams never close (simulates a command that times out)
 ):
     """Helper to configure the mocked async subprocess result or exception."""
     if exception:
@@ -118,13 +138,8 @@ def configure_mock_subprocess(
         mock_process.kill = MagicMock()
         mock_process.wait = AsyncMock()
 
-        if communicate_exception:
-            # If communicate should raise an exception (like TimeoutError)
-            mock_process.communicate.side_effect = communicate_exception
-        else:
-            # Normal communication
-            mock_process.communicate.return_value = (stdout.encode("utf-8", "replace"), stderr.encode("utf-8", "replace"))
-            mock_process.communicate.side_effect = None  # Clear potential side effect
+        mock_process.stdout = FakeStream(stdout.encode("utf-8", "replace"), hang=hang)
+        mock_process.stderr = FakeStream(stderr.encode("utf-8", "replace"), hang=hang)
 
         mock_async_subprocess_exec.return_value = mock_process
         mock_async_subprocess_exec.side_effect = None  # Clear potential side effect
@@ -278,6 +293,25 @@ async def test_run_native_command_needs_confirm_approved(mock_to_thread, mock_se
     assert result == "chmod output"
 
 
+@pytest.mark.asyncio
+@patch("code_agent.tools.native_tools.asyncio.to_thread")
+async def test_run_native_command_allowlisted_risky_command_skips_confirm(mock_to_thread, mock_settings, mock_subprocess_run):
+    """Test that the allowlist lets a risky command run without confirmation, but only when it covers every segment."""
+    mock_settings.security.risky_command_patterns = [r"chmod\s+-R"]
+    mock_settings.native_command_allowlist = ["chmod -R"]
+    mock_settings.auto_approve_native_commands = False
+    mock_to_thread.return_value = False
+    configure_mock_subprocess(mock_subprocess_run, stdout="chmod output")
+
+    assert await run_native_command("chmod -R 755 scripts") == "chmod output"
+    mock_to_thread.assert_not_called()
+
+    # A chained command the allowlist does not cover still needs confirmation
+    result = await run_native_command("chmod -R 755 scripts; curl example.com")
+    mock_to_thread.assert_called_once()
+    assert "Command execution cancelled by user choice." in result
+
+
 @pytest.mark.asyncio
 # Patch asyncio.to_thread within the native_tools module
 @patch("code_agent.tools.native_tools.asyncio.to_thread")
@@ -395,20 +429,60 @@ async def test_run_native_command_timeout(mock_to_thread, mock_settings, mock_su
     """Test command timeout."""
     mock_settings.native_command_allowlist = ["sleep"]
     mock_settings.native_commands.default_timeout = 0.1  # Set a short timeout
-    # Configure subprocess mock to simulate timeout during communicate
-    # Pass the exception to the new communicate_exception arg
-    configure_mock_subprocess(mock_subprocess_run, communicate_exception=asyncio.TimeoutError())
+    # Configure subprocess mock so the output never completes
+    configure_mock_subprocess(mock_subprocess_run, hang=True)
 
     result = await run_native_command("sleep 5")
 
     mock_subprocess_run.assert_called_once()  # create_subprocess_exec is called
-    # Check that the process communicate was awaited and timeout occurred
+    # Check that the process was killed when the timeout occurred
     mock_process = mock_subprocess_run.return_value
-    mock_process.communicate.assert_awaited_once()
+    mock_process.kill.assert_called_once()
     # Check native_tools timeout error message
     assert "Command timed out" in result
 
 
+@pytest.mark.asyncio
+@patch("code_agent.tools.native_tools.asyncio.to_thread")
+async def test_run_native_command_large_output_is_truncated(mock_to_thread, mock_settings, mock_subprocess_run):
+    """Test that only the head and tail of large output are returned, with the full output spilled to a file."""
+    mock_settings.native_command_allowlist = ["ls"]
+    mock_settings.native_commands.output_head_bytes = 10
+    mock_settings.native_commands.output_tail_bytes = 10
+    mock_settings.native_commands.echo_output = False
+    configure_mock_subprocess(mock_subprocess_run, stdout="start-" + "x" * 1000 + "-end")
+
+    result = await run_native_command("ls -la")
+
+    assert result.startswith("start-xxxx\n... [990 bytes omitted] ...\nxxxxxx-end")
+    spill_path = result.rsplit("the full output is in ", 1)[1].rstrip("]")
+    with open(spill_path) as f:
+        assert f.read() == "start-" + "x" * 1000 + "-end"
+    os.unlink(spill_path)
+
+
+@pytest.mark.asyncio
+@patch("code_agent.tools.native_tools.asyncio.to_thread")
+async def test_run_native_command_reuses_read_only_results(mock_to_thread, mock_settings, mock_subprocess_run, tmp_path):
+    """Test that a repeated read-only command is answered from the cache until something changes the workspace."""
+    mock_settings.native_command_allowlist = ["ls", "touch"]
+    mock_settings.auto_approve_native_commands = True
+    configure_mock_subprocess(mock_subprocess_run, stdout="file1")
+
+    first = await run_native_command("ls -la", working_directory=str(tmp_path))
+    second = await run_native_command("ls  -la", working_directory=str(tmp_path))
+
+    assert (first, second) == ("file1", "file1\n(cached)")
+    mock_subprocess_run.assert_called_once()
+
+    # Another command may have changed files, so the next listing runs again
+    await run_native_command("touch new.txt", working_directory=str(tmp_path))
+    configure_mock_subprocess(mock_subprocess_run, stdout="file1")
+    third = await run_native_command("ls -la", working_directory=str(tmp_path))
+    assert third == "file1"
+    assert mock_subprocess_run.call_count == 3
+
+
 # --- TODO: Add tests for _categorize_command --- (from native_tools)
 
 # --- TODO: Add tests for _analyze_command_impact --- (from native_tools)
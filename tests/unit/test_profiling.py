@@ -0,0 +1,98 @@
+"""
+Tests for per-turn profiling in code_agent.telemetry.profiling.
+"""
+
+import asyncio
+import io
+import pstats
+import time
+
+import pytest
+from rich.console import Console
+
+from code_agent.telemetry.profiling import CProfileProfiler, SamplingProfiler, _TurnProfiler, create_profiler, print_profile_summary
+
+
+def busy_work(seconds):
+    deadline = time.perf_counter() + seconds
+    total = 0
+    while time.perf_counter() < deadline:
+        total += sum(range(200))
+    return total
+
+
+async def turn_body():
+    busy_work(0.1)
+    # The loop idles in its selector while awaiting, like waiting on a model response
+    await asyncio.sleep(0.2)
+
+
+def _profile_turn(profiler):
+    async def main():
+        with profiler.turn():
+            await turn_body()
+
+    asyncio.run(main())
+    return profiler.turns[-1]
+
+
+def _assert_timings(turn):
+    assert turn.wall_s >= 0.3
+    assert 0.05 <= turn.cpu_s < turn.wall_s
+    assert 0.1 <= turn.io_wait_s <= turn.wall_s - turn.cpu_s + 0.05
+
+
+def test_sampling_profiler(tmp_path):
+    profiler = SamplingProfiler(tmp_path, interval=0.002)
+    turn = _profile_turn(profiler)
+
+    _assert_timings(turn)
+    assert turn.path == tmp_path / "turn-001.folded"
+    lines = turn.path.read_text(encoding="utf-8").splitlines()
+    stack, count = lines[0].rsplit(" ", 1)
+    assert int(count) > 0
+    assert any("busy_work" in line for line in lines)
+    assert all(";" in line.rsplit(" ", 1)[0] for line in lines)
+    assert "busy_work" in profiler.hotspots(5)[0][0]
+
+
+def test_cprofile_profiler(tmp_path):
+    profiler = CProfileProfiler(tmp_path)
+    turn = _profile_turn(profiler)
+    _profile_turn(profiler)
+
+    _assert_timings(turn)
+    assert [t.path.name for t in profiler.turns] == ["turn-001.pstats", "turn-002.pstats"]
+    stats = pstats.Stats(str(turn.path))
+    assert any(name == "busy_work" for _, _, name in stats.stats)
+    assert any("busy_work" in name for name, _ in profiler.hotspots(5))
+
+
+def test_create_profiler(tmp_path):
+    assert isinstance(create_profiler(tmp_path, "folded"), SamplingProfiler)
+    assert isinstance(create_profiler(tmp_path, "pstats"), CProfileProfiler)
+    with pytest.raises(ValueError):
+        create_profiler(tmp_path, "svg")
+
+
+def test_profilers_must_implement_the_interface(tmp_path):
+    class Incomplete(_TurnProfiler):
+        def _start(self):
+            pass
+
+    with pytest.raises(TypeError):
+        Incomplete(tmp_path)
+
+
+def test_print_profile_summary(tmp_path):
+    console = Console(file=io.StringIO(), width=200)
+    profiler = SamplingProfiler(tmp_path)
+    print_profile_summary(console, profiler)
+    assert "No turns were profiled" in console.file.getvalue()
+
+    _profile_turn(profiler)
+    print_profile_summary(console, profiler, top=3)
+    output = console.file.getvalue()
+    assert "Awaiting I/O" in output
+    assert "Top 3 hotspots" in output
+    assert "busy_work" in output
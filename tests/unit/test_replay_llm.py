@@ -0,0 +1,206 @@
+"""
+Tests for the offline record/replay model providers in code_agent.adk.replay_llm.
+"""
+
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+from typing import Any, AsyncGenerator, List
+
+import pytest
+from google.adk.agents import BaseAgent, LlmAgent
+from google.adk.agents.run_config import RunConfig, StreamingMode
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.adk.tools.agent_tool import AgentTool
+from google.genai import types
+from pydantic import PrivateAttr
+
+from code_agent.adk.replay_llm import Recording, RecordingLlm, ReplayLlm, ReplayMissError, apply_model_provider, request_key
+from code_agent.config.settings_based_config import ReplaySettings
+
+TOOL_CALL = {"content": {"role": "model", "parts": [{"function_call": {"name": "add_numbers", "args": {"a": 2, "b": 3}}}]}}
+FINAL_TEXT = {"content": {"role": "model", "parts": [{"text": "The sum of 2 and 3 is 5."}]}}
+
+
+def add_numbers(a: int, b: int) -> dict:
+    """Adds two numbers."""
+    return {"sum": a + b}
+
+
+def _write_recording(path, calls):
+    path.write_text("".join(json.dumps(call) + "\n" for call in calls), encoding="utf-8")
+    return path
+
+
+def _tool_recording(path, prompt="recorded-elsewhere"):
+    return _write_recording(
+        path,
+        [
+            {"agent": "coder", "position": 1, "prompt": prompt, "responses": [TOOL_CALL]},
+            {"agent": "coder", "position": 3, "prompt": prompt, "responses": [FINAL_TEXT]},
+        ],
+    )
+
+
+def _config(provider, path, **replay):
+    return SimpleNamespace(default_provider=provider, default_model=str(path), replay=ReplaySettings(**replay))
+
+
+def _run(agent, text="What is 2 + 3?", run_config=None) -> List[Any]:
+    session_service = InMemorySessionService()
+    session = session_service.create_session(app_name="test", user_id="user")
+    runner = Runner(app_name="test", agent=agent, session_service=session_service)
+    message = types.Content(role="user", parts=[types.Part(text=text)])
+
+    async def collect():
+        return [event async for event in runner.run_async(user_id="user", session_id=session.id, new_message=message, run_config=run_config or RunConfig())]
+
+    return asyncio.run(collect())
+
+
+def _final_text(events) -> str:
+    return "".join(part.text for event in events if not event.partial and event.content for part in event.content.parts if part.text)
+
+
+def test_replay_drives_runner_and_tools(tmp_path):
+    agent = LlmAgent(name="coder", model="gemini-2.0-flash", tools=[add_numbers])
+    assert apply_model_provider(agent, _config("replay", _tool_recording(tmp_path / "calls.jsonl"))) == "replay"
+    assert isinstance(agent.model, ReplayLlm)
+
+    events = _run(agent)
+
+    responses = [r for event in events for r in event.get_function_responses()]
+    assert [r.response for r in responses] == [{"sum": 5}]
+    assert _final_text(events) == "The sum of 2 and 3 is 5."
+
+
+def test_replay_streams_with_latency(tmp_path):
+    agent = LlmAgent(name="coder", model="gemini-2.0-flash", tools=[add_numbers])
+    apply_model_provider(agent, _config("replay", _tool_recording(tmp_path / "calls.jsonl"), latency=0.05, tokens_per_second=500))
+
+    start = time.perf_counter()
+    events = _run(agent, run_config=RunConfig(streaming_mode=StreamingMode.SSE))
+    elapsed = time.perf_counter() - start
+
+    partial = [event.content.parts[0].text for event in events if event.partial]
+    assert "".join(partial) == "The sum of 2 and 3 is 5."
+    assert len(partial) == 8
+    # Two model calls, each waiting for the latency, plus 8 tokens at 500/s
+    assert elapsed >= 0.1 + 8 / 500
+    assert _final_text(events) == "The sum of 2 and 3 is 5."
+
+
+class ScriptedLlm(BaseLlm):
+    """Plays back fixed responses, streaming text as two partial chunks like a live model."""
+
+    _calls: int = PrivateAttr(default=0)
+
+    async def generate_content_async(self, llm_request: LlmRequest, stream: bool = False) -> AsyncGenerator[LlmResponse, None]:
+        self._calls += 1
+        if self._calls == 1:
+            yield LlmResponse.model_validate(TOOL_CALL)
+            return
+        if stream:
+            yield LlmResponse(content=types.Content(role="model", parts=[types.Part(text="The sum of 2 ")]), partial=True)
+            yield LlmResponse(content=types.Content(role="model", parts=[types.Part(text="and 3 is 5.")]), partial=True)
+        yield LlmResponse.model_validate(FINAL_TEXT)
+
+
+def test_record_then_replay(tmp_path):
+    path = tmp_path / "recorded" / "calls.jsonl"
+    recorded_agent = LlmAgent(name="coder", model=ScriptedLlm(model="scripted"), tools=[add_numbers])
+    assert apply_model_provider(recorded_agent, _config("record", path)) == "record"
+    assert isinstance(recorded_agent.model, RecordingLlm)
+
+    recorded_events = _run(recorded_agent, run_config=RunConfig(streaming_mode=StreamingMode.SSE))
+
+    lines = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+    assert [(line["agent"], line["position"]) for line in lines] == [("coder", 1), ("coder", 3)]
+    assert all(len(line["responses"]) == 1 for line in lines)
+    assert lines[0]["prompt"] == lines[1]["prompt"]
+
+    replay_agent = LlmAgent(name="coder", model="gemini-2.0-flash", tools=[add_numbers])
+    apply_model_provider(replay_agent, _config("replay", path))
+    assert _final_text(_run(replay_agent)) == _final_text(recorded_events) == "The sum of 2 and 3 is 5."
+
+
+def _request(*texts):
+    return LlmRequest(contents=[types.Content(role="user", parts=[types.Part(text=text)]) for text in texts])
+
+
+def _text_call(prompt, text):
+    return {"agent": "a", "position": 1, "prompt": prompt, "responses": [{"content": {"role": "model", "parts": [{"text": text}]}}]}
+
+
+def test_recording_prefers_same_first_message_then_cycles(tmp_path):
+    hello_key = request_key("a", _request("hello"))
+    recording = Recording(
+        _write_recording(tmp_path / "calls.jsonl", [_text_call("other", "first"), _text_call(hello_key[2], "hello!"), _text_call("x", "third")])
+    )
+    assert len(recording) == 3
+
+    def text(key):
+        return recording.responses_for(key)[0].content.parts[0].text
+
+    assert [text(hello_key), text(hello_key)] == ["hello!", "hello!"]
+    other_key = request_key("a", _request("something new"))
+    assert [text(other_key) for _ in range(4)] == ["first", "hello!", "third", "first"]
+
+    with pytest.raises(ReplayMissError):
+        recording.responses_for(request_key("b", _request("hello")))
+    with pytest.raises(ReplayMissError):
+        recording.responses_for(request_key("a", _request("hello", "again")))
+
+
+def test_replayed_responses_are_copies(tmp_path):
+    recording = Recording(_write_recording(tmp_path / "calls.jsonl", [_text_call("p", "text")]))
+    key = ("a", 1, "p")
+    recording.responses_for(key)[0].content.parts[0].text = "changed"
+    assert recording.responses_for(key)[0].content.parts[0].text == "text"
+
+
+def test_invalid_recordings(tmp_path):
+    with pytest.raises(ValueError, match="line 2"):
+        Recording(_write_recording(tmp_path / "bad.jsonl", [_text_call("p", "ok"), {"agent": "a"}]))
+    with pytest.raises(OSError):
+        apply_model_provider(LlmAgent(name="a", model="gemini-2.0-flash"), _config("replay", tmp_path / "missing.jsonl"))
+    with pytest.raises(ValueError):
+        apply_model_provider(LlmAgent(name="a", model="gemini-2.0-flash"), _config("replay", ""))
+
+
+def test_other_providers_leave_models_alone(tmp_path):
+    agent = LlmAgent(name="a", model="gemini-2.0-flash")
+    assert apply_model_provider(agent, _config("ai_studio", "gemini-2.0-flash")) is None
+    assert agent.model == "gemini-2.0-flash"
+
+
+class LazyProxy(BaseAgent):
+    """Minimal stand-in for a lazily loaded sub-agent."""
+
+    _real: LlmAgent = PrivateAttr()
+
+    def load(self) -> LlmAgent:
+        return self._real
+
+
+def test_every_agent_in_the_tree_is_replaced(tmp_path):
+    helper = LlmAgent(name="helper", model="gemini-2.0-flash")
+    inheriting = LlmAgent(name="inheriting")
+    proxy = LazyProxy(name="lazy")
+    proxy._real = LlmAgent(name="lazy", model="gemini-2.0-flash")
+    root = LlmAgent(name="root", model=ScriptedLlm(model="scripted"), tools=[AgentTool(agent=helper)], sub_agents=[inheriting, proxy])
+
+    apply_model_provider(root, _config("record", tmp_path / "calls.jsonl"))
+
+    agents = {"root": root, "helper": helper, "inheriting": inheriting, "lazy": proxy._real}
+    assert {name: (agent.model.agent_name, agent.model.model) for name, agent in agents.items()} == {
+        "root": ("root", "scripted"),
+        "helper": ("helper", "gemini-2.0-flash"),
+        "inheriting": ("inheriting", "scripted"),
+        "lazy": ("lazy", "gemini-2.0-flash"),
+    }
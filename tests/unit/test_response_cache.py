@@ -0,0 +1,175 @@
+"""
+Tests for the on-disk model response cache in code_agent.adk.response_cache.
+"""
+
+import asyncio
+import json
+import os
+import time
+from types import SimpleNamespace
+from typing import AsyncGenerator
+
+from google.adk.agents import LlmAgent
+from google.adk.agents.run_config import RunConfig, StreamingMode
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+from pydantic import PrivateAttr
+
+from code_agent.adk.response_cache import ResponseCache, request_fingerprint
+from code_agent.config.settings_based_config import ResponseCacheSettings
+
+
+class CountingLlm(BaseLlm):
+    """Answers every call with a numbered reply, streaming it in two chunks when asked."""
+
+    _calls: int = PrivateAttr(default=0)
+
+    async def generate_content_async(self, llm_request: LlmRequest, stream: bool = False) -> AsyncGenerator[LlmResponse, None]:
+        self._calls += 1
+        text = f"reply {self._calls}"
+        if stream:
+            yield LlmResponse(content=types.Content(role="model", parts=[types.Part(text="reply ")]), partial=True)
+        yield LlmResponse(content=types.Content(role="model", parts=[types.Part(text=text)]))
+
+
+def _agent(temperature=0.0, **kwargs):
+    return LlmAgent(
+        name="coder",
+        model=CountingLlm(model="counting"),
+        instruction="Be brief.",
+        generate_content_config=types.GenerateContentConfig(temperature=temperature),
+        **kwargs,
+    )
+
+
+def _run(agent, text="hello", run_config=None) -> str:
+    session_service = InMemorySessionService()
+    session = session_service.create_session(app_name="test", user_id="user")
+    runner = Runner(app_name="test", agent=agent, session_service=session_service)
+    message = types.Content(role="user", parts=[types.Part(text=text)])
+
+    async def collect():
+        return [event async for event in runner.run_async(user_id="user", session_id=session.id, new_message=message, run_config=run_config or RunConfig())]
+
+    events = asyncio.run(collect())
+    return "".join(part.text for event in events if not event.partial and event.content for part in event.content.parts if part.text)
+
+
+def _request(text="hello", temperature=0.0, instruction="Be brief.", model="m"):
+    config = types.GenerateContentConfig(temperature=temperature, system_instruction=instruction)
+    return LlmRequest(model=model, contents=[types.Content(role="user", parts=[types.Part(text=text)])], config=config)
+
+
+def _response(text):
+    return LlmResponse(content=types.Content(role="model", parts=[types.Part(text=text)]))
+
+
+def test_repeated_deterministic_runs_skip_the_model(tmp_path):
+    cache = ResponseCache(cache_dir=tmp_path)
+    first, second = _agent(), _agent()
+    assert cache.attach(first) == 1
+    cache.attach(second)
+
+    assert _run(first) == "reply 1"
+    assert _run(second) == "reply 1"
+    assert second.model._calls == 0
+    assert _run(second, text="something else") == "reply 1"
+    assert second.model._calls == 1
+    assert cache.stats() == {"hits": 1, "misses": 2, "stores": 2, "bypassed": 0, "evictions": 0}
+    assert len(list(tmp_path.glob("*/*.json"))) == 2
+
+
+def test_streamed_calls_store_only_the_final_response(tmp_path):
+    cache = ResponseCache(cache_dir=tmp_path)
+    agent = _agent()
+    cache.attach(agent)
+
+    assert _run(agent, run_config=RunConfig(streaming_mode=StreamingMode.SSE)) == "reply 1"
+    assert _run(agent) == "reply 1"
+    assert agent.model._calls == 1
+
+
+def test_non_deterministic_requests_bypass_the_cache(tmp_path):
+    cache = ResponseCache(cache_dir=tmp_path)
+    agent = _agent(temperature=0.7)
+    cache.attach(agent)
+
+    assert [_run(agent), _run(agent)] == ["reply 1", "reply 2"]
+    assert cache.stats()["bypassed"] == 2
+    assert not list(tmp_path.glob("*/*.json"))
+
+    cache_all = ResponseCache(cache_dir=tmp_path, deterministic_only=False)
+    cache_all.attach(agent)
+    assert [_run(agent), _run(agent)] == ["reply 3", "reply 3"]
+
+
+def test_fingerprint_covers_model_instruction_contents_and_config():
+    base = request_fingerprint(_request())
+    assert base == request_fingerprint(_request())
+    assert len({base, *(request_fingerprint(r) for r in (_request(text="bye"), _request(instruction="Be verbose."), _request(model="other")))}) == 4
+
+    with_tool = _request()
+    with_tool.config.tools = [types.Tool(function_declarations=[types.FunctionDeclaration(name="add_numbers", description="Adds.")])]
+    assert request_fingerprint(with_tool) != base
+
+
+def test_expired_entries_are_misses(tmp_path):
+    cache = ResponseCache(cache_dir=tmp_path, ttl_seconds=60)
+    cache.put("ab" * 32, _response("cached"))
+    assert cache.get("ab" * 32).content.parts[0].text == "cached"
+
+    path = tmp_path / "ab" / f"{'ab' * 32}.json"
+    entry = json.loads(path.read_text())
+    entry["created"] = time.time() - 120
+    path.write_text(json.dumps(entry))
+    assert cache.get("ab" * 32) is None
+    assert not path.exists()
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    entry_size = len(json.dumps({"created": time.time(), "response": _response("x" * 1000).model_dump(mode="json", exclude_none=True)}))
+    cache = ResponseCache(cache_dir=tmp_path, max_size_mb=2.5 * entry_size / (1024 * 1024))
+    keys = [f"{i:02x}" * 32 for i in range(3)]
+    cache.put(keys[0], _response("x" * 1000))
+    cache.put(keys[1], _response("x" * 1000))
+    # Make the first entry the most recently used
+    os.utime(tmp_path / keys[1][:2] / f"{keys[1]}.json", (time.time() - 100, time.time() - 100))
+    assert cache.get(keys[0]) is not None
+
+    cache.put(keys[2], _response("x" * 1000))
+
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) is not None and cache.get(keys[2]) is not None
+    assert cache.evictions == 1
+
+
+def test_existing_model_callbacks_still_run(tmp_path):
+    calls = []
+
+    def before(callback_context, llm_request):
+        calls.append("before")
+        return None
+
+    def after(callback_context, llm_response):
+        calls.append("after")
+        return _response(llm_response.content.parts[0].text.upper())
+
+    cache = ResponseCache(cache_dir=tmp_path)
+    agent = _agent(before_model_callback=before, after_model_callback=after)
+    cache.attach(agent)
+
+    assert _run(agent) == "REPLY 1"
+    assert _run(agent) == "REPLY 1"
+    assert agent.model._calls == 1
+    assert calls == ["before", "after", "before"]
+
+
+def test_from_settings(tmp_path):
+    settings = ResponseCacheSettings(cache_dir=tmp_path, ttl_seconds=None, max_size_mb=1, deterministic_only=False)
+    cache = ResponseCache.from_settings(settings)
+    assert (cache.cache_dir, cache.ttl_seconds, cache.max_bytes, cache.deterministic_only) == (tmp_path, None, 1024 * 1024, False)
+    assert ResponseCache.from_settings(SimpleNamespace(**ResponseCacheSettings().model_dump())).cache_dir.name == "responses"
@@ -14,9 +14,12 @@ from code_agent.config.settings_based_config import ApiKeys, SecuritySettings
 from code_agent.tools.security import (
     DANGEROUS_COMMAND_PATTERNS,
     RISKY_COMMAND_PATTERNS,
+    PathPolicy,
+    get_path_policy,
     is_command_safe,
     is_path_safe,
     validate_commands_allowlist,
+    validate_paths,
 )
 
 # --- Fixtures ---
@@ -139,6 +142,49 @@ def test_is_path_safe_validation_disabled(mock_cwd, mock_config_base):
         assert is_safe is False  # Current implementation still returns False
 
 
+def test_validate_paths_matches_is_path_safe(tmp_path, monkeypatch, mock_config_base):
+    """Batch validation shares directory resolution but reaches the same verdicts."""
+    workspace = tmp_path / "workspace"
+    (workspace / "src" / "sub").mkdir(parents=True)
+    (tmp_path / "outside").mkdir()
+    (workspace / "src" / "escape").symlink_to(tmp_path / "outside")
+    monkeypatch.chdir(workspace)
+    paths = ["src/a.py", "src/b.py", "src/sub/c.py", "src/escape", "src/escape/d.py", "src/sub/../a.py", "/etc/passwd", "", "src", "."]
+
+    with patch("code_agent.tools.security.get_config", return_value=mock_config_base):
+        batch = validate_paths(paths)
+        get_path_policy(mock_config_base).clear()
+        assert batch == [is_path_safe(path) for path in paths]
+
+    assert [is_safe for is_safe, _ in batch] == [True, True, True, False, False, False, False, False, True, True]
+    assert batch[3] == (False, "Path resolves outside the workspace.")
+
+
+def test_path_verdicts_are_memoized_per_directory_and_config(tmp_path, monkeypatch, mock_config_base):
+    """Verdicts are reused until they expire, the working directory changes or the config is replaced."""
+    monkeypatch.chdir(tmp_path)
+    resolved = []
+    original_resolve = Path.resolve
+    monkeypatch.setattr(Path, "resolve", lambda self, *args: resolved.append(self) or original_resolve(self, *args))
+
+    policy = PathPolicy(max_age=60)
+    assert policy.check("a.txt") == policy.check("a.txt") == (True, None)
+    assert len(resolved) == 1
+
+    (tmp_path / "sub").mkdir()
+    monkeypatch.chdir(tmp_path / "sub")
+    policy.check("a.txt")
+    assert len(resolved) == 2
+
+    expiring = PathPolicy(max_age=0)
+    expiring.check("a.txt")
+    expiring.check("a.txt")
+    assert len(resolved) == 4
+
+    assert get_path_policy(mock_config_base) is get_path_policy(mock_config_base)
+    assert get_path_policy(mock_config_base.model_copy()) is not get_path_policy(mock_config_base)
+
+
 # --- Test Cases for is_command_safe ---
 
 
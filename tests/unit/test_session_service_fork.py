@@ -0,0 +1,169 @@
+"""Unit tests for copy-on-write session forking in code_agent.services.session_service."""
+
+import copy
+import tempfile
+import time
+import tracemalloc
+import unittest
+from pathlib import Path
+
+from google.adk.events import Event, EventActions
+from google.genai import types as genai_types
+
+from code_agent.services.session_service import FileSystemSessionService, ForkableInMemorySessionService, ForkedEventList
+
+
+def _event(text, state_delta=None):
+    return Event(
+        author="user",
+        content=genai_types.Content(role="user", parts=[genai_types.Part(text=text)]),
+        actions=EventActions(state_delta=state_delta or {}),
+    )
+
+
+def _texts(events):
+    return [event.content.parts[0].text for event in events]
+
+
+class TestForkedEventList(unittest.TestCase):
+    """Tests for ForkedEventList."""
+
+    def setUp(self):
+        self.parent = [_event(f"e{i}") for i in range(5)]
+
+    def test_fork_shares_prefix_and_appends_privately(self):
+        forked = ForkedEventList.fork(self.parent, 3)
+        forked.append(_event("f3"))
+        self.parent.append(_event("e5"))
+
+        self.assertEqual(_texts(forked), ["e0", "e1", "e2", "f3"])
+        self.assertEqual(len(self.parent), 6)
+        self.assertIs(forked[0], self.parent[0])
+        self.assertEqual(_texts(forked[-2:]), ["e2", "f3"])
+
+    def test_fork_of_fork(self):
+        first = ForkedEventList.fork(self.parent, 4)
+        first.append(_event("a4"))
+        second = ForkedEventList.fork(first, 5)
+        second.append(_event("b5"))
+        first.append(_event("a5"))
+
+        self.assertEqual(_texts(second), ["e0", "e1", "e2", "e3", "a4", "b5"])
+        self.assertEqual(_texts(first), ["e0", "e1", "e2", "e3", "a4", "a5"])
+
+    def test_in_place_mutation_copies_instead_of_touching_shared_events(self):
+        forked = ForkedEventList.fork(self.parent, 5)
+        child = ForkedEventList.fork(forked, 5)
+        forked[0] = _event("changed")
+        del forked[1]
+
+        self.assertEqual(_texts(forked), ["changed", "e2", "e3", "e4"])
+        self.assertEqual(_texts(self.parent), ["e0", "e1", "e2", "e3", "e4"])
+        self.assertEqual(_texts(child), ["e0", "e1", "e2", "e3", "e4"])
+
+    def test_deepcopy_returns_plain_list(self):
+        copied = copy.deepcopy(ForkedEventList.fork(self.parent, 2))
+        self.assertIsInstance(copied, list)
+        self.assertEqual(_texts(copied), ["e0", "e1"])
+        self.assertIsNot(copied[0], self.parent[0])
+
+
+class TestForkableInMemorySessionService(unittest.TestCase):
+    """Tests for SessionForkMixin via ForkableInMemorySessionService."""
+
+    def setUp(self):
+        self.service = ForkableInMemorySessionService()
+        self.keys = {"app_name": "test_app", "user_id": "test_user"}
+        self.parent = self.service.create_session(state={"initial": 1}, **self.keys)
+        for i in range(4):
+            self.service.append_event(self.parent, _event(f"e{i}", state_delta={"step": i}))
+
+    def test_fork_at_tip(self):
+        fork = self.service.fork_session(session_id=self.parent.id, new_session_id="fork", **self.keys)
+
+        self.assertEqual(fork.id, "fork")
+        self.assertEqual(_texts(fork.events), ["e0", "e1", "e2", "e3"])
+        self.assertEqual(fork.state, {"initial": 1, "step": 3})
+
+    def test_branches_are_independent(self):
+        fork = self.service.fork_session(session_id=self.parent.id, at_event=2, **self.keys)
+        self.assertEqual(fork.state, {"initial": 1, "step": 1})
+
+        self.service.append_event(fork, _event("fork-only", state_delta={"branch": True}))
+        self.service.append_event(self.parent, _event("parent-only"))
+
+        stored_fork = self.service.get_session(session_id=fork.id, **self.keys)
+        stored_parent = self.service.get_session(session_id=self.parent.id, **self.keys)
+        self.assertEqual(_texts(stored_fork.events), ["e0", "e1", "fork-only"])
+        self.assertEqual(stored_fork.state, {"initial": 1, "step": 1, "branch": True})
+        self.assertEqual(_texts(stored_parent.events), ["e0", "e1", "e2", "e3", "parent-only"])
+        self.assertNotIn("branch", stored_parent.state)
+
+    def test_invalid_forks(self):
+        with self.assertRaises(ValueError):
+            self.service.fork_session(session_id="missing", **self.keys)
+        with self.assertRaises(ValueError):
+            self.service.fork_session(session_id=self.parent.id, at_event=5, **self.keys)
+        with self.assertRaises(ValueError):
+            self.service.fork_session(session_id=self.parent.id, new_session_id=self.parent.id, **self.keys)
+
+    def test_fork_cost_does_not_depend_on_session_length(self):
+        for i in range(5000):
+            self.service.append_event(self.parent, _event(f"bulk{i}"))
+
+        tracemalloc.start()
+        try:
+            start = time.perf_counter()
+            fork = self.service.fork_session(session_id=self.parent.id, **self.keys)
+            elapsed = time.perf_counter() - start
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        self.assertEqual(len(fork.events), 5004)
+        # A copy of 5,000 events would take far more than this
+        self.assertLess(peak, 64 * 1024)
+        self.assertLess(elapsed, 0.05)
+
+
+class TestFileSystemSessionServiceFork(unittest.TestCase):
+    """Tests forking sessions that only exist on disk."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.sessions_dir = Path(self.temp_dir.name)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_fork_session_loaded_from_file(self):
+        writer = FileSystemSessionService(sessions_dir=str(self.sessions_dir))
+        session = writer.create_session(app_name="test_app", user_id="test_user", session_id="saved")
+        writer.append_event(session, _event("from disk"))
+        saved = writer.get_session(app_name="test_app", user_id="test_user", session_id="saved")
+        (self.sessions_dir / "saved.session.json").write_text(saved.model_dump_json())
+
+        service = FileSystemSessionService(sessions_dir=str(self.sessions_dir))
+        fork = service.fork_session(app_name="test_app", user_id="test_user", session_id="saved")
+
+        self.assertEqual(_texts(fork.events), ["from disk"])
+        self.assertIsNotNone(service.get_session(app_name="test_app", user_id="test_user", session_id=fork.id))
+
+    def test_fork_can_be_saved_and_reloaded(self):
+        service = FileSystemSessionService(sessions_dir=str(self.sessions_dir))
+        parent = service.create_session(app_name="test_app", user_id="test_user", state={"initial": 1})
+        for i in range(3):
+            service.append_event(parent, _event(f"e{i}", state_delta={"step": i}))
+        fork = service.fork_session(app_name="test_app", user_id="test_user", session_id=parent.id, at_event=2, new_session_id="fork")
+        service.append_event(fork, _event("fork-only"))
+
+        self.assertEqual(fork.model_dump(mode="json")["id"], "fork")
+        service.save_session(fork)
+        reloaded = FileSystemSessionService(sessions_dir=str(self.sessions_dir)).get_session(app_name="test_app", user_id="test_user", session_id="fork")
+
+        self.assertEqual(_texts(reloaded.events), ["e0", "e1", "fork-only"])
+        self.assertEqual(reloaded.state, {"initial": 1, "step": 1})
+
+
+if __name__ == "__main__":
+    unittest.main()
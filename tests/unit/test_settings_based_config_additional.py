@@ -148,7 +148,7 @@ class TestCreateDefaultConfigFile:
 class TestGetApiKey:
     """Tests for the get_api_key function."""
 
-    @patch("code_agent.config.settings_based_config._config")
+    @patch("code_agent.config.config._config")
     def test_get_api_key_exists(self, mock_config):
         """Test getting an API key that exists in config."""
         # Set up mock config
@@ -161,7 +161,7 @@ class TestGetApiKey:
         # Check result
         assert result == "sk-test-key"
 
-    @patch("code_agent.config.settings_based_config._config")
+    @patch("code_agent.config.config._config")
     def test_get_api_key_missing(self, mock_config):
         """Test getting an API key that doesn't exist in config."""
         # Set up mock config with proper non-existent attribute behavior
@@ -177,7 +177,7 @@ class TestGetApiKey:
         # Check result
         assert result is None
 
-    @patch("code_agent.config.settings_based_config._config")
+    @patch("code_agent.config.config._config")
     @patch.dict(os.environ, {"CODE_AGENT_API_KEYS__OPENAI": "sk-env-key"})
     def test_get_api_key_custom_env_var(self, mock_config):
         """Test getting an API key with custom provider-specific env var."""
@@ -199,8 +199,8 @@ class TestGetApiKey:
 class TestInitializeConfig:
     """Tests for the initialize_config function."""
 
-    @patch("code_agent.config.settings_based_config._config", None)
-    @patch("code_agent.config.settings_based_config.build_effective_config")
+    @patch("code_agent.config.config._config", None)
+    @patch("code_agent.config.config.build_effective_config")
     def test_initialize_config_first_time(self, mock_build_config):
         """Test initializing config for the first time."""
         # Set up mock
@@ -216,8 +216,8 @@ class TestInitializeConfig:
         # Check result is the settings object
         assert result is mock_settings
 
-    @patch("code_agent.config.settings_based_config._config")
-    @patch("code_agent.config.settings_based_config.build_effective_config")
+    @patch("code_agent.config.config._config")
+    @patch("code_agent.config.config.build_effective_config")
     def test_initialize_config_force_reinit(self, mock_build_config, mock_global_config):
         """Test reinitializing config with force_reinit=True."""
         # Set up mocks
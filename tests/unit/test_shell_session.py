@@ -0,0 +1,207 @@
+"""
+Tests for persistent shells in code_agent.tools.shell_session.
+"""
+
+import asyncio
+import shutil
+import time
+from types import SimpleNamespace
+from unittest import mock
+
+import pytest
+
+from code_agent.config.settings_based_config import CodeAgentSettings, NativeCommandSettings
+from code_agent.tools import shell_session
+from code_agent.tools.native_tools import run_native_command
+from code_agent.tools.shell_session import ShellSession, ShellSessionPool, uses_shell_syntax
+
+pytestmark = pytest.mark.skipif(shutil.which("bash") is None, reason="persistent shells need bash")
+
+
+def _run_all(shell, *commands, **kwargs):
+    async def main():
+        try:
+            return [await shell.run(command, **kwargs) for command in commands]
+        finally:
+            await shell.close()
+
+    return asyncio.run(main())
+
+
+def test_state_carries_over_between_commands(tmp_path):
+    shell = ShellSession()
+    results = _run_all(shell, f"cd {tmp_path} && export GREETING=hello", "pwd; echo $GREETING; echo oops >&2; false", "printf 'no newline'")
+
+    assert [result.return_code for result in results] == [0, 1, 0]
+    assert (results[1].stdout, results[1].stderr) == (f"{tmp_path}\nhello\n", "oops\n")
+    assert results[2].stdout == "no newline"
+    assert (shell.starts, shell.commands_run) == (1, 3)
+
+
+def test_working_directory_applies_to_one_command(tmp_path):
+    results = _run_all(ShellSession(), "cd /", "pwd", "pwd", working_directory=None)
+    assert results[1].stdout == "/\n"
+
+    async def main():
+        shell = ShellSession()
+        try:
+            inside = await shell.run("pwd; export INSIDE=1", working_directory=str(tmp_path))
+            after = await shell.run("pwd; echo $INSIDE")
+            return inside, after
+        finally:
+            await shell.close()
+
+    inside, after = asyncio.run(main())
+    assert inside.stdout == f"{tmp_path}\n"
+    # The directory is restored, other changes are kept
+    assert after.stdout.split("\n")[1] == "1"
+    assert after.stdout.split("\n")[0] != str(tmp_path)
+
+
+def test_commands_cannot_break_the_framing():
+    results = _run_all(ShellSession(), "cat", "echo 'unclosed", "echo fine")
+    assert results[0].return_code == 0
+    assert results[1].return_code == 2 and "unexpected EOF" in results[1].stderr
+    assert (results[2].return_code, results[2].stdout) == (0, "fine\n")
+
+
+def test_marker_split_across_reads(monkeypatch):
+    monkeypatch.setattr(shell_session, "_READ_CHUNK_BYTES", 3)
+    results = _run_all(ShellSession(), "echo abcdefghij; echo xyz >&2")
+    assert (results[0].stdout, results[0].stderr, results[0].return_code) == ("abcdefghij\n", "xyz\n", 0)
+
+
+def test_timeout_and_exit_restart_the_shell():
+    shell = ShellSession()
+    start = time.perf_counter()
+    results = _run_all(shell, "export KEPT=1", "sleep 5 & sleep 30", "echo [$KEPT]", "exit 7", "echo back", timeout=1)
+
+    assert time.perf_counter() - start < 10
+    assert results[1].timed_out and results[1].return_code is None
+    assert results[2].stdout == "[]\n"
+    assert results[3].shell_exited and results[3].return_code == 7
+    assert (results[4].stdout, shell.starts) == ("back\n", 3)
+
+
+def test_pool_keeps_one_shell_per_session():
+    pool = ShellSessionPool()
+
+    async def main():
+        await pool.get("a").run("export WHO=a")
+        result = await pool.get("b").run("echo [$WHO]")
+        same = pool.get("a") is pool.get("a")
+        await pool.close_all()
+        return result, same
+
+    result, same = asyncio.run(main())
+    assert result.stdout == "[]\n"
+    assert same
+
+
+def test_pool_closes_idle_shells():
+    pool = ShellSessionPool(idle_timeout=0.2)
+
+    async def main():
+        await pool.get("idle").run("true")
+        busy = asyncio.create_task(pool.get("busy").run("sleep 1"))
+        await asyncio.sleep(0.6)
+        # The background reaper closed the unused shell but not the one running a command
+        survivors = sorted(pool._sessions)
+        await busy
+        await pool.close_all()
+        return survivors
+
+    assert asyncio.run(main()) == ["busy"]
+    assert asyncio.run(ShellSessionPool().close_idle()) == 0
+
+
+def test_run_native_command_uses_the_persistent_shell(tmp_path):
+    settings = mock.MagicMock(spec=CodeAgentSettings)
+    settings.auto_approve_native_commands = True
+    settings.native_commands = NativeCommandSettings(persistent_shell=True)
+    pool = ShellSessionPool()
+
+    async def main():
+        await run_native_command(f"cd {tmp_path}", session_id="s1")
+        output = await run_native_command("pwd && ls missing-file", session_id="s1")
+        await pool.close_all()
+        return output
+
+    with (
+        mock.patch("code_agent.tools.native_tools.get_config", return_value=settings),
+        mock.patch("code_agent.tools.native_tools.get_shell_pool", return_value=pool),
+        mock.patch("code_agent.tools.native_tools.console"),
+        mock.patch("code_agent.tools.native_tools.print"),
+        mock.patch("code_agent.tools.progress_indicators.print"),
+    ):
+        output = asyncio.run(main())
+
+    assert output.startswith(str(tmp_path))
+    assert "Error (exit code: 2)" in output
+
+
+@pytest.mark.parametrize(
+    "command, expected",
+    [
+        ("ls -la src", False),
+        ("git commit -m 'a message'", False),
+        ("rm -rf ~", True),
+        ("rm -rf *", True),
+        ("ls; rm -rf ~", True),
+        ("cat x > ~/.bashrc", True),
+        ("ls $(touch pwned)", True),
+        ("echo $HOME", True),
+        ("cat {a,b}", True),
+        ("cat 'unclosed", True),
+    ],
+)
+def test_uses_shell_syntax(command, expected):
+    assert uses_shell_syntax(command) is expected
+
+
+def test_persistent_shell_asks_before_expanding_shell_syntax(tmp_path):
+    settings = mock.MagicMock(spec=CodeAgentSettings)
+    settings.auto_approve_native_commands = False
+    settings.native_commands = NativeCommandSettings(persistent_shell=True)
+    pool = ShellSessionPool()
+    (tmp_path / "keep").write_text("x")
+
+    async def main():
+        output = await run_native_command("rm -rf *", working_directory=str(tmp_path), session_id="s1")
+        await pool.close_all()
+        return output
+
+    with (
+        mock.patch("code_agent.tools.native_tools.get_config", return_value=settings),
+        mock.patch("code_agent.tools.native_tools.get_shell_pool", return_value=pool),
+        mock.patch("code_agent.tools.native_tools.is_command_allowlisted", return_value=True),
+        mock.patch("code_agent.tools.native_tools.Confirm.ask", return_value=False) as ask,
+        mock.patch("code_agent.tools.native_tools.console"),
+        mock.patch("code_agent.tools.native_tools.print"),
+        mock.patch("code_agent.tools.progress_indicators.print"),
+    ):
+        output = asyncio.run(main())
+
+    ask.assert_called_once()
+    assert output == "Command execution cancelled by user choice."
+    assert (tmp_path / "keep").exists()
+
+
+def test_vetted_shell_commands_can_share_a_persistent_shell(monkeypatch, tmp_path):
+    from code_agent.agent.software_engineer.software_engineer.tools import shell_command
+
+    monkeypatch.setattr(shell_command, "USE_PERSISTENT_SHELL", True)
+    pool = ShellSessionPool()
+    monkeypatch.setattr(shell_command, "get_shell_pool", lambda: pool)
+    context = SimpleNamespace(_invocation_context=SimpleNamespace(session=SimpleNamespace(id="s1")))
+
+    async def main():
+        await shell_command.execute_vetted_shell_command({"command": f"cd {tmp_path}"}, context)
+        result = await shell_command.execute_vetted_shell_command({"command": "pwd"}, context)
+        timed_out = await shell_command.execute_vetted_shell_command({"command": "sleep 30", "timeout": 1}, context)
+        await pool.close_all()
+        return result, timed_out
+
+    result, timed_out = asyncio.run(main())
+    assert (result.status, result.return_code, result.stdout) == ("executed", 0, str(tmp_path))
+    assert (timed_out.status, timed_out.return_code) == ("error", -2)
@@ -0,0 +1,81 @@
+"""
+Tests for lazy sub-agent loading in the software_engineer agent.
+"""
+
+import subprocess
+import sys
+import types
+
+import pytest
+from google.adk.agents import LlmAgent
+
+from code_agent.agent.software_engineer.software_engineer.shared_libraries.lazy_agent import LazyAgent
+
+MODULE_NAME = "code_agent_lazy_agent_test_module"
+SE_PACKAGE = "code_agent.agent.software_engineer.software_engineer"
+
+
+@pytest.fixture
+def agent_module():
+    """Registers a module defining a sub-agent, as the sub_agents/*/agent.py files do."""
+    module = types.ModuleType(MODULE_NAME)
+    module.helper_agent = LlmAgent(name="helper_agent", description="Helps out", model="gemini-2.0-flash")
+    sys.modules[MODULE_NAME] = module
+    yield module
+    sys.modules.pop(MODULE_NAME, None)
+
+
+def _tree(attribute="helper_agent"):
+    proxy = LazyAgent(name="helper_agent", description="Helps out", module=MODULE_NAME, attribute=attribute)
+    other = LlmAgent(name="other_agent", model="gemini-2.0-flash")
+    root = LlmAgent(name="root", model="gemini-2.0-flash", sub_agents=[proxy, other])
+    return root, proxy
+
+
+def test_find_agent_loads_and_swaps_in_real_agent(agent_module):
+    root, proxy = _tree()
+    assert not proxy.is_loaded
+    assert proxy.parent_agent is root
+
+    found = root.find_agent("helper_agent")
+
+    assert found is agent_module.helper_agent
+    assert proxy.is_loaded
+    assert root.sub_agents[0] is found
+    assert found.parent_agent is root
+    # Later lookups go straight to the real agent
+    assert root.find_agent("helper_agent") is found
+
+
+def test_lookup_of_other_agents_does_not_load(agent_module):
+    root, proxy = _tree()
+    assert root.find_agent("other_agent").name == "other_agent"
+    assert root.find_agent("missing") is None
+    assert not proxy.is_loaded
+
+
+def test_name_mismatch_is_rejected(agent_module):
+    agent_module.wrong_agent = LlmAgent(name="wrong_agent", model="gemini-2.0-flash")
+    root, _ = _tree(attribute="wrong_agent")
+    with pytest.raises(ValueError):
+        root.find_agent("helper_agent")
+
+
+def test_importing_root_agent_does_not_import_sub_agents():
+    code = f"import sys; import {SE_PACKAGE}.agent; print(sorted(m for m in sys.modules if '.sub_agents.' in m or m.endswith('tools.code_analysis')))"
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == "[]"
+
+
+def test_proxies_match_real_sub_agents():
+    from code_agent.agent.software_engineer.software_engineer.agent import root_agent
+
+    for sub_agent in list(root_agent.sub_agents):
+        if not isinstance(sub_agent, LazyAgent):
+            continue
+        name, description = sub_agent.name, sub_agent.description
+        real_agent = sub_agent.load()
+        assert real_agent.name == name
+        assert real_agent.description == description
+        assert real_agent.parent_agent is root_agent
@@ -0,0 +1,98 @@
+"""
+Tests for the software_engineer agent's execute_vetted_shell_command tool.
+"""
+
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+from code_agent.agent.software_engineer.software_engineer.tools import shell_command
+from code_agent.agent.software_engineer.software_engineer.tools.shell_command import (
+    ExecuteVettedShellCommandOutput,
+    execute_vetted_shell_command,
+    execute_vetted_shell_command_tool,
+)
+
+
+def _python(script: str) -> str:
+    return f"{sys.executable} -c {script!r}"
+
+
+def _run(args):
+    return asyncio.run(execute_vetted_shell_command(args, tool_context=None))
+
+
+def _is_running(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    # An exited process that nobody has reaped yet is not running
+    status = Path(f"/proc/{pid}/status")
+    return not (status.exists() and "\nState:\tZ" in status.read_text())
+
+
+def test_executes_command_and_captures_output(tmp_path):
+    result = _run({"command": _python("import os, sys; print(os.getcwd()); print('oops', file=sys.stderr); sys.exit(3)"), "working_directory": str(tmp_path)})
+    assert isinstance(result, ExecuteVettedShellCommandOutput)
+    assert (result.status, result.return_code, result.stdout, result.stderr) == ("executed", 3, str(tmp_path), "oops")
+    assert result.message == "Command executed with non-zero exit code."
+
+
+def test_command_not_found():
+    result = _run({"command": "definitely-not-a-command-xyz --version"})
+    assert (result.status, result.return_code) == ("error", -1)
+
+
+@pytest.mark.skipif(not hasattr(os, "killpg"), reason="process groups are POSIX-only")
+def test_timeout_kills_the_whole_process_group(tmp_path):
+    pid_file = tmp_path / "child.pid"
+    script = f"import subprocess, time; child = subprocess.Popen(['sleep', '30']); open({str(pid_file)!r}, 'w').write(str(child.pid)); time.sleep(30)"
+
+    start = time.perf_counter()
+    result = _run({"command": _python(script), "timeout": 1})
+
+    assert time.perf_counter() - start < 10
+    assert (result.status, result.return_code) == ("error", -2)
+    child_pid = int(pid_file.read_text())
+    deadline = time.monotonic() + 5
+    while _is_running(child_pid) and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert not _is_running(child_pid)
+
+
+def test_commands_run_concurrently_up_to_the_limit_without_blocking_the_loop(monkeypatch):
+    monkeypatch.setattr(shell_command, "MAX_CONCURRENT_SHELL_COMMANDS", 2)
+    command = _python("import time; time.sleep(0.3)")
+
+    async def main():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticking = asyncio.create_task(ticker())
+        start = time.perf_counter()
+        results = await asyncio.gather(*(execute_vetted_shell_command({"command": command}, tool_context=None) for _ in range(4)))
+        elapsed = time.perf_counter() - start
+        ticking.cancel()
+        return results, elapsed, ticks
+
+    results, elapsed, ticks = asyncio.run(main())
+
+    assert [result.return_code for result in results] == [0, 0, 0, 0]
+    # Two at a time: two rounds of 0.3s, not one (unlimited) or four (serial)
+    assert 0.6 <= elapsed < 1.2
+    assert ticks > 20
+
+
+def test_function_tool_awaits_the_command():
+    result = asyncio.run(execute_vetted_shell_command_tool.run_async(args={"args": {"command": _python("print('hi')")}}, tool_context=None))
+    assert (result.status, result.stdout) == ("executed", "hi")
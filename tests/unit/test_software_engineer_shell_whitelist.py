@@ -0,0 +1,157 @@
+"""
+Tests for the software_engineer agent's argument-aware shell command whitelist.
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from code_agent.agent.software_engineer.software_engineer.tools.shell_command import check_shell_command_safety, configure_shell_whitelist
+from code_agent.agent.software_engineer.software_engineer.tools.shell_whitelist import (
+    DEFAULT_SAFE_COMMANDS,
+    STATE_KEY,
+    ArgumentRule,
+    ShellWhitelist,
+    command_tokens,
+)
+
+
+def _context(**state):
+    return SimpleNamespace(state=dict(state))
+
+
+@pytest.mark.parametrize(
+    "command, entry",
+    [
+        ("ls", "ls"),
+        ("git status --short", "git status"),
+        ("kubectl get pods -n x", "kubectl get"),
+        ("git branch -a", "git branch"),
+        ("git branch --show-current", "git branch --show-current"),
+        ("git log --oneline -n 5 -- src", "git log"),
+        ("find . -name '*.py' -type f", "find"),
+        ("ip addr show dev eth0", "ip addr show"),
+        ("grep -rn 'a b' src", "grep"),
+        ("grep -r /etc/passwd src", "grep"),
+        ("grep -e x -- -file", "grep"),
+        ("cat README.md src/main.py", "cat"),
+        ("git diff HEAD~1 main..feature -- src", "git diff"),
+        ("tail -n 20 logs/app.log", "tail"),
+        ("kubectl get pods,services -o wide", "kubectl get"),
+        ("kubectl get deploy -oname", "kubectl get"),
+    ],
+)
+def test_default_entries_cover_safe_arguments(command, entry):
+    assert ShellWhitelist.from_state(None).match(command) == entry
+
+
+@pytest.mark.parametrize(
+    "command",
+    [
+        "git branch -D main",
+        "git branch new-feature",
+        "git tag v1.0",
+        "find . -delete",
+        "find . -exec rm {} +",
+        "git diff --output=patch.diff",
+        "date -s2020-01-01",
+        "ss -tK",
+        "ip route add default via 10.0.0.1",
+        "kubectl config view --raw",
+        "git remote -v add origin x",
+        "ls; rm -rf x",
+        "ls && rm -rf x",
+        "cat file | sh",
+        "ls > out.txt",
+        "ls 2>&1",
+        "echo $(rm x)",
+        "echo `rm x`",
+        "ls\nrm x",
+        "cat 'unclosed",
+        "git statusx",
+        "rm -rf build",
+        "cat /root/.ssh/id_rsa",
+        "cat ../.env",
+        "cat ~/.aws/credentials",
+        "cat $HOME/.netrc",
+        "cat {/etc/shadow,x}",
+        "head -n 5 src/../../secret",
+        "grep -r AWS_SECRET /home",
+        "grep -e AWS_SECRET /home",
+        "grep -re AWS_SECRET /home",
+        "grep -f /etc/patterns src",
+        "kubectl get secret db -o yaml",
+        "git diff --no-index /root/.ssh/id_rsa /dev/null",
+        "git diff --no-index a b",
+        "git diff /root/.ssh/id_rsa /dev/null",
+        "git diff HEAD -- ../outside",
+        "git grep --no-index token",
+        "kubectl get secrets",
+        "kubectl get pods,secrets",
+        "kubectl get secret/db",
+        "kubectl get pods -o json",
+        "kubectl get pods -ojsonpath={.items}",
+        "kubectl get pods --output=yaml",
+        "kubectl get --raw /api/v1/namespaces/default/secrets",
+        "",
+    ],
+)
+def test_commands_not_covered(command):
+    assert ShellWhitelist.from_state(None).match(command) is None
+
+
+def test_argument_rules():
+    listing = ArgumentRule(allowed_flags=frozenset({"-a", "-v", "--sort"}), positional=False)
+    assert listing.accepts(["-av", "--sort=-date"])
+    assert not listing.accepts(["-ad"])
+    assert not listing.accepts(["name"])
+    assert ArgumentRule(forbidden_flags=frozenset({"-f"})).accepts(["--", "-f"])
+    files = ArgumentRule(workspace_paths=True, pattern_first=True, pattern_flags=frozenset({"-e"}))
+    assert files.accepts(["/pattern", "src", "-"])
+    assert not files.accepts(["/pattern", "/etc"])
+    assert not files.accepts(["src", "-e", "/pattern"])
+    resources = ArgumentRule(forbidden_resources=frozenset({"secrets"}), output_formats=frozenset({"wide"}))
+    assert resources.accepts(["pods", "-o", "wide"])
+    assert not resources.accepts(["pods", "-o"])
+    assert not resources.accepts(["Secrets.v1"])
+    assert command_tokens("echo 'a b'") == ["echo", "a b"]
+
+
+def test_broader_entries_win_over_restricted_ones():
+    whitelist = ShellWhitelist({"git branch": ArgumentRule(positional=False), "git": ArgumentRule()})
+    assert whitelist.match("git branch -D main") == "git"
+
+
+def test_state_stores_only_the_differences_from_the_defaults():
+    context = _context()
+    configure_shell_whitelist({"action": "add", "command": "make test"}, context)
+    configure_shell_whitelist({"action": "remove", "command": "ping"}, context)
+    assert context.state[STATE_KEY] == {"defaults": True, "added": ["make test"], "removed": ["ping"]}
+
+    listed = configure_shell_whitelist({"action": "list"}, context).whitelist
+    assert listed == [entry for entry in DEFAULT_SAFE_COMMANDS if entry != "ping"] + ["make test"]
+    assert check_shell_command_safety({"command": "make test -j4"}, context).status == "whitelisted"
+    assert check_shell_command_safety({"command": "ping -c 1 host"}, context).status == "approval_required"
+
+    assert "Error" in configure_shell_whitelist({"action": "add", "command": "make | sh"}, context).status
+    configure_shell_whitelist({"action": "clear"}, context)
+    assert configure_shell_whitelist({"action": "list"}, context).whitelist == []
+    configure_shell_whitelist({"action": "add", "command": "ls"}, context)
+    assert context.state[STATE_KEY] == {"defaults": False, "added": ["ls"], "removed": []}
+
+
+def test_legacy_list_state_keeps_default_rules():
+    context = _context(**{STATE_KEY: ["git branch", "make"]})
+    assert check_shell_command_safety({"command": "git branch -a"}, context).status == "whitelisted"
+    assert check_shell_command_safety({"command": "git branch -D x"}, context).status == "approval_required"
+    assert check_shell_command_safety({"command": "make all"}, context).status == "whitelisted"
+    assert check_shell_command_safety({"command": "ls"}, context).status == "approval_required"
+
+
+def test_safety_check_initializes_state_and_respects_disabled_approval():
+    context = _context(require_shell_approval=False)
+    result = check_shell_command_safety({"command": "git status --short"}, context)
+    assert result.status == "whitelisted"
+    assert "'git status'" in result.message
+    assert STATE_KEY in context.state
+    assert check_shell_command_safety({"command": "rm -rf build"}, context).status == "approval_disabled"
@@ -0,0 +1,117 @@
+"""
+Tests for tracing helpers and local trace export in code_agent.telemetry.
+"""
+
+import asyncio
+import inspect
+import json
+import subprocess
+import sys
+
+import pytest
+
+from code_agent import telemetry
+from code_agent.telemetry import configure_tracing, shutdown_tracing, span, traced
+
+
+@pytest.fixture
+def trace_file(tmp_path):
+    """Records spans for the duration of a test and yields a function returning the written trace."""
+    path = tmp_path / "trace.json"
+
+    def written():
+        assert shutdown_tracing() == path
+        return json.loads(path.read_text(encoding="utf-8"))
+
+    yield path, written
+    shutdown_tracing()
+
+
+def _otlp_spans(document):
+    return {
+        span["name"]: span
+        for resource_spans in document["resourceSpans"]
+        for scope_spans in resource_spans["scopeSpans"]
+        for span in scope_spans["spans"]
+        if scope_spans["scope"]["name"] == telemetry.TRACER_NAME
+    }
+
+
+def test_span_is_a_no_op_without_opentelemetry():
+    code = (
+        "import sys; from code_agent.telemetry import span, traced\n"
+        "with span('x', a=1) as current: print(current)\n"
+        "print(traced('y')(lambda: 'called')())\n"
+        "print('opentelemetry.trace' in sys.modules)"
+    )
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.split() == ["None", "called", "False"]
+
+
+def test_otlp_export(trace_file):
+    path, written = trace_file
+    configure_tracing(path, "otlp")
+
+    with span("outer", session_id="s1", skipped=None):
+        with pytest.raises(RuntimeError), span("inner", count=3):
+            raise RuntimeError("boom")
+
+    spans = _otlp_spans(written())
+    outer, inner = spans["outer"], spans["inner"]
+    assert inner["parentSpanId"] == outer["spanId"]
+    assert inner["traceId"] == outer["traceId"]
+    assert outer["attributes"] == [{"key": "session_id", "value": {"stringValue": "s1"}}]
+    assert inner["attributes"] == [{"key": "count", "value": {"intValue": "3"}}]
+    assert inner["status"]["code"] == 2
+    assert int(outer["endTimeUnixNano"]) >= int(inner["endTimeUnixNano"])
+
+
+def test_chrome_export(trace_file):
+    path, written = trace_file
+    configure_tracing(path, "chrome")
+
+    with span("turn"), span("tool"):
+        pass
+
+    events = written()["traceEvents"]
+    complete = {event["name"]: event for event in events if event["ph"] == "X"}
+    assert set(complete) >= {"turn", "tool"}
+    assert complete["turn"]["tid"] == complete["tool"]["tid"]
+    assert complete["turn"]["ts"] <= complete["tool"]["ts"]
+    assert complete["turn"]["dur"] >= complete["tool"]["dur"]
+
+
+def test_unknown_format(tmp_path):
+    with pytest.raises(ValueError):
+        configure_tracing(tmp_path / "trace.json", "xml")
+
+
+def test_traced_records_arguments(trace_file):
+    path, written = trace_file
+    configure_tracing(path)
+
+    @traced("sync_op", record=("path",))
+    def sync_op(path, flag=False):
+        return path
+
+    @traced("async_op", record=("command",))
+    async def async_op(tool_context, command):
+        return command
+
+    assert sync_op("a.txt") == "a.txt"
+    assert asyncio.run(async_op(None, command="ls")) == "ls"
+    assert inspect.iscoroutinefunction(async_op)
+    assert list(inspect.signature(async_op).parameters) == ["tool_context", "command"]
+
+    spans = _otlp_spans(written())
+    assert spans["sync_op"]["attributes"] == [{"key": "path", "value": {"stringValue": "a.txt"}}]
+    assert spans["async_op"]["attributes"] == [{"key": "command", "value": {"stringValue": "ls"}}]
+
+
+def test_traced_tools_keep_their_declarations():
+    from code_agent.adk.tools import create_read_file_tool
+
+    tool = create_read_file_tool()
+    assert tool.name == "read_file"
+    assert "path" in tool._get_declaration().parameters.properties
@@ -253,16 +253,10 @@ class TestCommandSecurity(unittest.TestCase):
         self.assertEqual(reason, "")
         self.assertFalse(is_warning)
 
-        # Test with command matching risky pattern but also on allowlist
-        # Current implementation doesn't handle allowlisted but risky commands correctly
-        # It returns False with an empty reason, so match that behavior
-        with patch("code_agent.tools.security.re.search") as mock_re_search:
-            # Make re.search return True for risky pattern matching
-            mock_re_search.return_value = True
-
-            # Try an allowlisted command that also matches a risky pattern
+        # Being allowlisted does not exempt a command from the dangerous patterns
+        with patch("code_agent.tools.security.DANGEROUS_COMMAND_PATTERNS", [r"npm\s+install\s+-g"]):
+            # Try an allowlisted command that also matches a dangerous pattern
             is_safe, reason, is_warning = is_command_safe("npm install -g something")
-            # The implementation currently returns False here
             self.assertFalse(is_safe)
 
     @patch("code_agent.tools.security.get_config")